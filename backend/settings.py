@@ -4,9 +4,12 @@ Django settings for backend project.
 
 from pathlib import Path
 import os
+import sys
 import logging.config
 from datetime import timedelta
 
+from common.db import connection_settings
+
 # Build paths inside the project
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -20,6 +23,10 @@ ALLOWED_HOSTS = ["*"]
 
 # ✅ Media Files Configuration
 MEDIA_URL = "/media/"
+# Scheme and host clients reach this server at, e.g. https://api.example.com.
+# Makes media URLs absolute where there is no request to take them from
+# (notifications pushed over websockets); unset, those stay relative.
+PUBLIC_BASE_URL = os.environ.get('PUBLIC_BASE_URL', '')
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
 # ✅ Static Files
@@ -47,6 +54,7 @@ INSTALLED_APPS = [
     'feed.apps.FeedConfig',
     'users.apps.UsersConfig',
     'messaging.apps.MessagingConfig',
+    'recommendations.apps.RecommendationsConfig',
 
     # Django AllAuth
     'django.contrib.sites',
@@ -57,6 +65,8 @@ INSTALLED_APPS = [
 ]
 
 # ✅ Channels Configuration
+# Notification pushes are sent from HTTP views, so when HTTP and websockets are
+# served by different processes switch to channels_redis.core.RedisChannelLayer.
 ASGI_APPLICATION = 'backend.asgi.application'
 CHANNEL_LAYERS = {
     'default': {
@@ -64,14 +74,92 @@ CHANNEL_LAYERS = {
     },
 }
 
+# ✅ Cache Configuration
+# Process-local by default; point this at a shared backend (e.g. Redis) when
+# running several workers so cached counters are consistent between them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sono-default',
+    },
+    # Rendered public responses (see common/response_cache.py). Set
+    # RESPONSE_CACHE_DIR to share entries and invalidations between workers
+    # on one host through a FileBasedCache directory.
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache'
+        if os.environ.get('RESPONSE_CACHE_DIR') else 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': os.environ.get('RESPONSE_CACHE_DIR', 'sono-responses'),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+# Discover, public profiles and the post listing are served from the
+# 'responses' cache, invalidated by tag when posts, likes, comments,
+# profiles or follows change
+RESPONSE_CACHE = {
+    'ENABLED': True,
+    'CACHE': 'responses',
+    'TIMEOUT': 30,
+    'STALE_TIMEOUT': 300,
+    'CACHE_AUTHENTICATED': True,
+}
+
+# Likes and comments on the same post within this window are grouped into a
+# single "X and N others ..." notification
+NOTIFICATION_AGGREGATION_WINDOW = timedelta(hours=1)
+
+# Suggested collaborators, precomputed by `python manage.py compute_recommendations`
+# (see recommendations/engine.py). NumPy is used when installed.
+RECOMMENDATIONS = {
+    'TOP_K': 20,
+    'GENRE_WEIGHT': 1.0,
+    'TALENT_WEIGHT': 0.7,
+    'LOCATION_WEIGHT': 0.2,
+    'GRAPH_WEIGHT': 0.3,
+    'CROSS_TYPE_WEIGHT': 0.1,
+}
+
+# Trending feed (GET /api/feed/posts/?mode=trending), scored by
+# `python manage.py compute_trending` (see feed/trending.py)
+TRENDING = {
+    'HALF_LIFE': timedelta(hours=12),
+    'WINDOW': timedelta(days=7),
+    'LIKE_WEIGHT': 1.0,
+    'COMMENT_WEIGHT': 3.0,
+    'MIN_SCORE': 0.05,
+}
+
+# Batched likes/unlikes/comments from offline clients
+# (POST /api/feed/engagement/batch/, see feed/engagement.py)
+ENGAGEMENT_BATCH = {
+    'MAX_OPERATIONS': 200,
+    'KEY_TTL': timedelta(days=7),
+}
+
+# Per-request query count, DB/serializer time and response size, aggregated
+# per route at /metrics/ (see common/instrumentation.py). Views declare
+# query_budget; going over it fails the request under `manage.py test`.
+INSTRUMENTATION = {
+    'ENABLED': True,
+    'SERVER_TIMING': DEBUG,
+    'ENFORCE_QUERY_BUDGETS': 'test' in sys.argv,
+    # /metrics/ needs this bearer token; without one it is only served with
+    # DEBUG, to METRICS_ALLOWED_IPS. Don't forward /metrics/ from the proxy.
+    'METRICS_TOKEN': os.environ.get('METRICS_TOKEN', ''),
+    'METRICS_ALLOWED_IPS': ('127.0.0.1', '::1'),
+}
+
 # ✅ Middleware
 MIDDLEWARE = [
+    'common.instrumentation.RequestMetricsMiddleware',  # First, so it measures everything below
+    'common.compression.CompressionMiddleware',  # Before anything else that reads or changes the body
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'common.replicas.PrimaryStickinessMiddleware',  # Reads after a user's writes go to the primary
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',  # Add AllAuth middleware
@@ -107,10 +195,53 @@ DATABASES = {
         'PASSWORD': '1234',
         'HOST': 'localhost',
         'PORT': '5432',
+        # Persistent connections with health checks, or a connection pool
+        # when psycopg 3 is installed, capped at this process's share of
+        # DB_MAX_CONNECTIONS; see common/db.py for the DB_* environment variables. Under ASGI (Daphne)
+        # every HTTP request gives up its connection when it ends, whatever
+        # DB_CONN_MAX_AGE says, so only the pool reuses connections there
+        **connection_settings(),
     }
 }
 
+# ✅ Read Replicas
+# DB_REPLICA_HOSTS=host1,host2 adds a replica alias per host, with the
+# primary's credentials. Views decorated with common.replicas.read_from_replica
+# read from them; see that module for stickiness after writes and fallback.
+for number, host in enumerate(filter(None, (host.strip() for host in os.environ.get('DB_REPLICA_HOSTS', '').split(','))), 1):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'OPTIONS': dict(DATABASES['default'].get('OPTIONS', {})),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['common.replicas.ReplicaRouter']
+
+READ_REPLICAS = {
+    'ALIASES': [alias for alias in DATABASES if alias != 'default'],
+    'STICKY_SECONDS': int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 10)),
+    # Pins of token-authenticated users; use a cache shared by the workers when there are several
+    'CACHE': 'default',
+}
+
 # ✅ Authentication Backends
+# Password hashing: the first hasher is the preferred one. Stored hashes made
+# with another hasher or cost are upgraded transparently on the next login.
+PASSWORD_HASHERS = [
+    'users.hashers.ConfigurablePBKDF2PasswordHasher',  # Also reads the stock pbkdf2_sha256 hashes
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 0)) or None  # None: Django's default
+
+# Cap on concurrent password hashes (0 = no cap, hash inline). Requests still
+# wait for their hash; logins that can't get a slot within the timeout get a 503.
+PASSWORD_VERIFY_THREADS = 0
+PASSWORD_VERIFY_TIMEOUT = 5  # seconds
+
 AUTHENTICATION_BACKENDS = [
     'users.auth_backend.CustomUserBackend',
     'django.contrib.auth.backends.ModelBackend',
@@ -126,6 +257,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson when installed, with DRF's output (see common/fast_json.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'common.fast_json.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'common.fast_json.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 # JWT Settings
@@ -193,6 +334,16 @@ JAZZMIN_SETTINGS = {
 }
 
 # ✅ Configure logging to prevent large log files
+# Handlers write from a background thread (common.log.BackgroundHandler);
+# the file gets one JSON object per line. LOG_LEVEL=DEBUG shows the
+# per-request detail of the hot paths.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+
+# Keep 1 in 1/rate INFO/DEBUG records of these high-volume loggers
+LOG_SAMPLING = {
+    'messaging.consumers': 0.1,  # Per chat message
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -205,20 +356,33 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'structured': {
+            '()': 'common.log.StructuredFormatter',
+        },
+    },
+    'filters': {
+        'sampling': {
+            '()': 'common.log.SamplingFilter',
+            'rates': LOG_SAMPLING,
+        },
     },
     'handlers': {
         'console': {
-            'level': 'INFO',
-            'class': 'logging.StreamHandler',
+            'level': 'DEBUG',
+            'class': 'common.log.BackgroundHandler',
+            'handler_class': 'logging.StreamHandler',
             'formatter': 'simple',
+            'filters': ['sampling'],
         },
         'file': {
-            'level': 'INFO',
-            'class': 'logging.handlers.RotatingFileHandler',
+            'level': 'DEBUG',
+            'class': 'common.log.BackgroundHandler',
+            'handler_class': 'logging.handlers.RotatingFileHandler',
             'filename': os.path.join(BASE_DIR, 'django.log'),
             'maxBytes': 10 * 1024 * 1024,  # 10 MB
             'backupCount': 5,
-            'formatter': 'verbose',
+            'formatter': 'structured',
+            'filters': ['sampling'],
         },
     },
     'loggers': {
@@ -229,17 +393,27 @@ LOGGING = {
         },
         'feed': {
             'handlers': ['console', 'file'],
-            'level': 'INFO',
+            'level': LOG_LEVEL,
             'propagate': True,
         },
         'users': {
             'handlers': ['console', 'file'],
-            'level': 'INFO',
+            'level': LOG_LEVEL,
             'propagate': True,
         },
         'messaging': {
             'handlers': ['console', 'file'],
-            'level': 'INFO',
+            'level': LOG_LEVEL,
+            'propagate': True,
+        },
+        'common': {
+            'handlers': ['console', 'file'],
+            'level': LOG_LEVEL,
+            'propagate': True,
+        },
+        'recommendations': {
+            'handlers': ['console', 'file'],
+            'level': LOG_LEVEL,
             'propagate': True,
         },
     },
@@ -269,8 +443,22 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
 # EMAIL_HOST_USER = 'your_email@gmail.com'  # Replace with your actual email
 # EMAIL_HOST_PASSWORD = 'your_app_password'  # Replace with your app password from Google
 
-# For development/testing, use the console backend
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# For development/testing, use the console backend, or
+# 'django.core.mail.backends.filebased.EmailBackend' to write mail to EMAIL_FILE_PATH
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+# Outbound mail is queued in the OutboundEmail table and delivered by
+# `python manage.py send_queued_mail` (see users/mail_queue.py).
+# SEND_IN_PROCESS also drains the queue from a background thread of the
+# web process, so development works without a separate worker.
+MAIL_QUEUE = {
+    'WORKERS': 2,
+    'BATCH_SIZE': 50,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF': 30,  # seconds, doubled after each failed attempt
+    'SEND_IN_PROCESS': DEBUG,
+}
 
 SOCIALACCOUNT_PROVIDERS = {
     'google': {
@@ -3,6 +3,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from common.instrumentation import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/feed/", include("feed.urls")),
@@ -10,6 +12,8 @@ urlpatterns = [
     path("api/notifications/", include("users.urls")),
     path('accounts/', include('allauth.urls')),  # Django AllAuth URLs
     path('api/messaging/', include('messaging.urls')),  # Messaging URLs
+    path('api/recommendations/', include('recommendations.urls')),
+    path('metrics/', metrics_view, name='metrics'),  # Token or DEBUG only, see common/instrumentation.py
 ]
 
 # ✅ Serve media files in development mode
@@ -0,0 +1,92 @@
+"""
+Small helpers shared by the benchmark management commands: run a request
+function from a pool of client threads and summarise the latencies.
+"""
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test import Client
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(latencies, elapsed, status_codes=None):
+    """Latency summary in milliseconds plus throughput for ``elapsed`` seconds"""
+    summary = {
+        'requests': len(latencies),
+        'elapsed_s': elapsed,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0,
+        'p50_ms': statistics.median(latencies) if latencies else None,
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': max(latencies) if latencies else None,
+    }
+    if status_codes is not None:
+        summary['status_codes'] = {str(code): count for code, count in sorted(status_codes.items())}
+    return summary
+
+
+def run_concurrently(request, total, concurrency):
+    """
+    Call ``request(client, i)`` for i in range(total) from ``concurrency``
+    threads, each with its own test Client and database connection.
+    ``request`` returns a response; its status code is tallied.
+    """
+    local = threading.local()
+    connections = []
+    latencies = []
+    status_codes = {}
+    lock = threading.Lock()
+
+    def call(i):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client()
+            with lock:
+                connections.append(connection)
+        started = time.perf_counter()
+        response = request(client, i)
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed)
+            status_codes[response.status_code] = status_codes.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(total)))
+    elapsed = time.perf_counter() - started
+
+    # Each thread opened its own database connection
+    for thread_connection in connections:
+        thread_connection.close()
+
+    summary = summarize(latencies, elapsed, status_codes)
+    summary['concurrency'] = concurrency
+    return summary
+
+
+@contextmanager
+def explicit_timestamps(model, *field_names):
+    """
+    Let save() and bulk_create() keep the given auto_now/auto_now_add values
+    instead of overwriting them with the current time (for synthetic data).
+    """
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
@@ -0,0 +1,216 @@
+"""
+Response compression.
+
+CompressionMiddleware encodes response bodies with the best encoding the
+client accepts. Accept-Encoding q-values come first; ties go to the
+server's order in COMPRESSION['ENCODINGS'], ``br``, ``zstd``, ``gzip`` by
+default. Brotli and Zstandard are optional (``pip install brotli
+zstandard``); encodings whose module isn't installed are never offered.
+
+A response is left as it is when:
+- it is shorter than MIN_SIZE;
+- its media type is already compressed (images, audio, video, archives,
+  see EXCLUDED_TYPES);
+- it already has a Content-Encoding, is a range response, or says
+  ``Cache-Control: no-transform``;
+- the encoded body wouldn't be any shorter.
+
+Streaming responses (sync or async iterators) are encoded chunk by chunk,
+and each chunk is flushed so the client receives it without waiting for
+the rest. Compressed responses get ``Vary: Accept-Encoding``, and strong
+ETags become weak, as with Django's GZipMiddleware.
+"""
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, see the module docstring
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Zstandard is optional, see the module docstring
+    zstandard = None
+
+DEFAULTS = {
+    'ENCODINGS': ['br', 'zstd', 'gzip'],  # Preferred first, among those the client weighs equally
+    'MIN_SIZE': 512,  # Bytes; below about one packet compression saves no round trip
+    # Low levels suit responses compressed on every request; ratios are close to the maximum for JSON
+    'LEVELS': {'gzip': 6, 'br': 4, 'zstd': 3},
+    'EXCLUDED_TYPES': [
+        'image/', 'audio/', 'video/', 'font/woff', 'font/woff2',
+        'application/zip', 'application/gzip', 'application/x-gzip', 'application/zstd',
+        'application/x-bzip2', 'application/x-xz', 'application/x-7z-compressed',
+        'application/x-rar-compressed', 'application/pdf', 'application/octet-stream',
+    ],
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'COMPRESSION', {}).get(name, DEFAULTS[name])
+
+
+class GzipCompressor:
+    def __init__(self, level):
+        # wbits 31: a gzip header and trailer around the deflate stream
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        return self.compressor.compress(chunk) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, level):
+        self.compressor = brotli.Compressor(quality=level, mode=brotli.MODE_TEXT)
+
+    def compress(self, chunk):
+        return self.compressor.process(chunk) + self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk):
+        return self.compressor.compress(chunk) + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+def compress_gzip(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_br(data, level):
+    return brotli.compress(data, quality=level, mode=brotli.MODE_TEXT)
+
+
+def compress_zstd(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+# Encoding -> (one-shot function, streaming compressor class)
+ENCODERS = {'gzip': (compress_gzip, GzipCompressor)}
+if brotli is not None:
+    ENCODERS['br'] = (compress_br, BrotliCompressor)
+if zstandard is not None:
+    ENCODERS['zstd'] = (compress_zstd, ZstdCompressor)
+
+
+def available_encodings():
+    return [encoding for encoding in get_setting('ENCODINGS') if encoding in ENCODERS]
+
+
+def parse_accept_encoding(header):
+    """{coding: q} from an Accept-Encoding header; malformed q-values count as 1"""
+    weights = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    pass
+        weights[coding] = q
+    return weights
+
+
+def negotiate(header):
+    """The encoding to use for an Accept-Encoding header, or None to send the body as it is"""
+    if not header:
+        return None
+    weights = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for encoding in available_encodings():
+        q = weights.get(encoding)
+        if q is None and encoding == 'gzip':
+            q = weights.get('x-gzip')
+        if q is None:
+            q = weights.get('*', 0.0)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compressible(response):
+    if response.has_header('Content-Encoding') or response.has_header('Content-Range'):
+        return False
+    if 'no-transform' in response.get('Cache-Control', '').lower():
+        return False
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    if any(content_type.startswith(excluded) for excluded in get_setting('EXCLUDED_TYPES')):
+        return False
+    return response.streaming or len(response.content) >= get_setting('MIN_SIZE')
+
+
+def compress_stream(chunks, compressor):
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def compress_async_stream(chunks, compressor):
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """Compress responses with the client's preferred encoding; see the module docstring"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        compress, compressor_class = ENCODERS[encoding]
+        level = {**DEFAULTS['LEVELS'], **get_setting('LEVELS')}[encoding]
+        if response.streaming:
+            # Read streaming_content once: it wraps the iterator on every access
+            chunks = response.streaming_content
+            if response.is_async:
+                response.streaming_content = compress_async_stream(chunks, compressor_class(level))
+            else:
+                response.streaming_content = compress_stream(chunks, compressor_class(level))
+            # The compressed length isn't known until the stream ends
+            del response.headers['Content-Length']
+        else:
+            compressed = compress(response.content, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,87 @@
+"""
+Conditional GETs (ETag / If-None-Match) for JSON list endpoints.
+
+Decorate an APIView's ``get`` with ``conditional_response(version)``.
+``version(request, kwargs)`` returns a cheap marker that changes whenever
+anything the response shows changes: the versions of response cache tags
+(common.response_cache.tag_versions, no query) or a small aggregate such
+as a max id plus a count (one indexed query). The ETag is a hash of that
+marker together with the view, the viewer, the path, the media type and
+the normalized query string, so it is known before the view runs (a
+marker of None skips conditional handling for the request):
+
+- a request whose If-None-Match matches gets a 304 without running the
+  view, its queries or its serializers;
+- otherwise the view runs and a 200 response gets the ETag, plus
+  ``Cache-Control: no-cache`` (``private`` for authenticated viewers) so
+  client HTTP caches keep it and revalidate on every refresh.
+
+The marker is read before the view runs, so a write that commits while it
+does changes the next ETag rather than being missed. A body older than the
+marker, a stale copy common.response_cache serves while another request
+recomputes it, goes out without an ETag: the client would otherwise keep
+it as current until the next change. ETags are weak: the
+body may be re-encoded (e.g. compressed) on the way out.
+"""
+import functools
+import hashlib
+
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+
+from .response_cache import cache_key, tag_versions, viewer_class
+
+
+def etag_for(view_name, request, marker):
+    identity = repr((cache_key(view_name, viewer_class(request), request), marker))
+    return 'W/"%s"' % hashlib.sha1(identity.encode()).hexdigest()
+
+
+def if_none_match(request, etag):
+    """Whether the client's If-None-Match already names this ETag (weak comparison)"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    candidates = parse_etags(header)
+    if '*' in candidates:
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(candidate.removeprefix('W/') == opaque for candidate in candidates)
+
+
+def tags_version(tags):
+    """A ``version`` callable for responses that are invalidated through these cache tags"""
+
+    def version(request, kwargs):
+        return sorted(tag_versions(tags(request, kwargs)).items())
+
+    return version
+
+
+def conditional_response(version):
+    """Answer If-None-Match on an APIView ``get`` method; see the module docstring"""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            marker = version(request, kwargs)
+            if marker is None:
+                return method(view, request, *args, **kwargs)
+            etag = etag_for(type(view).__name__, request, marker)
+            if if_none_match(request, etag):
+                response = HttpResponseNotModified()
+            else:
+                response = method(view, request, *args, **kwargs)
+                if response.status_code != 200 or getattr(response, 'cache_outdated', False):
+                    return response
+            response['ETag'] = etag
+            if viewer_class(request) == 'anonymous':
+                patch_cache_control(response, no_cache=True)
+            else:
+                patch_cache_control(response, no_cache=True, private=True)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,101 @@
+"""
+Database connection reuse, health checks and pooling, configured from the
+environment by ``connection_settings()`` (merged into DATABASES['default']):
+
+- DB_POOL: ``auto`` (default) uses Django's connection pool when psycopg 3
+  and psycopg_pool are installed, ``true`` requires it and ``false`` turns
+  it off. Pooled connections are checked before they are handed out.
+- DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE / DB_POOL_TIMEOUT: the pool keeps
+  MIN_SIZE connections open and opens at most MAX_SIZE. MAX_SIZE caps how
+  many requests of this process use the database at once: ASGI requests
+  each get a thread of their own (see below), so no thread pool bounds
+  them. A request that finds every connection in use waits up to TIMEOUT
+  seconds, then fails with a pool timeout, which sheds a spike instead of
+  overloading the server. By default MAX_SIZE is this process's share of
+  the server's connection budget (``pool_max_size()``): DB_MAX_CONNECTIONS
+  (the server's max_connections, 100 by default in PostgreSQL) less
+  DB_RESERVED_CONNECTIONS (10, for management commands, the mail queue
+  and admin sessions), divided between WEB_CONCURRENCY processes (1).
+- Without a pool, DB_CONN_MAX_AGE (seconds, default 60) keeps a thread's
+  connection open across requests, and DB_CONN_HEALTH_CHECKS (default
+  true) checks a reused connection once per request before using it, so a
+  connection the server dropped is replaced instead of failing the request.
+  Under ASGI that only applies to the consumers, see below.
+
+Under ASGI, Django runs every HTTP request in a thread of its own, so a
+persistent connection could never be reused there: ``close_after_requests()``
+(called from backend/asgi.py) closes those connections, or returns them to
+the pool, when the request finishes. DB_CONN_MAX_AGE has no effect on HTTP
+requests there; only the pool (psycopg 3, in requirements.txt) saves them
+the connection setup. The chat consumers'
+``database_sync_to_async`` calls all run on one long-lived thread, which
+keeps its connection for CONN_MAX_AGE.
+"""
+import importlib.util
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+def pool_max_size(environ=os.environ):
+    """DB_POOL_MAX_SIZE, else this process's share of the server's connection budget"""
+    if environ.get('DB_POOL_MAX_SIZE'):
+        return int(environ['DB_POOL_MAX_SIZE'])
+    budget = int(environ.get('DB_MAX_CONNECTIONS', 100)) - int(environ.get('DB_RESERVED_CONNECTIONS', 10))
+    return max(1, budget // max(1, int(environ.get('WEB_CONCURRENCY', 1))))
+
+
+def pool_available():
+    return all(importlib.util.find_spec(name) is not None for name in ('psycopg', 'psycopg_pool'))
+
+
+def _flag(environ, name, default):
+    return environ.get(name, default).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def connection_settings(environ=os.environ):
+    """CONN_MAX_AGE, CONN_HEALTH_CHECKS and pool OPTIONS for a PostgreSQL entry in DATABASES"""
+    pool = environ.get('DB_POOL', 'auto').strip().lower()
+    if pool == 'auto':
+        use_pool = pool_available()
+    else:
+        use_pool = _flag(environ, 'DB_POOL', 'false')
+        if use_pool and not pool_available():
+            raise ImproperlyConfigured("DB_POOL needs psycopg 3 with its pool: pip install 'psycopg[binary,pool]'")
+
+    if not use_pool:
+        return {
+            'CONN_MAX_AGE': int(environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': _flag(environ, 'DB_CONN_HEALTH_CHECKS', 'true'),
+        }
+
+    from psycopg_pool import ConnectionPool
+
+    max_size = pool_max_size(environ)
+    return {
+        # Django's pool takes over connection reuse: connections go back to
+        # it when Django closes them, at the end of every request
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'pool': {
+                'min_size': min(int(environ.get('DB_POOL_MIN_SIZE', 2)), max_size),
+                'max_size': max_size,
+                'timeout': float(environ.get('DB_POOL_TIMEOUT', 10)),
+                'check': ConnectionPool.check_connection,
+            },
+        },
+    }
+
+
+def close_request_connections(**kwargs):
+    from django.db import connections
+
+    # Connections are per thread: this closes only the finishing request's
+    connections.close_all()
+
+
+def close_after_requests():
+    """Close each ASGI request's connections when it finishes, as its thread won't be reused"""
+    from django.core.signals import request_finished
+
+    request_finished.connect(close_request_connections, dispatch_uid='common.db.close_request_connections')
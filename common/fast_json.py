@@ -0,0 +1,72 @@
+"""
+JSON renderer and parser on orjson, for REST_FRAMEWORK's default classes.
+
+orjson is optional (``pip install orjson``). Without it, or when it can't
+reproduce DRF's output, these classes do exactly what JSONRenderer and
+JSONParser do:
+
+- Rendering keeps DRF's compact, UTF-8 output and key order. Datetimes,
+  dates and times, Decimals, lazy strings, querysets, bytes and
+  dataclasses are converted by DRF's own encoder (datetimes in UTC end in
+  ``Z``, Decimals become floats); UUIDs are written natively, as the same
+  string. U+2028 and U+2029 are escaped as DRF does. Indented output
+  (``Accept: application/json; indent=4``, the browsable API),
+  UNICODE_JSON/COMPACT_JSON set to False, and data orjson rejects
+  (integers beyond 64 bits, non-string keys) are rendered by JSONRenderer.
+- Parsing falls back to JSONParser for charsets other than UTF-8, integers
+  of 20 digits or more (orjson would read them as floats) and anything
+  orjson rejects, so invalid input gets the same ParseError.
+
+Two differences remain: floats with exponents are spelled without ``+``
+and leading zeros (``1e16``, ``0.00001``: the same numbers), and NaN and
+infinity are written as ``null`` where JSONRenderer raises ValueError.
+"""
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, see the module docstring
+    orjson = None
+
+# Let DRF's encoder handle these rather than orjson's own formats
+OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+
+# Digits to 0, to look for runs of 20 digits (a regular expression is ten times slower)
+DIGITS = bytes.maketrans(b'123456789', b'000000000')
+LONG_INTEGER = b'0' * 20
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        if LONG_INTEGER not in body.translate(DIGITS):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+        return super().parse(io.BytesIO(body), media_type, parser_context)
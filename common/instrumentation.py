@@ -0,0 +1,345 @@
+"""
+Per-request instrumentation: query count, DB time, serializer time and
+response size.
+
+RequestMetricsMiddleware (first in MIDDLEWARE) measures every request:
+
+- DB queries and their total time, with an execute wrapper on every
+  database connection, so it works without DEBUG;
+- time spent in top-level serializer ``.data`` calls (nested serializers
+  are included in their parent's time);
+- total time and response size;
+- the response cache outcome (hit, stale, miss, bypass) of views using
+  common.response_cache, from which the per-route hit ratio is derived.
+
+The numbers are aggregated into per-route histograms, served by
+metrics_view at /metrics/ (Prometheus text format, or ``?format=json``).
+With METRICS_TOKEN set, scrapers must send ``Authorization: Bearer
+<token>``; without one, /metrics/ is only answered with DEBUG on, to the
+addresses in METRICS_ALLOWED_IPS. Behind a reverse proxy every client
+comes from the proxy's address, so the proxy must not forward /metrics/. With SERVER_TIMING enabled they
+are also sent in a ``Server-Timing`` header, which browser dev tools show
+next to the request.
+
+Views can declare how many queries a request may run:
+
+    class GetPostsView(APIView):
+        query_budget = 8                       # any method
+        query_budget = {'GET': 8, 'POST': 12}  # per method
+
+Going over budget logs a warning, or raises QueryBudgetExceeded when
+ENFORCE_QUERY_BUDGETS is on (the default under ``manage.py test``), so an
+N+1 regression fails the test that exercises the view.
+"""
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SERVER_TIMING': False,
+    'ENFORCE_QUERY_BUDGETS': False,
+    'METRICS_TOKEN': '',  # Bearer token scrapers send; empty: DEBUG and METRICS_ALLOWED_IPS only
+    'METRICS_ALLOWED_IPS': ('127.0.0.1', '::1'),
+    'LATENCY_BUCKETS_MS': (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+    'QUERY_BUCKETS': (1, 2, 5, 10, 20, 50, 100, 200),
+}
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def get_setting(name):
+    return getattr(settings, 'INSTRUMENTATION', {}).get(name, DEFAULTS[name])
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view ran more queries than its query_budget allows"""
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.serializer_ms = 0.0
+        self.serializer_depth = 0
+        self.budget = None
+        self.view_name = None
+        self.cache = None  # Outcome set by common.response_cache
+
+
+def current_metrics():
+    """Metrics of the request being handled in this context, or None"""
+    return _current.get()
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_ms += (time.perf_counter() - started) * 1000
+
+
+_serializer_timing_installed = False
+
+
+def install_serializer_timing():
+    """
+    Time BaseSerializer.data, where every top-level serializer renders its
+    representation. Only calls made while a request is measured are timed.
+    """
+    global _serializer_timing_installed
+    if _serializer_timing_installed:
+        return
+    from rest_framework.serializers import BaseSerializer
+
+    data = BaseSerializer.data
+
+    def timed_data(serializer):
+        metrics = _current.get()
+        if metrics is None:
+            return data.fget(serializer)
+        metrics.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            metrics.serializer_depth -= 1
+            # Serializers used while rendering another one count once
+            if metrics.serializer_depth == 0:
+                metrics.serializer_ms += (time.perf_counter() - started) * 1000
+
+    BaseSerializer.data = property(timed_data)
+    _serializer_timing_installed = True
+
+
+class Histogram:
+    """Cumulative bucket counts, as Prometheus histograms are exposed"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def as_dict(self):
+        return {
+            'buckets': {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+            'count': self.count,
+            'sum': self.sum,
+        }
+
+
+class RouteStats:
+    def __init__(self):
+        self.latency_ms = Histogram(get_setting('LATENCY_BUCKETS_MS'))
+        self.queries = Histogram(get_setting('QUERY_BUCKETS'))
+        self.db_ms = 0.0
+        self.serializer_ms = 0.0
+        self.response_bytes = 0
+        self.status_codes = {}
+        self.budget_exceeded = 0
+        self.cache = {}
+
+    def cache_hit_ratio(self):
+        # Stale responses were served from the cache too; bypasses don't count
+        served = self.cache.get('hit', 0) + self.cache.get('stale', 0)
+        lookups = served + self.cache.get('miss', 0)
+        return served / lookups if lookups else None
+
+
+class MetricsRegistry:
+    """Per-route statistics of this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+
+    def record(self, method, route, metrics, elapsed_ms, status_code, size):
+        with self.lock:
+            stats = self.routes.get((method, route))
+            if stats is None:
+                stats = self.routes[(method, route)] = RouteStats()
+            stats.latency_ms.observe(elapsed_ms)
+            stats.queries.observe(metrics.queries)
+            stats.db_ms += metrics.db_ms
+            stats.serializer_ms += metrics.serializer_ms
+            stats.response_bytes += size or 0
+            stats.status_codes[status_code] = stats.status_codes.get(status_code, 0) + 1
+            if metrics.budget is not None and metrics.queries > metrics.budget:
+                stats.budget_exceeded += 1
+            if metrics.cache is not None:
+                stats.cache[metrics.cache] = stats.cache.get(metrics.cache, 0) + 1
+
+    def reset(self):
+        with self.lock:
+            self.routes = {}
+
+    def snapshot(self):
+        with self.lock:
+            return [
+                {
+                    'method': method,
+                    'route': route,
+                    'requests': stats.latency_ms.count,
+                    'latency_ms': stats.latency_ms.as_dict(),
+                    'queries': stats.queries.as_dict(),
+                    'db_ms_sum': stats.db_ms,
+                    'serializer_ms_sum': stats.serializer_ms,
+                    'response_bytes_sum': stats.response_bytes,
+                    'status_codes': {str(code): count for code, count in sorted(stats.status_codes.items())},
+                    'budget_exceeded': stats.budget_exceeded,
+                    'cache': dict(sorted(stats.cache.items())),
+                    'cache_hit_ratio': stats.cache_hit_ratio(),
+                }
+                for (method, route), stats in sorted(self.routes.items())
+            ]
+
+
+registry = MetricsRegistry()
+
+
+def view_class_of(view_func):
+    """The class behind an as_view() function, or None for function views"""
+    return getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+
+
+def view_query_budget(view_class, method):
+    """The query_budget declared by the view class for this method, or None"""
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        return budget.get(method)
+    return budget
+
+
+def route_of(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return '/' + match.route if match.route else match.view_name
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = get_setting('ENABLED')
+        if self.enabled:
+            install_serializer_timing()
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        elapsed_ms = (time.perf_counter() - metrics.started) * 1000
+        size = None if response.streaming else len(response.content)
+        route = route_of(request)
+        if route != '/metrics/':
+            registry.record(request.method, route, metrics, elapsed_ms, response.status_code, size)
+
+        if get_setting('SERVER_TIMING'):
+            response['Server-Timing'] = (
+                f'db;dur={metrics.db_ms:.1f};desc="{metrics.queries} queries", '
+                f'serializer;dur={metrics.serializer_ms:.1f}, '
+                f'total;dur={elapsed_ms:.1f}'
+            )
+
+        if metrics.budget is not None and metrics.queries > metrics.budget:
+            message = (
+                f"{metrics.view_name} ran {metrics.queries} queries for {request.method} {request.path}, "
+                f"budget is {metrics.budget}"
+            )
+            if get_setting('ENFORCE_QUERY_BUDGETS'):
+                raise QueryBudgetExceeded(message)
+            logger.warning("RequestMetricsMiddleware: %s", message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current.get()
+        if metrics is not None:
+            view_class = view_class_of(view_func)
+            metrics.budget = view_query_budget(view_class, request.method)
+            metrics.view_name = getattr(view_class or view_func, '__name__', None)
+        return None
+
+
+def _prometheus_histogram(lines, name, labels, histogram):
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+
+def prometheus_text():
+    lines = [
+        '# TYPE http_request_duration_ms histogram',
+        '# TYPE http_request_queries histogram',
+        '# TYPE http_request_db_ms_total counter',
+        '# TYPE http_request_serializer_ms_total counter',
+        '# TYPE http_response_bytes_total counter',
+        '# TYPE http_responses_total counter',
+        '# TYPE http_query_budget_exceeded_total counter',
+        '# TYPE http_response_cache_total counter',
+    ]
+    with registry.lock:
+        for (method, route), stats in sorted(registry.routes.items()):
+            labels = f'method="{method}",route="{route}"'
+            _prometheus_histogram(lines, 'http_request_duration_ms', labels, stats.latency_ms)
+            _prometheus_histogram(lines, 'http_request_queries', labels, stats.queries)
+            lines.append(f'http_request_db_ms_total{{{labels}}} {stats.db_ms}')
+            lines.append(f'http_request_serializer_ms_total{{{labels}}} {stats.serializer_ms}')
+            lines.append(f'http_response_bytes_total{{{labels}}} {stats.response_bytes}')
+            for code, count in sorted(stats.status_codes.items()):
+                lines.append(f'http_responses_total{{{labels},status="{code}"}} {count}')
+            lines.append(f'http_query_budget_exceeded_total{{{labels}}} {stats.budget_exceeded}')
+            for outcome, count in sorted(stats.cache.items()):
+                lines.append(f'http_response_cache_total{{{labels},result="{outcome}"}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_allowed(request):
+    token = get_setting('METRICS_TOKEN')
+    if token:
+        scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        return scheme.lower() == 'bearer' and constant_time_compare(credentials.strip(), token)
+    return settings.DEBUG and request.META.get('REMOTE_ADDR') in get_setting('METRICS_ALLOWED_IPS')
+
+
+def metrics_view(request):
+    """Per-route request metrics of this process, for scrapers with METRICS_TOKEN (see the module docstring)"""
+    if not metrics_allowed(request):
+        raise Http404
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'routes': registry.snapshot()})
+    return HttpResponse(prometheus_text(), content_type='text/plain; version=0.0.4')
@@ -0,0 +1,141 @@
+"""
+Logging building blocks used by settings.LOGGING.
+
+- StructuredFormatter writes one JSON object per record: timestamp, level,
+  logger, message, any ``extra={...}`` fields and the exception text.
+- SamplingFilter keeps only every Nth INFO/DEBUG record of the loggers
+  listed in its ``rates`` (e.g. ``{'messaging.consumers': 0.1}``), for
+  events too frequent to log one by one. Warnings and errors always pass.
+- BackgroundHandler puts records on a bounded queue and returns; a
+  listener thread formats and writes them with the wrapped handler (a
+  StreamHandler or RotatingFileHandler), so requests never wait on disk or
+  terminal I/O. When the queue is full, records are dropped and counted
+  rather than blocking.
+
+Log with %-style arguments, not f-strings: ``logger.debug("Post %s", id)``
+only formats the message when DEBUG is enabled for the logger, and the
+formatting then happens on the listener thread. Values passed as arguments
+are formatted later, so pass immutable values rather than objects that the
+request keeps changing.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+from datetime import datetime, timezone
+
+from django.utils.module_loading import import_string
+
+# Attributes every LogRecord has; anything else came from ``extra``
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class StructuredFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES and not name.startswith('_'):
+                entry[name] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Pass one in ``1 / rate`` INFO/DEBUG records of each configured logger"""
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.intervals = {
+            name: max(1, round(1 / rate)) if rate > 0 else None
+            for name, rate in (rates or {}).items()
+        }
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def interval_for(self, logger_name):
+        # The most specific configured parent logger wins
+        name = logger_name
+        while name:
+            if name in self.intervals:
+                return self.intervals[name]
+            name = name.rpartition('.')[0]
+        return 1
+
+    def filter(self, record):
+        # One instance can sit on several handlers (settings.LOGGING shares
+        # it): decide once per record, so every handler keeps the same ones
+        decisions = record.__dict__.setdefault('_sampling', {})
+        if id(self) not in decisions:
+            decisions[id(self)] = self.sample(record)
+        return decisions[id(self)]
+
+    def sample(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        interval = self.interval_for(record.name)
+        if interval == 1:
+            return True
+        if interval is None:
+            return False
+        with self.lock:
+            count = self.counters.get(record.name, 0)
+            self.counters[record.name] = count + 1
+        if count % interval:
+            return False
+        record.sample_rate = 1 / interval
+        return True
+
+
+class BackgroundHandler(logging.handlers.QueueHandler):
+    """
+    Non-blocking wrapper around another handler class. Extra keyword
+    arguments are passed to ``handler_class``, so in LOGGING:
+
+        'file': {
+            'class': 'common.log.BackgroundHandler',
+            'handler_class': 'logging.handlers.RotatingFileHandler',
+            'filename': ..., 'maxBytes': ..., 'backupCount': 5,
+            'formatter': 'structured',
+        }
+    """
+
+    def __init__(self, handler_class='logging.StreamHandler', queue_size=10000, **handler_kwargs):
+        super().__init__(queue.Queue(queue_size))
+        self.target = import_string(handler_class)(**handler_kwargs)
+        self.dropped = 0
+        self.listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=False)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread, in the wrapped handler
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Unlike QueueHandler.prepare, don't format here: the record is
+        # handed to a thread in this process, not pickled
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self.listener is not None:
+            # Writes out whatever is still queued
+            self.listener.stop()
+            self.listener = None
+            self.target.close()
+        super().close()
@@ -0,0 +1,191 @@
+"""
+Read replicas for read-heavy views.
+
+Decorate an APIView's ``get`` with ``read_from_replica()`` to run its
+queries on one of the database aliases in READ_REPLICAS['ALIASES']
+(settings adds one per host in DB_REPLICA_HOSTS). Everything else
+(writes, other views, consumers, management commands) keeps using
+``default``, and so do the view's own reads inside a transaction on
+``default``. ReplicaRouter does
+the routing from a context variable the decorator sets for the duration of
+the view.
+
+A request stays on the primary when:
+
+- its user wrote something in the last STICKY_SECONDS. Successful unsafe
+  requests set a cookie (COOKIE_NAME) with the time the pin ends, and pin
+  an authenticated user in the cache named by READ_REPLICAS['CACHE'], for
+  API clients that don't keep cookies. Writes made outside a request (chat
+  messages over the websocket) call ``pin_to_primary`` themselves. So users
+  see their own writes even while the replicas lag behind;
+- for views whose responses are cached or carry an ETag, one of the
+  response cache tags they depend on (``tags(request, kwargs)``, or None
+  when they aren't known up front) changed in the last STICKY_SECONDS.
+  Otherwise a lagging replica's data could be stored or tagged with the
+  new version, and served as current until the next change. Tags the cache
+  hasn't seen yet (or whose version expired, see TAG_TIMEOUT in
+  common.response_cache) start at the current time, so they count as changed:
+
+      @cache_response(tags=lambda kwargs, data: [PROFILES_TAG])
+      @read_from_replica(tags=lambda request, kwargs: [PROFILES_TAG])
+      def get(self, request): ...
+
+- no replica is reachable. A replica that fails to connect is skipped for
+  RETRY_SECONDS.
+
+To try it locally, add a second alias for the same SQLite file (or for a
+copy of it, to see stale reads) and list it in READ_REPLICAS['ALIASES'].
+"""
+import contextvars
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from .response_cache import tag_versions
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ALIASES': [],  # No replicas: every query goes to default
+    'STICKY_SECONDS': 10,  # How long a user's reads stay on the primary after they write; above the usual replica lag
+    'COOKIE_NAME': 'primary_until',
+    'CACHE': 'default',
+    'RETRY_SECONDS': 30,  # How long a replica that failed to connect is skipped
+}
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+# Replica alias -> time.monotonic() until which it isn't tried
+_unavailable = {}
+
+
+def get_setting(name):
+    return getattr(settings, 'READ_REPLICAS', {}).get(name, DEFAULTS[name])
+
+
+def _pin_key(user_id):
+    return f'replica:pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Send this user's reads to the primary for STICKY_SECONDS, after a write made outside a request"""
+    if get_setting('ALIASES'):
+        caches[get_setting('CACHE')].set(_pin_key(user_id), 1, get_setting('STICKY_SECONDS'))
+
+
+def pinned_to_primary(request):
+    try:
+        if float(request.COOKIES.get(get_setting('COOKIE_NAME'), 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    user = getattr(request, 'user', None)
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return False
+    return caches[get_setting('CACHE')].get(_pin_key(user.id)) is not None
+
+
+def _available(alias):
+    if _unavailable.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        logger.warning("Read replica %s is unavailable, reading from the primary", alias, exc_info=True)
+        _unavailable[alias] = time.monotonic() + get_setting('RETRY_SECONDS')
+        return False
+    _unavailable.pop(alias, None)
+    return True
+
+
+def changed_recently(tags):
+    if tags is None:
+        return True
+    horizon = time.time_ns() - get_setting('STICKY_SECONDS') * 1_000_000_000
+    return any(version > horizon for version in tag_versions(tags).values())
+
+
+def replica_for(request, kwargs, tags=None):
+    """The replica alias this request may read from, or None for the primary"""
+    aliases = get_setting('ALIASES')
+    if not aliases or request.method not in SAFE_METHODS or pinned_to_primary(request):
+        return None
+    if tags is not None and changed_recently(tags(request, kwargs)):
+        return None
+    for alias in random.sample(aliases, len(aliases)):
+        if _available(alias):
+            return alias
+    return None
+
+
+def read_from_replica(tags=None):
+    """Run an APIView ``get`` method's reads on a replica; see the module docstring"""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            alias = replica_for(request, kwargs, tags)
+            if alias is None:
+                return method(view, request, *args, **kwargs)
+            token = _read_alias.set(alias)
+            try:
+                return method(view, request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+
+        return wrapper
+
+    return decorator
+
+
+class ReplicaRouter:
+    """Reads inside ``read_from_replica`` go to its replica; everything else to default"""
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_setting('ALIASES')}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema from the primary
+        if db in get_setting('ALIASES'):
+            return False
+        return None
+
+
+class PrimaryStickinessMiddleware:
+    """Pins the user of every successful unsafe request to the primary for STICKY_SECONDS"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method in SAFE_METHODS or response.status_code >= 400 or not get_setting('ALIASES'):
+            return response
+        seconds = get_setting('STICKY_SECONDS')
+        response.set_cookie(
+            get_setting('COOKIE_NAME'), str(int(time.time()) + seconds),
+            max_age=seconds, httponly=True, samesite='Lax',
+        )
+        # DRF sets the token-authenticated user on the underlying request
+        user = getattr(request, 'user', None)
+        if user is not None and getattr(user, 'is_authenticated', False):
+            pin_to_primary(user.id)
+        return response
@@ -0,0 +1,220 @@
+"""
+Response cache for public read endpoints.
+
+Decorate an APIView's ``get`` with ``cache_response`` to store its rendered
+200 responses in the cache named by RESPONSE_CACHE['CACHE'] (``responses``
+in CACHES: local memory by default, a FileBasedCache directory when
+several workers must share entries and invalidations):
+
+    class DiscoverView(APIView):
+        @cache_response(tags=lambda kwargs, data: [PROFILES_TAG])
+        def get(self, request): ...
+
+Entries are keyed by the view, the viewer class (``anonymous``, or one
+entry per authenticated user since follow and like state is per viewer),
+the scheme, host and path, the negotiated media type and the normalized
+query string (sorted, blank values dropped). ``vary(request, kwargs)``, when
+given and not None, adds a component for data that changes outside any
+tag, such as a job that runs in another process: a new value is a new
+entry.
+
+Invalidation is by tag. Every tag has a version in the cache, the time it
+last changed in nanoseconds; an entry records the versions of its tags
+when it was computed and is out of date once any of them has moved on.
+Versions expire after TAG_TIMEOUT and come back at the current time, so
+with the default process-local cache a worker that missed another
+worker's invalidation catches up within TAG_TIMEOUT; share the cache
+(RESPONSE_CACHE_DIR) to see invalidations at once.
+``invalidate(*tags)`` bumps versions after the current transaction
+commits. ``tags(kwargs, data)`` is called with ``data=None`` before the
+view runs, for the tags the URL already determines, and again with the
+response data for the rest.
+
+An entry is fresh for TIMEOUT seconds and is kept STALE_TIMEOUT seconds
+longer. A request that finds it expired or invalidated takes a short lock
+and recomputes it; concurrent requests keep getting the stale copy in the
+meantime instead of all hitting the database at once. A stale copy that
+is out of date is marked ``cache_outdated`` so common.conditional doesn't
+give it the ETag of the current versions.
+
+The outcome (hit, stale, miss or bypass) is sent as ``X-Cache`` and
+counted per route by common.instrumentation, which serves the hit ratios
+at /metrics/.
+"""
+import functools
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+
+from .instrumentation import current_metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'CACHE': 'responses',
+    'TIMEOUT': 30,  # Seconds an entry is served as is
+    'STALE_TIMEOUT': 300,  # Seconds after that it may still be served while one request recomputes it
+    'LOCK_TIMEOUT': 30,  # Upper bound on a recompute, should the worker die while holding the lock
+    # Seconds a tag version is kept (None: TIMEOUT + STALE_TIMEOUT, as long as the entries
+    # recording it). Bounds how long a worker with its own cache misses another's invalidations
+    'TAG_TIMEOUT': None,
+    'CACHE_AUTHENTICATED': True,  # False: only anonymous responses are cached
+    'KEY_PREFIX': 'response',
+}
+
+# Any post, like or comment; post listings show author names and avatars too
+POSTS_TAG = 'posts'
+# Any artist or producer profile, or follow counts
+PROFILES_TAG = 'profiles'
+
+
+def get_setting(name):
+    return getattr(settings, 'RESPONSE_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def get_cache():
+    return caches[get_setting('CACHE')]
+
+
+def user_tag(user_id):
+    """One user's profile, follow counts, collaborations and posts (artist and producer IDs don't overlap, see users.id_ranges)"""
+    return f'user:{user_id}'
+
+
+def notifications_tag(user_id):
+    """One user's notification inbox and unread count"""
+    return f'notifications:{user_id}'
+
+
+def _tag_key(tag):
+    return f"{get_setting('KEY_PREFIX')}:tag:{tag}"
+
+
+def _tag_timeout():
+    timeout = get_setting('TAG_TIMEOUT')
+    if timeout is None:
+        timeout = get_setting('TIMEOUT') + get_setting('STALE_TIMEOUT')
+    return timeout
+
+
+def tag_versions(tags):
+    """Current version of each tag; tags never seen (or evicted) start at a fresh version"""
+    cache = get_cache()
+    keys = {tag: _tag_key(tag) for tag in tags}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for tag, key in keys.items():
+        if key not in found:
+            # A time-based start, so an evicted tag can't come back at a version old entries recorded
+            cache.add(key, time.time_ns(), _tag_timeout())
+            found[key] = cache.get(key)
+        versions[tag] = found[key]
+    return versions
+
+
+def _bump(tags):
+    cache = get_cache()
+    for tag in tags:
+        # The time of the change, so common.replicas can tell recent writes
+        cache.set(_tag_key(tag), time.time_ns(), _tag_timeout())
+
+
+def invalidate(*tags):
+    """Mark every entry with one of these tags out of date once the current transaction commits"""
+    # Also while caching is disabled: ETags (common.conditional) use the versions
+    if tags:
+        tags = set(tags)
+        transaction.on_commit(lambda: _bump(tags))
+
+
+def viewer_class(request):
+    user = getattr(request, 'user', None)
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return 'anonymous'
+    return f'user:{user.id}'
+
+
+def cache_key(view_name, viewer, request):
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+        if value != ''
+    )
+    identity = repr((request.scheme, request.get_host(), request.path, request.accepted_media_type, params))
+    digest = hashlib.sha1(identity.encode()).hexdigest()
+    return f"{get_setting('KEY_PREFIX')}:{view_name}:{viewer}:{digest}"
+
+
+def _record(response, outcome):
+    response['X-Cache'] = outcome.upper()
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.cache = outcome
+    return response
+
+
+def _cached_response(entry, outdated=False):
+    response = HttpResponse(entry['content'], content_type=entry['content_type'], status=entry['status'])
+    response.cache_outdated = outdated
+    return response
+
+
+def cache_response(tags, vary=None):
+    """Cache the rendered 200 responses of an APIView ``get`` method; see the module docstring"""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if not get_setting('ENABLED'):
+                return method(view, request, *args, **kwargs)
+            viewer = viewer_class(request)
+            if viewer != 'anonymous' and not get_setting('CACHE_AUTHENTICATED'):
+                return _record(method(view, request, *args, **kwargs), 'bypass')
+
+            cache = get_cache()
+            key = cache_key(type(view).__name__, viewer, request)
+            variant = vary(request, kwargs) if vary is not None else None
+            if variant is not None:
+                key += ':' + hashlib.sha1(repr(variant).encode()).hexdigest()
+            entry = cache.get(key)
+            if entry is not None:
+                current = tag_versions(entry['tags'])
+                if entry['fresh_until'] > time.time() and current == entry['tags']:
+                    return _record(_cached_response(entry), 'hit')
+                # Expired or invalidated: one request recomputes, the others get the old copy
+                if not cache.add(f'{key}:lock', 1, get_setting('LOCK_TIMEOUT')):
+                    return _record(_cached_response(entry, outdated=current != entry['tags']), 'stale')
+            try:
+                # Versions are read before the view runs, so a write that
+                # commits while it does leaves the new entry out of date
+                versions = tag_versions(tags(kwargs, None))
+                response = method(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return _record(response, 'miss')
+                late_tags = set(tags(kwargs, response.data)) - set(versions)
+                versions.update(tag_versions(late_tags))
+
+                response = view.finalize_response(request, response, *args, **kwargs)
+                response.render()
+                cache.set(key, {
+                    'content': response.content,
+                    'content_type': response['Content-Type'],
+                    'status': response.status_code,
+                    'fresh_until': time.time() + get_setting('TIMEOUT'),
+                    'tags': versions,
+                }, get_setting('TIMEOUT') + get_setting('STALE_TIMEOUT'))
+                return _record(response, 'miss')
+            finally:
+                if entry is not None:
+                    cache.delete(f'{key}:lock')
+
+        return wrapper
+
+    return decorator
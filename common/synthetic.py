@@ -0,0 +1,291 @@
+"""
+Synthetic datasets for benchmarks.
+
+generate() fills the configured database with a realistic, reproducible
+(seeded) population: artists and producers, posts with media stubs, likes,
+comments, follow edges, aggregated like/comment notifications, and chat
+rooms with messages and read statuses. Everything is written with
+bulk_create in chunks, and the denormalized counters (Post.likes_count,
+followers_count, following_count) are computed up front so they match the
+rows, as the API would have left them.
+
+Popularity is skewed: a few users and posts get most of the follows and
+likes. All rows are tied to usernames starting with the dataset prefix, and
+delete() removes them again.
+"""
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+
+from common.benchmarking import explicit_timestamps
+from feed.models import Comment, Like, Post
+from messaging.models import ChatRoom, ChatRoomParticipant, Message, MessageReadStatus
+from users.models import Artist, Follow, Notification, Producer
+
+BATCH_SIZE = 2000
+PASSWORD = 'synthetic-password'
+
+# Named dataset sizes; every value can be overridden individually
+SCALES = {
+    'small': {
+        'artists': 150, 'producers': 50, 'posts_per_user': 5, 'likes_per_post': 8,
+        'comments_per_post': 2, 'follows_per_user': 15, 'rooms': 100, 'messages_per_room': 20,
+    },
+    'medium': {
+        'artists': 1500, 'producers': 500, 'posts_per_user': 5, 'likes_per_post': 15,
+        'comments_per_post': 3, 'follows_per_user': 30, 'rooms': 1000, 'messages_per_room': 30,
+    },
+    'large': {
+        'artists': 7500, 'producers': 2500, 'posts_per_user': 5, 'likes_per_post': 25,
+        'comments_per_post': 4, 'follows_per_user': 50, 'rooms': 5000, 'messages_per_room': 40,
+    },
+}
+
+GENRES = ['hip-hop', 'rnb', 'pop', 'rock', 'jazz', 'electronic', 'afrobeat', 'reggae', 'soul', 'trap', 'house', 'gospel']
+TALENTS = ['singer', 'rapper', 'guitarist', 'pianist', 'drummer', 'songwriter', 'dj', 'bassist']
+LOCATIONS = ['Paris', 'Lyon', 'Marseille', 'Montreal', 'Dakar', 'Abidjan', 'Brussels', 'Geneva', 'Casablanca', 'Tunis']
+WORDS = (
+    'new track session studio beat mix vocals drop tonight release live show collab verse hook '
+    'master demo album single feature remix tour crowd stage melody rhythm bass sample'
+).split()
+MEDIA_STUBS = [
+    ('image', 'posts/images/synthetic.jpg'),
+    ('audio', 'posts/audio/synthetic.mp3'),
+    ('video', 'posts/videos/synthetic.mp4'),
+]
+HISTORY = timedelta(days=30)
+
+
+class SyntheticDataset:
+    """IDs of what generate() created, for picking benchmark viewers"""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.artist_ids = []
+        self.producer_ids = []
+        self.post_owners = {}
+        self.rooms = {}
+        self.counts = {}
+        self.elapsed_s = None
+
+    @property
+    def users(self):
+        return [('artist', user_id) for user_id in self.artist_ids] + [('producer', user_id) for user_id in self.producer_ids]
+
+
+def scale_options(scale, **overrides):
+    options = dict(SCALES[scale])
+    options.update({name: value for name, value in overrides.items() if value is not None})
+    return options
+
+
+def _skewed_index(rng, count):
+    """Index in range(count), small indexes being much more likely"""
+    return min(count - 1, int(count * rng.random() ** 3))
+
+
+def _sentence(rng, words=8):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, words))).capitalize()
+
+
+def _bulk_create(model, objs):
+    created = []
+    for start in range(0, len(objs), BATCH_SIZE):
+        created.extend(model.objects.bulk_create(objs[start:start + BATCH_SIZE]))
+    return created
+
+
+def generate(prefix, seed=0, artists=150, producers=50, posts_per_user=5, likes_per_post=8, comments_per_post=2,
+             follows_per_user=15, rooms=100, messages_per_room=20):
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    now = timezone.now()
+    dataset = SyntheticDataset(prefix)
+
+    def past(after=None):
+        start = after or now - HISTORY
+        return start + (now - start) * rng.random()
+
+    # Follow edges by user index, so the counters can be set before insert
+    users = [('artist', i) for i in range(artists)] + [('producer', i) for i in range(producers)]
+    edges = set()
+    followers = [0] * len(users)
+    following = [0] * len(users)
+    for follower in range(len(users)):
+        for _ in range(min(follows_per_user, len(users) - 1)):
+            followee = _skewed_index(rng, len(users))
+            if followee != follower and (follower, followee) not in edges:
+                edges.add((follower, followee))
+                following[follower] += 1
+                followers[followee] += 1
+
+    encoded = make_password(PASSWORD)  # Hash once, every synthetic user shares it
+
+    def profile(index, kind, i):
+        fields = dict(
+            username=f"{prefix}_{kind[0]}{i}", nom=rng.choice(WORDS).capitalize(), prenom=kind.capitalize(),
+            email=f"{prefix}_{kind[0]}{i}@synthetic.local", password=encoded,
+            bio=_sentence(rng, 20), genres=', '.join(rng.sample(GENRES, 2)), location=rng.choice(LOCATIONS),
+            followers_count=followers[index], following_count=following[index], created_at=past(),
+        )
+        if kind == 'artist':
+            fields['talents'] = ', '.join(rng.sample(TALENTS, 2))
+        else:
+            fields['studio_name'] = f"{fields['nom']} Studio"
+        return fields
+
+    with explicit_timestamps(Artist, 'created_at'), explicit_timestamps(Producer, 'created_at'):
+        created_artists = _bulk_create(Artist, [Artist(**profile(i, 'artist', i)) for i in range(artists)])
+        created_producers = _bulk_create(Producer, [
+            Producer(**profile(artists + i, 'producer', i)) for i in range(producers)
+        ])
+    dataset.artist_ids = [artist.id for artist in created_artists]
+    dataset.producer_ids = [producer.id for producer in created_producers]
+    user_keys = dataset.users  # Same order as ``users``
+    user_objects = created_artists + created_producers
+
+    with explicit_timestamps(Follow, 'created_at'):
+        _bulk_create(Follow, [
+            Follow(follower_type=user_keys[a][0], follower_id=user_keys[a][1],
+                   followee_type=user_keys[b][0], followee_id=user_keys[b][1], created_at=past())
+            for a, b in edges
+        ])
+
+    # Posts: popular users post more; likes per post are planned first so
+    # likes_count is right on insert
+    post_rows = []
+    for _ in range(len(users) * posts_per_user):
+        owner = _skewed_index(rng, len(users)) if rng.random() < 0.5 else rng.randrange(len(users))
+        likers = rng.sample(range(len(users)), min(len(users), int(rng.expovariate(1 / likes_per_post)))) if likes_per_post else []
+        post_rows.append((owner, likers))
+
+    posts = []
+    for owner, likers in post_rows:
+        media = rng.choice(MEDIA_STUBS) if rng.random() < 0.4 else None
+        posts.append(Post(
+            user_type=user_keys[owner][0], user_id=user_keys[owner][1], content=_sentence(rng, 25),
+            likes_count=len(likers), created_at=past(),
+            **({media[0]: media[1]} if media else {}),
+        ))
+    with explicit_timestamps(Post, 'created_at'):
+        posts = _bulk_create(Post, posts)
+    dataset.post_owners = {post.id: (post.user_type, post.user_id) for post in posts}
+
+    likes = []
+    comments = []
+    like_counts = {}
+    comment_counts = {}
+    for post, (owner, likers) in zip(posts, post_rows):
+        for liker in likers:
+            likes.append(Like(post_id=post.id, user_type=user_keys[liker][0], user_id=user_keys[liker][1],
+                              created_at=past(post.created_at)))
+        like_counts[post.id] = len(likers)
+        count = int(rng.expovariate(1 / comments_per_post)) if comments_per_post else 0
+        for _ in range(count):
+            commenter = rng.randrange(len(users))
+            comments.append(Comment(post_id=post.id, user_type=user_keys[commenter][0], user_id=user_keys[commenter][1],
+                                    text=_sentence(rng, 12), created_at=past(post.created_at)))
+        comment_counts[post.id] = count
+    with explicit_timestamps(Like, 'created_at'), explicit_timestamps(Comment, 'created_at'):
+        _bulk_create(Like, likes)
+        _bulk_create(Comment, comments)
+
+    # One aggregated like and comment notification per post, as
+    # users.notifications.aggregate_post_notification leaves them
+    notifications = []
+    for post, (owner, _) in zip(posts, post_rows):
+        recipient = user_objects[owner]
+        sender = user_objects[rng.randrange(len(users))]
+        for notification_type, count in (('like', like_counts[post.id]), ('comment', comment_counts[post.id])):
+            if not count:
+                continue
+            notifications.append(Notification(
+                **{users[owner][0]: recipient},
+                **{f'sender_{"artist" if isinstance(sender, Artist) else "producer"}': sender},
+                notification_type=notification_type, post_id=post.id, actor_count=count,
+                message=f"{sender.username} and {count - 1} others {'liked' if notification_type == 'like' else 'commented on'} your post.",
+                read=rng.random() < 0.6, created_at=past(post.created_at),
+            ))
+    with explicit_timestamps(Notification, 'created_at'):
+        _bulk_create(Notification, notifications)
+
+    # Chat rooms between two users each, with read statuses for the recipient
+    content_types = {
+        'artist': ContentType.objects.get_for_model(Artist),
+        'producer': ContentType.objects.get_for_model(Producer),
+    }
+    pairs = []
+    for _ in range(rooms):
+        a = _skewed_index(rng, len(users))
+        b = rng.randrange(len(users))
+        if a != b:
+            pairs.append((a, b))
+    with explicit_timestamps(ChatRoom, 'created_at'):
+        chat_rooms = _bulk_create(ChatRoom, [
+            ChatRoom(name=f"{prefix}_room{i}", created_at=past()) for i in range(len(pairs))
+        ])
+    _bulk_create(ChatRoomParticipant, [
+        ChatRoomParticipant(chat_room_id=room.id, content_type=content_types[user_keys[member][0]],
+                            object_id=user_keys[member][1])
+        for room, pair in zip(chat_rooms, pairs) for member in pair
+    ])
+    dataset.rooms = {room.id: (user_keys[a], user_keys[b]) for room, (a, b) in zip(chat_rooms, pairs)}
+
+    messages = []
+    recipients = []
+    for room, (a, b) in zip(chat_rooms, pairs):
+        sent_at = room.created_at
+        for _ in range(messages_per_room):
+            sender, recipient = (a, b) if rng.random() < 0.5 else (b, a)
+            sent_at = past(sent_at)
+            messages.append(Message(room_id=room.id, content_type=content_types[user_keys[sender][0]],
+                                    object_id=user_keys[sender][1], content=_sentence(rng, 15), timestamp=sent_at))
+            recipients.append(recipient)
+    with explicit_timestamps(Message, 'timestamp'):
+        messages = _bulk_create(Message, messages)
+    read_statuses = []
+    for message, recipient in zip(messages, recipients):
+        # Everything but the last few messages of a conversation has been read
+        is_read = rng.random() < 0.8
+        read_statuses.append(MessageReadStatus(
+            message_id=message.id, content_type=content_types[user_keys[recipient][0]],
+            object_id=user_keys[recipient][1], is_read=is_read, read_at=message.timestamp if is_read else None,
+        ))
+    _bulk_create(MessageReadStatus, read_statuses)
+
+    dataset.counts = {
+        'artists': len(dataset.artist_ids),
+        'producers': len(dataset.producer_ids),
+        'follows': len(edges),
+        'posts': len(posts),
+        'likes': len(likes),
+        'comments': len(comments),
+        'notifications': len(notifications),
+        'chat_rooms': len(chat_rooms),
+        'messages': len(messages),
+        'read_statuses': len(read_statuses),
+    }
+    dataset.elapsed_s = time.perf_counter() - started
+    return dataset
+
+
+def delete(prefix):
+    """Remove a synthetic dataset; returns the number of users deleted"""
+    artist_ids = list(Artist.objects.filter(username__startswith=f"{prefix}_").values_list('id', flat=True))
+    producer_ids = list(Producer.objects.filter(username__startswith=f"{prefix}_").values_list('id', flat=True))
+    for user_type, user_ids in (('artist', artist_ids), ('producer', producer_ids)):
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            chunk = user_ids[start:start + BATCH_SIZE]
+            # Cascades to likes and comments on these posts
+            Post.objects.filter(user_type=user_type, user_id__in=chunk).delete()
+            Follow.objects.filter(follower_type=user_type, follower_id__in=chunk).delete()
+    # Cascades to participants, messages and read statuses
+    ChatRoom.objects.filter(name__startswith=f"{prefix}_room").delete()
+    # Cascades to notifications
+    Artist.objects.filter(id__in=artist_ids).delete()
+    Producer.objects.filter(id__in=producer_ids).delete()
+    return len(artist_ids) + len(producer_ids)
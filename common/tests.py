@@ -0,0 +1,160 @@
+import logging
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.db import OperationalError, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+
+from . import replicas
+from .log import SamplingFilter
+from .response_cache import _bump, get_cache, tag_versions
+from users.models import Artist
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class SamplingFilterTests(SimpleTestCase):
+    def test_shared_filter_samples_each_record_once(self):
+        # As in settings.LOGGING: one filter instance on the console and file handlers
+        sampling = SamplingFilter({'sampling_test': 0.1})
+        handlers = [ListHandler(), ListHandler()]
+        logger = logging.getLogger('sampling_test.consumers')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        for handler in handlers:
+            handler.addFilter(sampling)
+            logger.addHandler(handler)
+        try:
+            for i in range(100):
+                logger.info("Event %s", i)
+            logger.warning("Always kept")
+        finally:
+            for handler in handlers:
+                logger.removeHandler(handler)
+
+        console, file = ([record.getMessage() for record in handler.records] for handler in handlers)
+        self.assertEqual(len(console), 11)
+        self.assertEqual(console, file)
+        self.assertEqual(console[:2], ["Event 0", "Event 10"])
+        self.assertEqual(console[-1], "Always kept")
+
+
+class TagVersionTests(SimpleTestCase):
+    @override_settings(RESPONSE_CACHE={**settings.RESPONSE_CACHE, 'TAG_TIMEOUT': 1})
+    def test_versions_expire(self):
+        get_cache().clear()
+        _bump(['expiring'])
+        bumped = tag_versions(['expiring'])['expiring']
+        self.assertEqual(tag_versions(['expiring'])['expiring'], bumped)
+
+        # A worker that missed a later bump elsewhere catches up once its copy expires
+        time.sleep(1.1)
+        self.assertGreater(tag_versions(['expiring'])['expiring'], bumped)
+
+
+class MetricsAccessTests(SimpleTestCase):
+    def get(self, **extra):
+        return self.client.get('/metrics/', REMOTE_ADDR='127.0.0.1', **extra)
+
+    @override_settings(DEBUG=False, INSTRUMENTATION={**settings.INSTRUMENTATION, 'METRICS_TOKEN': ''})
+    def test_local_address_is_not_enough_without_debug(self):
+        # Behind a reverse proxy every client is 127.0.0.1
+        self.assertEqual(self.get().status_code, 404)
+
+    @override_settings(DEBUG=True, INSTRUMENTATION={**settings.INSTRUMENTATION, 'METRICS_TOKEN': ''})
+    def test_local_address_with_debug(self):
+        self.assertEqual(self.get().status_code, 200)
+
+    @override_settings(INSTRUMENTATION={**settings.INSTRUMENTATION, 'METRICS_TOKEN': 'secret'})
+    def test_token(self):
+        self.assertEqual(self.get().status_code, 404)
+        self.assertEqual(self.get(HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+        self.assertEqual(self.get(HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+
+class StubUser:
+    is_authenticated = True
+
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+class ReadFromReplicaView:
+    @replicas.read_from_replica()
+    def get(self, request):
+        # The alias reads are routed to
+        return Artist.objects.all().db
+
+
+@override_settings(READ_REPLICAS={**settings.READ_REPLICAS, 'ALIASES': ['replica']})
+class ReplicaRoutingTests(TransactionTestCase):
+    """Two aliases for the one test database, as README suggests for trying replicas locally.
+
+    Not a TestCase: the router keeps reads on the primary inside its transaction.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Added here rather than in settings, so the rest of the suite reads from the primary
+        connections.settings['replica'] = {**connections['default'].settings_dict}
+        cls.databases = {'default', 'replica'}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        replicas._unavailable.clear()
+        caches[replicas.get_setting('CACHE')].clear()
+
+    def read_alias(self, request, user=None):
+        request.user = user or AnonymousUser()
+        return ReadFromReplicaView().get(request)
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(self.read_alias(self.factory.get('/')), 'replica')
+        # Outside the decorated view, reads stay on the primary
+        self.assertEqual(Artist.objects.all().db, 'default')
+
+    def test_writer_is_pinned_by_cookie_and_user(self):
+        request = self.factory.post('/')
+        request.user = StubUser(42)
+        response = replicas.PrimaryStickinessMiddleware(lambda request: HttpResponse(status=201))(request)
+        cookie = response.cookies[replicas.get_setting('COOKIE_NAME')].value
+
+        # A browser sends the cookie back
+        self.assertEqual(self.read_alias(self.factory.get('/', HTTP_COOKIE=f'primary_until={cookie}')), 'default')
+        # An API client without cookies is pinned by its user
+        self.assertEqual(self.read_alias(self.factory.get('/'), StubUser(42)), 'default')
+        self.assertEqual(self.read_alias(self.factory.get('/'), StubUser(43)), 'replica')
+
+    def test_failed_writes_dont_pin(self):
+        request = self.factory.post('/')
+        request.user = StubUser(42)
+        response = replicas.PrimaryStickinessMiddleware(lambda request: HttpResponse(status=400))(request)
+        self.assertNotIn(replicas.get_setting('COOKIE_NAME'), response.cookies)
+        self.assertEqual(self.read_alias(self.factory.get('/'), StubUser(42)), 'replica')
+
+    def test_unreachable_replica_falls_back_to_the_primary(self):
+        with mock.patch.object(connections['replica'], 'ensure_connection', side_effect=OperationalError("unreachable")):
+            with self.assertLogs('common.replicas', 'WARNING'):
+                self.assertEqual(self.read_alias(self.factory.get('/')), 'default')
+        # Skipped for RETRY_SECONDS rather than tried on every request
+        self.assertIn('replica', replicas._unavailable)
+        self.assertEqual(self.read_alias(self.factory.get('/')), 'default')
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Post, Comment, Like
+from .models import Post, Comment, Like, TrendingPost
 from common.admin_mixins import ViewOnlyModelAdmin
 
 class PostAdmin(ViewOnlyModelAdmin):
@@ -19,9 +19,14 @@ class LikeAdmin(ViewOnlyModelAdmin):
     list_filter = ('user_type', 'created_at')
     readonly_fields = ('created_at',)
 
+class TrendingPostAdmin(ViewOnlyModelAdmin):
+    list_display = ('post', 'score', 'last_activity_at')
+    ordering = ('-score',)
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Like, LikeAdmin)
+admin.site.register(TrendingPost, TrendingPostAdmin)
 
 
 # Register your models here.
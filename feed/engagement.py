@@ -0,0 +1,202 @@
+"""
+Batched engagement writes for offline-synced clients.
+
+A client sends its queued likes, unlikes and comments as one ordered list,
+each operation with its own idempotency key:
+
+    {"operations": [
+        {"key": "b3f1...", "type": "like", "post_id": 12},
+        {"key": "9ac0...", "type": "comment", "post_id": 12, "text": "Nice"},
+        {"key": "41d7...", "type": "unlike", "post_id": 7}
+    ]}
+
+apply_operations() runs the whole list in one transaction with a fixed
+number of statements: the like state of every post involved is read once,
+the operations are replayed in order against it in memory, and only the
+net changes are written (one multi-row INSERT for likes, one DELETE for
+unlikes, one bulk INSERT for comments, one for the keys). Each operation
+gets its own result; keys that were applied before return their stored
+result, so resending a batch after a dropped connection is safe.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from common.response_cache import POSTS_TAG, invalidate, user_tag
+from users.notifications import aggregate_post_notification
+from .likes import like_posts, unlike_posts
+from .models import Comment, EngagementKey, Like, Post
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MAX_OPERATIONS': 200,
+    'KEY_TTL': timedelta(days=7),
+}
+OPERATION_TYPES = ('like', 'unlike', 'comment')
+MAX_KEY_LENGTH = 64
+
+
+class BatchError(ValueError):
+    """The batch as a whole is malformed"""
+
+
+def get_setting(name):
+    return getattr(settings, 'ENGAGEMENT_BATCH', {}).get(name, DEFAULTS[name])
+
+
+def parse_operations(payload):
+    """
+    Validate the request body. Returns a list of (key, operation, error)
+    where error is None for well-formed operations.
+    """
+    operations = payload.get('operations') if isinstance(payload, dict) else None
+    if not isinstance(operations, list) or not operations:
+        raise BatchError("operations must be a non-empty list")
+    if len(operations) > get_setting('MAX_OPERATIONS'):
+        raise BatchError(f"At most {get_setting('MAX_OPERATIONS')} operations per batch")
+
+    parsed = []
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise BatchError("Each operation must be an object")
+        key = operation.get('key')
+        if not isinstance(key, str) or not key or len(key) > MAX_KEY_LENGTH:
+            raise BatchError(f"Each operation needs a key of 1 to {MAX_KEY_LENGTH} characters")
+
+        error = None
+        if operation.get('type') not in OPERATION_TYPES:
+            error = f"type must be one of {', '.join(OPERATION_TYPES)}"
+        elif not isinstance(operation.get('post_id'), int):
+            error = "post_id must be an integer"
+        elif operation['type'] == 'comment' and not str(operation.get('text') or '').strip():
+            error = "Comment text cannot be empty"
+        parsed.append((key, operation, error))
+    return parsed
+
+
+def prune_keys():
+    """Forget idempotency keys older than KEY_TTL"""
+    EngagementKey.objects.filter(created_at__lt=timezone.now() - get_setting('KEY_TTL')).delete()
+
+
+def apply_operations(parsed, user, user_type, serialize_comments=None):
+    """
+    Apply the operations in order. Returns one result per operation and the
+    resulting like state of the posts involved. serialize_comments turns the created comments into their response data.
+    Retried once if a concurrent request with the same keys committed first;
+    the retry then replays that request's results.
+    """
+    try:
+        return _apply(parsed, user, user_type, serialize_comments)
+    except IntegrityError:
+        logger.info("apply_operations: keys of %s %s were applied concurrently, replaying", user_type, user.id)
+        return _apply(parsed, user, user_type, serialize_comments)
+
+
+def _apply(parsed, user, user_type, serialize_comments):
+    keys = [key for key, _, _ in parsed]
+    with transaction.atomic():
+        stored = dict(
+            EngagementKey.objects.filter(user_type=user_type, user_id=user.id, key__in=keys).values_list('key', 'result')
+        )
+
+        # Operations to apply: well-formed, not applied before, first use of the key in this batch
+        pending = []
+        seen = set(stored)
+        for key, operation, error in parsed:
+            if error is None and key not in seen:
+                pending.append((key, operation))
+            seen.add(key)
+
+        post_ids = {operation['post_id'] for _, operation in pending}
+        posts = Post.objects.only('id', 'user_id', 'user_type').in_bulk(post_ids) if post_ids else {}
+        initially_liked = set(
+            Like.objects.filter(post_id__in=list(posts), user_id=user.id, user_type=user_type).values_list('post_id', flat=True)
+        ) if posts else set()
+
+        # Replay the likes and unlikes in order against the current state
+        liked = set(initially_liked)
+        results = {}
+        comments = []
+        for key, operation in pending:
+            post_id = operation['post_id']
+            result = {'key': key, 'type': operation['type'], 'post_id': post_id}
+            results[key] = result
+            if post_id not in posts:
+                result.update(status='error', error="Post not found")
+            elif operation['type'] == 'comment':
+                result['status'] = 'applied'
+                comments.append((key, Comment(
+                    post_id=post_id, user_id=user.id, user_type=user_type, text=str(operation['text']).strip(),
+                )))
+            else:
+                want = operation['type'] == 'like'
+                result['status'] = 'applied' if (post_id in liked) != want else 'noop'
+                result['liked'] = want
+                (liked.add if want else liked.discard)(post_id)
+
+        # Net changes only: like then unlike of the same post writes nothing
+        newly_liked = like_posts(sorted(liked - initially_liked), user_type, user.id)
+        unlike_posts(sorted(initially_liked - liked), user_type, user.id)
+        created = Comment.objects.bulk_create([comment for _, comment in comments])
+        if created:
+            # bulk_create sends no post_save, see feed.signals
+            invalidate(POSTS_TAG, *{user_tag(posts[comment.post_id].user_id) for comment in created})
+            data = serialize_comments(created) if serialize_comments else [{'id': comment.id} for comment in created]
+            for (key, _), comment_data in zip(comments, data):
+                results[key]['comment'] = comment_data
+
+        # Fails with IntegrityError if a concurrent batch stored the same keys first
+        EngagementKey.objects.bulk_create([
+            EngagementKey(user_type=user_type, user_id=user.id, key=key, result=result)
+            for key, result in results.items()
+        ])
+
+        # Current state of every post touched, so the client can reconcile its cache
+        post_states = {
+            post_id: {'likes_count': likes_count, 'liked': post_id in liked}
+            for post_id, likes_count in Post.objects.filter(id__in=list(posts)).values_list('id', 'likes_count')
+        } if posts else {}
+
+        transaction.on_commit(lambda: notify_owners(posts, newly_liked, comments, user, user_type))
+
+    output = []
+    for key, operation, error in parsed:
+        if error is not None:
+            output.append({'key': key, 'type': operation.get('type'), 'post_id': operation.get('post_id'),
+                           'status': 'error', 'error': error})
+        elif key in stored:
+            output.append({**stored[key], 'replayed': True})
+        elif key in results:
+            output.append(results.pop(key))
+        else:
+            # Same key twice in one batch: the first occurrence was applied
+            output.append({'key': key, 'type': operation['type'], 'post_id': operation['post_id'],
+                           'status': 'duplicate'})
+    return {'results': output, 'posts': post_states}
+
+
+def notify_owners(posts, newly_liked, comments, user, user_type):
+    """One aggregated like/comment notification per post, as the single endpoints send"""
+    last_comment = {}
+    for _, comment in comments:
+        last_comment[comment.post_id] = comment
+
+    actions = [('like', post_id, f"{user.username} liked your post.") for post_id in sorted(newly_liked)]
+    for post_id, comment in sorted(last_comment.items()):
+        text = comment.text
+        actions.append(('comment', post_id, f"{user.username} commented on your post: \"{text[:50]}{'...' if len(text) > 50 else ''}\""))
+
+    for notification_type, post_id, message in actions:
+        post = posts[post_id]
+        if post.user_id == user.id:
+            continue
+        try:
+            aggregate_post_notification(notification_type, post, user, user_type, message=message)
+        except Exception as e:
+            # Log error but don't fail the batch if a notification fails
+            logger.error("notify_owners: Error creating %s notification for post %s: %s", notification_type, post_id, e)
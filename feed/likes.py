@@ -0,0 +1,147 @@
+"""
+Idempotent like/unlike.
+
+Liking is a single ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` against
+the (post, user_id, user_type) unique constraint, unliking a single
+``DELETE ... RETURNING``. Only a statement that actually changed a row
+touches Post.likes_count, with an ``UPDATE ... RETURNING`` that yields the
+new count, so repeated or concurrent taps neither raise IntegrityError nor
+drift the counter. Both statements run in one transaction. like_posts()
+and unlike_posts() do the same for many posts at once (offline sync
+batches, see feed.engagement). The UPDATE also returns the post's author,
+whose cached responses are invalidated along with the post listings.
+
+The SQL is written by hand because the ORM cannot report whether a
+conflicting insert was skipped, nor return rows from a delete. It needs
+RETURNING support: PostgreSQL, or SQLite 3.35+.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from common.response_cache import POSTS_TAG, invalidate, user_tag
+
+from .models import Like, Post
+from .trending import retract_engagement, retract_engagements
+
+LIKE_TABLE = Like._meta.db_table
+POST_TABLE = Post._meta.db_table
+
+
+def _returned_datetime(value):
+    """Timestamps come back from RETURNING as text (in UTC) on SQLite"""
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value, datetime.timezone.utc)
+    return value
+
+
+def _adjust_likes_count(cursor, post_id, delta):
+    cursor.execute(
+        f"UPDATE {POST_TABLE} SET likes_count = likes_count + %s WHERE id = %s RETURNING likes_count, user_id",
+        [delta, post_id],
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return 0
+    invalidate(POSTS_TAG, user_tag(row[1]))
+    return row[0]
+
+
+def _adjust_likes_counts(cursor, post_ids, delta):
+    if not post_ids:
+        return
+    # Never below zero, even if the counter was edited by hand
+    cursor.execute(
+        f"UPDATE {POST_TABLE} SET likes_count = likes_count + %s WHERE id IN ("
+        + ", ".join(["%s"] * len(post_ids))
+        + ") AND likes_count + %s >= 0 RETURNING user_id",
+        [delta, *post_ids, delta],
+    )
+    invalidate(POSTS_TAG, *{user_tag(row[0]) for row in cursor.fetchall()})
+
+
+def like_post(post_id, user_type, user_id):
+    """
+    Like the post (a no-op if already liked). Returns (created, likes_count);
+    likes_count is None when nothing changed.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {LIKE_TABLE} (post_id, user_id, user_type, created_at) VALUES (%s, %s, %s, %s) "
+            f"ON CONFLICT (post_id, user_id, user_type) DO NOTHING RETURNING id",
+            [post_id, user_id, user_type, connection.ops.adapt_datetimefield_value(timezone.now())],
+        )
+        if cursor.fetchone() is None:
+            return False, None
+        return True, _adjust_likes_count(cursor, post_id, 1)
+
+
+def unlike_post(post_id, user_type, user_id):
+    """
+    Remove the like (a no-op if there is none). Returns (deleted,
+    likes_count); likes_count is None when nothing changed.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {LIKE_TABLE} WHERE post_id = %s AND user_id = %s AND user_type = %s RETURNING id, created_at",
+            [post_id, user_id, user_type],
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return False, None
+        like_id, created_at = row
+        retract_engagement(Like(
+            id=like_id, post_id=post_id, user_id=user_id, user_type=user_type, created_at=_returned_datetime(created_at),
+        ))
+        return True, _adjust_likes_count(cursor, post_id, -1)
+
+
+def like_posts(post_ids, user_type, user_id):
+    """
+    Like several posts with one multi-row INSERT; posts already liked are
+    skipped. Returns the IDs of the posts that were newly liked.
+    """
+    post_ids = list(post_ids)
+    if not post_ids:
+        return set()
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {LIKE_TABLE} (post_id, user_id, user_type, created_at) VALUES "
+            + ", ".join(["(%s, %s, %s, %s)"] * len(post_ids))
+            + " ON CONFLICT (post_id, user_id, user_type) DO NOTHING RETURNING post_id",
+            [value for post_id in post_ids for value in (post_id, user_id, user_type, now)],
+        )
+        liked = {row[0] for row in cursor.fetchall()}
+        _adjust_likes_counts(cursor, sorted(liked), 1)
+    return liked
+
+
+def unlike_posts(post_ids, user_type, user_id):
+    """
+    Remove the user's likes of several posts with one DELETE. Returns the
+    IDs of the posts that were actually unliked.
+    """
+    post_ids = list(post_ids)
+    if not post_ids:
+        return set()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {LIKE_TABLE} WHERE user_id = %s AND user_type = %s AND post_id IN ("
+            + ", ".join(["%s"] * len(post_ids))
+            + ") RETURNING id, post_id, created_at",
+            [user_id, user_type, *post_ids],
+        )
+        deleted = [
+            Like(id=like_id, post_id=post_id, user_id=user_id, user_type=user_type, created_at=_returned_datetime(created_at))
+            for like_id, post_id, created_at in cursor.fetchall()
+        ]
+        retract_engagements(deleted)
+        unliked = {like.post_id for like in deleted}
+        _adjust_likes_counts(cursor, sorted(unliked), -1)
+    return unliked
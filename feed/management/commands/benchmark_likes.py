@@ -0,0 +1,96 @@
+import json
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from common.benchmarking import run_concurrently
+from feed.models import Like, Post
+from users.models import Artist, Notification
+from users.views import get_tokens_for_user
+
+
+class Command(BaseCommand):
+    help = (
+        "Tap like on one post from many users concurrently, each user several times in a "
+        "row, and check that the like rows, Post.likes_count and the owner's notification "
+        "agree. Creates temporary users in the configured database and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help="Users liking the post")
+        parser.add_argument('--taps', type=int, default=3, help="Like requests per user (repeats must be no-ops)")
+        parser.add_argument('--concurrency', type=int, default=8, help="Concurrent client threads")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        self.prefix = f"bench_likes_{uuid.uuid4().hex[:8]}"
+        try:
+            owner, likers, post = self.create_users_and_post(options['users'])
+            tokens = [get_tokens_for_user(liker)['access'] for liker in likers]
+
+            def tap(client, i):
+                # Consecutive requests from the same user land in different threads
+                return client.put(
+                    f'/api/feed/posts/{post.id}/like/',
+                    HTTP_AUTHORIZATION=f'Bearer {tokens[i % len(tokens)]}',
+                )
+
+            results = run_concurrently(tap, len(likers) * options['taps'], options['concurrency'])
+            results['checks'] = self.verify(owner, post)
+        finally:
+            self.cleanup()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.stdout.write(
+                f"{results['requests']} like taps in {results['elapsed_s']:.2f}s "
+                f"({results['throughput_rps']:.1f}/s, concurrency {results['concurrency']})"
+            )
+            self.stdout.write(
+                f"latency ms: p50 {results['p50_ms']:.1f}  p95 {results['p95_ms']:.1f}  "
+                f"p99 {results['p99_ms']:.1f}  max {results['max_ms']:.1f}"
+            )
+            self.stdout.write(f"status codes: {results['status_codes']}")
+            for name, check in results['checks'].items():
+                style = self.style.SUCCESS if check['ok'] else self.style.ERROR
+                self.stdout.write(style(f"{name}: expected {check['expected']}, got {check['actual']}"))
+
+        if not all(check['ok'] for check in results['checks'].values()):
+            raise SystemExit(1)
+
+    def create_users_and_post(self, count):
+        encoded = make_password('bench-password')
+        owner = Artist.objects.create(
+            username=f"{self.prefix}_owner", nom='Bench', prenom='Owner',
+            email=f"{self.prefix}_owner@bench.local", password=encoded,
+        )
+        Artist.objects.bulk_create([
+            Artist(username=f"{self.prefix}_u{i}", nom='Bench', prenom='Liker',
+                   email=f"{self.prefix}_u{i}@bench.local", password=encoded)
+            for i in range(count)
+        ])
+        likers = list(Artist.objects.filter(username__startswith=f"{self.prefix}_u"))
+        post = Post.objects.create(user_id=owner.id, user_type='artist', content=self.prefix)
+        return owner, likers, post
+
+    def verify(self, owner, post):
+        post.refresh_from_db(fields=['likes_count'])
+        likes = Like.objects.filter(post=post).count()
+        notifications = Notification.objects.filter(artist=owner, notification_type='like', post_id=post.id)
+
+        # Whatever got liked must be counted exactly once, even when some
+        # requests failed (e.g. lock timeouts on SQLite)
+        checks = {
+            'likes_count matches like rows': (likes, post.likes_count),
+            'like notifications (one aggregated row)': (1 if likes else 0, notifications.count()),
+        }
+        return {
+            name: {'expected': expected, 'actual': actual, 'ok': expected == actual}
+            for name, (expected, actual) in checks.items()
+        }
+
+    def cleanup(self):
+        Post.objects.filter(content=self.prefix).delete()
+        Artist.objects.filter(username__startswith=self.prefix).delete()
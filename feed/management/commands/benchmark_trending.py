@@ -0,0 +1,165 @@
+import json
+import random
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from common.benchmarking import explicit_timestamps
+from feed.models import Comment, Like, Post, TrendingPost, TrendingState
+from feed.trending import STATE_ID, compute_trending, decay_factor, get_setting, trending_posts
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the compute_trending job on synthetic activity: a full rebuild over "
+        "--likes likes, then incremental runs with and without new activity, and "
+        "check that the incremental scores match a full rebuild. Creates temporary "
+        "posts in the configured database and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=20000, help="Synthetic posts")
+        parser.add_argument('--likes', type=int, default=1000000, help="Likes spread over the trending window")
+        parser.add_argument('--comments', type=int, default=100000, help="Comments spread over the trending window")
+        parser.add_argument('--new-likes', type=int, default=10000, help="Likes added before the incremental run")
+        parser.add_argument('--new-comments', type=int, default=1000, help="Comments added before the incremental run")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        self.prefix = f"bench_trending_{uuid.uuid4().hex[:8]}"
+        self.random = random.Random(options['seed'])
+        results = {
+            'posts': options['posts'],
+            'likes': options['likes'],
+            'comments': options['comments'],
+        }
+        try:
+            post_ids = self.create_posts(options['posts'])
+            window = get_setting('WINDOW')
+
+            started = time.perf_counter()
+            self.create_activity(post_ids, options['likes'], options['comments'], window, user_offset=0)
+            results['setup_s'] = time.perf_counter() - started
+
+            results['full'] = compute_trending(full=True)
+            results['incremental_idle'] = compute_trending()
+
+            self.create_activity(
+                post_ids, options['new_likes'], options['new_comments'], None,
+                user_offset=options['likes'] // len(post_ids) + 1,
+            )
+            results['incremental'] = compute_trending()
+            results['read_ms'] = self.time_read()
+            results['checks'] = self.verify(post_ids)
+        finally:
+            self.cleanup()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.stdout.write(
+                f"{results['posts']} posts, {results['likes']} likes, {results['comments']} comments "
+                f"(setup {results['setup_s']:.1f}s)"
+            )
+            for name in ('full', 'incremental_idle', 'incremental'):
+                stats = results[name]
+                self.stdout.write(
+                    f"{name}: {stats['elapsed_s']:.2f}s, read {stats['likes']} likes and {stats['comments']} comments, "
+                    f"updated {stats['updated']} posts"
+                )
+            self.stdout.write(f"trending read (top {get_setting('LIMIT')}): median {results['read_ms']:.2f} ms")
+            for name, check in results['checks'].items():
+                style = self.style.SUCCESS if check['ok'] else self.style.ERROR
+                self.stdout.write(style(f"{name}: expected {check['expected']}, got {check['actual']}"))
+
+        if not all(check['ok'] for check in results['checks'].values()):
+            raise SystemExit(1)
+
+    def create_posts(self, count):
+        Post.objects.bulk_create(
+            [Post(user_id=self.random.randint(1, 1000), user_type='artist', content=self.prefix) for _ in range(count)],
+            batch_size=5000,
+        )
+        return list(Post.objects.filter(content=self.prefix).order_by('id').values_list('id', flat=True))
+
+    def create_activity(self, post_ids, likes, comments, window, user_offset):
+        """
+        Likes and comments with created_at spread over ``window`` (or now when
+        None). Popularity is skewed so that some posts clearly trend.
+        """
+        now = timezone.now()
+        chunk = 50000
+
+        def created_at():
+            if window is None:
+                return now
+            # Keep clear of the window boundary so full and incremental runs see the same rows
+            return now - window * 0.95 * self.random.random()
+
+        def post_for(i):
+            return post_ids[min(len(post_ids) - 1, int(len(post_ids) * self.random.random() ** 2))]
+
+        with explicit_timestamps(Like, 'created_at'), explicit_timestamps(Comment, 'created_at'):
+            for start in range(0, likes, chunk):
+                # (post, user) pairs must be unique: user i // posts likes post i % posts
+                Like.objects.bulk_create([
+                    Like(post_id=post_ids[i % len(post_ids)], user_id=user_offset + i // len(post_ids) + 1,
+                         user_type='artist', created_at=created_at())
+                    for i in range(start, min(likes, start + chunk))
+                ], batch_size=5000)
+            for start in range(0, comments, chunk):
+                Comment.objects.bulk_create([
+                    Comment(post_id=post_for(i), user_id=self.random.randint(1, 1000), user_type='artist',
+                            text='bench', created_at=created_at())
+                    for i in range(start, min(comments, start + chunk))
+                ], batch_size=5000)
+
+    def time_read(self, repeat=20):
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            trending_posts(get_setting('LIMIT'))
+            latencies.append((time.perf_counter() - started) * 1000)
+        return statistics.median(latencies)
+
+    def current_scores(self, post_ids, at):
+        """Scores of the benchmark posts decayed to the common time ``at``"""
+        epoch = TrendingState.objects.get(pk=STATE_ID).epoch
+        factor = decay_factor(epoch, at)
+        return {
+            post_id: score * factor
+            for post_id, score in TrendingPost.objects.filter(post_id__in=post_ids).values_list('post_id', 'score')
+        }
+
+    def verify(self, post_ids):
+        at = timezone.now()
+        incremental = self.current_scores(post_ids, at)
+        compute_trending(full=True)
+        full = self.current_scores(post_ids, at)
+
+        shared = incremental.keys() & full.keys()
+        difference = max(
+            (abs(incremental[post_id] - full[post_id]) / full[post_id] for post_id in shared),
+            default=0.0,
+        )
+        top = get_setting('LIMIT')
+        checks = {
+            'posts ranked by both runs': (len(full), len(shared)),
+            'relative score difference below 1e-6': (True, difference < 1e-6),
+            f'same top {top}': (
+                True,
+                sorted(full, key=full.get, reverse=True)[:top] == sorted(incremental, key=incremental.get, reverse=True)[:top],
+            ),
+        }
+        return {
+            name: {'expected': expected, 'actual': actual, 'ok': expected == actual}
+            for name, (expected, actual) in checks.items()
+        }
+
+    def cleanup(self):
+        # Cascades to the synthetic likes, comments and ranking rows
+        Post.objects.filter(content=self.prefix).delete()
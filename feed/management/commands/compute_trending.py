@@ -0,0 +1,25 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from feed.trending import compute_trending
+
+
+class Command(BaseCommand):
+    help = "Update the trending post scores with the likes and comments since the last run (run periodically)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rebuild every score from the recent activity window")
+        parser.add_argument('--json', action='store_true', help="Print the run statistics as JSON")
+
+    def handle(self, *args, **options):
+        stats = compute_trending(full=options['full'])
+        if options['json']:
+            self.stdout.write(json.dumps(stats, indent=2))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['mode'].capitalize()} run: read {stats['likes']} likes and {stats['comments']} comments "
+            f"({stats['late']} late), "
+            f"updated {stats['updated']} posts ({stats['created']} new, {stats['pruned']} pruned), "
+            f"{stats['ranked']} ranked, in {stats['elapsed_s']:.2f}s"
+        ))
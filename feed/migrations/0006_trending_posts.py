@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0005_alter_like_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingAdjustment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.BigIntegerField()),
+                ('weight', models.FloatField()),
+                ('occurred_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrendingState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('epoch', models.DateTimeField()),
+                ('last_like_id', models.BigIntegerField(default=0)),
+                ('last_comment_id', models.BigIntegerField(default=0)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_full_run_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='feed.post')),
+                ('score', models.FloatField()),
+                ('last_activity_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-score', '-post'], name='trending_score')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_likes(apps, schema_editor):
+    Post = apps.get_model('feed', 'Post')
+    Like = apps.get_model('feed', 'Like')
+    likes = Like.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(total=Count('id')).values('total')
+    Post.objects.update(likes_count=Coalesce(Subquery(likes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0007_comment_post_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing_likes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0008_post_likes_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EngagementKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_type', models.CharField(choices=[('artist', 'Artist'), ('producer', 'Producer')], max_length=10)),
+                ('user_id', models.BigIntegerField()),
+                ('key', models.CharField(max_length=64)),
+                ('result', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='engagement_key_created')],
+                'constraints': [models.UniqueConstraint(fields=('user_type', 'user_id', 'key'), name='engagement_key_user')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 01:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0009_engagement_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trendingstate',
+            name='missing_comment_ids',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='trendingstate',
+            name='missing_like_ids',
+            field=models.JSONField(default=list),
+        ),
+    ]
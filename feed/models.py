@@ -11,6 +11,8 @@ class Post(models.Model):
     video = models.FileField(upload_to="posts/videos/", blank=True, null=True)
     audio = models.FileField(upload_to="posts/audio/", blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Maintained by feed.likes in the same transaction as the Like rows
+    likes_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"Post by {self.user_type} {self.user_id} on {self.created_at}"
@@ -23,6 +25,12 @@ class Comment(models.Model):
     text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of a post's comments and the feed previews
+            models.Index(fields=['post', '-created_at', '-id'], name='comment_post_created'),
+        ]
+
     def __str__(self):
         return f"Comment by {self.user_type} {self.user_id} on {self.post.id}"
 
@@ -39,3 +47,83 @@ class Like(models.Model):
 
     def __str__(self):
         return f"Like by {self.user_type} {self.user_id} on {self.post.id}"
+
+
+class EngagementKey(models.Model):
+    """
+    Client idempotency key of an operation applied by the engagement batch
+    endpoint (see feed.engagement), with the result that was returned for
+    it. Replaying the key returns the stored result instead of applying the
+    operation again.
+    """
+    user_type = models.CharField(max_length=10, choices=[("artist", "Artist"), ("producer", "Producer")])
+    user_id = models.BigIntegerField()
+    key = models.CharField(max_length=64)
+    result = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_type', 'user_id', 'key'], name='engagement_key_user'),
+        ]
+        indexes = [
+            # Expired keys are deleted by age
+            models.Index(fields=['created_at'], name='engagement_key_created'),
+        ]
+
+    def __str__(self):
+        return f"Engagement key {self.key} of {self.user_type} {self.user_id}"
+
+
+class TrendingPost(models.Model):
+    """
+    Ranking table behind the trending feed, maintained by the
+    compute_trending job (see feed.trending). ``score`` is the post's
+    exponentially decayed engagement expressed at TrendingState.epoch, so the
+    trending order at any moment is simply ``-score`` and the feed is a
+    top-N range scan on the score index.
+    """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name="trending")
+    score = models.FloatField()
+    last_activity_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score', '-post'], name='trending_score'),
+        ]
+
+    def __str__(self):
+        return f"Trending post {self.post_id} ({self.score:.3f})"
+
+
+class TrendingAdjustment(models.Model):
+    """
+    Engagement change not yet applied to TrendingPost, e.g. a removed like
+    (negative weight) that was already counted. Applied and deleted by the
+    next compute_trending run.
+    """
+    post_id = models.BigIntegerField()
+    weight = models.FloatField()
+    occurred_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Trending adjustment {self.weight:+g} for post {self.post_id}"
+
+
+class TrendingState(models.Model):
+    """
+    Single row holding the decay epoch of TrendingPost.score and the last
+    Like and Comment IDs already counted, so each run only reads new activity.
+    The IDs below those that had no row yet are read again by the next runs,
+    in case their transaction commits late.
+    """
+    epoch = models.DateTimeField()
+    last_like_id = models.BigIntegerField(default=0)
+    last_comment_id = models.BigIntegerField(default=0)
+    missing_like_ids = models.JSONField(default=list)
+    missing_comment_ids = models.JSONField(default=list)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_full_run_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Trending state (likes > {self.last_like_id}, comments > {self.last_comment_id})"
@@ -1,13 +1,104 @@
 from rest_framework import serializers
 from django.conf import settings
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
 import logging
 from .models import Post, Comment, Like
 from users.models import Artist, Producer
+from users.notifications import get_user_type
 import time
 logger = logging.getLogger(__name__)
 
+# Newest comments embedded in each post of a feed page
+COMMENTS_PREVIEW_SIZE = 3
+UNKNOWN_USER = {"name": "Unknown", "avatar": None, "role": "user"}
+
+
+def user_summary(user, role, base_url):
+    """The {name, avatar, role} object posts and comments show for their author"""
+    avatar_url = None
+    if user.profile_picture:
+        # Add timestamp to prevent caching
+        avatar_url = f"{base_url}{user.profile_picture.url}?_={int(time.time())}"
+    return {"name": user.username, "avatar": avatar_url, "role": role}
+
+
+def load_authors(pairs):
+    """{(user_type, user_id): user} with one query per user model"""
+    authors = {}
+    for user_type, model in (("artist", Artist), ("producer", Producer)):
+        user_ids = {user_id for pair_type, user_id in pairs if pair_type == user_type}
+        if user_ids:
+            for user_id, user in model.objects.only("id", "username", "profile_picture").in_bulk(user_ids).items():
+                authors[(user_type, user_id)] = user
+    return authors
+
+
+def comment_previews(post_ids, size=COMMENTS_PREVIEW_SIZE):
+    """{post_id: [newest comments]} for all the posts in one query"""
+    comments = (
+        Comment.objects.filter(post_id__in=post_ids)
+        .annotate(position=Window(
+            RowNumber(), partition_by=[F("post_id")], order_by=[F("created_at").desc(), F("id").desc()],
+        ))
+        .filter(position__lte=size)
+        .order_by("post_id", "position")
+    )
+    previews = {}
+    for comment in comments:
+        previews.setdefault(comment.post_id, []).append(comment)
+    return previews
+
+
+class PostListSerializer(serializers.ListSerializer):
+    """
+    Serializes a page of posts with a fixed number of queries: comment
+    counts, the comment previews, the viewer's likes and every author (of
+    the posts and of the previewed comments) are loaded for the whole page
+    up front. Like counts come from Post.likes_count.
+    """
+
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, "all") else data)
+        self.context["post_batch"] = self.load_related(posts)
+        return [self.child.to_representation(item) for item in posts]
+
+    def load_related(self, posts):
+        post_ids = [post.id for post in posts]
+        if not post_ids:
+            return {"comment_counts": {}, "previews": {}, "authors": {}, "liked": set()}
+
+        comment_counts = dict(
+            Comment.objects.filter(post_id__in=post_ids).values("post_id")
+            .annotate(total=Count("id")).values_list("post_id", "total")
+        )
+        previews = comment_previews(post_ids)
+        pairs = {(post.user_type, post.user_id) for post in posts}
+        pairs.update((comment.user_type, comment.user_id) for comments in previews.values() for comment in comments)
+        return {
+            "comment_counts": comment_counts,
+            "previews": previews,
+            "authors": load_authors(pairs),
+            "liked": self.liked_post_ids(post_ids),
+        }
+
+    def liked_post_ids(self, post_ids):
+        """IDs of the posts on the page that the requesting user liked"""
+        request = self.context.get("request")
+        user = getattr(request, "user", None)
+        if not user or not user.is_authenticated:
+            return set()
+        user_type = get_user_type(user)
+        if not user_type:
+            return set()
+        return set(
+            Like.objects.filter(post_id__in=post_ids, user_id=user.id, user_type=user_type).values_list("post_id", flat=True)
+        )
+
+
 class PostSerializer(serializers.ModelSerializer):
     comments_count = serializers.SerializerMethodField()
+    comments_preview = serializers.SerializerMethodField()
     likes_count = serializers.SerializerMethodField()
     liked = serializers.SerializerMethodField()  # Add this field to indicate if current user liked the post
     user = serializers.SerializerMethodField()  # Return a user object
@@ -17,16 +108,38 @@ class PostSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Post
-        fields = ["id", "user", "content", "image", "video", "audio", "created_at", "comments_count", "likes_count", "liked"]
+        fields = [
+            "id", "user", "content", "image", "video", "audio", "created_at", "comments_count", "comments_preview",
+            "likes_count", "liked",
+        ]
+        list_serializer_class = PostListSerializer
 
     def get_comments_count(self, obj):
+        batch = self.context.get("post_batch")
+        if batch is not None:
+            return batch["comment_counts"].get(obj.id, 0)
         return obj.comments.count()
 
+    def get_comments_preview(self, obj):
+        """The newest comments, as GetCommentsView returns them first"""
+        batch = self.context.get("post_batch")
+        if batch is not None:
+            comments = batch["previews"].get(obj.id, [])
+            context = {**self.context, "comment_authors": batch["authors"]}
+        else:
+            comments = comment_previews([obj.id]).get(obj.id, [])
+            context = self.context
+        return CommentSerializer(comments, many=True, context=context).data
+
     def get_likes_count(self, obj):
-        return obj.likes.count()
+        return obj.likes_count
 
     def get_liked(self, obj):
         """Check if the current user has liked this post"""
+        batch = self.context.get("post_batch")
+        if batch is not None:
+            return obj.id in batch["liked"]
+
         request = self.context.get("request")
         
         # If no request or not authenticated, return False
@@ -63,7 +176,12 @@ class PostSerializer(serializers.ModelSerializer):
         request = self.context.get("request")  # Ensure absolute URL
         base_url = request.build_absolute_uri('/').rstrip('/') if request else ""
 
-        logger.info(f"Getting user info for post {obj.id} - User ID: {obj.user_id}, User Type: {obj.user_type}")
+        batch = self.context.get("post_batch")
+        if batch is not None:
+            author = batch["authors"].get((obj.user_type, obj.user_id))
+            return user_summary(author, obj.user_type, base_url) if author else UNKNOWN_USER
+
+        logger.debug("Getting user info for post %s - User ID: %s, User Type: %s", obj.id, obj.user_id, obj.user_type)
         
         # Get authenticated user if available
         auth_user = getattr(request, 'user', None)
@@ -72,11 +190,11 @@ class PostSerializer(serializers.ModelSerializer):
         
         # Log authentication information
         if auth_user and auth_user.is_authenticated:
-            logger.info(f"Auth user: ID={auth_user_id}, username={auth_username}")
+            logger.debug("Auth user: ID=%s, username=%s", auth_user_id, auth_username)
             
             # If this post belongs to the authenticated user, use their info directly
             if auth_user_id == obj.user_id:
-                logger.info(f"Post belongs to authenticated user: {auth_username}")
+                logger.debug("Post belongs to authenticated user: %s", auth_username)
                 avatar_url = None
                 
                 # Get profile picture if available
@@ -101,16 +219,16 @@ class PostSerializer(serializers.ModelSerializer):
                     avatar_url = f"{base_url}{artist.profile_picture.url}"
                     # Add timestamp to prevent caching
                     avatar_url = f"{avatar_url}?_={int(time.time())}"
-                    logger.debug(f"Artist avatar URL: {avatar_url}")
+                    logger.debug("Artist avatar URL: %s", avatar_url)
                 
-                logger.info(f"Found artist: {artist.username} (ID: {artist.id})")
+                logger.debug("Found artist: %s (ID: %s)", artist.username, artist.id)
                 return {
                     "name": artist.username,
                     "avatar": avatar_url,
                     "role": "artist",
                 }
             except Artist.DoesNotExist:
-                logger.warning(f"Artist with ID {obj.user_id} not found")
+                logger.warning("Artist with ID %s not found", obj.user_id)
         elif obj.user_type == "producer":
             try:
                 # Use get() instead of filter().first() to ensure we get the exact user
@@ -120,18 +238,18 @@ class PostSerializer(serializers.ModelSerializer):
                     avatar_url = f"{base_url}{producer.profile_picture.url}"
                     # Add timestamp to prevent caching
                     avatar_url = f"{avatar_url}?_={int(time.time())}"
-                    logger.debug(f"Producer avatar URL: {avatar_url}")
+                    logger.debug("Producer avatar URL: %s", avatar_url)
                 
-                logger.info(f"Found producer: {producer.username} (ID: {producer.id})")
+                logger.debug("Found producer: %s (ID: %s)", producer.username, producer.id)
                 return {
                     "name": producer.username,
                     "avatar": avatar_url,
                     "role": "producer",
                 }
             except Producer.DoesNotExist:
-                logger.warning(f"Producer with ID {obj.user_id} not found")
+                logger.warning("Producer with ID %s not found", obj.user_id)
         
-        logger.warning(f"No user found for post {obj.id} - User ID: {obj.user_id}, User Type: {obj.user_type}")
+        logger.warning("No user found for post %s - User ID: %s, User Type: %s", obj.id, obj.user_id, obj.user_type)
         return {"name": "Unknown", "avatar": None, "role": "user"}
 
 
@@ -140,7 +258,7 @@ class PostSerializer(serializers.ModelSerializer):
         if obj.image:
             base_url = request.build_absolute_uri('/').rstrip('/') if request else ""
             image_url = f"{base_url}{obj.image.url}"
-            logger.debug(f"Post image URL: {image_url}")
+            logger.debug("Post image URL: %s", image_url)
             return image_url
         return None
     
@@ -152,7 +270,7 @@ class PostSerializer(serializers.ModelSerializer):
         if obj.video:
             base_url = request.build_absolute_uri('/').rstrip('/') if request else ""
             video_url = f"{base_url}{obj.video.url}"
-            logger.debug(f"Post video URL: {video_url}")
+            logger.debug("Post video URL: %s", video_url)
             return video_url
     
         return None
@@ -164,24 +282,40 @@ class PostSerializer(serializers.ModelSerializer):
         if obj.audio:
             base_url = request.build_absolute_uri('/').rstrip('/') if request else ""
             audio_url = f"{base_url}{obj.audio.url}"
-            logger.debug(f"Post audio URL: {audio_url}")
+            logger.debug("Post audio URL: %s", audio_url)
             return audio_url
             
         return None
 
 
+class CommentListSerializer(serializers.ListSerializer):
+    """Serializes a page of comments with their authors loaded in one query per user model"""
+
+    def to_representation(self, data):
+        comments = list(data.all() if hasattr(data, "all") else data)
+        if "comment_authors" not in self.context:
+            self.context["comment_authors"] = load_authors({(c.user_type, c.user_id) for c in comments})
+        return [self.child.to_representation(item) for item in comments]
+
+
 class CommentSerializer(serializers.ModelSerializer):
     user = serializers.SerializerMethodField()
     
     class Meta:
         model = Comment
         fields = ["id", "user", "text", "created_at"]
+        list_serializer_class = CommentListSerializer
     
     def get_user(self, obj):
         """Return a user object with name, avatar, and role"""
         request = self.context.get("request")  # Ensure absolute URL
         base_url = request.build_absolute_uri('/').rstrip('/') if request else ""
-        logger.info(f"Getting user info for comment {obj.id} - User ID: {obj.user_id}, User Type: {obj.user_type}")
+
+        authors = self.context.get("comment_authors")
+        if authors is not None:
+            author = authors.get((obj.user_type, obj.user_id))
+            return user_summary(author, obj.user_type, base_url) if author else UNKNOWN_USER
+        logger.debug("Getting user info for comment %s - User ID: %s, User Type: %s", obj.id, obj.user_id, obj.user_type)
         
         # Get user information based on type
         if obj.user_type == "artist":
@@ -192,16 +326,16 @@ class CommentSerializer(serializers.ModelSerializer):
                     avatar_url = f"{base_url}{artist.profile_picture.url}"
                     # Add timestamp to prevent caching
                     avatar_url = f"{avatar_url}?_={int(time.time())}"
-                    logger.debug(f"Artist avatar URL: {avatar_url}")
+                    logger.debug("Artist avatar URL: %s", avatar_url)
 
-                logger.info(f"Found artist: {artist.username} (ID: {artist.id})")
+                logger.debug("Found artist: %s (ID: %s)", artist.username, artist.id)
                 return {
                     "name": artist.username,
                     "avatar": avatar_url,
                     "role": "artist",
                 }
             except Artist.DoesNotExist:
-                logger.warning(f"Artist with ID {obj.user_id} not found")
+                logger.warning("Artist with ID %s not found", obj.user_id)
                 
         elif obj.user_type == "producer":
             try:
@@ -211,16 +345,16 @@ class CommentSerializer(serializers.ModelSerializer):
                     avatar_url = f"{base_url}{producer.profile_picture.url}"
                     # Add timestamp to prevent caching
                     avatar_url = f"{avatar_url}?_={int(time.time())}"
-                    logger.debug(f"Producer avatar URL: {avatar_url}")
+                    logger.debug("Producer avatar URL: %s", avatar_url)
 
-                logger.info(f"Found producer: {producer.username} (ID: {producer.id})")
+                logger.debug("Found producer: %s (ID: %s)", producer.username, producer.id)
                 return {
                     "name": producer.username,
                     "avatar": avatar_url,
                     "role": "producer",
                 }
             except Producer.DoesNotExist:
-                logger.warning(f"Producer with ID {obj.user_id} not found")
+                logger.warning("Producer with ID %s not found", obj.user_id)
         
-        logger.warning(f"No user found for comment {obj.id}")
+        logger.warning("No user found for comment %s", obj.id)
         return {"name": "Unknown", "avatar": None, "role": "user"}
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from common.response_cache import POSTS_TAG, invalidate, user_tag
+
+from .models import Comment, Post
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    """Drop cached post listings and the author's profile"""
+    invalidate(POSTS_TAG, user_tag(instance.user_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    """Comment counts and previews are part of the post"""
+    if isinstance(kwargs.get('origin'), Post):
+        return  # Deleted along with its post, which post_changed handles
+    invalidate(POSTS_TAG, user_tag(instance.post.user_id))
@@ -1,3 +1,128 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+
+from common.instrumentation import QueryBudgetExceeded, view_query_budget
+from common.response_cache import POSTS_TAG, _bump, get_cache
+from users.models import Artist, Producer
+
+from .models import Comment, Like, Post, TrendingPost, TrendingState
+from .trending import compute_trending
+from .views import GetPostsView
+
+ENFORCED = {**settings.INSTRUMENTATION, 'ENFORCE_QUERY_BUDGETS': True}
+
+
+@override_settings(INSTRUMENTATION=ENFORCED)
+class GetPostsQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        artists = [
+            Artist.objects.create(username=f'artist{i}', nom='Test', prenom='Artist', email=f'artist{i}@example.com', password='x')
+            for i in range(3)
+        ]
+        producer = Producer.objects.create(username='producer', nom='Test', prenom='Producer', email='producer@example.com', password='x')
+        authors = [(artist.id, 'artist') for artist in artists] + [(producer.id, 'producer')]
+        for i in range(8):
+            user_id, user_type = authors[i % len(authors)]
+            post = Post.objects.create(user_id=user_id, user_type=user_type, content=f'post {i}')
+            for artist in artists[:i % 3 + 1]:
+                Comment.objects.create(post=post, user_id=artist.id, user_type='artist', text='nice')
+                Like.objects.create(post=post, user_id=artist.id, user_type='artist')
+
+    def setUp(self):
+        get_cache().clear()  # Measure the view, not a cached response
+
+    def test_recent_posts_within_budget(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/feed/posts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 8)
+        self.assertLessEqual(len(queries), view_query_budget(GetPostsView, 'GET'))
+
+    def test_trending_posts_within_budget(self):
+        response = self.client.get('/api/feed/posts/?mode=trending')
+        self.assertEqual(response.status_code, 200)
+
+    def test_over_budget_raises(self):
+        with mock.patch.object(GetPostsView, 'query_budget', {'GET': 1}):
+            with self.assertRaises(QueryBudgetExceeded), self.assertLogs('django.request', 'ERROR'):
+                self.client.get('/api/feed/posts/')
+
+
+class TrendingLateCommitTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.artists = [
+            Artist.objects.create(username=f'fan{i}', nom='Test', prenom='Fan', email=f'fan{i}@example.com', password='x')
+            for i in range(4)
+        ]
+        cls.post = Post.objects.create(user_id=cls.artists[0].id, user_type='artist', content='post')
+
+    def like(self, artist, **fields):
+        return Like.objects.create(post=self.post, user_id=artist.id, user_type='artist', **fields)
+
+    def score(self):
+        return TrendingPost.objects.get(post=self.post).score
+
+    def test_row_committed_below_the_watermark_is_counted_once(self):
+        first = self.like(self.artists[0])
+        compute_trending()
+        # ID first.id + 1 is allocated to a transaction that hasn't committed yet
+        self.like(self.artists[1], id=first.id + 2)
+        compute_trending()
+        self.assertEqual(TrendingState.objects.get().missing_like_ids, [first.id + 1])
+        self.assertAlmostEqual(self.score(), 2, places=3)
+
+        self.like(self.artists[2], id=first.id + 1)
+        stats = compute_trending()
+        self.assertEqual(stats['late'], 1)
+        self.assertEqual(TrendingState.objects.get().missing_like_ids, [])
+        self.assertAlmostEqual(self.score(), 3, places=3)
+
+        stats = compute_trending()
+        self.assertEqual(stats['late'], 0)
+        self.assertAlmostEqual(self.score(), 3, places=3)
+
+
+class PostListingETagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.artist = Artist.objects.create(username='author', nom='Test', prenom='Author', email='author@example.com', password='x')
+        cls.post = Post.objects.create(user_id=cls.artist.id, user_type='artist', content='before')
+        Like.objects.create(post=cls.post, user_id=cls.artist.id, user_type='artist')
+
+    def setUp(self):
+        get_cache().clear()
+
+    def test_stale_copy_gets_no_etag(self):
+        first = self.client.get('/api/feed/posts/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        Post.objects.filter(pk=self.post.pk).update(content='after')
+        _bump([POSTS_TAG])
+        # Another request is recomputing the entry
+        with mock.patch.object(LocMemCache, 'add', return_value=False):
+            stale = self.client.get('/api/feed/posts/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(stale['X-Cache'], 'STALE')
+        self.assertNotIn('ETag', stale)
+
+        fresh = self.client.get('/api/feed/posts/')
+        self.assertEqual(fresh.json()[0]['content'], 'after')
+        self.assertNotEqual(fresh['ETag'], first['ETag'])
+
+    def test_trending_run_is_a_new_entry(self):
+        before = self.client.get('/api/feed/posts/?mode=trending')
+        self.assertEqual(before.json(), [])
+
+        compute_trending()
+        after = self.client.get('/api/feed/posts/?mode=trending', HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(after['X-Cache'], 'MISS')
+        self.assertEqual([post['id'] for post in after.json()], [self.post.id])
+        self.assertEqual(self.client.get('/api/feed/posts/?mode=trending', HTTP_IF_NONE_MATCH=after['ETag']).status_code, 304)
@@ -0,0 +1,336 @@
+"""
+Trending posts.
+
+A post's trending score is its engagement with exponential time decay:
+
+    score(now) = sum(weight(event) * 2 ** (-(now - event.created_at) / HALF_LIFE))
+
+over its likes (LIKE_WEIGHT) and comments (COMMENT_WEIGHT). Every score
+decays by the same factor as time passes, so TrendingPost stores it at a
+fixed reference time (TrendingState.epoch) instead:
+
+    stored = sum(weight(event) * 2 ** ((event.created_at - epoch) / HALF_LIFE))
+
+The trending order at any moment is just ``-stored``, new activity only ever
+adds to the stored value, and the feed is a top-N scan of the score index.
+
+``python manage.py compute_trending`` (run it every few minutes) reads the
+likes and comments created since the previous run, by ID, and adds their
+contributions in one transaction together with the new watermarks. IDs are
+allocated when a row is inserted but only become visible when its
+transaction commits, so a row can appear below the watermark after the run
+that moved past it. Each run therefore remembers the IDs among the last
+OVERLAP below the watermark that had no row yet, and the following runs
+read those again: a row is counted the first time it's seen, and never
+twice. When the
+epoch falls far behind, all scores are rescaled to a new epoch in a single
+UPDATE so they stay in float range; posts whose score has decayed below
+MIN_SCORE are dropped. Removing a like queues a TrendingAdjustment that the
+next run subtracts (see retract_engagement), so the job is the only writer of
+TrendingPost. ``--full`` rebuilds the table from the last WINDOW of activity,
+e.g. nightly, which also corrects any drift.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import Comment, Like, Post, TrendingAdjustment, TrendingPost, TrendingState
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'HALF_LIFE': timedelta(hours=12),
+    'WINDOW': timedelta(days=7),
+    'LIKE_WEIGHT': 1.0,
+    'COMMENT_WEIGHT': 3.0,
+    'MIN_SCORE': 0.05,
+    'REBASE_AFTER': 20,  # half-lives
+    'BATCH_SIZE': 5000,
+    'OVERLAP': 1000,  # IDs below the watermark checked again for rows that committed late
+    'LIMIT': 20,
+    'MAX_LIMIT': 100,
+}
+STATE_ID = 1
+
+
+def get_setting(name):
+    return getattr(settings, 'TRENDING', {}).get(name, DEFAULTS[name])
+
+
+def event_weights():
+    return {Like: get_setting('LIKE_WEIGHT'), Comment: get_setting('COMMENT_WEIGHT')}
+
+
+def decay_factor(moment, epoch):
+    """2 ** ((moment - epoch) / HALF_LIFE): an event's weight multiplier at ``epoch``"""
+    half_life = get_setting('HALF_LIFE').total_seconds()
+    return 2.0 ** ((moment - epoch).total_seconds() / half_life)
+
+
+def trending_posts(limit):
+    """The ``limit`` highest scoring posts, best first"""
+    rows = TrendingPost.objects.select_related('post').order_by('-score', '-post')[:limit]
+    return [row.post for row in rows]
+
+
+def scan_events(model, after_id, up_to_id, epoch, totals, since=None, missing=None):
+    """
+    Add the decayed weight of ``model`` rows with after_id < id <= up_to_id
+    to ``totals`` ({post_id: [score, last_activity_at]}), reading them in
+    ID order one batch at a time. Returns the number of rows read.
+
+    The IDs among the last OVERLAP up to ``up_to_id`` that had no row are
+    appended to ``missing``, for scan_late_events to read next time.
+    """
+    weight = event_weights()[model]
+    batch_size = get_setting('BATCH_SIZE')
+    half_life = get_setting('HALF_LIFE').total_seconds()
+    epoch_ts = epoch.timestamp()
+    rows = model.objects.order_by('id')
+    if since is not None:
+        rows = rows.filter(created_at__gte=since)
+    overlap_start = max(after_id, up_to_id - get_setting('OVERLAP'))
+    seen = set()
+
+    count = 0
+    while after_id < up_to_id:
+        batch = list(rows.filter(id__gt=after_id, id__lte=up_to_id).values_list('id', 'post_id', 'created_at')[:batch_size])
+        if not batch:
+            break
+        for event_id, post_id, created_at in batch:
+            add_event(totals, post_id, weight * 2.0 ** ((created_at.timestamp() - epoch_ts) / half_life), created_at)
+            if event_id > overlap_start:
+                seen.add(event_id)
+        count += len(batch)
+        after_id = batch[-1][0]
+    if missing is not None:
+        missing.extend(event_id for event_id in range(overlap_start + 1, up_to_id + 1) if event_id not in seen)
+    return count
+
+
+def scan_late_events(model, pending_ids, watermark, epoch, totals, missing):
+    """
+    Add the ``model`` rows among ``pending_ids`` (IDs below the watermark
+    that had no row in an earlier run) that exist now, like scan_events.
+    IDs still without a row are appended to ``missing`` until they fall
+    more than OVERLAP below ``watermark``: their transaction rolled back,
+    or the row was deleted. Returns the number of rows read.
+    """
+    pending_ids = [event_id for event_id in pending_ids if event_id > watermark - get_setting('OVERLAP')]
+    if not pending_ids:
+        return 0
+    weight = event_weights()[model]
+    found = set()
+    for event_id, post_id, created_at in model.objects.filter(id__in=pending_ids).values_list('id', 'post_id', 'created_at'):
+        add_event(totals, post_id, weight * decay_factor(created_at, epoch), created_at)
+        found.add(event_id)
+    missing.extend(event_id for event_id in pending_ids if event_id not in found)
+    return len(found)
+
+
+def add_event(totals, post_id, contribution, created_at):
+    entry = totals.get(post_id)
+    if entry is None:
+        totals[post_id] = [contribution, created_at]
+    else:
+        entry[0] += contribution
+        if created_at > entry[1]:
+            entry[1] = created_at
+
+
+def scan_adjustments(up_to_id, epoch, totals):
+    """Add the queued adjustments with id <= up_to_id to ``totals``"""
+    adjustments = TrendingAdjustment.objects.filter(id__lte=up_to_id).values_list('post_id', 'weight', 'occurred_at')
+    count = 0
+    for post_id, weight, occurred_at in adjustments.iterator():
+        entry = totals.setdefault(post_id, [0.0, occurred_at])
+        entry[0] += weight * decay_factor(occurred_at, epoch)
+        count += 1
+    return count
+
+
+def existing_post_ids(post_ids):
+    """The subset of ``post_ids`` that still exist (posts may be deleted mid-run)"""
+    batch_size = get_setting('BATCH_SIZE')
+    post_ids = list(post_ids)
+    existing = set()
+    for start in range(0, len(post_ids), batch_size):
+        existing.update(Post.objects.filter(id__in=post_ids[start:start + batch_size]).values_list('id', flat=True))
+    return existing
+
+
+def add_scores(totals):
+    """
+    Add ``totals`` to the stored scores, creating rows for new posts. The
+    caller holds the TrendingState lock, which makes this job the only
+    writer, so each batch is merged in Python and written back with one
+    DELETE and one INSERT instead of a row-by-row UPDATE.
+    """
+    batch_size = get_setting('BATCH_SIZE')
+    post_ids = sorted(totals)
+    created = 0
+    for start in range(0, len(post_ids), batch_size):
+        chunk = post_ids[start:start + batch_size]
+        ranked = {
+            post_id: (score, last_activity_at)
+            for post_id, score, last_activity_at in TrendingPost.objects.filter(post_id__in=chunk).values_list(
+                'post_id', 'score', 'last_activity_at'
+            )
+        }
+        # Only posts with new engagement get a row; queued retractions alone don't
+        new_ids = existing_post_ids(post_id for post_id in chunk if post_id not in ranked and totals[post_id][0] > 0)
+        rows = []
+        for post_id in chunk:
+            score, last_activity_at = totals[post_id]
+            if post_id in ranked:
+                old_score, old_activity_at = ranked[post_id]
+                rows.append(TrendingPost(
+                    post_id=post_id, score=old_score + score, last_activity_at=max(old_activity_at, last_activity_at),
+                ))
+            elif post_id in new_ids:
+                rows.append(TrendingPost(post_id=post_id, score=score, last_activity_at=last_activity_at))
+        TrendingPost.objects.filter(post_id__in=list(ranked)).delete()
+        TrendingPost.objects.bulk_create(rows)
+        created += len(new_ids)
+    return created
+
+
+def rebase(state, now):
+    """Rescale every stored score from state.epoch to ``now`` in one UPDATE"""
+    factor = decay_factor(state.epoch, now)
+    TrendingPost.objects.update(score=F('score') * factor)
+    state.epoch = now
+
+
+def prune(epoch, now):
+    """Drop posts whose current score has decayed below MIN_SCORE"""
+    threshold = get_setting('MIN_SCORE') * decay_factor(now, epoch)
+    deleted, _ = TrendingPost.objects.filter(score__lt=threshold).delete()
+    return deleted
+
+
+def compute_trending(full=False):
+    """
+    Bring the trending scores up to date (everything from scratch when
+    ``full``) and return run statistics.
+    """
+    started = time.perf_counter()
+    now = timezone.now()
+    stats = {'mode': 'full' if full else 'incremental'}
+
+    with transaction.atomic():
+        state = TrendingState.objects.select_for_update().filter(pk=STATE_ID).first()
+        if state is None:
+            state = TrendingState(pk=STATE_ID, epoch=now)
+            # First run: build the table from scratch
+            full = True
+            stats['mode'] = 'full'
+        up_to = {
+            Like: Like.objects.aggregate(last=Max('id'))['last'] or 0,
+            Comment: Comment.objects.aggregate(last=Max('id'))['last'] or 0,
+        }
+
+        totals = {}
+        missing = {Like: [], Comment: []}
+        if full:
+            # Fresh epoch: every stored score is its current value
+            state.epoch = now
+            since = now - get_setting('WINDOW')
+            stats['likes'] = scan_events(Like, 0, up_to[Like], state.epoch, totals, since=since, missing=missing[Like])
+            stats['comments'] = scan_events(
+                Comment, 0, up_to[Comment], state.epoch, totals, since=since, missing=missing[Comment],
+            )
+            stats['late'] = 0
+
+            min_score = get_setting('MIN_SCORE')
+            live = existing_post_ids(post_id for post_id, (score, _) in totals.items() if score >= min_score)
+            TrendingPost.objects.all().delete()
+            TrendingPost.objects.bulk_create([
+                TrendingPost(post_id=post_id, score=totals[post_id][0], last_activity_at=totals[post_id][1])
+                for post_id in live
+            ], batch_size=get_setting('BATCH_SIZE'))
+            stats['updated'] = stats['created'] = len(live)
+            stats['pruned'] = 0
+            # Retractions of rows the rebuild no longer saw
+            last_adjustment = TrendingAdjustment.objects.aggregate(last=Max('id'))['last'] or 0
+            stats['adjustments'] = 0
+            state.last_full_run_at = now
+        else:
+            if (now - state.epoch) > get_setting('HALF_LIFE') * get_setting('REBASE_AFTER'):
+                rebase(state, now)
+                stats['rebased'] = True
+            watermarks = {
+                Like: max(state.last_like_id, up_to[Like]),
+                Comment: max(state.last_comment_id, up_to[Comment]),
+            }
+            stats['late'] = (
+                scan_late_events(Like, state.missing_like_ids, watermarks[Like], state.epoch, totals, missing[Like])
+                + scan_late_events(
+                    Comment, state.missing_comment_ids, watermarks[Comment], state.epoch, totals, missing[Comment],
+                )
+            )
+            stats['likes'] = scan_events(Like, state.last_like_id, up_to[Like], state.epoch, totals, missing=missing[Like])
+            stats['comments'] = scan_events(
+                Comment, state.last_comment_id, up_to[Comment], state.epoch, totals, missing=missing[Comment],
+            )
+            last_adjustment = TrendingAdjustment.objects.aggregate(last=Max('id'))['last'] or 0
+            stats['adjustments'] = scan_adjustments(last_adjustment, state.epoch, totals)
+            stats['updated'] = len(totals)
+            stats['created'] = add_scores(totals)
+            stats['pruned'] = prune(state.epoch, now)
+
+        # Scores, watermarks and applied adjustments commit together, so
+        # nothing is counted twice
+        TrendingAdjustment.objects.filter(id__lte=last_adjustment).delete()
+        state.last_like_id = max(state.last_like_id, up_to[Like])
+        state.last_comment_id = max(state.last_comment_id, up_to[Comment])
+        state.missing_like_ids = sorted(missing[Like])
+        state.missing_comment_ids = sorted(missing[Comment])
+        state.last_run_at = now
+        state.save()
+
+    stats['ranked'] = TrendingPost.objects.count()
+    stats['elapsed_s'] = time.perf_counter() - started
+    logger.info(
+        f"compute_trending: {stats['mode']} run read {stats['likes']} likes and {stats['comments']} comments "
+        f"({stats['late']} late), "
+        f"updated {stats['updated']} posts ({stats['created']} new, {stats['pruned']} pruned) in {stats['elapsed_s']:.2f}s"
+    )
+    return stats
+
+
+def retract_engagement(instance):
+    """
+    Queue the removal of a Like or Comment that is being deleted from its
+    post's trending score. Call it before delete() (which clears the ID), in
+    the same transaction; rows the job has not counted yet are simply never
+    read.
+    """
+    retract_engagements([instance])
+
+
+def retract_engagements(instances):
+    """retract_engagement() for many deleted rows, with one insert"""
+    state = TrendingState.objects.filter(pk=STATE_ID).first()
+    if state is None:
+        return
+    weights = event_weights()
+    adjustments = []
+    for instance in instances:
+        if isinstance(instance, Like):
+            watermark, missing = state.last_like_id, state.missing_like_ids
+        else:
+            watermark, missing = state.last_comment_id, state.missing_comment_ids
+        if instance.id > watermark or instance.id in missing:
+            continue  # Not counted yet
+        adjustments.append(TrendingAdjustment(
+            post_id=instance.post_id,
+            weight=-weights[type(instance)],
+            occurred_at=instance.created_at,
+        ))
+    TrendingAdjustment.objects.bulk_create(adjustments)
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
-from .views import CreatePostView, GetPostsView, LikePostView, AddCommentView, GetUserPostsView, GetCommentsView, UpdatePostView, DeletePostView
+from .views import CreatePostView, GetPostsView, LikePostView, AddCommentView, GetUserPostsView, GetCommentsView, UpdatePostView, DeletePostView, EngagementBatchView
 from users.views import NotificationView, MarkNotificationReadView, DeleteNotificationView
 
 urlpatterns = [
@@ -10,6 +10,7 @@ urlpatterns = [
     path("posts/<int:post_id>/like/", LikePostView.as_view(), name="like_post"),
     path("posts/<int:post_id>/comment/", AddCommentView.as_view(), name="add_comment"),
     path("posts/<int:post_id>/comments/", GetCommentsView.as_view(), name="get_comments"),
+    path("engagement/batch/", EngagementBatchView.as_view(), name="engagement_batch"),
     path('user/posts/', GetUserPostsView.as_view(), name='get_user_posts'),
     path('user/<int:user_id>/posts/', GetUserPostsView.as_view(), name='get_specific_user_posts'),
     
@@ -8,9 +8,19 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.authentication import SessionAuthentication, BasicAuthentication
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from rest_framework.exceptions import NotFound
+from common.pagination import KeysetPagination
+from common.conditional import conditional_response, tags_version
+from common.replicas import read_from_replica
+from common.response_cache import POSTS_TAG, cache_response
 from users.models import Artist, Producer, Notification
-from .models import Post, Comment, Like
+from users.notifications import aggregate_post_notification, get_user_type
+from .models import Post, Comment, Like, TrendingState
+from .engagement import BatchError, apply_operations, parse_operations, prune_keys
+from .likes import like_post, unlike_post
 from .serializers import PostSerializer, CommentSerializer
+from .trending import get_setting as get_trending_setting, trending_posts
 from rest_framework import status
 from users.jwt_auth import CustomJWTAuthentication  # Import our custom JWT auth class
 
@@ -22,34 +32,34 @@ class CreatePostView(APIView):
     def post(self, request):
         try:
             # Log authentication information for debugging
-            logger.info(f"Request user: {request.user}")
-            logger.info(f"Request auth: {request.auth}")
-            logger.info(f"User ID: {getattr(request.user, 'id', 'No ID')}")
-            logger.info(f"Username: {getattr(request.user, 'username', 'No username')}")
+            logger.info("Request user: %s", request.user)
+            logger.info("Request auth: %s", request.auth)
+            logger.info("User ID: %s", getattr(request.user, 'id', 'No ID'))
+            logger.info("Username: %s", getattr(request.user, 'username', 'No username'))
             
             user = request.user
             
             # Check if user exists
             if not user or not hasattr(user, 'id'):
-                logger.error(f"User not found or invalid: {user}")
+                logger.error("User not found or invalid: %s", user)
                 return Response({"error": "User not authenticated properly"}, status=status.HTTP_401_UNAUTHORIZED)
             
             # Determine user type with extra validation
             try:
                 # Get user ID from token claims if available
                 user_id_from_token = getattr(request.auth, 'payload', {}).get('user_id', user.id)
-                logger.info(f"User ID from token: {user_id_from_token}")
+                logger.info("User ID from token: %s", user_id_from_token)
                 
                 # Check if IDs match
                 if user_id_from_token != user.id:
-                    logger.warning(f"User ID mismatch: token={user_id_from_token}, user={user.id}")
+                    logger.warning("User ID mismatch: token=%s, user=%s", user_id_from_token, user.id)
                 
                 # Use the ID from the authenticated user object
                 user_id = user.id
                 
                 # Get user_type from token first
                 user_type = getattr(request.auth, 'payload', {}).get('user_type', '').lower()
-                logger.info(f"User type from token: {user_type}")
+                logger.info("User type from token: %s", user_type)
                 
                 # If user_type not in token or empty, determine from database
                 if not user_type:
@@ -57,25 +67,25 @@ class CreatePostView(APIView):
                     if Producer.objects.filter(id=user_id).exists():
                         user_type = "producer"
                         producer = Producer.objects.get(id=user_id)
-                        logger.info(f"Creating post for producer: {producer.username} (ID: {producer.id})")
+                        logger.info("Creating post for producer: %s (ID: %s)", producer.username, producer.id)
                         
                         # Verify username matches
                         if producer.username != user.username:
-                            logger.warning(f"Username mismatch: producer.username={producer.username}, user.username={user.username}")
+                            logger.warning("Username mismatch: producer.username=%s, user.username=%s", producer.username, user.username)
                             
                     elif Artist.objects.filter(id=user_id).exists():
                         user_type = "artist"
                         artist = Artist.objects.get(id=user_id)
-                        logger.info(f"Creating post for artist: {artist.username} (ID: {artist.id})")
+                        logger.info("Creating post for artist: %s (ID: %s)", artist.username, artist.id)
                         
                         # Verify username matches
                         if artist.username != user.username:
-                            logger.warning(f"Username mismatch: artist.username={artist.username}, user.username={user.username}")
+                            logger.warning("Username mismatch: artist.username=%s, user.username=%s", artist.username, user.username)
                     else:
-                        logger.error(f"User {user_id} is neither Artist nor Producer")
+                        logger.error("User %s is neither Artist nor Producer", user_id)
                         return Response({"error": "Invalid user type"}, status=status.HTTP_400_BAD_REQUEST)
             except Exception as e:
-                logger.error(f"Error determining user type: {str(e)}")
+                logger.error("Error determining user type: %s", e)
                 return Response({"error": f"Error determining user type: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
             content = request.data.get("content", "").strip()
@@ -89,11 +99,11 @@ class CreatePostView(APIView):
 
             # Log media information
             if request.FILES.get("audio"):
-                logger.info(f"Audio file received: {request.FILES.get('audio').name}")
+                logger.info("Audio file received: %s", request.FILES.get('audio').name)
             if request.FILES.get("image"):
-                logger.info(f"Image file received: {request.FILES.get('image').name}")
+                logger.info("Image file received: %s", request.FILES.get('image').name)
             if request.FILES.get("video"):
-                logger.info(f"Video file received: {request.FILES.get('video').name}")
+                logger.info("Video file received: %s", request.FILES.get('video').name)
 
             post = Post.objects.create(
                 user_id=user.id,
@@ -107,23 +117,62 @@ class CreatePostView(APIView):
             return Response({"message": "Post created successfully!", "post_id": post.id}, status=status.HTTP_201_CREATED)
 
         except Exception as e:
-            logger.error(f"Error creating post: {str(e)}")
+            logger.error("Error creating post: %s", e)
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+_posts_tags_version = tags_version(lambda request, kwargs: [POSTS_TAG])
+
+
+def trending_run(request, kwargs):
+    """Time of the last compute_trending run for ?mode=trending, else None; read once per request"""
+    if request.query_params.get("mode") != "trending":
+        return None
+    if not hasattr(request, "_trending_run"):
+        # compute_trending runs in its own process; its result is in the database
+        request._trending_run = TrendingState.objects.values_list("last_run_at", flat=True).first()
+    return request._trending_run
+
+
+def posts_version(request, kwargs):
+    """ETag marker of the post listing: the posts tag, and the last trending run for ?mode=trending"""
+    marker = _posts_tags_version(request, kwargs)
+    if marker is not None and request.query_params.get("mode") == "trending":
+        marker.append(("trending", trending_run(request, kwargs)))
+    return marker
+
+
 # Get All Posts for Feed
 class GetPostsView(APIView):
     permission_classes = [AllowAny]  # Public access
     authentication_classes = []  # No authentication required
+    query_budget = {"GET": 8}  # However many posts: mode=recent returns all of them, unpaginated (see common.instrumentation)
 
+    @conditional_response(posts_version)
+    # A trending run is a new entry, as it is a new ETag
+    @cache_response(tags=lambda kwargs, data: [POSTS_TAG], vary=trending_run)
+    @read_from_replica(tags=lambda request, kwargs: [POSTS_TAG])
     def get(self, request):
         try:
-            # Log request information
-            logger.info(f"GetPostsView: Fetching posts for feed")
-            
-            # Get all posts ordered by creation date (newest first)
-            posts = Post.objects.all().order_by("-created_at")
-            logger.info(f"GetPostsView: Found {posts.count()} posts")
+            mode = request.query_params.get("mode", "recent")
+            logger.debug("GetPostsView: Fetching %s posts for feed", mode)
+
+            if mode == "trending":
+                # Top N of the precomputed ranking (see feed.trending)
+                try:
+                    limit = int(request.query_params.get("limit", get_trending_setting("LIMIT")))
+                except ValueError:
+                    return Response({"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+                limit = max(1, min(limit, get_trending_setting("MAX_LIMIT")))
+                posts = trending_posts(limit)
+            elif mode == "recent":
+                # Get all posts ordered by creation date (newest first)
+                posts = Post.objects.all().order_by("-created_at")
+            else:
+                return Response(
+                    {"error": "mode must be 'recent' or 'trending'"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
             
             # Serialize the posts with the request context for absolute URLs
             serializer = PostSerializer(posts, many=True, context={"request": request})
@@ -131,7 +180,7 @@ class GetPostsView(APIView):
             # Return the serialized data
             return Response(serializer.data, status=status.HTTP_200_OK)
         except Exception as e:
-            logger.error(f"GetPostsView Error: {str(e)}")
+            logger.error("GetPostsView Error: %s", e)
             return Response(
                 {"error": "An error occurred while fetching posts."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -173,7 +222,7 @@ class GetUserPostsView(APIView):
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         except Exception as e:
-            logger.error(f"Error fetching user posts: {str(e)}")
+            logger.error("Error fetching user posts: %s", e)
             return Response(
                 {"error": "Failed to fetch user posts"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -182,122 +231,111 @@ class GetUserPostsView(APIView):
 
 # Like a Post
 class LikePostView(APIView):
+    """
+    PUT likes the post and DELETE unlikes it; both are idempotent, so
+    repeated taps are no-ops. POST keeps the original toggle behaviour.
+    Each change is one statement plus the counter update (see feed.likes).
+    """
     permission_classes = [IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]  # Use our custom JWT auth class
 
     def post(self, request, post_id):
+        return self.change(request, post_id, liked=None)
+
+    def put(self, request, post_id):
+        return self.change(request, post_id, liked=True)
+
+    def delete(self, request, post_id):
+        return self.change(request, post_id, liked=False)
+
+    def change(self, request, post_id, liked):
         try:
-            # Log request information
-            logger.info(f"LikePostView: User {request.user.username} (ID: {request.user.id}) attempting to like post {post_id}")
-            
-            # Check if post exists
-            try:
-                post = Post.objects.get(id=post_id)
-                logger.info(f"LikePostView: Found post {post_id}")
-            except Post.DoesNotExist:
-                logger.warning(f"LikePostView: Post {post_id} not found")
-                return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
-            
             user = request.user
-            
-            # Try to get user_type from token payload first (most reliable)
-            if hasattr(request.auth, 'payload') and 'user_type' in request.auth.payload:
-                user_type = request.auth.payload.get('user_type')
-                logger.info(f"LikePostView: Got user_type from token: {user_type}")
-            # Fallback method: check the user model type
-            else:
-                if Producer.objects.filter(id=user.id).exists():
-                    user_type = "producer"
-                    logger.info(f"LikePostView: Determined user is a producer")
-                elif Artist.objects.filter(id=user.id).exists():
-                    user_type = "artist"
-                    logger.info(f"LikePostView: Determined user is an artist")
-                else:
-                    logger.error(f"LikePostView: User {user.id} is neither Artist nor Producer")
-                    return Response({"error": "Invalid user type"}, status=status.HTTP_400_BAD_REQUEST)
+            user_type = get_user_type(user)
+            if not user_type:
+                logger.error("LikePostView: User %s is neither Artist nor Producer", user.id)
+                return Response({"error": "Invalid user type"}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Try to find existing like
-            existing_like = Like.objects.filter(
-                post=post,
-                user_id=user.id,
-                user_type=user_type
-            ).first()
-            
-            if existing_like:
-                # Unlike the post (toggle behavior)
-                logger.info(f"LikePostView: User {user.id} unliking post {post_id}")
-                existing_like.delete()
-                return Response({
-                    "message": "Like removed",
-                    "liked": False,
-                    "likes_count": Like.objects.filter(post=post).count()
-                }, status=status.HTTP_200_OK)
+            post = Post.objects.only("id", "user_id", "user_type", "likes_count").filter(id=post_id).first()
+            if post is None:
+                logger.warning("LikePostView: Post %s not found", post_id)
+                return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
+
+            if liked is None:
+                # Toggle: unlike if liked, like otherwise
+                changed, likes_count = unlike_post(post.id, user_type, user.id)
+                liked = not changed
+                if liked:
+                    changed, likes_count = like_post(post.id, user_type, user.id)
+            elif liked:
+                changed, likes_count = like_post(post.id, user_type, user.id)
             else:
-                # Like the post
-                try:
-                    logger.info(f"LikePostView: User {user.id} liking post {post_id}")
-                    like = Like.objects.create(
-                        post=post,
-                        user_id=user.id,
-                        user_type=user_type,
-                    )
-                    
-                    # Create notification only if the post owner is not the same as the liker
-                    if post.user_id != user.id:
-                        try:
-                            # Determine post owner (artist or producer)
-                            post_owner_artist = None
-                            post_owner_producer = None
-                            if post.user_type == "artist":
-                                post_owner_artist = Artist.objects.get(id=post.user_id)
-                                logger.info(f"LikePostView: Post owner is artist {post_owner_artist.username}")
-                            elif post.user_type == "producer":
-                                post_owner_producer = Producer.objects.get(id=post.user_id)
-                                logger.info(f"LikePostView: Post owner is producer {post_owner_producer.username}")
-                                
-                            # Determine sender (artist or producer)
-                            sender_artist = None
-                            sender_producer = None
-                            if user_type == "artist":
-                                sender_artist = Artist.objects.get(id=user.id)
-                            elif user_type == "producer":
-                                sender_producer = Producer.objects.get(id=user.id)
-                            
-                            # Get sender username for notification message
-                            sender_username = user.username
-                                
-                            # Create notification
-                            notification = Notification.objects.create(
-                                artist=post_owner_artist,
-                                producer=post_owner_producer,
-                                sender_artist=sender_artist,
-                                sender_producer=sender_producer,
-                                notification_type="like",
-                                message=f"{sender_username} liked your post.",
-                                related_id=post.id,
-                                read=False
-                            )
-                            logger.info(f"LikePostView: Created notification {notification.id} for post owner")
-                            
-                        except Exception as notif_error:
-                            # Log error but don't fail the like operation if notification fails
-                            logger.error(f"LikePostView: Error creating notification: {str(notif_error)}")
-                    
-                    return Response({
-                        "message": "Post liked successfully",
-                        "liked": True,
-                        "likes_count": Like.objects.filter(post=post).count()
-                    }, status=status.HTTP_201_CREATED)
-                    
-                except Exception as like_error:
-                    logger.error(f"LikePostView: Error creating like: {str(like_error)}")
-                    # Check for IntegrityError (duplicate like)
-                    if "unique constraint" in str(like_error).lower():
-                        return Response({"error": "You have already liked this post"}, status=status.HTTP_400_BAD_REQUEST)
-                    return Response({"error": str(like_error)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                changed, likes_count = unlike_post(post.id, user_type, user.id)
+
+            if likes_count is None:
+                likes_count = post.likes_count
+            logger.debug("LikePostView: %s %s %s post %s (changed: %s)", user_type, user.id, 'liked' if liked else 'unliked', post_id, changed)
+
+            # Notify the post owner once the like is committed
+            if liked and changed and post.user_id != user.id:
+                transaction.on_commit(lambda: self.notify(post, user, user_type))
+
+            return Response({
+                "message": "Post liked successfully" if liked else "Like removed",
+                "liked": liked,
+                "likes_count": likes_count,
+            }, status=status.HTTP_201_CREATED if liked and changed else status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error("LikePostView Error: %s", e)
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def notify(self, post, user, user_type):
+        try:
+            # Likes within one time window coalesce into a single
+            # "X and N others liked your post" notification
+            notification = aggregate_post_notification(
+                "like", post, user, user_type,
+                message=f"{user.username} liked your post.",
+            )
+            logger.debug("LikePostView: Recorded like notification %s for post owner", getattr(notification, 'id', None))
+        except Exception as notif_error:
+            # Log error but don't fail the like operation if notification fails
+            logger.error("LikePostView: Error creating notification: %s", notif_error)
+
+
+class EngagementBatchView(APIView):
+    """
+    Apply a batch of likes, unlikes and comments queued by an offline client.
+    Every operation carries an idempotency key, so a batch can be resent
+    safely; see feed.engagement for the format.
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def post(self, request):
+        try:
+            user = request.user
+            user_type = get_user_type(user)
+            if not user_type:
+                logger.error("EngagementBatchView: User %s is neither Artist nor Producer", user.id)
+                return Response({"error": "Invalid user type"}, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                parsed = parse_operations(request.data)
+            except BatchError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            prune_keys()
+            outcome = apply_operations(
+                parsed, user, user_type,
+                serialize_comments=lambda comments: CommentSerializer(comments, many=True, context={"request": request}).data,
+            )
+            logger.debug("EngagementBatchView: %s %s synced %s operations", user_type, user.id, len(parsed))
+            return Response(outcome, status=status.HTTP_200_OK)
 
         except Exception as e:
-            logger.error(f"LikePostView Error: {str(e)}")
+            logger.error("EngagementBatchView Error: %s", e)
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
@@ -321,7 +359,7 @@ class AddCommentView(APIView):
                 elif Artist.objects.filter(id=user.id).exists():
                     user_type = "artist"
                 else:
-                    logger.error(f"User {user.id} is neither Artist nor Producer")
+                    logger.error("User %s is neither Artist nor Producer", user.id)
                     return Response({"error": "Invalid user type"}, status=status.HTTP_400_BAD_REQUEST)
             
             # Validate text is not empty
@@ -343,41 +381,17 @@ class AddCommentView(APIView):
             # Create notification only if the post owner is not the commenter
             if post.user_id != user.id:
                 try:
-                    # Determine post owner (artist or producer)
-                    post_owner_artist = None
-                    post_owner_producer = None
-                    if post.user_type == "artist":
-                        post_owner_artist = Artist.objects.get(id=post.user_id)
-                    elif post.user_type == "producer":
-                        post_owner_producer = Producer.objects.get(id=post.user_id)
-                        
-                    # Determine sender (artist or producer)
-                    sender_artist = None
-                    sender_producer = None
-                    if user_type == "artist":
-                        sender_artist = Artist.objects.get(id=user.id)
-                    elif user_type == "producer":
-                        sender_producer = Producer.objects.get(id=user.id)
-                    
-                    # Get sender username for notification message
-                    sender_username = user.username
-                        
-                    # Create notification
-                    notification = Notification.objects.create(
-                        artist=post_owner_artist,
-                        producer=post_owner_producer,
-                        sender_artist=sender_artist,
-                        sender_producer=sender_producer,
-                        notification_type="comment",
-                        message=f"{sender_username} commented on your post: \"{text[:50]}{'...' if len(text) > 50 else ''}\"",
-                        post_id=post.id,
-                        read=False
+                    # Comments within one time window coalesce into a single
+                    # "X and N others commented on your post" notification
+                    notification = aggregate_post_notification(
+                        "comment", post, user, user_type,
+                        message=f"{user.username} commented on your post: \"{text[:50]}{'...' if len(text) > 50 else ''}\"",
                     )
                     
-                    logger.info(f"Created comment notification {notification.id} for post {post_id}")
+                    logger.info("Recorded comment notification %s for post %s", getattr(notification, 'id', None), post_id)
                 except Exception as e:
                     # Log error but don't fail the whole request if notification creation fails
-                    logger.error(f"Failed to create comment notification: {str(e)}")
+                    logger.error("Failed to create comment notification: %s", e)
             
             # Serialize the created comment
             serializer = CommentSerializer(comment, context={"request": request})
@@ -390,7 +404,7 @@ class AddCommentView(APIView):
         except Post.DoesNotExist:
             return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            logger.error(f"Error adding comment: {str(e)}")
+            logger.error("Error adding comment: %s", e)
             return Response(
                 {"error": f"Failed to add comment: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -398,31 +412,37 @@ class AddCommentView(APIView):
 
 
 # Get Comments for a Post
+class CommentPagination(KeysetPagination):
+    page_size = 20
+    max_page_size = 100
+
+
 class GetCommentsView(APIView):
+    """
+    Cursor-paginated comments of a post, newest first. Each page is one
+    range scan of the (post, created_at, id) index plus one query per
+    author type.
+    """
     permission_classes = [AllowAny]  # Public access
     authentication_classes = []  # No authentication required
 
     def get(self, request, post_id):
         try:
             # Check if post exists
-            post = Post.objects.get(id=post_id)
-            
-            # Get all comments for this post
-            comments = Comment.objects.filter(post=post).order_by('-created_at')
-            
+            if not Post.objects.filter(id=post_id).exists():
+                return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
+
+            paginator = CommentPagination()
+            comments = paginator.paginate_queryset(Comment.objects.filter(post_id=post_id), request, view=self)
+
             # Serialize the comments
             serializer = CommentSerializer(comments, many=True, context={"request": request})
-            
-            # Return the serialized data
-            return Response(serializer.data, status=status.HTTP_200_OK)
-            
-        except Post.DoesNotExist:
-            return Response(
-                {"error": "Post not found"}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
+            return paginator.get_paginated_response(serializer.data)
+
+        except NotFound:
+            raise
         except Exception as e:
-            logger.error(f"Error fetching comments: {str(e)}")
+            logger.error("Error fetching comments: %s", e)
             return Response(
                 {"error": "Failed to fetch comments"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -493,7 +513,7 @@ class UpdatePostView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            logger.error(f"Error updating post: {str(e)}")
+            logger.error("Error updating post: %s", e)
             return Response(
                 {"error": f"Failed to update post: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -534,7 +554,7 @@ class DeletePostView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            logger.error(f"Error deleting post: {str(e)}")
+            logger.error("Error deleting post: %s", e)
             return Response(
                 {"error": f"Failed to delete post: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -7,12 +7,82 @@ from urllib.parse import parse_qs
 import jwt
 from django.conf import settings
 from users.models import Artist, Producer
+from users.notifications import notification_group_name, get_unread_count
+from common.replicas import pin_to_primary
 import logging
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
+
+def get_user_from_token(token):
+    """
+    Resolve the Artist/Producer from a JWT passed in the websocket query string.
+    Returns AnonymousUser if the token is missing or invalid.
+    """
+    if not token:
+        logger.warning("No token provided for WebSocket authentication")
+        return AnonymousUser()
+
+    try:
+        # Decode the token
+        decoded_token = jwt.decode(
+            token,
+            settings.SIMPLE_JWT['SIGNING_KEY'],
+            algorithms=[settings.SIMPLE_JWT['ALGORITHM']]
+        )
+
+        # Extract user info
+        user_id = decoded_token.get('user_id')
+        user_type = decoded_token.get('user_type', '')
+
+        logger.debug("WebSocket auth: Token contains user_id=%s, user_type=%s", user_id, user_type)
+
+        if not user_id:
+            logger.error("Token missing user_id claim")
+            return AnonymousUser()
+
+        # Find the user based on type
+        user = None
+        if user_type == 'artist':
+            try:
+                user = Artist.objects.get(id=user_id)
+                logger.debug("Found Artist with id=%s", user_id)
+            except Artist.DoesNotExist:
+                logger.warning("Artist with id=%s not found", user_id)
+        elif user_type == 'producer':
+            try:
+                user = Producer.objects.get(id=user_id)
+                logger.debug("Found Producer with id=%s", user_id)
+            except Producer.DoesNotExist:
+                logger.warning("Producer with id=%s not found", user_id)
+        else:
+            # Try both models if user_type not specified
+            try:
+                # Check ID range to determine type
+                if user_id >= 1000000:
+                    user = Producer.objects.get(id=user_id)
+                    logger.debug("Found Producer with id=%s based on ID range", user_id)
+                else:
+                    user = Artist.objects.get(id=user_id)
+                    logger.debug("Found Artist with id=%s based on ID range", user_id)
+            except (Artist.DoesNotExist, Producer.DoesNotExist):
+                logger.warning("User not found with id=%s", user_id)
+
+        if user:
+            # Add authentication flag for compatibility
+            user.is_authenticated = True
+            return user
+
+        logger.error("No user found for token with user_id=%s, user_type=%s", user_id, user_type)
+        return AnonymousUser()
+
+    except Exception as e:
+        logger.error("Invalid token: %s", e)
+        return AnonymousUser()
+
+
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.room_name = self.scope['url_route']['kwargs']['room_name']
@@ -28,13 +98,13 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         if user is None or isinstance(user, AnonymousUser):
             # Reject the connection if no valid token
-            logger.error(f"WebSocket connection rejected: Invalid token")
+            logger.error("WebSocket connection rejected: Invalid token")
             await self.close()
             return
 
         # Store user in scope
         self.scope['user'] = user
-        logger.info(f"WebSocket connected: user={user.username}, type={type(user)}")
+        logger.debug("WebSocket connected: user=%s, type=%s", user.username, type(user))
 
         # Join room group
         await self.channel_layer.group_add(
@@ -155,7 +225,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
             if not participant_exists:
                 # Add user as participant using the new method
                 room.add_participant(user)
-                logger.info(f"Added user {user.username} to chat room {room.name}")
+                logger.info("Added user %s to chat room %s", user.username, room.name)
 
             # Create the message using ContentType
             new_message = Message.objects.create(
@@ -164,7 +234,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 object_id=user.id,
                 content=message
             )
-            logger.info(f"Saved message: {new_message.id} from {user.username}")
+            logger.info("Saved message: %s from %s", new_message.id, user.username)
+            # The sender's next history fetch must include it
+            pin_to_primary(user.id)
 
             # Create read statuses for all other participants
             for participant_link in room.participant_links.all():
@@ -183,7 +255,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
             return new_message
         except Exception as e:
-            logger.error(f"Error saving message: {e}")
+            logger.error("Error saving message: %s", e)
             return None
 
     @database_sync_to_async
@@ -204,71 +276,69 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'size': message.file_size,
             }
         except Message.DoesNotExist:
-            logger.error(f"Message not found: {message_id}")
+            logger.error("Message not found: %s", message_id)
             return None
         except Exception as e:
-            logger.error(f"Error getting file data: {e}")
+            logger.error("Error getting file data: %s", e)
             return None
 
     @database_sync_to_async
     def get_user_from_token(self, token):
-        if not token:
-            logger.warning("No token provided for WebSocket authentication")
-            return AnonymousUser()
+        return get_user_from_token(token)
 
-        try:
-            # Decode the token
-            decoded_token = jwt.decode(
-                token,
-                settings.SIMPLE_JWT['SIGNING_KEY'],
-                algorithms=[settings.SIMPLE_JWT['ALGORITHM']]
-            )
 
-            # Extract user info
-            user_id = decoded_token.get('user_id')
-            user_type = decoded_token.get('user_type', '')
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+    Per-user notification socket. New notifications and unread badge
+    changes are pushed here (see users.notifications) so clients don't
+    have to poll the notification inbox.
+    """
 
-            logger.info(f"WebSocket auth: Token contains user_id={user_id}, user_type={user_type}")
+    async def connect(self):
+        self.group_name = None
 
-            if not user_id:
-                logger.error("Token missing user_id claim")
-                return AnonymousUser()
+        query_params = parse_qs(self.scope.get('query_string', b'').decode())
+        token = query_params.get('token', [''])[0]
+        user = await database_sync_to_async(get_user_from_token)(token)
 
-            # Find the user based on type
-            user = None
-            if user_type == 'artist':
-                try:
-                    user = Artist.objects.get(id=user_id)
-                    logger.info(f"Found Artist with id={user_id}")
-                except Artist.DoesNotExist:
-                    logger.warning(f"Artist with id={user_id} not found")
-            elif user_type == 'producer':
-                try:
-                    user = Producer.objects.get(id=user_id)
-                    logger.info(f"Found Producer with id={user_id}")
-                except Producer.DoesNotExist:
-                    logger.warning(f"Producer with id={user_id} not found")
-            else:
-                # Try both models if user_type not specified
-                try:
-                    # Check ID range to determine type
-                    if user_id >= 1000000:
-                        user = Producer.objects.get(id=user_id)
-                        logger.info(f"Found Producer with id={user_id} based on ID range")
-                    else:
-                        user = Artist.objects.get(id=user_id)
-                        logger.info(f"Found Artist with id={user_id} based on ID range")
-                except (Artist.DoesNotExist, Producer.DoesNotExist):
-                    logger.warning(f"User not found with id={user_id}")
-
-            if user:
-                # Add authentication flag for compatibility
-                user.is_authenticated = True
-                return user
-
-            logger.error(f"No user found for token with user_id={user_id}, user_type={user_type}")
-            return AnonymousUser()
+        if user is None or isinstance(user, AnonymousUser):
+            logger.error("Notification WebSocket connection rejected: Invalid token")
+            await self.close()
+            return
 
-        except Exception as e:
-            logger.error(f"Invalid token: {e}")
-            return AnonymousUser()
\ No newline at end of file
+        self.scope['user'] = user
+        self.user_type = 'artist' if isinstance(user, Artist) else 'producer'
+        self.group_name = notification_group_name(self.user_type, user.id)
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        # Let the client sync its badge without a separate HTTP request
+        unread_count = await database_sync_to_async(get_unread_count)(self.user_type, user.id)
+        await self.send(text_data=json.dumps({
+            'type': 'unread_count',
+            'unread_count': unread_count,
+        }))
+
+    async def disconnect(self, close_code):
+        if self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        # Push-only socket; clients use the HTTP endpoints to read/delete
+        pass
+
+    async def notification_created(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'notification',
+            'notification': event['notification'],
+            'unread_delta': event['unread_delta'],
+            'unread_count': event['unread_count'],
+        }))
+
+    async def notification_unread(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'unread_count',
+            'unread_delta': event['unread_delta'],
+            'unread_count': event['unread_count'],
+        }))
@@ -0,0 +1,276 @@
+"""
+Websocket load generator for messaging.consumers.ChatConsumer.
+
+Opens many authenticated chat sockets (one user each, spread over rooms)
+against a running ASGI server, sends messages at a fixed total rate from
+randomly chosen clients, and matches every delivery back to its send:
+
+- delivery latency: time from sendMessage() on the sender to the frame
+  arriving at each room member (the consumer echoes to the sender too);
+- dropped deliveries: members that were connected when a message was sent
+  but never received it before the drain period ended.
+
+Everything runs on one asyncio loop in this process with a minimal
+websocket client on asyncio streams (autobahn's asyncio flavour can't be
+used: daphne pins txaio to Twisted once Django is set up), so the sockets
+are cheap enough to open thousands of them. Use the loadtest_chat command
+to run it.
+"""
+import asyncio
+import base64
+import json
+import os
+import random
+import struct
+import time
+
+from common.benchmarking import percentile
+
+OPCODE_TEXT = 0x1
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+
+class HandshakeRejected(ConnectionError):
+    """The server answered the upgrade with something other than 101"""
+
+
+class ChatClient:
+    """
+    Minimal RFC 6455 client on asyncio streams: text frames only, which is
+    all ChatConsumer speaks. Kept lean so one process can drive thousands.
+    """
+
+    def __init__(self, run, index, room, token):
+        self.run = run
+        self.index = index
+        self.room = room
+        self.token = token
+        self.reader = None
+        self.writer = None
+        self.connect_ms = None
+        self.reading = None
+
+    @property
+    def connected(self):
+        return self.writer is not None
+
+    async def connect(self, timeout):
+        started = time.perf_counter()
+        self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(self.run.host, self.run.port), timeout)
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.writer.write((
+            f"GET /ws/chat/{self.room}/?token={self.token} HTTP/1.1\r\n"
+            f"Host: {self.run.host}:{self.run.port}\r\n"
+            "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        ).encode())
+        try:
+            head = await asyncio.wait_for(self.reader.readuntil(b"\r\n\r\n"), timeout)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+            self.abort()
+            raise
+        if not head.startswith(b"HTTP/1.1 101"):
+            # The consumer closes the handshake when the token is rejected
+            self.abort()
+            raise HandshakeRejected(head.split(b"\r\n", 1)[0].decode(errors='replace'))
+        self.connect_ms = (time.perf_counter() - started) * 1000
+        self.reading = asyncio.create_task(self.read_frames())
+
+    def send(self, text):
+        payload = json.dumps({'message': text}).encode()
+        self.write_frame(OPCODE_TEXT, payload)
+
+    def write_frame(self, opcode, payload):
+        # Client frames must be masked
+        mask = os.urandom(4)
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, 0x80 | length)
+        elif length < 1 << 16:
+            header = struct.pack('!BBH', 0x80 | opcode, 0x80 | 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 0x80 | 127, length)
+        masked = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+        self.writer.write(header + mask + masked)
+
+    async def read_frames(self):
+        try:
+            while True:
+                first, second = await self.reader.readexactly(2)
+                opcode = first & 0x0F
+                length = second & 0x7F
+                if length == 126:
+                    length, = struct.unpack('!H', await self.reader.readexactly(2))
+                elif length == 127:
+                    length, = struct.unpack('!Q', await self.reader.readexactly(8))
+                payload = await self.reader.readexactly(length)
+                if opcode == OPCODE_TEXT:
+                    self.run.received(self, payload, time.perf_counter())
+                elif opcode == OPCODE_PING:
+                    self.write_frame(OPCODE_PONG, payload)
+                elif opcode == OPCODE_CLOSE:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.abort()
+            self.run.disconnected(self)
+
+    async def close(self):
+        if self.writer is not None:
+            try:
+                self.write_frame(OPCODE_CLOSE, struct.pack('!H', 1000))
+            except ConnectionError:
+                pass
+        if self.reading is not None:
+            try:
+                await asyncio.wait_for(self.reading, 2)
+            except asyncio.TimeoutError:
+                self.reading.cancel()
+        self.abort()
+
+    def abort(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class LoadRun:
+    """One load test: connect, send at ``rate`` for ``duration``, drain, report"""
+
+    def __init__(self, url, rooms, tokens, rate, duration, drain, message_size=64, connect_concurrency=100,
+                 connect_timeout=10.0, seed=0):
+        self.url = url.rstrip('/')
+        host_port = self.url.split('://', 1)[-1]
+        self.host, _, port = host_port.partition(':')
+        self.port = int(port or 80)
+        self.rate = rate
+        self.duration = duration
+        self.drain = drain
+        self.padding = 'x' * max(0, message_size)
+        self.connect_concurrency = connect_concurrency
+        self.connect_timeout = connect_timeout
+        self.random = random.Random(seed)
+        self.marker = f"lt{random.Random(seed).getrandbits(32):08x}"
+
+        # Client i joins room i % len(rooms)
+        self.clients = [ChatClient(self, i, rooms[i % len(rooms)], token) for i, token in enumerate(tokens)]
+        self.members = {room: set() for room in rooms}
+        self.connect_errors = {}
+        self.disconnects = 0
+
+        self.sent = {}  # message id -> (sent at, members expected to receive it)
+        self.expected = 0
+        self.pending = 0
+        self.latencies = []
+        self.send_started = None
+        self.last_delivery = None
+        self.unexpected = 0
+
+    async def connect_all(self):
+        semaphore = asyncio.Semaphore(self.connect_concurrency)
+
+        async def connect(client):
+            async with semaphore:
+                try:
+                    await client.connect(self.connect_timeout)
+                except Exception as e:
+                    name = type(e).__name__
+                    self.connect_errors[name] = self.connect_errors.get(name, 0) + 1
+                    return
+                self.members[client.room].add(client)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(connect(client) for client in self.clients))
+        return time.perf_counter() - started
+
+    def disconnected(self, client):
+        if client in self.members[client.room]:
+            self.members[client.room].discard(client)
+            self.disconnects += 1
+
+    def received(self, client, payload, at):
+        try:
+            text = json.loads(payload).get('message', '')
+            marker, message_id, _ = text.split(':', 2)
+            sent_at, expected = self.sent[int(message_id)]
+        except (ValueError, KeyError, AttributeError):
+            self.unexpected += 1
+            return
+        if marker != self.marker or client.index not in expected:
+            self.unexpected += 1
+            return
+        expected.discard(client.index)
+        self.pending -= 1
+        self.latencies.append((at - sent_at) * 1000)
+        self.last_delivery = at
+
+    async def send_all(self):
+        senders = [client for client in self.clients if client.connected]
+        if not senders:
+            return 0.0
+        total = int(self.rate * self.duration)
+        started = self.send_started = time.perf_counter()
+        for message_id in range(total):
+            # Fixed schedule, so a slow server shows up as latency, not a lower send rate
+            delay = started + message_id / self.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            sender = self.random.choice(senders)
+            if not sender.connected:
+                continue
+            expected = {member.index for member in self.members[sender.room]}
+            self.sent[message_id] = (time.perf_counter(), expected)
+            self.expected += len(expected)
+            self.pending += len(expected)
+            sender.send(f"{self.marker}:{message_id}:{self.padding}")
+        return time.perf_counter() - started
+
+    async def wait_for_deliveries(self):
+        deadline = time.perf_counter() + self.drain
+        while self.pending > 0 and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+
+    async def close_all(self):
+        await asyncio.gather(*(client.close() for client in self.clients))
+
+    async def execute(self):
+        connect_s = await self.connect_all()
+        connected = sum(len(members) for members in self.members.values())
+        send_s = await self.send_all()
+        await self.wait_for_deliveries()
+        disconnects = self.disconnects
+        await self.close_all()
+
+        delivered = len(self.latencies)
+        delivery_s = self.last_delivery - self.send_started if self.last_delivery else 0
+        connect_times = [client.connect_ms for client in self.clients if client.connect_ms is not None]
+        return {
+            'clients': len(self.clients),
+            'rooms': len(self.members),
+            'connected': connected,
+            'connect_errors': self.connect_errors,
+            'connect_s': connect_s,
+            'connect_p50_ms': percentile(connect_times, 50),
+            'connect_p95_ms': percentile(connect_times, 95),
+            'disconnects_during_run': disconnects,
+            'target_rate': self.rate,
+            'messages_sent': len(self.sent),
+            'send_rate': len(self.sent) / send_s if send_s else 0,
+            'deliveries_expected': self.expected,
+            'deliveries': delivered,
+            'dropped': self.expected - delivered,
+            'dropped_pct': (self.expected - delivered) / self.expected * 100 if self.expected else 0.0,
+            'deliveries_per_s': delivered / delivery_s if delivery_s else 0,
+            'unexpected_frames': self.unexpected,
+            'latency_p50_ms': percentile(self.latencies, 50),
+            'latency_p95_ms': percentile(self.latencies, 95),
+            'latency_p99_ms': percentile(self.latencies, 99),
+            'latency_max_ms': max(self.latencies) if self.latencies else None,
+        }
+
+
+def run(url, rooms, tokens, **options):
+    return asyncio.run(LoadRun(url, rooms, tokens, **options).execute())
@@ -0,0 +1,157 @@
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+
+from messaging.loadtest import run
+from messaging.models import ChatRoom, ChatRoomParticipant
+from users.models import Artist
+from users.views import get_tokens_for_user
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test ChatConsumer: open --clients authenticated websockets spread over --rooms, "
+        "send --rate messages/s for --duration seconds and report delivery latency percentiles "
+        "and dropped messages. Starts a local Daphne on a free port unless --url is given. "
+        "Creates temporary users and rooms in the configured database and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000, help="Websocket clients (one user each)")
+        parser.add_argument('--rooms', type=int, default=100, help="Chat rooms the clients are spread over")
+        parser.add_argument('--rate', type=float, default=100.0, help="Messages per second, over all clients")
+        parser.add_argument('--duration', type=float, default=30.0, help="Seconds of sending")
+        parser.add_argument('--drain', type=float, default=10.0, help="Seconds to wait for late deliveries")
+        parser.add_argument('--message-size', type=int, default=64, help="Padding bytes per message")
+        parser.add_argument('--connect-concurrency', type=int, default=100, help="Handshakes in flight at once")
+        parser.add_argument('--connect-timeout', type=float, default=10.0)
+        parser.add_argument('--url', help="ws://host:port of a running server (default: start Daphne)")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the JSON results to this file")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['rooms'] < 1 or options['rate'] <= 0:
+            raise CommandError("--clients, --rooms and --rate must be positive")
+        self.raise_file_limit(options['clients'])
+        self.prefix = f"loadtest_{uuid.uuid4().hex[:8]}"
+        server = None
+        try:
+            rooms, tokens = self.create_users_and_rooms(options['clients'], options['rooms'])
+            url = options['url']
+            if url is None:
+                server, url = self.start_daphne()
+            results = run(
+                url, rooms, tokens,
+                rate=options['rate'], duration=options['duration'], drain=options['drain'],
+                message_size=options['message_size'], connect_concurrency=options['connect_concurrency'],
+                connect_timeout=options['connect_timeout'], seed=options['seed'],
+            )
+            results['url'] = url
+            results['channel_layer'] = settings.CHANNEL_LAYERS['default']['BACKEND']
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+            self.cleanup()
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{results['connected']}/{results['clients']} clients connected in {results['connect_s']:.1f}s "
+            f"over {results['rooms']} rooms (handshake p50 {results['connect_p50_ms'] or 0:.1f} ms, "
+            f"p95 {results['connect_p95_ms'] or 0:.1f} ms), errors: {results['connect_errors'] or 'none'}"
+        )
+        self.stdout.write(
+            f"sent {results['messages_sent']} messages at {results['send_rate']:.1f}/s "
+            f"(target {results['target_rate']:.1f}/s), {results['deliveries']} deliveries "
+            f"({results['deliveries_per_s']:.1f}/s)"
+        )
+        if results['deliveries']:
+            self.stdout.write(
+                f"delivery latency ms: p50 {results['latency_p50_ms']:.1f}  p95 {results['latency_p95_ms']:.1f}  "
+                f"p99 {results['latency_p99_ms']:.1f}  max {results['latency_max_ms']:.1f}"
+            )
+        style = self.style.SUCCESS if results['dropped'] == 0 else self.style.ERROR
+        self.stdout.write(style(
+            f"dropped {results['dropped']} of {results['deliveries_expected']} deliveries "
+            f"({results['dropped_pct']:.2f}%), {results['disconnects_during_run']} disconnects"
+        ))
+
+    def raise_file_limit(self, clients):
+        # Every client needs a socket here and one in Daphne
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        needed = clients + 256
+        if soft != resource.RLIM_INFINITY and soft < needed:
+            limit = needed if hard == resource.RLIM_INFINITY else min(hard, needed)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+            if limit < needed:
+                self.stderr.write(f"Open file limit is {limit}; some of the {clients} clients may fail to connect")
+
+    def create_users_and_rooms(self, clients, room_count):
+        encoded = make_password('loadtest-password')  # Hash once, tokens are issued directly
+        Artist.objects.bulk_create([
+            Artist(username=f"{self.prefix}_u{i}", nom='Load', prenom='Test',
+                   email=f"{self.prefix}_u{i}@loadtest.local", password=encoded)
+            for i in range(clients)
+        ], batch_size=2000)
+        users = list(Artist.objects.filter(username__startswith=f"{self.prefix}_u").order_by('id'))
+        rooms = ChatRoom.objects.bulk_create([ChatRoom(name=f"{self.prefix}_r{i}") for i in range(room_count)])
+
+        # Client i joins room i % rooms, as messaging.loadtest assigns them
+        content_type = ContentType.objects.get_for_model(Artist)
+        ChatRoomParticipant.objects.bulk_create([
+            ChatRoomParticipant(chat_room_id=rooms[i % room_count].id, content_type=content_type, object_id=user.id)
+            for i, user in enumerate(users)
+        ], batch_size=2000)
+        return [room.name for room in rooms], [get_tokens_for_user(user)['access'] for user in users]
+
+    def start_daphne(self):
+        port = free_port()
+        # Same settings module and database as this command; Daphne's own
+        # logging is discarded so it doesn't compete for the terminal
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'daphne', '-b', '127.0.0.1', '-p', str(port), 'backend.asgi:application'],
+            cwd=settings.BASE_DIR, env=os.environ.copy(),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        if not wait_for_port(port, timeout=30):
+            server.terminate()
+            raise CommandError("Daphne did not start listening within 30s")
+        return server, f"ws://127.0.0.1:{port}"
+
+    def cleanup(self):
+        # Cascades to participants, messages and read statuses
+        ChatRoom.objects.filter(name__startswith=f"{self.prefix}_r").delete()
+        Artist.objects.filter(username__startswith=f"{self.prefix}_u").delete()
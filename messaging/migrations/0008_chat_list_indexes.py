@@ -0,0 +1,22 @@
+# Generated by Django 5.1.6 on 2026-10-19 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('messaging', '0007_alter_message_file_attachment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatroomparticipant',
+            index=models.Index(fields=['content_type', 'object_id'], name='chat_participant_user'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['room', 'id'], name='message_room_id'),
+        ),
+    ]
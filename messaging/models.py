@@ -25,6 +25,10 @@ class ChatRoomParticipant(models.Model):
 
     class Meta:
         unique_together = ('chat_room', 'content_type', 'object_id')
+        indexes = [
+            # A user's rooms (chat list, its ETag)
+            models.Index(fields=['content_type', 'object_id'], name='chat_participant_user'),
+        ]
 
     def __str__(self):
         return f"ChatRoomParticipant: {self.participant} in {self.chat_room}"
@@ -55,7 +59,7 @@ class ChatRoom(models.Model):
         if isinstance(user, (Artist, Producer)):
             try:
                 content_type = ContentType.objects.get_for_model(user)
-                logger.info(f"Adding participant to chat room {self.id}: user={user.id}, type={content_type}")
+                logger.debug("Adding participant to chat room %s: user=%s, type=%s", self.id, user.id, content_type)
 
                 # Check if participant already exists
                 exists = ChatRoomParticipant.objects.filter(
@@ -65,7 +69,7 @@ class ChatRoom(models.Model):
                 ).exists()
 
                 if exists:
-                    logger.info(f"Participant {user.id} already exists in chat room {self.id}")
+                    logger.debug("Participant %s already exists in chat room %s", user.id, self.id)
                     return
 
                 participant = ChatRoomParticipant.objects.create(
@@ -73,16 +77,16 @@ class ChatRoom(models.Model):
                     content_type=content_type,
                     object_id=user.id
                 )
-                logger.info(f"Added participant {user.username} (id={user.id}) to chat room {self.id}")
+                logger.debug("Added participant %s (id=%s) to chat room %s", user.username, user.id, self.id)
                 return participant
             except Exception as e:
-                logger.error(f"Error adding participant {user} to chat room {self.id}: {str(e)}")
+                logger.error("Error adding participant %s to chat room %s: %s", user, self.id, e)
                 import traceback
                 logger.error(traceback.format_exc())
                 raise RuntimeError(f"Failed to add participant: {str(e)}")
         else:
-            logger.error(f"Cannot add participant of type {type(user).__name__} to chat room {self.id}")
-            logger.error(f"User details: {user}")
+            logger.error("Cannot add participant of type %s to chat room %s", type(user).__name__, self.id)
+            logger.error("User details: %s", user)
             raise TypeError(f"Expected Artist or Producer, got {type(user).__name__}")
 
     def has_participant(self, user):
@@ -106,14 +110,14 @@ class ChatRoom(models.Model):
         """
         # Check that both users are either Artist or Producer
         if not (isinstance(user1, (Artist, Producer)) and isinstance(user2, (Artist, Producer))):
-            logger.error(f"Both users must be Artist or Producer instances")
-            logger.error(f"User1: {type(user1)}, User2: {type(user2)}")
-            logger.error(f"User1 ID: {getattr(user1, 'id', 'No ID')}, User2 ID: {getattr(user2, 'id', 'No ID')}")
+            logger.error("Both users must be Artist or Producer instances")
+            logger.error("User1: %s, User2: %s", type(user1), type(user2))
+            logger.error("User1 ID: %s, User2 ID: %s", getattr(user1, 'id', 'No ID'), getattr(user2, 'id', 'No ID'))
 
             # Check user models specifically
             user1_model = user1.__class__.__name__ if user1 else 'None'
             user2_model = user2.__class__.__name__ if user2 else 'None'
-            logger.error(f"User1 model: {user1_model}, User2 model: {user2_model}")
+            logger.error("User1 model: %s, User2 model: %s", user1_model, user2_model)
 
             raise TypeError(f"Both users must be Artist or Producer instances, got {user1_model} and {user2_model}")
 
@@ -123,7 +127,7 @@ class ChatRoom(models.Model):
             user1_content_type = ContentType.objects.get_for_model(user1)
             user2_content_type = ContentType.objects.get_for_model(user2)
 
-            logger.info(f"Finding chat rooms for user1={user1.id} (type={user1_content_type}) and user2={user2.id} (type={user2_content_type})")
+            logger.info("Finding chat rooms for user1=%s (type=%s) and user2=%s (type=%s)", user1.id, user1_content_type, user2.id, user2_content_type)
 
             # Find chat rooms that have user1 as a participant
             user1_rooms = set(ChatRoomParticipant.objects.filter(
@@ -131,7 +135,7 @@ class ChatRoom(models.Model):
                 object_id=user1.id
             ).values_list('chat_room_id', flat=True))
 
-            logger.info(f"Found {len(user1_rooms)} rooms for user1: {user1_rooms}")
+            logger.info("Found %s rooms for user1: %s", len(user1_rooms), user1_rooms)
 
             # Find chat rooms that have user2 as a participant
             user2_rooms = set(ChatRoomParticipant.objects.filter(
@@ -139,20 +143,20 @@ class ChatRoom(models.Model):
                 object_id=user2.id
             ).values_list('chat_room_id', flat=True))
 
-            logger.info(f"Found {len(user2_rooms)} rooms for user2: {user2_rooms}")
+            logger.info("Found %s rooms for user2: %s", len(user2_rooms), user2_rooms)
 
             # Get the intersection of rooms
             common_rooms = user1_rooms.intersection(user2_rooms)
-            logger.info(f"Found {len(common_rooms)} common rooms: {common_rooms}")
+            logger.info("Found %s common rooms: %s", len(common_rooms), common_rooms)
 
             if common_rooms:
                 # Return the first common room
                 room_id = list(common_rooms)[0]
                 room = ChatRoom.objects.get(id=room_id)
-                logger.info(f"Found existing chat room: {room.id} for users {user1.id} and {user2.id}")
+                logger.info("Found existing chat room: %s for users %s and %s", room.id, user1.id, user2.id)
                 return room, False
         except Exception as e:
-            logger.error(f"Error finding existing chat room: {str(e)}")
+            logger.error("Error finding existing chat room: %s", e)
             import traceback
             logger.error(traceback.format_exc())
 
@@ -160,35 +164,35 @@ class ChatRoom(models.Model):
         try:
             # Generate a unique name based on user IDs
             room_name = f"chat_{min(user1.id, user2.id)}_{max(user1.id, user2.id)}"
-            logger.info(f"Creating new room with name: {room_name}")
+            logger.info("Creating new room with name: %s", room_name)
 
             # Create the room
             room = ChatRoom.objects.create(name=room_name)
-            logger.info(f"Room created with id: {room.id}")
+            logger.info("Room created with id: %s", room.id)
 
             # Add both users as participants
             try:
                 room.add_participant(user1)
-                logger.info(f"Added user1 (id={user1.id}) as participant")
+                logger.info("Added user1 (id=%s) as participant", user1.id)
             except Exception as e:
-                logger.error(f"Error adding user1 as participant: {str(e)}")
+                logger.error("Error adding user1 as participant: %s", e)
                 import traceback
                 logger.error(traceback.format_exc())
                 raise
 
             try:
                 room.add_participant(user2)
-                logger.info(f"Added user2 (id={user2.id}) as participant")
+                logger.info("Added user2 (id=%s) as participant", user2.id)
             except Exception as e:
-                logger.error(f"Error adding user2 as participant: {str(e)}")
+                logger.error("Error adding user2 as participant: %s", e)
                 import traceback
                 logger.error(traceback.format_exc())
                 raise
 
-            logger.info(f"Created new chat room: {room.id} for users {user1.id} and {user2.id}")
+            logger.info("Created new chat room: %s for users %s and %s", room.id, user1.id, user2.id)
             return room, True
         except Exception as e:
-            logger.error(f"Error creating chat room: {str(e)}")
+            logger.error("Error creating chat room: %s", e)
             import traceback
             logger.error(traceback.format_exc())
             raise
@@ -238,6 +242,10 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # Latest message of a set of rooms (chat list ETag)
+            models.Index(fields=['room', 'id'], name='message_room_id'),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender.username} at {self.timestamp}"
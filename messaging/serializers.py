@@ -22,7 +22,7 @@ class UserSerializer(serializers.ModelSerializer):
         elif isinstance(instance, Producer):
             self.Meta.model = Producer
         else:
-            logger.warning(f"Unknown user type: {type(instance)}")
+            logger.warning("Unknown user type: %s", type(instance))
 
         return super().to_representation(instance)
 
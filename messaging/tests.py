@@ -1,3 +1,42 @@
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from common.instrumentation import view_query_budget
+from users.models import Artist, Producer
+from users.views import get_tokens_for_user
+
+from .models import ChatRoom, ChatRoomParticipant, Message
+from .views import UserChatListView
+
+ENFORCED = {**settings.INSTRUMENTATION, 'ENFORCE_QUERY_BUDGETS': True}
+
+
+@override_settings(INSTRUMENTATION=ENFORCED)
+class UserChatListQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.artist = Artist.objects.create(username='artist', nom='Test', prenom='Artist', email='artist@example.com', password='x')
+        others = [
+            Artist.objects.create(username='singer', nom='Test', prenom='Singer', email='singer@example.com', password='x'),
+            Producer.objects.create(username='producer', nom='Test', prenom='Producer', email='producer@example.com', password='x'),
+            Producer.objects.create(username='engineer', nom='Test', prenom='Engineer', email='engineer@example.com', password='x'),
+        ]
+        artist_type = ContentType.objects.get_for_model(Artist)
+        for other in others:
+            other_type = ContentType.objects.get_for_model(other)
+            room = ChatRoom.objects.create(name=f'artist-{other.username}')
+            ChatRoomParticipant.objects.create(chat_room=room, content_type=artist_type, object_id=cls.artist.id)
+            ChatRoomParticipant.objects.create(chat_room=room, content_type=other_type, object_id=other.id)
+            for i in range(3):
+                Message.objects.create(room=room, content_type=other_type, object_id=other.id, content=f'message {i}')
+
+    def test_chat_list_within_budget(self):
+        self.client.defaults['HTTP_AUTHORIZATION'] = f"Bearer {get_tokens_for_user(self.artist)['access']}"
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/messaging/chats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+        self.assertLessEqual(len(queries), view_query_budget(UserChatListView, 'GET'))
@@ -2,13 +2,16 @@ from django.shortcuts import render, get_object_or_404
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.parsers import MultiPartParser, FormParser
 from .models import ChatRoom, Message, ChatRoomParticipant, MessageReadStatus
 from .serializers import ChatRoomSerializer, MessageSerializer
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db.models import Count, Max, OuterRef, Q, Subquery
 from users.models import Artist, Producer
 from users.jwt_auth import CustomJWTAuthentication
+from common.conditional import conditional_response
+from common.fast_json import ORJSONParser
+from common.replicas import read_from_replica
 import logging
 from django.contrib.contenttypes.models import ContentType
 import traceback
@@ -37,7 +40,7 @@ class ChatRoomListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         # Only show chat rooms that the user is part of
         user = self.request.user
-        logger.info(f"Getting chat rooms for user: {user}, type: {type(user)}")
+        logger.debug("Getting chat rooms for user: %s, type: %s", user, type(user))
 
         # Get content type for the user
         content_type = ContentType.objects.get_for_model(user)
@@ -51,7 +54,7 @@ class ChatRoomListCreateView(generics.ListCreateAPIView):
         return ChatRoom.objects.filter(id__in=participant_rooms)
 
     def perform_create(self, serializer):
-        logger.info(f"Creating chat room, user: {self.request.user}, user type: {type(self.request.user)}")
+        logger.info("Creating chat room, user: %s, user type: %s", self.request.user, type(self.request.user))
         chat_room = serializer.save()
 
         # Add current user as participant
@@ -59,7 +62,7 @@ class ChatRoomListCreateView(generics.ListCreateAPIView):
 
         # Add other participants if provided
         participants = self.request.data.get('participants', [])
-        logger.info(f"Adding participants: {participants}")
+        logger.info("Adding participants: %s", participants)
         for user_id in participants:
             try:
                 # Try to find the user in both Artist and Producer models
@@ -68,28 +71,28 @@ class ChatRoomListCreateView(generics.ListCreateAPIView):
                     user_id = int(user_id)
                     if user_id >= 1000000:  # Producer ID range
                         user = Producer.objects.get(id=user_id)
-                        logger.info(f"Found producer: {user.username}")
+                        logger.info("Found producer: %s", user.username)
                     else:
                         user = Artist.objects.get(id=user_id)
-                        logger.info(f"Found artist: {user.username}")
+                        logger.info("Found artist: %s", user.username)
                 except (ValueError, Artist.DoesNotExist, Producer.DoesNotExist) as e:
-                    logger.error(f"Error finding user {user_id}: {str(e)}")
+                    logger.error("Error finding user %s: %s", user_id, e)
 
                 if user:
                     chat_room.add_participant(user)
-                    logger.info(f"Added participant: {user.username}")
+                    logger.info("Added participant: %s", user.username)
                 else:
-                    logger.warning(f"User not found with ID: {user_id}")
+                    logger.warning("User not found with ID: %s", user_id)
             except Exception as e:
-                logger.error(f"Error adding participant {user_id}: {str(e)}")
+                logger.error("Error adding participant %s: %s", user_id, e)
 
     def post(self, request, *args, **kwargs):
         """
         Custom POST method to handle chat room creation
         """
-        logger.info(f"POST request to create chat room: {request.data}")
-        logger.info(f"Request headers: {request.headers}")
-        logger.info(f"Request user: {request.user}, authenticated: {request.user.is_authenticated}")
+        logger.info("POST request to create chat room: %s", request.data)
+        logger.info("Request headers: %s", request.headers)
+        logger.info("Request user: %s, authenticated: %s", request.user, request.user.is_authenticated)
 
         try:
             # Extract the participant_id from the request
@@ -103,48 +106,48 @@ class ChatRoomListCreateView(generics.ListCreateAPIView):
                 )
 
             # Find the participant based on ID
-            logger.info(f"Looking for participant with ID: {participant_id}, type: {type(participant_id)}")
+            logger.info("Looking for participant with ID: %s, type: %s", participant_id, type(participant_id))
             participant = None
 
             try:
                 # Convert to integer if it's a string
                 if isinstance(participant_id, str):
-                    logger.info(f"Converting participant_id from string '{participant_id}' to integer")
+                    logger.info("Converting participant_id from string '%s' to integer", participant_id)
                     try:
                         participant_id = int(participant_id)
                     except ValueError as e:
-                        logger.error(f"Failed to convert participant_id to integer: {str(e)}")
+                        logger.error("Failed to convert participant_id to integer: %s", e)
                         return Response(
                             {"error": f"Invalid participant_id format: {participant_id}. Must be a valid integer."},
                             status=status.HTTP_400_BAD_REQUEST
                         )
 
-                logger.info(f"Converted participant_id: {participant_id}, type: {type(participant_id)}")
+                logger.info("Converted participant_id: %s, type: %s", participant_id, type(participant_id))
 
                 if participant_id >= 1000000:  # Producer ID range
-                    logger.info(f"Looking for producer with ID: {participant_id}")
+                    logger.info("Looking for producer with ID: %s", participant_id)
                     try:
                         participant = Producer.objects.get(id=participant_id)
-                        logger.info(f"Found producer participant: {participant.username}")
+                        logger.info("Found producer participant: %s", participant.username)
                     except Producer.DoesNotExist:
-                        logger.error(f"Producer with ID {participant_id} not found")
+                        logger.error("Producer with ID %s not found", participant_id)
                         return Response(
                             {"error": f"Producer not found with ID: {participant_id}"},
                             status=status.HTTP_404_NOT_FOUND
                         )
                 else:
-                    logger.info(f"Looking for artist with ID: {participant_id}")
+                    logger.info("Looking for artist with ID: %s", participant_id)
                     try:
                         participant = Artist.objects.get(id=participant_id)
-                        logger.info(f"Found artist participant: {participant.username}")
+                        logger.info("Found artist participant: %s", participant.username)
                     except Artist.DoesNotExist:
-                        logger.error(f"Artist with ID {participant_id} not found")
+                        logger.error("Artist with ID %s not found", participant_id)
                         return Response(
                             {"error": f"Artist not found with ID: {participant_id}"},
                             status=status.HTTP_404_NOT_FOUND
                         )
             except Exception as e:
-                logger.error(f"Error finding participant: {str(e)}")
+                logger.error("Error finding participant: %s", e)
                 logger.error(traceback.format_exc())
                 return Response(
                     {"error": f"Failed to find participant: {str(e)}"},
@@ -153,8 +156,8 @@ class ChatRoomListCreateView(generics.ListCreateAPIView):
 
             # Get or create a chat room
             current_user = request.user
-            logger.info(f"Current user: {current_user.username} ({type(current_user)})")
-            logger.info(f"Current user ID: {current_user.id}, participant ID: {participant_id}")
+            logger.info("Current user: %s (%s)", current_user.username, type(current_user))
+            logger.info("Current user ID: %s, participant ID: %s", current_user.id, participant_id)
 
             if current_user.id == participant_id:
                 logger.error("User tried to create chat with themselves")
@@ -165,7 +168,7 @@ class ChatRoomListCreateView(generics.ListCreateAPIView):
 
             try:
                 room, created = ChatRoom.get_or_create_chatroom(current_user, participant)
-                logger.info(f"Chat room {'created' if created else 'found'}: {room.id}")
+                logger.info("Chat room %s: %s", 'created' if created else 'found', room.id)
 
                 # Return the room data
                 serializer = self.get_serializer(room)
@@ -173,7 +176,7 @@ class ChatRoomListCreateView(generics.ListCreateAPIView):
                 status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
                 return Response(serializer.data, status=status_code)
             except Exception as e:
-                logger.error(f"Error in get_or_create_chatroom: {str(e)}")
+                logger.error("Error in get_or_create_chatroom: %s", e)
                 logger.error(traceback.format_exc())
                 return Response(
                     {"error": f"Failed to create chat room: {str(e)}"},
@@ -181,7 +184,7 @@ class ChatRoomListCreateView(generics.ListCreateAPIView):
                 )
 
         except Exception as e:
-            logger.error(f"Error creating chat room: {str(e)}")
+            logger.error("Error creating chat room: %s", e)
             logger.error(traceback.format_exc())
             return Response(
                 {"error": f"Failed to create chat room: {str(e)}"},
@@ -226,7 +229,7 @@ class ChatMessageListView(generics.ListCreateAPIView):
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    parser_classes = (MultiPartParser, FormParser, ORJSONParser)
 
     def get_serializer_context(self):
         """
@@ -237,6 +240,11 @@ class ChatMessageListView(generics.ListCreateAPIView):
         context['request'] = self.request
         return context
 
+    # The read statuses it records still go to the primary
+    @read_from_replica()
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
         room_id = self.kwargs.get('room_id')
         user = self.request.user
@@ -305,7 +313,7 @@ class ChatMessageListView(generics.ListCreateAPIView):
         except ChatRoom.DoesNotExist:
             pass
         except ValueError as e:
-            logger.error(f"Error creating message: {str(e)}")
+            logger.error("Error creating message: %s", e)
             raise
 
     def mark_message_as_read(self, message, user):
@@ -437,58 +445,82 @@ class MarkMessagesAsReadView(APIView):
             )
 
 
+def chat_list_version(request, kwargs):
+    """
+    ETag marker of the chat list, in one indexed query: participants of the
+    user's rooms (count and newest) and the newest message of any of them.
+    Participants' usernames are not part of it.
+    """
+    content_type = ContentType.objects.get_for_model(request.user)
+    rooms = ChatRoomParticipant.objects.filter(content_type=content_type, object_id=request.user.id).values('chat_room_id')
+    latest_message = Message.objects.filter(room=OuterRef('chat_room_id')).order_by('-id').values('id')[:1]
+    marker = ChatRoomParticipant.objects.filter(chat_room_id__in=rooms).aggregate(
+        participants=Count('id'),
+        last_participant=Max('id'),
+        last_message=Max(Subquery(latest_message)),
+    )
+    return sorted(marker.items())
+
+
 class UserChatListView(APIView):
     """
-    List all users the current user has chatted with
+    List all users the current user has chatted with.
+    Runs a fixed number of queries: the other participants of the user's
+    rooms with each room's latest message, then one query per user model.
     """
     permission_classes = [permissions.IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]
+    query_budget = 5
 
+    @conditional_response(chat_list_version)
     def get(self, request):
         user = request.user
-        logger.info(f"Getting chats for user: {user}, type: {type(user)}")
 
         # Get content type for the user
         content_type = ContentType.objects.get_for_model(user)
 
-        # Find all chat rooms where this user is a participant
+        # Other participants of every chat room this user is part of,
+        # annotated with the room's latest message
         participant_rooms = ChatRoomParticipant.objects.filter(
             content_type=content_type,
             object_id=user.id
-        ).values_list('chat_room_id', flat=True)
+        ).values('chat_room_id')
+        latest_message = Message.objects.filter(room=OuterRef('chat_room_id')).order_by('-timestamp')
+        links = list(
+            ChatRoomParticipant.objects.filter(chat_room_id__in=participant_rooms)
+            .exclude(content_type=content_type, object_id=user.id)
+            .annotate(
+                latest_content=Subquery(latest_message.values('content')[:1]),
+                latest_time=Subquery(latest_message.values('timestamp')[:1]),
+            )
+            .order_by('chat_room_id', 'id')
+        )
 
-        chat_rooms = ChatRoom.objects.filter(id__in=participant_rooms)
-        logger.info(f"Found {chat_rooms.count()} chat rooms")
+        # Load the participants with one query per user model
+        ids_by_type = {}
+        for link in links:
+            ids_by_type.setdefault(link.content_type_id, set()).add(link.object_id)
+        participants = {}
+        for content_type_id, object_ids in ids_by_type.items():
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            for object_id, participant in model.objects.only('id', 'username').in_bulk(object_ids).items():
+                participants[(content_type_id, object_id)] = participant
 
         # Get unique participants excluding the current user
         user_data = []
-        for room in chat_rooms:
-            # Get all participants in this room
-            room_participants = ChatRoomParticipant.objects.filter(chat_room=room)
-
-            for participant_link in room_participants:
-                # Skip the current user
-                if participant_link.content_type == content_type and participant_link.object_id == user.id:
-                    continue
-
-                participant = participant_link.participant
-                logger.info(f"Processing participant: {participant.username}, type: {type(participant)}")
-
-                # Get the latest message for the room
-                latest_message = Message.objects.filter(room=room).order_by('-timestamp').first()
-                latest_content = latest_message.content if latest_message else ""
-                latest_time = latest_message.timestamp if latest_message else None
-
-                # Check if this participant is already in user_data
-                existing = next((item for item in user_data if item['id'] == participant.id), None)
-                if not existing:
-                    user_data.append({
-                        'id': participant.id,
-                        'username': participant.username,
-                        'room_id': room.id,
-                        'latest_message': latest_content,
-                        'timestamp': latest_time,
-                    })
+        seen = set()
+        for link in links:
+            participant = participants.get((link.content_type_id, link.object_id))
+            if participant is None or participant.id in seen:
+                continue
+            seen.add(participant.id)
+            user_data.append({
+                'id': participant.id,
+                'username': participant.username,
+                'room_id': link.chat_room_id,
+                'latest_message': link.latest_content or "",
+                'timestamp': link.latest_time,
+            })
 
         # Sort by latest message timestamp - handle None and type conversion
         def sort_key(x):
@@ -499,6 +531,6 @@ class UserChatListView(APIView):
             return timestamp.isoformat() if hasattr(timestamp, 'isoformat') else str(timestamp)
 
         user_data.sort(key=sort_key, reverse=True)
-        logger.info(f"Returning {len(user_data)} chat contacts")
+        logger.debug("Returning %s chat contacts", len(user_data))
 
         return Response(user_data)
@@ -0,0 +1,14 @@
+from django.contrib import admin
+from .models import SuggestedCollaborator, RecommendationProfile
+from common.admin_mixins import ViewOnlyModelAdmin
+
+class SuggestedCollaboratorAdmin(ViewOnlyModelAdmin):
+    list_display = ('user_type', 'user_id', 'rank', 'candidate_type', 'candidate_id', 'score', 'computed_at')
+    list_filter = ('user_type', 'candidate_type')
+
+class RecommendationProfileAdmin(ViewOnlyModelAdmin):
+    list_display = ('user_type', 'user_id', 'fingerprint', 'computed_at')
+    list_filter = ('user_type',)
+
+admin.site.register(SuggestedCollaborator, SuggestedCollaboratorAdmin)
+admin.site.register(RecommendationProfile, RecommendationProfileAdmin)
@@ -0,0 +1,421 @@
+"""
+Collaborator recommendations.
+
+Every Artist and Producer is described by a sparse, L2-normalised vector of
+idf-weighted genre and talent tags, their location and their accepted
+collaborations. The score of a candidate for a user is
+
+    cosine(tags) + LOCATION_WEIGHT * same location
+                 + GRAPH_WEIGHT * shared collaborators / sqrt(deg(user) * deg(candidate))
+                 + CROSS_TYPE_WEIGHT if one is an artist and the other a producer
+
+counting only candidates with some tag, location or collaborator in
+common, and never the user's existing collaborators. The top K per user
+are precomputed by ``python manage.py compute_recommendations`` (run it
+periodically, e.g. from cron) and served from the SuggestedCollaborator
+table.
+
+Runs are incremental: a user's list is recomputed when their own inputs
+changed, when it contains a user whose inputs changed or who was deleted,
+or when a changed user now scores above the last entry of the list. Tag
+weights are global, so a periodic ``--full`` run keeps them fresh.
+
+NumPy is optional. With it, scores are computed for a block of users at a
+time as a dense matrix product over the tag vocabulary (capped at
+MAX_FEATURES tags); without it, the same scores come from an inverted
+index over the tags.
+"""
+import hashlib
+import heapq
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from users.models import Artist, Producer, CollaborationRequest
+from .models import RecommendationProfile, SuggestedCollaborator
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, see the module docstring
+    np = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'TOP_K': 20,
+    'GENRE_WEIGHT': 1.0,
+    'TALENT_WEIGHT': 0.7,
+    'LOCATION_WEIGHT': 0.2,
+    'GRAPH_WEIGHT': 0.3,
+    'CROSS_TYPE_WEIGHT': 0.1,
+    'MAX_FEATURES': 512,
+    'BLOCK_SIZE': 512,
+    'USE_NUMPY': True,
+}
+
+WRITE_BATCH_SIZE = 5000
+DELETE_CHUNK_SIZE = 500
+
+
+def get_setting(name):
+    return getattr(settings, 'RECOMMENDATIONS', {}).get(name, DEFAULTS[name])
+
+
+def split_tags(value):
+    """'Hip Hop, R&B' -> ['hip hop', 'r&b'] (same splitting as the serializers)"""
+    if not value:
+        return []
+    return sorted({tag.strip().lower() for tag in value.split(',') if tag.strip()})
+
+
+def normalize_location(value):
+    """Compare locations on their first component, e.g. the city"""
+    if not value:
+        return ''
+    return value.split(',')[0].strip().lower()
+
+
+class Profiles:
+    """Recommendation inputs of every Artist and Producer, indexed by row"""
+
+    def __init__(self):
+        self.keys = []  # (user_type, user_id)
+        self.index = {}
+        self.tags = []  # {tag: kind weight}
+        self.locations = []
+        self.partners = []  # rows of accepted collaborators
+
+    @classmethod
+    def load(cls):
+        profiles = cls()
+        for user_id, genres, talents, location in Artist.objects.values_list(
+            'id', 'genres', 'talents', 'location'
+        ).iterator():
+            profiles.add(('artist', user_id), genres, talents, location)
+        for user_id, genres, location in Producer.objects.values_list('id', 'genres', 'location').iterator():
+            profiles.add(('producer', user_id), genres, None, location)
+        profiles.load_graph()
+        return profiles
+
+    def add(self, key, genres, talents, location):
+        tags = {}
+        for tag in split_tags(genres):
+            tags[f"genre:{tag}"] = get_setting('GENRE_WEIGHT')
+        for tag in split_tags(talents):
+            tags[f"talent:{tag}"] = get_setting('TALENT_WEIGHT')
+        self.index[key] = len(self.keys)
+        self.keys.append(key)
+        self.tags.append(tags)
+        self.locations.append(normalize_location(location))
+        self.partners.append(set())
+
+    def load_graph(self):
+        accepted = CollaborationRequest.objects.filter(status='accepted').values_list(
+            'sender_artist_id', 'sender_producer_id', 'receiver_artist_id', 'receiver_producer_id'
+        )
+        for sender_artist, sender_producer, receiver_artist, receiver_producer in accepted.iterator():
+            sender = self.index.get(('artist', sender_artist) if sender_artist else ('producer', sender_producer))
+            receiver = self.index.get(('artist', receiver_artist) if receiver_artist else ('producer', receiver_producer))
+            if sender is None or receiver is None or sender == receiver:
+                continue
+            self.partners[sender].add(receiver)
+            self.partners[receiver].add(sender)
+
+    def fingerprint(self, row):
+        data = repr((
+            sorted(self.tags[row].items()),
+            self.locations[row],
+            sorted(self.keys[partner] for partner in self.partners[row]),
+        ))
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class Scorer:
+    """Scores candidates for users; subclasses compute the tag similarity"""
+    backend = None
+
+    def __init__(self, profiles):
+        self.profiles = profiles
+        self.location_weight = get_setting('LOCATION_WEIGHT')
+        self.graph_weight = get_setting('GRAPH_WEIGHT')
+        self.cross_type_weight = get_setting('CROSS_TYPE_WEIGHT')
+
+        # idf weights over the most common tags, then L2-normalised vectors
+        users = len(profiles.keys)
+        document_frequency = Counter(tag for tags in profiles.tags for tag in tags)
+        self.vocabulary = [tag for tag, _ in document_frequency.most_common(get_setting('MAX_FEATURES'))]
+        idf = {tag: math.log((1 + users) / (1 + document_frequency[tag])) + 1 for tag in self.vocabulary}
+        self.vectors = []
+        for tags in profiles.tags:
+            vector = {tag: weight * idf[tag] for tag, weight in tags.items() if tag in idf}
+            norm = math.sqrt(sum(value * value for value in vector.values()))
+            self.vectors.append({tag: value / norm for tag, value in vector.items()} if norm else {})
+
+    def graph_bonus(self, row):
+        """{candidate: bonus} for users sharing collaborators with ``row``"""
+        partners = self.profiles.partners
+        if not partners[row]:
+            return {}
+        shared = defaultdict(int)
+        for partner in partners[row]:
+            for other in partners[partner]:
+                if other != row:
+                    shared[other] += 1
+        degree = len(partners[row])
+        return {
+            other: self.graph_weight * count / math.sqrt(degree * len(partners[other]))
+            for other, count in shared.items()
+        }
+
+    def top_k(self, rows, k):
+        """Yield (row, [(candidate, score), ...]) best first"""
+        raise NotImplementedError
+
+    def affected_by(self, rows, thresholds):
+        """
+        Return the users that score one of ``rows`` above their threshold.
+        Scores are symmetric, so this is computed from the rows' side.
+        """
+        raise NotImplementedError
+
+
+class PythonScorer(Scorer):
+    backend = 'python'
+
+    def __init__(self, profiles):
+        super().__init__(profiles)
+        self.postings = defaultdict(list)
+        for row, vector in enumerate(self.vectors):
+            for tag, value in vector.items():
+                self.postings[tag].append((row, value))
+        self.location_groups = defaultdict(list)
+        for row, location in enumerate(profiles.locations):
+            if location:
+                self.location_groups[location].append(row)
+
+    def row_scores(self, row):
+        totals = defaultdict(float)
+        for tag, value in self.vectors[row].items():
+            for other, other_value in self.postings[tag]:
+                totals[other] += value * other_value
+        location = self.profiles.locations[row]
+        if location:
+            for other in self.location_groups[location]:
+                totals[other] += self.location_weight
+        for other, bonus in self.graph_bonus(row).items():
+            totals[other] += bonus
+
+        keys = self.profiles.keys
+        partners = self.profiles.partners[row]
+        user_type = keys[row][0]
+        scores = {}
+        for other, score in totals.items():
+            if score <= 0 or other == row or other in partners:
+                continue
+            if keys[other][0] != user_type:
+                score += self.cross_type_weight
+            scores[other] = score
+        return scores
+
+    def top_k(self, rows, k):
+        for row in rows:
+            scores = self.row_scores(row)
+            yield row, heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def affected_by(self, rows, thresholds):
+        affected = set()
+        for row in rows:
+            for other, score in self.row_scores(row).items():
+                if score > thresholds[other]:
+                    affected.add(other)
+        return affected
+
+
+class NumpyScorer(Scorer):
+    backend = 'numpy'
+
+    def __init__(self, profiles):
+        super().__init__(profiles)
+        columns = {tag: column for column, tag in enumerate(self.vocabulary)}
+        self.matrix = np.zeros((len(profiles.keys), len(self.vocabulary)), dtype=np.float32)
+        for row, vector in enumerate(self.vectors):
+            for tag, value in vector.items():
+                self.matrix[row, columns[tag]] = value
+
+        location_codes = {}
+        self.locations = np.array(
+            [location_codes.setdefault(location, len(location_codes)) if location else -1
+             for location in profiles.locations],
+            dtype=np.int64,
+        )
+        self.types = np.array([0 if user_type == 'artist' else 1 for user_type, _ in profiles.keys], dtype=np.int8)
+        self.block_size = get_setting('BLOCK_SIZE')
+
+    def blocks(self, rows):
+        """Yield (row, scores over all users) computed a block of rows at a time"""
+        rows = list(rows)
+        for start in range(0, len(rows), self.block_size):
+            block = np.asarray(rows[start:start + self.block_size], dtype=np.int64)
+            scores = self.matrix[block] @ self.matrix.T
+            block_locations = self.locations[block][:, None]
+            scores += self.location_weight * ((block_locations == self.locations[None, :]) & (block_locations >= 0))
+            for offset, row in enumerate(block.tolist()):
+                yield row, self.finish(row, scores[offset])
+
+    def finish(self, row, scores):
+        bonus = self.graph_bonus(row)
+        if bonus:
+            others = np.fromiter(bonus.keys(), dtype=np.int64, count=len(bonus))
+            scores[others] += np.fromiter(bonus.values(), dtype=np.float32, count=len(bonus))
+        has_evidence = scores > 0
+        scores += self.cross_type_weight * (has_evidence & (self.types != self.types[row]))
+        scores[row] = 0
+        partners = self.profiles.partners[row]
+        if partners:
+            scores[list(partners)] = 0
+        return scores
+
+    def top_k(self, rows, k):
+        for row, scores in self.blocks(rows):
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            ranked = sorted(((int(other), float(scores[other])) for other in candidates), key=lambda item: (-item[1], item[0]))
+            yield row, ranked
+
+    def affected_by(self, rows, thresholds):
+        thresholds = np.asarray(thresholds, dtype=np.float32)
+        affected = set()
+        for row, scores in self.blocks(rows):
+            affected.update(np.flatnonzero(scores > thresholds).tolist())
+        return affected
+
+
+def make_scorer(profiles, use_numpy=None):
+    if use_numpy is None:
+        use_numpy = get_setting('USE_NUMPY')
+    if use_numpy and np is None:
+        logger.info("Recommendations: NumPy is not installed, using the pure Python scorer")
+    if use_numpy and np is not None:
+        return NumpyScorer(profiles)
+    return PythonScorer(profiles)
+
+
+def _keys_by_type(keys):
+    grouped = defaultdict(list)
+    for user_type, user_id in keys:
+        grouped[user_type].append(user_id)
+    return grouped
+
+
+def _delete_for_users(model, keys):
+    for user_type, user_ids in _keys_by_type(keys).items():
+        for start in range(0, len(user_ids), DELETE_CHUNK_SIZE):
+            model.objects.filter(user_type=user_type, user_id__in=user_ids[start:start + DELETE_CHUNK_SIZE]).delete()
+
+
+def _holders_of(keys, profiles):
+    """Rows whose stored list contains one of ``keys``"""
+    rows = set()
+    for candidate_type, candidate_ids in _keys_by_type(keys).items():
+        for start in range(0, len(candidate_ids), DELETE_CHUNK_SIZE):
+            holders = SuggestedCollaborator.objects.filter(
+                candidate_type=candidate_type,
+                candidate_id__in=candidate_ids[start:start + DELETE_CHUNK_SIZE],
+            ).values_list('user_type', 'user_id').distinct()
+            rows.update(profiles.index[key] for key in holders if key in profiles.index)
+    return rows
+
+
+def _thresholds(profiles, k):
+    """Score a candidate must beat to enter each user's stored list"""
+    thresholds = [0.0] * len(profiles.keys)
+    lists = SuggestedCollaborator.objects.values('user_type', 'user_id').annotate(size=Count('id'), lowest=Min('score'))
+    for entry in lists.iterator():
+        row = profiles.index.get((entry['user_type'], entry['user_id']))
+        if row is not None and entry['size'] >= k:
+            thresholds[row] = entry['lowest']
+    return thresholds
+
+
+def compute_recommendations(full=False, top_k=None, use_numpy=None):
+    """
+    Recompute stored suggestions, incrementally unless ``full`` is set.
+    Returns a dict of run statistics.
+    """
+    started = time.perf_counter()
+    now = timezone.now()
+    k = top_k or get_setting('TOP_K')
+
+    profiles = Profiles.load()
+    scorer = make_scorer(profiles, use_numpy)
+    fingerprints = [profiles.fingerprint(row) for row in range(len(profiles.keys))]
+    stored = {
+        (user_type, user_id): fingerprint
+        for user_type, user_id, fingerprint in RecommendationProfile.objects.values_list(
+            'user_type', 'user_id', 'fingerprint'
+        ).iterator()
+    }
+    removed = [key for key in stored if key not in profiles.index]
+
+    if full or not stored:
+        changed = set(range(len(profiles.keys)))
+        recompute = set(changed)
+    else:
+        changed = {row for row, key in enumerate(profiles.keys) if stored.get(key) != fingerprints[row]}
+        recompute = set(changed)
+        # Lists holding a changed or deleted user may drop or reorder it
+        recompute.update(_holders_of([profiles.keys[row] for row in changed] + removed, profiles))
+        # Lists a changed user may now enter
+        if changed:
+            recompute.update(scorer.affected_by(sorted(changed), _thresholds(profiles, k)))
+
+    rows = sorted(recompute)
+    written = 0
+    with transaction.atomic():
+        _delete_for_users(SuggestedCollaborator, [profiles.keys[row] for row in rows] + removed)
+        _delete_for_users(RecommendationProfile, [profiles.keys[row] for row in rows] + removed)
+
+        suggestions = []
+        for row, ranked in scorer.top_k(rows, k):
+            user_type, user_id = profiles.keys[row]
+            for rank, (candidate, score) in enumerate(ranked, start=1):
+                candidate_type, candidate_id = profiles.keys[candidate]
+                suggestions.append(SuggestedCollaborator(
+                    user_type=user_type, user_id=user_id, rank=rank,
+                    candidate_type=candidate_type, candidate_id=candidate_id,
+                    score=score, computed_at=now,
+                ))
+            if len(suggestions) >= WRITE_BATCH_SIZE:
+                SuggestedCollaborator.objects.bulk_create(suggestions)
+                written += len(suggestions)
+                suggestions = []
+        SuggestedCollaborator.objects.bulk_create(suggestions)
+        written += len(suggestions)
+
+        RecommendationProfile.objects.bulk_create([
+            RecommendationProfile(
+                user_type=profiles.keys[row][0], user_id=profiles.keys[row][1],
+                fingerprint=fingerprints[row], computed_at=now,
+            )
+            for row in rows
+        ], batch_size=WRITE_BATCH_SIZE)
+
+    stats = {
+        'backend': scorer.backend,
+        'users': len(profiles.keys),
+        'features': len(scorer.vocabulary),
+        'changed': len(changed),
+        'recomputed': len(rows),
+        'removed': len(removed),
+        'suggestions_written': written,
+        'elapsed_s': time.perf_counter() - started,
+    }
+    logger.info("Recommendations: %s", stats)
+    return stats
@@ -0,0 +1,30 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from recommendations.engine import compute_recommendations
+
+
+class Command(BaseCommand):
+    help = "Precompute suggested collaborators for every Artist and Producer (run periodically)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recompute every user instead of only what changed")
+        parser.add_argument('--top-k', type=int, default=None, help="Suggestions stored per user")
+        parser.add_argument('--no-numpy', action='store_true', help="Use the pure Python scorer even if NumPy is installed")
+        parser.add_argument('--json', action='store_true', help="Print the run statistics as JSON")
+
+    def handle(self, *args, **options):
+        stats = compute_recommendations(
+            full=options['full'],
+            top_k=options['top_k'],
+            use_numpy=False if options['no_numpy'] else None,
+        )
+        if options['json']:
+            self.stdout.write(json.dumps(stats, indent=2))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed {stats['recomputed']} of {stats['users']} users "
+            f"({stats['changed']} changed, {stats['removed']} removed) with the {stats['backend']} scorer "
+            f"in {stats['elapsed_s']:.2f}s"
+        ))
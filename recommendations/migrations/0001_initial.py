@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_type', models.CharField(choices=[('artist', 'Artist'), ('producer', 'Producer')], max_length=10)),
+                ('user_id', models.BigIntegerField()),
+                ('fingerprint', models.CharField(max_length=40)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user_type', 'user_id'), name='recommendation_profile_user')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SuggestedCollaborator',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_type', models.CharField(choices=[('artist', 'Artist'), ('producer', 'Producer')], max_length=10)),
+                ('user_id', models.BigIntegerField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('candidate_type', models.CharField(choices=[('artist', 'Artist'), ('producer', 'Producer')], max_length=10)),
+                ('candidate_id', models.BigIntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['user_type', 'user_id', 'rank'],
+                'indexes': [models.Index(fields=['candidate_type', 'candidate_id'], name='suggestion_candidate')],
+                'constraints': [models.UniqueConstraint(fields=('user_type', 'user_id', 'rank'), name='suggestion_user_rank')],
+            },
+        ),
+    ]
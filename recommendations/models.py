@@ -0,0 +1,51 @@
+from django.db import models
+
+USER_TYPES = [("artist", "Artist"), ("producer", "Producer")]
+
+
+class SuggestedCollaborator(models.Model):
+    """
+    Precomputed "suggested collaborators" for a user, written by the
+    compute_recommendations job (see recommendations.engine). Reading a
+    user's suggestions is a single range scan on (user_type, user_id, rank).
+    """
+    user_type = models.CharField(max_length=10, choices=USER_TYPES)
+    user_id = models.BigIntegerField()
+    rank = models.PositiveSmallIntegerField()
+    candidate_type = models.CharField(max_length=10, choices=USER_TYPES)
+    candidate_id = models.BigIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['user_type', 'user_id', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['user_type', 'user_id', 'rank'], name='suggestion_user_rank'),
+        ]
+        indexes = [
+            # Incremental runs find the lists that contain a changed user
+            models.Index(fields=['candidate_type', 'candidate_id'], name='suggestion_candidate'),
+        ]
+
+    def __str__(self):
+        return f"#{self.rank} for {self.user_type} {self.user_id}: {self.candidate_type} {self.candidate_id} ({self.score:.3f})"
+
+
+class RecommendationProfile(models.Model):
+    """
+    Fingerprint of the inputs (tags, location, collaborators) a user's
+    suggestions were last computed from. Incremental runs only recompute
+    users whose fingerprint changed, plus the lists those changes affect.
+    """
+    user_type = models.CharField(max_length=10, choices=USER_TYPES)
+    user_id = models.BigIntegerField()
+    fingerprint = models.CharField(max_length=40)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_type', 'user_id'], name='recommendation_profile_user'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_type} {self.user_id} ({self.fingerprint[:8]})"
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import SuggestedCollaboratorsView
+
+urlpatterns = [
+    path("collaborators/", SuggestedCollaboratorsView.as_view(), name="suggested_collaborators"),
+]
@@ -0,0 +1,79 @@
+import logging
+
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from users.follows import following_set
+from users.jwt_auth import CustomJWTAuthentication
+from users.models import Artist, Producer
+from users.serializers import ArtistSerializer, ProducerSerializer
+from .engine import get_setting
+from .models import SuggestedCollaborator
+
+logger = logging.getLogger(__name__)
+
+
+class SuggestedCollaboratorsView(APIView):
+    """
+    Precomputed collaborator suggestions for the authenticated user, best
+    first. One indexed query for the list, one per user model for the
+    profiles and one for the follow state, regardless of how many users exist.
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', get_setting('TOP_K')))
+        except ValueError:
+            return Response({"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, get_setting('TOP_K')))
+
+        try:
+            user_type = 'artist' if isinstance(request.user, Artist) else 'producer'
+            suggestions = list(
+                SuggestedCollaborator.objects.filter(user_type=user_type, user_id=request.user.id).order_by('rank')[:limit]
+            )
+
+            artist_ids = [s.candidate_id for s in suggestions if s.candidate_type == 'artist']
+            producer_ids = [s.candidate_id for s in suggestions if s.candidate_type == 'producer']
+            artists = Artist.objects.in_bulk(artist_ids) if artist_ids else {}
+            producers = Producer.objects.in_bulk(producer_ids) if producer_ids else {}
+            # Follow state of the whole list in one query
+            context = {
+                'request': request,
+                'follow_state': following_set(
+                    user_type, request.user.id, [(s.candidate_type, s.candidate_id) for s in suggestions]
+                ),
+            }
+
+            results = []
+            for suggestion in suggestions:
+                if suggestion.candidate_type == 'artist':
+                    candidate = artists.get(suggestion.candidate_id)
+                    serializer_class = ArtistSerializer
+                else:
+                    candidate = producers.get(suggestion.candidate_id)
+                    serializer_class = ProducerSerializer
+                # Deleted since the last run; the next run drops it
+                if candidate is None:
+                    continue
+                results.append({
+                    'rank': suggestion.rank,
+                    'score': round(suggestion.score, 4),
+                    'user': serializer_class(candidate, context=context).data,
+                })
+
+            return Response({
+                'computed_at': suggestions[0].computed_at if suggestions else None,
+                'results': results,
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error("SuggestedCollaboratorsView Error: %s", e)
+            return Response(
+                {"error": "An error occurred while fetching suggested collaborators."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -1,5 +1,9 @@
 """
 Test script to verify the ID range implementation for Artists and Producers.
+
+Run it as a script to check the configured database, or with
+``python manage.py test test_id_ranges`` to run the same checks against a
+freshly migrated test database.
 """
 import os
 import django
@@ -9,7 +13,11 @@ import time
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 django.setup()
 
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection
+from django.test import TestCase
 from users.models import Artist, Producer, get_user_by_id
+from users.id_ranges import PRODUCER_ID_START, ARTIST_ID_MAX, check_id_ranges, next_producer_id
 
 def test_create_producer():
     """Test creating a new producer and verify it gets a high ID."""
@@ -39,6 +47,60 @@ def test_create_producer():
     
     return True
 
+def test_bulk_create_producers():
+    """Test that bulk-created producers get IDs from the database sequence in the high range."""
+    timestamp = int(time.time())
+
+    producers = Producer.objects.bulk_create([
+        Producer(
+            username=f'bulk_producer_{timestamp}_{i}',
+            nom='Bulk',
+            prenom='Producer',
+            email=f'Bulk{timestamp}_{i}@Example.com',
+            password='testpassword'
+        )
+        for i in range(5)
+    ])
+    ids = [p.id for p in producers]
+    print(f'Bulk created producers with IDs: {ids}')
+
+    try:
+        assert all(pid is not None for pid in ids), "bulk_create did not return producer IDs"
+        assert all(pid >= PRODUCER_ID_START for pid in ids), f"Bulk producer IDs {ids} are not all >= {PRODUCER_ID_START}"
+        assert len(set(ids)) == len(ids), f"Bulk producer IDs {ids} are not unique"
+
+        # bulk_create should apply the same normalization as save()
+        stored = Producer.objects.get(id=ids[0])
+        assert stored.email == stored.email.lower(), f"Email {stored.email} was not lowercased"
+        assert stored.password.startswith('pbkdf2_sha256$'), "Password was not hashed"
+
+        for pid in ids:
+            user, user_type = get_user_by_id(pid)
+            assert user_type == 'producer', f"Expected 'producer' for ID {pid}, got '{user_type}'"
+    finally:
+        Producer.objects.filter(id__in=ids).delete()
+        print('Bulk test producers deleted')
+
+    return True
+
+def test_id_range_configuration():
+    """Test that the database sequences enforce the artist/producer ID ranges."""
+    upcoming = next_producer_id(connection)
+    print(f'Next producer ID from the database ({connection.vendor}): {upcoming}')
+    if upcoming is not None:
+        assert upcoming >= PRODUCER_ID_START, f"Next producer ID {upcoming} is below {PRODUCER_ID_START}"
+
+    errors, warnings = check_id_ranges(connection)
+    for warning in warnings:
+        print(f"Warning: {warning}")
+    assert not errors, f"ID range errors: {errors}"
+
+    artist = Artist.objects.order_by('-id').first()
+    if artist:
+        assert artist.id <= ARTIST_ID_MAX, f"Artist ID {artist.id} is in the producer range"
+
+    return True
+
 def test_get_user_by_id():
     """Test the get_user_by_id function with existing users."""
     # Get an existing artist
@@ -68,6 +130,34 @@ def test_get_user_by_id():
     
     return True
 
+class FreshlyMigratedIdRangeTests(TestCase):
+    """The checks above, on the test database the migrations just built."""
+
+    def test_id_range_configuration(self):
+        self.assertTrue(test_id_range_configuration())
+
+    def test_create_producer(self):
+        self.assertTrue(test_create_producer())
+
+    def test_bulk_create_producers(self):
+        self.assertTrue(test_bulk_create_producers())
+
+    def test_get_user_by_id(self):
+        Artist.objects.create(username='range_artist', nom='Test', prenom='Artist', email='range_artist@example.com', password='x')
+        Producer.objects.create(username='range_producer', nom='Test', prenom='Producer', email='range_producer@example.com', password='x')
+        self.assertTrue(test_get_user_by_id())
+
+    def test_migrate_reapplies_lost_range(self):
+        """A table rebuild that drops the sequence is repaired by the next migrate."""
+        if connection.vendor != 'sqlite':
+            self.skipTest("Only SQLite loses the sequence when a table is rebuilt")
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'users_producer'")
+        self.assertEqual(next_producer_id(connection), 1)
+
+        emit_post_migrate_signal(0, False, connection.alias)
+        self.assertEqual(next_producer_id(connection), PRODUCER_ID_START)
+
 if __name__ == "__main__":
     print("\n=== Testing ID Range Implementation ===\n")
     
@@ -76,5 +166,11 @@ if __name__ == "__main__":
     
     print("\n--- Testing creation of new producer ---\n")
     test_create_producer()
+
+    print("\n--- Testing bulk creation of producers ---\n")
+    test_bulk_create_producers()
+
+    print("\n--- Testing database ID range configuration ---\n")
+    test_id_range_configuration()
     
     print("\n=== All tests completed successfully ===\n") 
\ No newline at end of file
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django import forms
 from django.contrib.auth.hashers import make_password
-from .models import Artist, Producer, CollaborationRequest, Notification
+from .models import Artist, Producer, CollaborationRequest, Follow, Notification, OutboundEmail
 from common.admin_mixins import ViewOnlyModelAdmin
 
 # 🔥 Custom Form for Artist to Show Password Field
@@ -58,6 +58,8 @@ admin.site.register(Producer, ProducerAdmin)
 try:
     admin.site.register(CollaborationRequest, ViewOnlyModelAdmin)
     admin.site.register(Notification, ViewOnlyModelAdmin)
+    admin.site.register(OutboundEmail, ViewOnlyModelAdmin)
+    admin.site.register(Follow, ViewOnlyModelAdmin)
 except admin.sites.AlreadyRegistered:
     pass  # Models already registered
 
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .id_ranges import reapply_id_ranges
+
+        post_migrate.connect(reapply_id_ranges, sender=self, dispatch_uid='users.reapply_id_ranges')
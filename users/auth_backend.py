@@ -1,6 +1,6 @@
 from django.contrib.auth.backends import BaseBackend
 from .models import Artist, Producer
-from django.contrib.auth.hashers import check_password
+from .credentials import PasswordVerificationBusy, find_user_by_email, verify_password
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,32 +11,31 @@ class CustomUserBackend(BaseBackend):
     """
 
     def authenticate(self, request, email=None, password=None, **kwargs):
-        logger.debug(f"CustomUserBackend.authenticate called with email: {email}")
+        logger.debug("CustomUserBackend.authenticate called with email: %s", email)
         
-        try:
-            user = Artist.objects.get(email=email)
-            logger.info(f"Found Artist with email {email}")
-        except Artist.DoesNotExist:
-            try:
-                user = Producer.objects.get(email=email)
-                logger.info(f"Found Producer with email {email}")
-            except Producer.DoesNotExist:
-                logger.warning(f"No user found with email {email}")
-                return None  # No user found
+        user, user_type = find_user_by_email(email)
+        if not user:
+            logger.warning("No user found with email %s", email)
+            return None  # No user found
+        logger.info("Found %s with email %s", user_type, email)
 
-        # 🔥 Check password
-        if check_password(password, user.password):
-            logger.info(f"Password matched for user {email}")
-            return user
+        # 🔥 Check password (upgrading the stored hash if needed)
+        try:
+            if verify_password(user, password):
+                logger.info("Password matched for user %s", email)
+                return user
+        except PasswordVerificationBusy:
+            logger.warning("Password verification busy, rejecting login for %s", email)
+            return None
         
-        logger.warning(f"Password did not match for user {email}")
+        logger.warning("Password did not match for user %s", email)
         return None
 
     def get_user(self, user_id):
         """
         Used by Django to retrieve the user instance.
         """
-        logger.debug(f"CustomUserBackend.get_user called with user_id: {user_id}")
+        logger.debug("CustomUserBackend.get_user called with user_id: %s", user_id)
         
         try:
             # Try to determine the model based on ID range
@@ -46,18 +45,18 @@ class CustomUserBackend(BaseBackend):
                 # Check ID range to determine if it's a Producer or Artist
                 if user_id >= 1000000:
                     user = Producer.objects.get(pk=user_id)
-                    logger.info(f"Found Producer with ID {user_id}")
+                    logger.debug("Found Producer with ID %s", user_id)
                     return user
             
             # Default to trying Artist first
             user = Artist.objects.get(pk=user_id)
-            logger.info(f"Found Artist with ID {user_id}")
+            logger.debug("Found Artist with ID %s", user_id)
             return user
         except Artist.DoesNotExist:
             try:
                 user = Producer.objects.get(pk=user_id)
-                logger.info(f"Found Producer with ID {user_id}")
+                logger.debug("Found Producer with ID %s", user_id)
                 return user
             except Producer.DoesNotExist:
-                logger.warning(f"No user found with ID {user_id}")
+                logger.warning("No user found with ID %s", user_id)
                 return None
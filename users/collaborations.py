@@ -0,0 +1,78 @@
+"""
+Collaboration request inbox helpers.
+
+Every CollaborationRequest has two CollaborationParticipant rows, one for
+its sender and one for its receiver. A user's requests (sent, received or
+both, optionally by status) are then a single range scan over the
+(participant_type, participant_id, ...) indexes instead of an OR/UNION over
+four nullable foreign keys.
+
+Rows are created by the post_save signal (users.signals) and, for
+bulk_create and queryset updates which skip signals, by calling
+index_requests() / sync_status() directly.
+"""
+from .models import CollaborationParticipant, CollaborationRequest
+
+ROLE_FILTERS = {
+    'sent': 'sender',
+    'received': 'receiver',
+}
+STATUSES = [choice for choice, _ in CollaborationRequest.STATUS_CHOICES]
+
+
+def sender_of(collab_request):
+    """Return (user_type, user_id) of the request's sender"""
+    if collab_request.sender_artist_id:
+        return 'artist', collab_request.sender_artist_id
+    if collab_request.sender_producer_id:
+        return 'producer', collab_request.sender_producer_id
+    return None, None
+
+
+def receiver_of(collab_request):
+    """Return (user_type, user_id) of the request's receiver"""
+    if collab_request.receiver_artist_id:
+        return 'artist', collab_request.receiver_artist_id
+    if collab_request.receiver_producer_id:
+        return 'producer', collab_request.receiver_producer_id
+    return None, None
+
+
+def participant_rows(collab_request):
+    rows = []
+    for role, (user_type, user_id) in (('sender', sender_of(collab_request)), ('receiver', receiver_of(collab_request))):
+        if user_type:
+            rows.append(CollaborationParticipant(
+                request_id=collab_request.id,
+                participant_type=user_type,
+                participant_id=user_id,
+                role=role,
+                status=collab_request.status,
+                created_at=collab_request.created_at,
+            ))
+    return rows
+
+
+def index_requests(collab_requests):
+    """Create the participant rows of saved requests (existing rows are kept)"""
+    rows = [row for collab_request in collab_requests for row in participant_rows(collab_request)]
+    CollaborationParticipant.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def sync_status(request_ids, status):
+    """Copy a status change made with a queryset update() to the participant rows"""
+    CollaborationParticipant.objects.filter(request_id__in=request_ids).update(status=status)
+
+
+def requests_for(user_type, user_id, role=None, statuses=None):
+    """
+    Participant rows of a user, newest first, with their request loaded.
+    ``role`` is 'sent' or 'received' (None for both), ``statuses`` a list
+    of request statuses.
+    """
+    rows = CollaborationParticipant.objects.filter(participant_type=user_type, participant_id=user_id)
+    if role in ROLE_FILTERS:
+        rows = rows.filter(role=ROLE_FILTERS[role])
+    if statuses:
+        rows = rows.filter(status__in=statuses)
+    return rows.select_related('request')
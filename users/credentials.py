@@ -0,0 +1,114 @@
+"""
+Credential lookups and password verification for the login paths
+(LoginView, CustomUserBackend and the password reset views).
+
+Emails are matched case-insensitively through the LOWER(email) indexes on
+Artist and Producer.
+
+settings.PASSWORD_VERIFY_THREADS (off by default) caps how many password
+hashes run at once. The request thread still waits for its hash; the pool
+only bounds the CPU that hashing can take, and the slots bound how many
+logins wait for it (PASSWORD_VERIFY_MAX_PENDING). A login that gets no
+slot within PASSWORD_VERIFY_TIMEOUT raises PasswordVerificationBusy, which
+the views turn into a 503, so a login spike is shed instead of starving
+every other request of CPU.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.db.models.functions import Lower
+
+from .models import Artist, Producer
+
+logger = logging.getLogger(__name__)
+
+USER_MODELS = ((Artist, 'artist'), (Producer, 'producer'))
+
+
+class PasswordVerificationBusy(Exception):
+    """No password verification slot freed up within PASSWORD_VERIFY_TIMEOUT"""
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+def users_with_email(model, email):
+    """Queryset of ``model`` rows whose email matches case-insensitively"""
+    return model.objects.alias(email_folded=Lower('email')).filter(email_folded=normalize_email(email))
+
+
+def find_user_by_email(email, **filters):
+    """
+    Return (user, user_type) for an email, or (None, None).
+    Artists are checked first, as before.
+    """
+    if not normalize_email(email):
+        return None, None
+    for model, user_type in USER_MODELS:
+        user = users_with_email(model, email).filter(**filters).first()
+        if user:
+            return user, user_type
+    return None, None
+
+
+def email_registered(email):
+    return any(users_with_email(model, email).exists() for model, _ in USER_MODELS)
+
+
+_pool = None
+_pool_slots = None
+_pool_threads = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool, _pool_slots, _pool_threads
+    threads = getattr(settings, 'PASSWORD_VERIFY_THREADS', 0)
+    if not threads:
+        return None, None
+    with _pool_lock:
+        if _pool is None or _pool_threads != threads:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='password-verify')
+            _pool_threads = threads
+            # Hashes running plus hashes waiting for a thread
+            _pool_slots = threading.BoundedSemaphore(
+                getattr(settings, 'PASSWORD_VERIFY_MAX_PENDING', None) or threads * 4
+            )
+        return _pool, _pool_slots
+
+
+def _run_hasher(func, *args):
+    pool, slots = _get_pool()
+    if pool is None:
+        return func(*args)
+    if not slots.acquire(timeout=getattr(settings, 'PASSWORD_VERIFY_TIMEOUT', 5)):
+        raise PasswordVerificationBusy()
+    try:
+        # Blocks this thread as an inline call would; the pool caps concurrency
+        return pool.submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def verify_password(user, password):
+    """
+    Check ``password`` against the user's stored hash.
+
+    If the hash was made with a hasher other than the preferred one (the
+    first entry of PASSWORD_HASHERS) or with a different cost, it is
+    replaced with a fresh hash after a successful check.
+    """
+    needs_upgrade = []
+    valid = _run_hasher(check_password, password, user.password, needs_upgrade.append)
+    if valid and needs_upgrade:
+        user.password = _run_hasher(make_password, password)
+        # update() instead of save(): no profile picture checks, no signals
+        type(user).objects.filter(pk=user.pk).update(password=user.password)
+        logger.info("Upgraded password hash for %s %s", type(user).__name__, user.pk)
+    return valid
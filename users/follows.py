@@ -0,0 +1,131 @@
+"""
+Follow graph helpers.
+
+Edges live in the Follow table as (follower_type, follower_id) ->
+(followee_type, followee_id), so artists and producers can follow each
+other. Every user's followers_count and following_count are updated in the
+same transaction as the edge, with F() expressions, so profiles never count
+rows. Both users' cached profiles are invalidated once it commits.
+
+Lists of users annotate the viewer's follow state with following_set(),
+which answers "does the viewer follow these N users" with one indexed query
+instead of one per row.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+
+from common.response_cache import PROFILES_TAG, invalidate, user_tag
+
+from .models import Artist, Follow, Producer
+
+USER_MODELS = {
+    'artist': Artist,
+    'producer': Producer,
+}
+
+
+def viewer_of(request):
+    """(user_type, user_id) of the authenticated user, or None"""
+    user = getattr(request, 'user', None)
+    if isinstance(user, Artist):
+        return 'artist', user.id
+    if isinstance(user, Producer):
+        return 'producer', user.id
+    return None
+
+
+def _adjust_counts(follower_type, follower_id, followee_type, followee_id, delta):
+    follower_model = USER_MODELS[follower_type]
+    followee_model = USER_MODELS[followee_type]
+    if delta > 0:
+        follower_model.objects.filter(id=follower_id).update(following_count=F('following_count') + delta)
+        followee_model.objects.filter(id=followee_id).update(followers_count=F('followers_count') + delta)
+    else:
+        # Never below zero, even if the counters were edited by hand
+        follower_model.objects.filter(id=follower_id, following_count__gt=0).update(following_count=F('following_count') + delta)
+        followee_model.objects.filter(id=followee_id, followers_count__gt=0).update(followers_count=F('followers_count') + delta)
+    invalidate(PROFILES_TAG, user_tag(follower_id), user_tag(followee_id))
+
+
+def follow(follower_type, follower_id, followee_type, followee_id):
+    """Create the edge; returns False if it already existed"""
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                Follow.objects.create(
+                    follower_type=follower_type, follower_id=follower_id,
+                    followee_type=followee_type, followee_id=followee_id,
+                )
+        except IntegrityError:
+            # Already following (possibly from a concurrent request)
+            return False
+        _adjust_counts(follower_type, follower_id, followee_type, followee_id, 1)
+    return True
+
+
+def unfollow(follower_type, follower_id, followee_type, followee_id):
+    """Delete the edge; returns False if there was none"""
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(
+            follower_type=follower_type, follower_id=follower_id,
+            followee_type=followee_type, followee_id=followee_id,
+        ).delete()
+        if not deleted:
+            return False
+        _adjust_counts(follower_type, follower_id, followee_type, followee_id, -1)
+    return True
+
+
+def _targets_filter(type_field, id_field, targets):
+    by_type = {}
+    for user_type, user_id in targets:
+        by_type.setdefault(user_type, set()).add(user_id)
+    condition = Q()
+    for user_type, user_ids in by_type.items():
+        condition |= Q(**{type_field: user_type, f'{id_field}__in': user_ids})
+    return condition
+
+
+def following_set(viewer_type, viewer_id, targets):
+    """The (user_type, user_id) pairs of ``targets`` that the viewer follows"""
+    targets = list(targets)
+    if not targets:
+        return set()
+    return set(
+        Follow.objects.filter(follower_type=viewer_type, follower_id=viewer_id)
+        .filter(_targets_filter('followee_type', 'followee_id', targets))
+        .values_list('followee_type', 'followee_id')
+    )
+
+
+def followed_by_set(viewer_type, viewer_id, targets):
+    """The (user_type, user_id) pairs of ``targets`` that follow the viewer"""
+    targets = list(targets)
+    if not targets:
+        return set()
+    return set(
+        Follow.objects.filter(followee_type=viewer_type, followee_id=viewer_id)
+        .filter(_targets_filter('follower_type', 'follower_id', targets))
+        .values_list('follower_type', 'follower_id')
+    )
+
+
+def followers_of(user_type, user_id):
+    """Follow edges pointing at the user, newest first"""
+    return Follow.objects.filter(followee_type=user_type, followee_id=user_id)
+
+
+def following_of(user_type, user_id):
+    """Follow edges starting from the user, newest first"""
+    return Follow.objects.filter(follower_type=user_type, follower_id=user_id)
+
+
+def load_users(pairs):
+    """{(user_type, user_id): user} for the given pairs, one query per user model"""
+    loaded = {}
+    for user_type, model in USER_MODELS.items():
+        user_ids = {user_id for pair_type, user_id in pairs if pair_type == user_type}
+        if user_ids:
+            for user_id, user in model.objects.in_bulk(user_ids).items():
+                loaded[(user_type, user_id)] = user
+    return loaded
@@ -0,0 +1,31 @@
+"""
+Password hashing helpers for Artists and Producers.
+
+The preferred hasher is the first entry of settings.PASSWORD_HASHERS.
+Hashes made with another hasher (or another cost) are upgraded the next
+time the user logs in, see users.credentials.verify_password.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, identify_hasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count taken from
+    settings.PASSWORD_PBKDF2_ITERATIONS (Django's default when unset).
+    Hashes keep the standard ``pbkdf2_sha256$`` format, so they stay
+    readable by the stock hasher.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
+
+
+def is_password_hashed(value):
+    """Return True if ``value`` is already an encoded hash from a known hasher"""
+    try:
+        identify_hasher(value)
+    except ValueError:
+        return False
+    return True
@@ -0,0 +1,162 @@
+"""
+Database-side ID range allocation for Artists and Producers.
+
+Artists and Producers live in separate tables but share a single ID space
+(tokens, chat participants and posts only carry a numeric ``user_id``).
+Artists are allocated from ``1 .. ARTIST_ID_MAX`` and Producers from
+``PRODUCER_ID_START`` upwards. The ranges are enforced by the database
+sequence of each table, so ``save()``, ``objects.create()`` and
+``objects.bulk_create()`` all get correct IDs without reading ``max(id)``
+in Python.
+
+Migration 0014 sets the ranges up, and ``reapply_id_ranges`` sets them up
+again after every ``migrate``: on SQLite, a migration that rebuilds the
+producer table drops its sequence, and with it the range.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+PRODUCER_ID_START = 1000000
+ARTIST_ID_MAX = PRODUCER_ID_START - 1
+
+ARTIST_TABLE = 'users_artist'
+PRODUCER_TABLE = 'users_producer'
+
+
+def _max_id(cursor, table):
+    cursor.execute(f"SELECT MAX(id) FROM {table}")
+    row = cursor.fetchone()
+    return row[0] or 0
+
+
+def _configure_postgresql(cursor):
+    # Producers: move the sequence into the 1,000,000+ range first, then
+    # pin MINVALUE so a sequence reset can never hand out artist-range IDs.
+    next_producer_id = max(_max_id(cursor, PRODUCER_TABLE) + 1, PRODUCER_ID_START)
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{PRODUCER_TABLE}', 'id'), %s, false)",
+        [next_producer_id],
+    )
+    cursor.execute(f"SELECT pg_get_serial_sequence('{PRODUCER_TABLE}', 'id')")
+    producer_seq = cursor.fetchone()[0]
+    cursor.execute(
+        f"ALTER SEQUENCE {producer_seq} MINVALUE {PRODUCER_ID_START} START WITH {PRODUCER_ID_START}"
+    )
+
+    # Artists: cap the sequence so it errors out instead of silently
+    # running into the producer range.
+    cursor.execute(f"SELECT pg_get_serial_sequence('{ARTIST_TABLE}', 'id')")
+    artist_seq = cursor.fetchone()[0]
+    cursor.execute(f"ALTER SEQUENCE {artist_seq} MAXVALUE {ARTIST_ID_MAX}")
+
+
+def _configure_sqlite(cursor):
+    # AUTOINCREMENT tables take the next ID from sqlite_sequence, which is
+    # also what bulk inserts use.
+    next_producer_id = max(_max_id(cursor, PRODUCER_TABLE) + 1, PRODUCER_ID_START)
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [PRODUCER_TABLE])
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute(
+            "INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)",
+            [PRODUCER_TABLE, next_producer_id - 1],
+        )
+    elif row[0] < next_producer_id - 1:
+        cursor.execute(
+            "UPDATE sqlite_sequence SET seq = %s WHERE name = %s",
+            [next_producer_id - 1, PRODUCER_TABLE],
+        )
+
+
+def _configure_mysql(cursor):
+    next_producer_id = max(_max_id(cursor, PRODUCER_TABLE) + 1, PRODUCER_ID_START)
+    cursor.execute(f"ALTER TABLE {PRODUCER_TABLE} AUTO_INCREMENT = {next_producer_id}")
+
+
+def configure_id_ranges(connection):
+    """
+    Make the database allocate Producer IDs from PRODUCER_ID_START upwards.
+    Safe to run repeatedly; it never moves a sequence backwards.
+    """
+    configurators = {
+        'postgresql': _configure_postgresql,
+        'sqlite': _configure_sqlite,
+        'mysql': _configure_mysql,
+    }
+    configurator = configurators.get(connection.vendor)
+    if configurator is None:
+        logger.warning("ID ranges: no range configuration available for database vendor '%s'", connection.vendor)
+        return
+
+    with connection.cursor() as cursor:
+        configurator(cursor)
+    logger.info("ID ranges: configured producer IDs to start at %s (%s)", PRODUCER_ID_START, connection.vendor)
+
+
+def reapply_id_ranges(sender, using, **kwargs):
+    """post_migrate handler for the users app (see UsersConfig.ready)"""
+    from django.db import connections, router
+
+    from .models import Producer
+
+    connection = connections[using]
+    if not router.allow_migrate_model(using, Producer):
+        return
+    if PRODUCER_TABLE not in connection.introspection.table_names():
+        return  # Migrated back before the table existed
+    configure_id_ranges(connection)
+
+
+def next_producer_id(connection):
+    """
+    Return the ID the database will hand out to the next Producer,
+    or None if it cannot be determined for this vendor.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"SELECT pg_get_serial_sequence('{PRODUCER_TABLE}', 'id')")
+            producer_seq = cursor.fetchone()[0]
+            cursor.execute(f"SELECT last_value, is_called FROM {producer_seq}")
+            last_value, is_called = cursor.fetchone()
+            return last_value + 1 if is_called else last_value
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [PRODUCER_TABLE])
+            row = cursor.fetchone()
+            return (row[0] if row else 0) + 1
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT AUTO_INCREMENT FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [PRODUCER_TABLE],
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+    return None
+
+
+def check_id_ranges(connection):
+    """
+    Validate the ID ranges in the database.
+    Returns a tuple of (errors, warnings) as lists of human readable
+    messages. Producers created before the range separation keep their
+    old IDs, so they are reported as warnings only.
+    """
+    errors = []
+    warnings = []
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {ARTIST_TABLE} WHERE id > %s", [ARTIST_ID_MAX])
+        stray_artists = cursor.fetchone()[0]
+        if stray_artists:
+            errors.append(f"{stray_artists} artist(s) have IDs in the producer range (> {ARTIST_ID_MAX})")
+
+        cursor.execute(f"SELECT COUNT(*) FROM {PRODUCER_TABLE} WHERE id < %s", [PRODUCER_ID_START])
+        legacy_producers = cursor.fetchone()[0]
+        if legacy_producers:
+            warnings.append(f"{legacy_producers} producer(s) have legacy IDs below {PRODUCER_ID_START}")
+
+    upcoming = next_producer_id(connection)
+    if upcoming is not None and upcoming < PRODUCER_ID_START:
+        errors.append(f"next producer ID would be {upcoming}, expected >= {PRODUCER_ID_START}")
+
+    return errors, warnings
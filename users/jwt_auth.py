@@ -7,7 +7,6 @@ from .models import Artist, Producer
 from rest_framework import exceptions
 import jwt
 from jwt.exceptions import InvalidTokenError, DecodeError
-import traceback
 
 logger = logging.getLogger(__name__)
 
@@ -24,18 +23,15 @@ class CustomJWTAuthentication(JWTAuthentication):
         try:
             header = self.get_header(request)
             if header is None:
-                logger.error("CustomJWT: Authentication failed - No Auth header found")
+                # Anonymous request; AllowAny views get here on every call
+                logger.debug("CustomJWT: No Auth header")
                 return None
 
             raw_token = self.get_raw_token(header)
             if raw_token is None:
-                logger.error("CustomJWT: Authentication failed - No token found in header")
+                logger.warning("CustomJWT: Authentication failed - No token found in header")
                 return None
-                
-            # Log the raw token (first 10 chars for security)
-            token_preview = raw_token.decode()[:10] + "..." if hasattr(raw_token, "decode") else str(raw_token)[:10] + "..."
-            logger.info(f"CustomJWT: Processing token (preview): {token_preview}")
-            
+
             # Validate token manually to have more control
             try:
                 # Try to decode the token with verification first
@@ -44,9 +40,8 @@ class CustomJWTAuthentication(JWTAuthentication):
                     settings.SIMPLE_JWT['SIGNING_KEY'],
                     algorithms=[settings.SIMPLE_JWT['ALGORITHM']]
                 )
-                logger.info(f"CustomJWT: Token validated successfully, payload: {decoded_token}")
             except (InvalidTokenError, DecodeError) as e:
-                logger.error(f"CustomJWT: Token validation failed: {str(e)}")
+                logger.warning("CustomJWT: Token validation failed: %s", e)
                 return None
                 
             # Get the user from the validated token
@@ -56,16 +51,15 @@ class CustomJWTAuthentication(JWTAuthentication):
                     logger.error("CustomJWT: User lookup failed")
                     return None
                     
-                logger.info(f"CustomJWT: Authentication successful for user {user.username} (ID: {user.id})")
+                logger.debug("CustomJWT: Authentication successful for user %s (ID: %s)", user.username, user.id)
                 return (user, decoded_token)
             except Exception as e:
-                logger.error(f"CustomJWT: Error during user lookup: {str(e)}")
+                logger.error("CustomJWT: Error during user lookup: %s", e)
                 return None
         
         except Exception as e:
             # Log the full exception with traceback for debugging
-            logger.error(f"CustomJWT: Unexpected error during authentication: {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.exception("CustomJWT: Unexpected error during authentication: %s", e)
             return None
     
     def get_user(self, validated_token):
@@ -80,7 +74,8 @@ class CustomJWTAuthentication(JWTAuthentication):
             email = validated_token.get('email', '')
             username = validated_token.get('username', '')
             
-            logger.info(f"CustomJWT: Token contains user_id={user_id}, user_type={user_type}, email={email}, username={username}")
+            # Never log the token or its claims beyond the user reference
+            logger.debug("CustomJWT: Token for user_id=%s, user_type=%s", user_id, user_type)
             
             # Check for required token claims
             if not user_id:
@@ -101,24 +96,24 @@ class CustomJWTAuthentication(JWTAuthentication):
             if not user_type or user_type.lower() == 'artist':
                 try:
                     user = Artist.objects.get(id=user_id)
-                    logger.info(f"CustomJWT: Found Artist with id={user_id}, username={user.username}")
+                    logger.debug("CustomJWT: Found Artist with id=%s, username=%s", user_id, user.username)
                     # Set the user_type if it wasn't in the token
                     user_type = 'artist'
                 except Artist.DoesNotExist:
-                    logger.warning(f"CustomJWT: Artist with id={user_id} not found")
+                    logger.warning("CustomJWT: Artist with id=%s not found", user_id)
             
             # Try Producer if user is still not found or user_type is 'producer'
             if (not user) and (not user_type or user_type.lower() == 'producer'):
                 try:
                     user = Producer.objects.get(id=user_id)
-                    logger.info(f"CustomJWT: Found Producer with id={user_id}, username={user.username}")
+                    logger.debug("CustomJWT: Found Producer with id=%s, username=%s", user_id, user.username)
                     # Set the user_type if it wasn't in the token
                     user_type = 'producer'
                 except Producer.DoesNotExist:
-                    logger.warning(f"CustomJWT: Producer with id={user_id} not found")
+                    logger.warning("CustomJWT: Producer with id=%s not found", user_id)
             
             if not user:
-                logger.error(f"CustomJWT: User not found for user_id={user_id}, user_type={user_type}")
+                logger.error("CustomJWT: User not found for user_id=%s, user_type=%s", user_id, user_type)
                 raise exceptions.AuthenticationFailed({
                     'detail': 'User not found',
                     'code': 'user_not_found'
@@ -127,11 +122,10 @@ class CustomJWTAuthentication(JWTAuthentication):
             # Ensure the user has an email attribute
             if hasattr(user, 'email') and (not user.email or user.email.strip() == ""):
                 user.email = email
-                logger.info(f"CustomJWT: Updated user email to: '{email}'")
             
             # Ensure username is set correctly if provided in token
             if username and hasattr(user, 'username') and user.username != username:
-                logger.warning(f"CustomJWT: Username mismatch - Token: '{username}', DB: '{user.username}'")
+                logger.warning("CustomJWT: Username mismatch - Token: '%s', DB: '%s'", username, user.username)
                 # Don't override database username, but log the discrepancy
             
             # Add user_type attribute to the user object for convenience
@@ -139,13 +133,12 @@ class CustomJWTAuthentication(JWTAuthentication):
             
             # Make sure the user object has is_authenticated attribute
             if not hasattr(user, 'is_authenticated'):
-                logger.info(f"CustomJWT: Adding is_authenticated to user of type {type(user)}")
+                logger.debug("CustomJWT: Adding is_authenticated to user of type %s", type(user))
                 user.is_authenticated = True
             
-            logger.info(f"CustomJWT: Final user: ID={user.id}, username='{getattr(user, 'username', 'N/A')}', email='{getattr(user, 'email', 'N/A')}', type={user_type}, authenticated={getattr(user, 'is_authenticated', False)}")
+            logger.debug("CustomJWT: Authenticated %s %s", user_type, user.id)
             return user
             
         except Exception as e:
-            logger.error(f"CustomJWT Error in get_user: {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.exception("CustomJWT Error in get_user: %s", e)
             raise
@@ -0,0 +1,263 @@
+"""
+Outbound mail queue.
+
+Views call ``enqueue_mail()``, which only inserts an OutboundEmail row and
+returns, so SMTP latency or outages never reach API latency. Delivery is
+done by queue workers:
+
+* ``python manage.py send_queued_mail`` runs a pool of worker threads, each
+  claiming batches of due rows and sending them over one reused backend
+  connection (the usual production setup).
+* With ``MAIL_QUEUE['SEND_IN_PROCESS']`` enabled, a daemon thread in the web
+  process drains the queue right after each enqueue commits. Handy in
+  development together with the console or file-based EMAIL_BACKEND.
+
+Failed sends are retried with exponential backoff up to ``MAX_ATTEMPTS``,
+after which the row is marked 'failed' and kept for inspection.
+"""
+import datetime
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, connection as db_connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'BATCH_SIZE': 50,
+    'WORKERS': 2,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF': 30,  # seconds before the first retry, doubled on each attempt
+    'MAX_BACKOFF': 60 * 60,
+    'LEASE': 5 * 60,  # seconds before a claimed but unfinished row is claimed again
+    'POLL_INTERVAL': 5,
+    'SEND_IN_PROCESS': False,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'MAIL_QUEUE', {}).get(name, DEFAULTS[name])
+
+
+def enqueue_mail(subject, body, recipients, from_email=None):
+    """Queue a plain text email and return the OutboundEmail row"""
+    email = OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or '',
+        recipients=list(recipients),
+    )
+    logger.info("Mail queue: queued email %s (%s)", email.id, subject)
+    if get_setting('SEND_IN_PROCESS'):
+        transaction.on_commit(wake_dispatcher)
+    return email
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next attempt after ``attempts`` failures"""
+    return min(get_setting('RETRY_BACKOFF') * 2 ** (attempts - 1), get_setting('MAX_BACKOFF'))
+
+
+def _due(now):
+    lease_expired = now - datetime.timedelta(seconds=get_setting('LEASE'))
+    return (
+        Q(status='pending', next_attempt_at__lte=now)
+        | Q(status='sending', claimed_at__lt=lease_expired)
+    )
+
+
+def claim_batch(batch_size=None):
+    """
+    Claim up to ``batch_size`` due emails for this worker.
+
+    The claim is a single conditional UPDATE that re-checks the due
+    condition per row, so concurrent workers (threads or processes) never
+    claim the same row, on any database backend.
+    """
+    batch_size = batch_size or get_setting('BATCH_SIZE')
+    now = timezone.now()
+    ids = list(
+        OutboundEmail.objects.filter(_due(now))
+        .order_by('next_attempt_at', 'id')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+
+    token = uuid.uuid4().hex
+    OutboundEmail.objects.filter(_due(now), id__in=ids).update(
+        status='sending', claim_token=token, claimed_at=now,
+    )
+    return list(OutboundEmail.objects.filter(claim_token=token, status='sending'))
+
+
+def _record_failure(email, error):
+    attempts = email.attempts + 1
+    if attempts >= get_setting('MAX_ATTEMPTS'):
+        changes = {'status': 'failed'}
+        logger.error("Mail queue: giving up on email %s after %s attempts: %s", email.id, attempts, error)
+    else:
+        delay = retry_delay(attempts)
+        changes = {
+            'status': 'pending',
+            'next_attempt_at': timezone.now() + datetime.timedelta(seconds=delay),
+        }
+        logger.warning("Mail queue: email %s failed (attempt %s), retrying in %ss: %s", email.id, attempts, delay, error)
+    OutboundEmail.objects.filter(id=email.id, claim_token=email.claim_token).update(
+        attempts=attempts, last_error=str(error), claim_token='', **changes,
+    )
+
+
+def _record_sent(email):
+    """Mark one email sent, unless another worker has claimed it since"""
+    updated = OutboundEmail.objects.filter(id=email.id, claim_token=email.claim_token).update(
+        status='sent', sent_at=timezone.now(), attempts=F('attempts') + 1,
+        claim_token='', last_error='',
+    )
+    if not updated:
+        logger.warning("Mail queue: email %s was sent after its lease expired and may be sent again", email.id)
+
+
+def deliver_batch(emails, connection):
+    """
+    Send claimed emails over an already created backend connection and
+    record each outcome as soon as it is known, so a crash mid-batch only
+    resends the email it was sending. Stops once the batch's lease has
+    expired: other workers may have claimed the rest. Returns the number of
+    emails sent.
+    """
+    sent = 0
+    lease = datetime.timedelta(seconds=get_setting('LEASE'))
+    for email in emails:
+        if timezone.now() - email.claimed_at >= lease:
+            logger.warning("Mail queue: lease expired, leaving the rest of the batch from email %s", email.id)
+            break
+        message = EmailMessage(
+            email.subject,
+            email.body,
+            email.from_email or settings.DEFAULT_FROM_EMAIL,
+            email.recipients,
+            connection=connection,
+        )
+        try:
+            message.send()
+        except Exception as e:
+            _record_failure(email, e)
+            # The connection may be broken now; the next send reopens it
+            try:
+                connection.close()
+            except Exception:
+                pass
+            continue
+        _record_sent(email)
+        sent += 1
+    return sent
+
+
+class MailQueueWorker:
+    """
+    Claims and sends batches, keeping one backend connection (e.g. one SMTP
+    session) open for as long as there is work.
+    """
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or get_setting('BATCH_SIZE')
+        self.connection = None
+
+    def run_once(self):
+        """Send one batch; returns the number of emails claimed"""
+        emails = claim_batch(self.batch_size)
+        if not emails:
+            self.close()
+            return 0
+        if self.connection is None:
+            self.connection = get_connection()
+        try:
+            self.connection.open()
+        except Exception as e:
+            # Server unreachable: put the whole batch back with backoff
+            for email in emails:
+                _record_failure(email, e)
+            self.close()
+            return len(emails)
+        sent = deliver_batch(emails, self.connection)
+        logger.info("Mail queue: sent %s/%s emails", sent, len(emails))
+        return len(emails)
+
+    def drain(self):
+        """Send batches until nothing is due"""
+        total = 0
+        while True:
+            claimed = self.run_once()
+            if not claimed:
+                return total
+            total += claimed
+
+    def run(self, stop_event, poll_interval=None):
+        poll_interval = poll_interval or get_setting('POLL_INTERVAL')
+        try:
+            while not stop_event.is_set():
+                close_old_connections()
+                if not self.run_once():
+                    stop_event.wait(poll_interval)
+        finally:
+            self.close()
+            db_connection.close()
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+
+def run_workers(workers=None, batch_size=None, stop_event=None, poll_interval=None):
+    """Run a pool of queue workers until ``stop_event`` is set"""
+    workers = workers or get_setting('WORKERS')
+    stop_event = stop_event or threading.Event()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mail-queue') as pool:
+        futures = [
+            pool.submit(MailQueueWorker(batch_size).run, stop_event, poll_interval)
+            for _ in range(workers)
+        ]
+        for future in futures:
+            future.result()
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def _dispatch_forever():
+    worker = MailQueueWorker()
+    while True:
+        _wakeup.wait(get_setting('POLL_INTERVAL'))
+        _wakeup.clear()
+        try:
+            close_old_connections()
+            worker.drain()
+        except Exception as e:
+            logger.error("Mail queue: in-process dispatcher error: %s", e)
+        finally:
+            db_connection.close()
+
+
+def wake_dispatcher():
+    """Start the in-process dispatcher thread if needed and wake it up"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None or not _dispatcher.is_alive():
+            _dispatcher = threading.Thread(target=_dispatch_forever, name='mail-queue-dispatcher', daemon=True)
+            _dispatcher.start()
+    _wakeup.set()
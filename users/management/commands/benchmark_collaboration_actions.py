@@ -0,0 +1,128 @@
+import json
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from common.benchmarking import run_concurrently
+from users.collaborations import index_requests
+from users.models import Artist, Producer, CollaborationRequest, Notification
+from users.views import get_tokens_for_user
+
+
+class Command(BaseCommand):
+    help = (
+        "Accept collaboration requests concurrently through the action endpoint and "
+        "check that no counter updates or notifications are lost or duplicated. Creates "
+        "temporary users in the configured database and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--senders', type=int, default=50, help="Requests sent to one receiver (half from artists, half from producers)")
+        parser.add_argument('--repeat', type=int, default=2, help="Times each request is accepted (retried accepts must be no-ops)")
+        parser.add_argument('--concurrency', type=int, default=8, help="Concurrent client threads")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        self.prefix = f"bench_collab_{uuid.uuid4().hex[:8]}"
+        try:
+            receiver, senders, request_ids = self.create_requests(options['senders'])
+            token = get_tokens_for_user(receiver)['access']
+
+            def accept(client, i):
+                request_id = request_ids[i % len(request_ids)]
+                return client.post(
+                    f'/api/auth/collaboration-requests/{request_id}/action/',
+                    {'action': 'accept'},
+                    HTTP_AUTHORIZATION=f'Bearer {token}',
+                )
+
+            results = run_concurrently(accept, len(request_ids) * options['repeat'], options['concurrency'])
+            results['accepted'] = CollaborationRequest.objects.filter(id__in=request_ids, status='accepted').count()
+            results['pending'] = len(request_ids) - results['accepted']
+            results['checks'] = self.verify(receiver, senders, request_ids, results['accepted'])
+        finally:
+            self.cleanup()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.stdout.write(
+                f"{results['requests']} accepts in {results['elapsed_s']:.2f}s "
+                f"({results['throughput_rps']:.1f}/s, concurrency {results['concurrency']})"
+            )
+            self.stdout.write(
+                f"latency ms: p50 {results['p50_ms']:.1f}  p95 {results['p95_ms']:.1f}  "
+                f"p99 {results['p99_ms']:.1f}  max {results['max_ms']:.1f}"
+            )
+            self.stdout.write(f"status codes: {results['status_codes']}")
+            self.stdout.write(f"requests accepted: {results['accepted']}, still pending: {results['pending']}")
+            for name, check in results['checks'].items():
+                style = self.style.SUCCESS if check['ok'] else self.style.ERROR
+                self.stdout.write(style(f"{name}: expected {check['expected']}, got {check['actual']}"))
+
+        if not all(check['ok'] for check in results['checks'].values()):
+            raise SystemExit(1)
+
+    def create_requests(self, count):
+        encoded = make_password('bench-password')
+        receiver = Artist.objects.create(
+            username=f"{self.prefix}_receiver", nom='Bench', prenom='Receiver',
+            email=f"{self.prefix}_receiver@bench.local", password=encoded,
+        )
+        artists = Artist.objects.bulk_create([
+            Artist(username=f"{self.prefix}_a{i}", nom='Bench', prenom='Artist',
+                   email=f"{self.prefix}_a{i}@bench.local", password=encoded)
+            for i in range((count + 1) // 2)
+        ])
+        producers = Producer.objects.bulk_create([
+            Producer(username=f"{self.prefix}_p{i}", nom='Bench', prenom='Producer',
+                     email=f"{self.prefix}_p{i}@bench.local", password=encoded)
+            for i in range(count // 2)
+        ])
+        # Re-read to get IDs on backends where bulk_create doesn't return them
+        artists = list(Artist.objects.filter(username__startswith=f"{self.prefix}_a"))
+        producers = list(Producer.objects.filter(username__startswith=f"{self.prefix}_p"))
+
+        requests = [
+            CollaborationRequest(sender_artist=artist, receiver_artist=receiver, message='bench')
+            for artist in artists
+        ] + [
+            CollaborationRequest(sender_producer=producer, receiver_artist=receiver, message='bench')
+            for producer in producers
+        ]
+        CollaborationRequest.objects.bulk_create(requests)
+        saved = list(CollaborationRequest.objects.filter(receiver_artist=receiver))
+        # bulk_create skips post_save, which normally adds the inbox rows
+        index_requests(saved)
+        request_ids = [collab_request.id for collab_request in saved]
+        return receiver, artists + producers, request_ids
+
+    def verify(self, receiver, senders, request_ids, accepted):
+        receiver.refresh_from_db(fields=['collaboration_count'])
+        artist_ids = [s.id for s in senders if isinstance(s, Artist)]
+        producer_ids = [s.id for s in senders if isinstance(s, Producer)]
+        sender_counts = (
+            list(Artist.objects.filter(id__in=artist_ids).values_list('collaboration_count', flat=True))
+            + list(Producer.objects.filter(id__in=producer_ids).values_list('collaboration_count', flat=True))
+        )
+        notifications = Notification.objects.filter(
+            notification_type='collaboration_update', related_id__in=request_ids
+        ).count()
+
+        # Whatever got accepted must be counted exactly once, even when some
+        # requests failed (e.g. lock timeouts on SQLite)
+        checks = {
+            'receiver collaboration_count': (accepted, receiver.collaboration_count),
+            'senders with collaboration_count 1': (accepted, sum(1 for c in sender_counts if c == 1)),
+            'senders with collaboration_count > 1': (0, sum(1 for c in sender_counts if c > 1)),
+            'collaboration_update notifications': (accepted, notifications),
+        }
+        return {
+            name: {'expected': expected, 'actual': actual, 'ok': expected == actual}
+            for name, (expected, actual) in checks.items()
+        }
+
+    def cleanup(self):
+        Artist.objects.filter(username__startswith=self.prefix).delete()
+        Producer.objects.filter(username__startswith=self.prefix).delete()
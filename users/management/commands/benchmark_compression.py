@@ -0,0 +1,127 @@
+import json
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from common.compression import available_encodings
+from common.synthetic import SCALES, delete, generate, scale_options
+from users.follows import load_users
+from users.views import get_tokens_for_user
+
+from .benchmark_endpoints import ENDPOINTS
+
+# Name -> (downlink bits per second, round trip ms), as in browser network throttling presets
+LINKS = {
+    'slow-3g': (400_000, 400),
+    '3g': (1_600_000, 150),
+    '4g': (9_000_000, 60),
+}
+
+INITIAL_WINDOW = 10 * 1460  # TCP initial congestion window (RFC 6928), bytes
+
+
+def transfer_ms(size, bandwidth, rtt_ms):
+    """
+    Time from the first to the last byte of a ``size`` byte response on a
+    fresh connection: the congestion window starts at INITIAL_WINDOW and
+    doubles every round trip (slow start) until it fills the link.
+    """
+    elapsed = 0.0
+    window = INITIAL_WINDOW
+    remaining = size
+    while remaining > 0:
+        sent = min(window, remaining)
+        remaining -= sent
+        sending_ms = sent * 8 / bandwidth * 1000
+        # Unless the window already fills the link, wait for acknowledgements
+        elapsed += max(sending_ms, rtt_ms) if remaining else sending_ms
+        window *= 2
+    return elapsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure response sizes, server time and modelled time to last byte on mobile links "
+        "for each response encoding (identity, gzip and, when installed, br and zstd) of the "
+        "largest endpoints, against a synthetic dataset created and deleted by the command. "
+        "Time to last byte is one round trip for the request plus the server time plus the "
+        "transfer under TCP slow start on a fresh connection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', default='medium', help=f"One of {', '.join(SCALES)}")
+        parser.add_argument('--repeat', type=int, default=10, help="Timed requests per endpoint and encoding")
+        parser.add_argument('--links', default=','.join(LINKS), help=f"Comma-separated, from {', '.join(LINKS)}")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        if options['scale'] not in SCALES:
+            raise CommandError(f"Unknown scale: {options['scale']}")
+        links = [link.strip() for link in options['links'].split(',') if link.strip()]
+        unknown = set(links) - set(LINKS)
+        if unknown:
+            raise CommandError(f"Unknown links: {', '.join(sorted(unknown))}")
+        encodings = ['identity'] + available_encodings()
+        endpoints = ENDPOINTS + [('all_users', lambda viewer, dataset: '/api/auth/users/', False)]
+
+        results = {'scale': options['scale'], 'links': {link: LINKS[link] for link in links}, 'endpoints': {}}
+        prefix = f"bench_gz_{uuid.uuid4().hex[:8]}"
+        try:
+            dataset = generate(prefix, seed=options['seed'], **scale_options(options['scale']))
+            results['dataset'] = dataset.counts
+            viewer = dataset.users[0]
+            client = Client(HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(load_users([viewer])[viewer])['access']}")
+            for name, url_for, authenticated in endpoints:
+                url = url_for(viewer, dataset)
+                if url is None:
+                    continue
+                results['endpoints'][name] = {
+                    encoding: self.measure(client if authenticated else Client(), url, encoding, links, options['repeat'])
+                    for encoding in encodings
+                }
+        finally:
+            delete(prefix)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{options['scale']} dataset; server time is the median with the response cache as configured"
+        )
+        self.stdout.write(
+            f"  {'endpoint':<16} {'encoding':<9} {'KiB':>9} {'server ms':>10}"
+            + ''.join(f" {f'{link} ms':>12}" for link in links)
+        )
+        for name, by_encoding in results['endpoints'].items():
+            for encoding, result in by_encoding.items():
+                self.stdout.write(
+                    f"  {name:<16} {encoding:<9} {result['bytes'] / 1024:9.1f} {result['server_ms']:10.1f}"
+                    + ''.join(f" {result['ttlb_ms'][link]:12.0f}" for link in links)
+                )
+
+    def measure(self, client, url, encoding, links, repeat):
+        headers = {'HTTP_ACCEPT_ENCODING': encoding}
+        client.get(url, **headers)  # Warm up, and fill the response cache
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(url, **headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise CommandError(f"GET {url} returned {response.status_code}")
+        if response.get('Content-Encoding', 'identity') != encoding:
+            raise CommandError(f"GET {url} wasn't encoded with {encoding}")
+        size = len(response.content)
+        server_ms = statistics.median(latencies)
+        return {
+            'bytes': size,
+            'server_ms': server_ms,
+            'ttlb_ms': {
+                link: LINKS[link][1] + server_ms + transfer_ms(size, *LINKS[link])
+                for link in links
+            },
+        }
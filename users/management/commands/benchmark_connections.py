@@ -0,0 +1,141 @@
+import asyncio
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from channels.db import database_sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+
+from common.benchmarking import summarize
+from common.db import close_request_connections, pool_available, pool_max_size
+from users.models import Artist
+
+# How each unit of work runs; see Command.help
+MODES = ['request', 'asgi_request', 'consumer']
+
+
+def query():
+    # One indexed lookup, so the timings are mostly connection handling
+    return Artist.objects.filter(pk=0).exists()
+
+
+@contextmanager
+def database_settings(**overrides):
+    """Temporarily change the default connection's settings (shared by every thread's connection)"""
+    settings_dict = connection.settings_dict
+    previous = {name: settings_dict.get(name) for name in overrides}
+    connection.close()
+    settings_dict.update(overrides)
+    try:
+        yield
+    finally:
+        connection.close()
+        if 'OPTIONS' in overrides and hasattr(connection, 'close_pool'):
+            connection.close_pool()
+        settings_dict.update(previous)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure database connection overhead per unit of work: a WSGI-style request on a "
+        "long-lived thread (request), an ASGI request in a thread of its own (asgi_request) "
+        "and a chat consumer's database_sync_to_async call (consumer), each with connections "
+        "closed after every request (CONN_MAX_AGE=0, the old setting), kept open "
+        "(CONN_MAX_AGE with health checks) and, with psycopg 3 on PostgreSQL, pooled."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Timed units of work per mode and setting")
+        parser.add_argument('--modes', default=','.join(MODES), help="Comma-separated subset")
+        parser.add_argument('--max-age', type=int, default=60, help="CONN_MAX_AGE for the persistent setting")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        configurations = [
+            ('close', {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}),
+            ('persistent', {'CONN_MAX_AGE': options['max_age'], 'CONN_HEALTH_CHECKS': True}),
+        ]
+        if connection.vendor == 'postgresql' and pool_available():
+            from psycopg_pool import ConnectionPool
+
+            pool = {'min_size': 2, 'max_size': pool_max_size(), 'timeout': 10, 'check': ConnectionPool.check_connection}
+            configurations.append((
+                'pool', {'CONN_MAX_AGE': 0, 'OPTIONS': {**connection.settings_dict.get('OPTIONS', {}), 'pool': pool}},
+            ))
+
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip() in MODES]
+        results = {'database': connection.vendor, 'requests': options['requests'], 'results': {}}
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(count_connection)
+        try:
+            for mode in modes:
+                for name, overrides in configurations:
+                    with database_settings(**overrides):
+                        run = getattr(self, f'run_{mode}')
+                        run(max(5, options['requests'] // 20))  # Warm up
+                        opened.clear()
+                        started = time.perf_counter()
+                        latencies = run(options['requests'])
+                        summary = summarize(latencies, time.perf_counter() - started)
+                    summary['connections_opened'] = len(opened)
+                    results['results'][f'{mode}/{name}'] = summary
+        finally:
+            connection_created.disconnect(count_connection)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{results['database']}, {results['requests']} units of work per mode and setting")
+        for label, summary in results['results'].items():
+            self.stdout.write(
+                f"  {label:<26} p50 {summary['p50_ms']:7.3f} ms  p95 {summary['p95_ms']:7.3f} ms  "
+                f"{summary['throughput_rps']:8.0f}/s  connections opened {summary['connections_opened']}"
+            )
+
+    def run_request(self, total):
+        # What the WSGI handler does around each request on a worker thread
+        latencies = []
+        for _ in range(total):
+            started = time.perf_counter()
+            close_old_connections()
+            query()
+            close_old_connections()
+            latencies.append((time.perf_counter() - started) * 1000)
+        return latencies
+
+    def run_asgi_request(self, total):
+        # Django's ASGI handler runs each request's sync code in a new thread,
+        # and backend/asgi.py closes its connections when it finishes
+        latencies = []
+
+        def request():
+            close_old_connections()
+            query()
+            close_request_connections()
+
+        for _ in range(total):
+            started = time.perf_counter()
+            thread = threading.Thread(target=request)
+            thread.start()
+            thread.join()
+            latencies.append((time.perf_counter() - started) * 1000)
+        return latencies
+
+    def run_consumer(self, total):
+        # database_sync_to_async closes old connections before and after each call
+        async def calls():
+            latencies = []
+            for _ in range(total):
+                started = time.perf_counter()
+                await database_sync_to_async(query)()
+                latencies.append((time.perf_counter() - started) * 1000)
+            return latencies
+
+        return asyncio.run(calls())
@@ -0,0 +1,235 @@
+import json
+import logging
+import subprocess
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from common.benchmarking import summarize
+from common.synthetic import SCALES, delete, generate, scale_options
+from users.follows import load_users
+from users.views import get_tokens_for_user
+
+# (name, url for viewer (user_type, user_id) and dataset, authenticated)
+ENDPOINTS = [
+    ('feed', lambda viewer, dataset: '/api/feed/posts/', False),
+    ('profile', lambda viewer, dataset: '/api/auth/profile/{}/{}/'.format(*dataset.users[0]), True),
+    ('discover', lambda viewer, dataset: '/api/auth/discover/', True),
+    ('notifications', lambda viewer, dataset: '/api/auth/notifications/', True),
+    ('chat_list', lambda viewer, dataset: '/api/messaging/chats/', True),
+    ('message_history', lambda viewer, dataset: room_of(viewer, dataset), True),
+]
+
+
+def room_of(viewer, dataset):
+    for room_id, members in dataset.rooms.items():
+        if viewer in members:
+            return f'/api/messaging/rooms/{room_id}/messages/'
+    return None
+
+
+class CountingHandler(logging.Handler):
+    """Counts the records that reach the root logger, i.e. that get formatted and written"""
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the feed, profile, discover, notifications, chat list and message history "
+        "endpoints against synthetic datasets of several sizes (see common/synthetic.py). "
+        "Each dataset is created in the configured database and deleted afterwards. "
+        "Write the results with --output and compare two runs with --compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='small,medium', help=f"Comma-separated, from {', '.join(SCALES)}")
+        parser.add_argument('--endpoints', default=','.join(name for name, _, _ in ENDPOINTS), help="Comma-separated subset")
+        parser.add_argument('--requests', type=int, default=30, help="Timed requests per endpoint and scale")
+        parser.add_argument('--warmup', type=int, default=3, help="Untimed requests per endpoint first")
+        parser.add_argument('--viewers', type=int, default=5, help="Users the requests rotate through")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the JSON results to this file")
+        parser.add_argument('--compare', help="JSON results of an earlier run to compare p50 latency and queries with")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+        parser.add_argument(
+            '--revalidate', action='store_true',
+            help="Send If-None-Match with the ETag of the previous response, as refreshing clients do",
+        )
+        parser.add_argument(
+            '--no-response-cache', action='store_true',
+            help="Disable the response cache, so cacheable endpoints are timed computing every response",
+        )
+        parser.add_argument(
+            '--logging-overhead', action='store_true',
+            help="Also time every endpoint with logging disabled and report log records per request",
+        )
+
+    def handle(self, *args, **options):
+        scales = [scale.strip() for scale in options['scales'].split(',') if scale.strip()]
+        unknown = set(scales) - set(SCALES)
+        if unknown:
+            raise CommandError(f"Unknown scales: {', '.join(sorted(unknown))}")
+        names = {name.strip() for name in options['endpoints'].split(',')}
+        endpoints = [endpoint for endpoint in ENDPOINTS if endpoint[0] in names]
+
+        results = {
+            'commit': current_commit(),
+            'database': connection.vendor,
+            'requests': options['requests'],
+            'response_cache': not options['no_response_cache'],
+            'scales': {},
+        }
+        # Cached endpoints are otherwise timed on cache hits after the warmup
+        response_cache = {**getattr(settings, 'RESPONSE_CACHE', {}), 'ENABLED': not options['no_response_cache']}
+        with override_settings(RESPONSE_CACHE=response_cache):
+            for scale in scales:
+                prefix = f"bench_ep_{uuid.uuid4().hex[:8]}"
+                try:
+                    dataset = generate(prefix, seed=options['seed'], **scale_options(scale))
+                    results['scales'][scale] = {
+                        'dataset': dataset.counts,
+                        'setup_s': dataset.elapsed_s,
+                        'endpoints': self.run_scale(dataset, endpoints, options),
+                    }
+                finally:
+                    delete(prefix)
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.print_results(results)
+        if options['compare']:
+            with open(options['compare']) as previous:
+                self.print_comparison(json.load(previous), results)
+
+    def run_scale(self, dataset, endpoints, options):
+        # The most followed and most active users come first
+        viewers = dataset.users[:options['viewers']]
+        loaded = load_users(viewers)
+        clients = {viewer: Client(HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(loaded[viewer])['access']}")
+                   for viewer in viewers}
+        anonymous = Client()
+
+        measured = {}
+        for name, url_for, authenticated in endpoints:
+            calls = []
+            for i in range(options['warmup'] + options['requests']):
+                viewer = viewers[i % len(viewers)]
+                url = url_for(viewer, dataset)
+                if url is not None:
+                    calls.append((clients[viewer] if authenticated else anonymous, url))
+            if not calls:
+                continue
+
+            if not options['logging_overhead']:
+                measured[name] = self.measure(calls, options['warmup'], options['revalidate'])
+                continue
+
+            counter = CountingHandler()
+            logging.getLogger().addHandler(counter)
+            try:
+                summary = self.measure(calls, options['warmup'], options['revalidate'])
+            finally:
+                logging.getLogger().removeHandler(counter)
+            summary['log_records_per_request'] = counter.count / len(calls)
+            logging.disable(logging.CRITICAL)
+            try:
+                summary['p50_ms_logging_disabled'] = self.measure(calls, options['warmup'], options['revalidate'])['p50_ms']
+            finally:
+                logging.disable(logging.NOTSET)
+            measured[name] = summary
+        return measured
+
+    def measure(self, calls, warmup, revalidate=False):
+        etags = {}
+        latencies = []
+        queries = []
+        sizes = []
+        status_codes = {}
+        started = None
+        for i, (client, url) in enumerate(calls):
+            if i == warmup:
+                started = time.perf_counter()
+            with ExitStack() as stack:
+                # Every alias, so reads sent to replicas (common.replicas) count too
+                captured = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+                request_started = time.perf_counter()
+                headers = {'HTTP_IF_NONE_MATCH': etags[client, url]} if revalidate and (client, url) in etags else {}
+                response = client.get(url, **headers)
+                elapsed_ms = (time.perf_counter() - request_started) * 1000
+            if response.has_header('ETag'):
+                etags[client, url] = response['ETag']
+            if i < warmup:
+                continue
+            latencies.append(elapsed_ms)
+            queries.append(sum(len(capture.captured_queries) for capture in captured))
+            sizes.append(len(response.content))
+            status_codes[response.status_code] = status_codes.get(response.status_code, 0) + 1
+
+        summary = summarize(latencies, time.perf_counter() - started if started else 0, status_codes)
+        summary['queries_avg'] = sum(queries) / len(queries) if queries else None
+        summary['queries_max'] = max(queries) if queries else None
+        summary['response_bytes_avg'] = sum(sizes) / len(sizes) if sizes else None
+        return summary
+
+    def print_results(self, results):
+        self.stdout.write(
+            f"commit {results['commit']} on {results['database']}, {results['requests']} requests per endpoint, "
+            f"response cache {'on' if results.get('response_cache', True) else 'off'}"
+        )
+        for scale, scale_results in results['scales'].items():
+            dataset = scale_results['dataset']
+            self.stdout.write(
+                f"\n{scale}: {dataset['artists'] + dataset['producers']} users, {dataset['posts']} posts, "
+                f"{dataset['likes']} likes, {dataset['messages']} messages (setup {scale_results['setup_s']:.1f}s)"
+            )
+            for name, summary in scale_results['endpoints'].items():
+                self.stdout.write(
+                    f"  {name:<16} p50 {summary['p50_ms']:8.1f} ms  p95 {summary['p95_ms']:8.1f} ms  "
+                    f"queries {summary['queries_avg']:6.1f}  {summary['response_bytes_avg'] / 1024:8.1f} KiB  "
+                    f"{summary['status_codes']}"
+                )
+                if 'log_records_per_request' in summary:
+                    self.stdout.write(
+                        f"  {'':<16} {summary['log_records_per_request']:.1f} log records/request, "
+                        f"p50 {summary['p50_ms_logging_disabled']:8.1f} ms with logging disabled"
+                    )
+
+    def print_comparison(self, previous, current):
+        self.stdout.write(f"\ncompared with commit {previous.get('commit')} (p50 ms and queries, before -> after)")
+        for scale, scale_results in current['scales'].items():
+            before_scale = previous.get('scales', {}).get(scale, {}).get('endpoints', {})
+            for name, after in scale_results['endpoints'].items():
+                before = before_scale.get(name)
+                if before is None:
+                    continue
+                change = (after['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+                self.stdout.write(
+                    f"  {scale:<7} {name:<16} {before['p50_ms']:8.1f} -> {after['p50_ms']:8.1f} ms ({change:+.0f}%)  "
+                    f"queries {before['queries_avg']:.1f} -> {after['queries_avg']:.1f}"
+                )
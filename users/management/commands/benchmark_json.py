@@ -0,0 +1,110 @@
+import io
+import json
+import statistics
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from common.fast_json import ORJSONParser, ORJSONRenderer, orjson
+from common.synthetic import SCALES, delete, generate, scale_options
+from users.follows import load_users
+from users.views import get_tokens_for_user
+
+from .benchmark_endpoints import ENDPOINTS
+
+
+def timed(function, repeat):
+    """Median milliseconds of ``repeat`` calls"""
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF's JSONRenderer and JSONParser with the orjson ones in common/fast_json.py "
+        "on the payloads of the feed, profile, discover, notifications, chat list and message "
+        "history endpoints, against a synthetic dataset created and deleted by the command. "
+        "Reports render and parse times, the share of the request spent rendering, and "
+        "whether both renderers produce the same bytes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', default='medium', help=f"One of {', '.join(SCALES)}")
+        parser.add_argument('--repeat', type=int, default=50, help="Timed renders and parses per payload")
+        parser.add_argument('--requests', type=int, default=5, help="Timed requests per endpoint")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        if options['scale'] not in SCALES:
+            raise CommandError(f"Unknown scale: {options['scale']}")
+        if orjson is None:
+            raise CommandError("orjson is not installed: pip install orjson")
+
+        results = {'scale': options['scale'], 'orjson': orjson.__version__, 'endpoints': {}}
+        prefix = f"bench_json_{uuid.uuid4().hex[:8]}"
+        # Time the views computing their payloads, not response cache hits
+        response_cache = {**getattr(settings, 'RESPONSE_CACHE', {}), 'ENABLED': False}
+        with override_settings(RESPONSE_CACHE=response_cache):
+            try:
+                dataset = generate(prefix, seed=options['seed'], **scale_options(options['scale']))
+                results['dataset'] = dataset.counts
+                viewer = dataset.users[0]
+                client = Client(HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(load_users([viewer])[viewer])['access']}")
+                for name, url_for, authenticated in ENDPOINTS:
+                    url = url_for(viewer, dataset)
+                    if url is not None:
+                        results['endpoints'][name] = self.measure(client if authenticated else Client(), url, options)
+            finally:
+                delete(prefix)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{options['scale']} dataset, orjson {results['orjson']}, median ms")
+        for name, result in results['endpoints'].items():
+            self.stdout.write(
+                f"  {name:<16} {result['bytes'] / 1024:8.1f} KiB  render {result['render_ms']['drf']:7.3f} -> "
+                f"{result['render_ms']['orjson']:7.3f} ({result['render_speedup']:4.1f}x)  parse "
+                f"{result['parse_ms']['drf']:7.3f} -> {result['parse_ms']['orjson']:7.3f}  request "
+                f"{result['request_ms']:7.1f}, rendering {result['render_share']['drf']:5.1%} -> "
+                f"{result['render_share']['orjson']:5.1%}  identical: {result['identical']}"
+            )
+
+    def measure(self, client, url, options):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f"GET {url} returned {response.status_code}")
+        data = response.data
+        drf, fast = JSONRenderer(), ORJSONRenderer()
+        content = drf.render(data, 'application/json')
+        render_ms = {
+            'drf': timed(lambda: drf.render(data, 'application/json'), options['repeat']),
+            'orjson': timed(lambda: fast.render(data, 'application/json'), options['repeat']),
+        }
+        context = {'encoding': 'utf-8'}
+        parse_ms = {
+            'drf': timed(lambda: JSONParser().parse(io.BytesIO(content), parser_context=context), options['repeat']),
+            'orjson': timed(lambda: ORJSONParser().parse(io.BytesIO(content), parser_context=context), options['repeat']),
+        }
+        request_ms = timed(lambda: client.get(url), options['requests'])
+        return {
+            'bytes': len(content),
+            'identical': fast.render(data, 'application/json') == content,
+            'render_ms': render_ms,
+            'render_speedup': render_ms['drf'] / render_ms['orjson'] if render_ms['orjson'] else None,
+            'parse_ms': parse_ms,
+            # The request renders with whichever renderer is configured
+            'request_ms': request_ms,
+            'render_share': {name: value / request_ms for name, value in render_ms.items()},
+        }
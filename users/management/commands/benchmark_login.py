@@ -0,0 +1,83 @@
+import json
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from common.benchmarking import run_concurrently
+from users.models import Artist, Producer
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure login throughput through POST /api/auth/login/. Creates temporary "
+        "artists and producers in the configured database and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help="Temporary users to create (half artists, half producers)")
+        parser.add_argument('--requests', type=int, default=200, help="Total login requests")
+        parser.add_argument('--concurrency', type=int, default=8, help="Concurrent client threads")
+        parser.add_argument('--iterations', type=int, default=None, help="Override PASSWORD_PBKDF2_ITERATIONS")
+        parser.add_argument('--verify-threads', type=int, default=None, help="Override PASSWORD_VERIFY_THREADS")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        overrides = {}
+        if options['iterations'] is not None:
+            overrides['PASSWORD_PBKDF2_ITERATIONS'] = options['iterations']
+        if options['verify_threads'] is not None:
+            overrides['PASSWORD_VERIFY_THREADS'] = options['verify_threads']
+
+        with override_settings(**overrides):
+            credentials = self.create_users(options['users'])
+            try:
+                results = self.run(credentials, options['requests'], options['concurrency'])
+            finally:
+                self.delete_users(credentials)
+
+        results['settings'] = overrides
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{results['requests']} logins in {results['elapsed_s']:.2f}s "
+            f"({results['throughput_rps']:.1f}/s, concurrency {results['concurrency']})"
+        )
+        self.stdout.write(
+            f"latency ms: p50 {results['p50_ms']:.1f}  p95 {results['p95_ms']:.1f}  "
+            f"p99 {results['p99_ms']:.1f}  max {results['max_ms']:.1f}"
+        )
+        self.stdout.write(f"status codes: {results['status_codes']}")
+
+    def create_users(self, count):
+        self.prefix = f"bench_login_{uuid.uuid4().hex[:8]}"
+        password = 'bench-password'
+        # Hash once: every temporary user shares the same password
+        encoded = make_password(password)
+        artists = [
+            Artist(username=f"{self.prefix}_a{i}", nom='Bench', prenom='Artist',
+                   email=f"{self.prefix}_a{i}@bench.local", password=encoded)
+            for i in range((count + 1) // 2)
+        ]
+        producers = [
+            Producer(username=f"{self.prefix}_p{i}", nom='Bench', prenom='Producer',
+                     email=f"{self.prefix}_p{i}@bench.local", password=encoded)
+            for i in range(count // 2)
+        ]
+        Artist.objects.bulk_create(artists)
+        Producer.objects.bulk_create(producers)
+        # Mixed-case emails exercise the case-insensitive lookup
+        return [(user.email.upper(), password) for user in artists + producers]
+
+    def delete_users(self, credentials):
+        Artist.objects.filter(username__startswith=self.prefix).delete()
+        Producer.objects.filter(username__startswith=self.prefix).delete()
+
+    def run(self, credentials, total, concurrency):
+        def login(client, i):
+            email, password = credentials[i % len(credentials)]
+            return client.post('/api/auth/login/', {'email': email, 'password': password})
+
+        return run_concurrently(login, total, concurrency)
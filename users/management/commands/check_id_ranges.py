@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, DEFAULT_DB_ALIAS
+
+from users.id_ranges import check_id_ranges, configure_id_ranges, next_producer_id, PRODUCER_ID_START
+
+
+class Command(BaseCommand):
+    help = "Validate (and optionally repair) the Artist/Producer ID ranges in the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help="Database alias to check")
+        parser.add_argument('--fix', action='store_true', help="Re-apply the producer sequence configuration")
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+
+        if options['fix']:
+            configure_id_ranges(connection)
+            self.stdout.write(f"Producer IDs configured to start at {PRODUCER_ID_START}")
+
+        self.stdout.write(f"Next producer ID: {next_producer_id(connection)}")
+
+        errors, warnings = check_id_ranges(connection)
+        for warning in warnings:
+            self.stdout.write(self.style.WARNING(f"- {warning}"))
+        for error in errors:
+            self.stderr.write(f"- {error}")
+
+        if errors:
+            raise CommandError("ID ranges are misconfigured; run with --fix")
+        self.stdout.write(self.style.SUCCESS("ID ranges OK"))
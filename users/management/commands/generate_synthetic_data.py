@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from common.synthetic import PASSWORD, SCALES, delete, generate, scale_options
+from users.models import Artist
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the configured database with a synthetic dataset: artists, producers, posts with "
+        "media stubs, likes, comments, follows, notifications and chat rooms with messages. "
+        "Rows are tied to usernames starting with --prefix; remove them with --delete."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small', help="Named dataset size")
+        parser.add_argument('--prefix', default='synthetic', help="Username prefix of the generated users")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--delete', action='store_true', help="Delete the dataset with this prefix instead")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+        for name in SCALES['small']:
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=None, help=f"Override the scale's {name}")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['delete']:
+            deleted = delete(prefix)
+            self.stdout.write(f"Deleted {deleted} synthetic users with prefix {prefix!r} and their data")
+            return
+
+        if Artist.objects.filter(username__startswith=f"{prefix}_").exists():
+            raise CommandError(f"A dataset with prefix {prefix!r} exists; use --delete first or another --prefix")
+
+        sizes = scale_options(options['scale'], **{name: options[name] for name in SCALES['small']})
+        dataset = generate(prefix, seed=options['seed'], **sizes)
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'prefix': prefix, 'scale': options['scale'], 'sizes': sizes,
+                'counts': dataset.counts, 'elapsed_s': dataset.elapsed_s,
+            }, indent=2))
+            return
+        self.stdout.write(f"Generated {options['scale']} dataset {prefix!r} in {dataset.elapsed_s:.1f}s:")
+        for name, count in dataset.counts.items():
+            self.stdout.write(f"  {name}: {count}")
+        self.stdout.write(f"Log in as {prefix}_a0@synthetic.local (password {PASSWORD!r})")
@@ -0,0 +1,35 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from users.mail_queue import MailQueueWorker, get_setting, run_workers
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbound email (see users.mail_queue)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="Number of worker threads")
+        parser.add_argument('--batch-size', type=int, default=None, help="Emails claimed per batch")
+        parser.add_argument('--poll-interval', type=float, default=None, help="Seconds to sleep when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="Send everything that is due, then exit")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            worker = MailQueueWorker(options['batch_size'])
+            try:
+                processed = worker.drain()
+            finally:
+                worker.close()
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} queued email(s)"))
+            return
+
+        workers = options['workers'] or get_setting('WORKERS')
+        stop_event = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop_event.set())
+
+        self.stdout.write(f"Sending queued mail with {workers} worker(s); press Ctrl+C to stop")
+        run_workers(workers, options['batch_size'], stop_event, options['poll_interval'])
+        self.stdout.write("Mail queue workers stopped")
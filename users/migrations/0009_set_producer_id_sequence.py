@@ -4,6 +4,14 @@ from django.db import migrations, models
 from django.conf import settings
 
 
+def set_producer_id_sequence(apps, schema_editor):
+    # pg_get_serial_sequence only exists on PostgreSQL; other databases are
+    # configured by 0014_producer_id_range.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("SELECT setval(pg_get_serial_sequence('users_producer', 'id'), 1000000, false);")
+
+
 class Migration(migrations.Migration):
 
     dependencies = [
@@ -12,8 +20,5 @@ class Migration(migrations.Migration):
 
     operations = [
         # For PostgreSQL - sets the sequence to start at 1,000,000
-        migrations.RunSQL(
-            sql="SELECT setval(pg_get_serial_sequence('users_producer', 'id'), 1000000, false);",
-            reverse_sql="-- No reverse migration needed"
-        ),
+        migrations.RunPython(set_producer_id_sequence, migrations.RunPython.noop),
     ]
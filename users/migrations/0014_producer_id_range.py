@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def configure_id_ranges(apps, schema_editor):
+    """
+    Move producer ID allocation into the database sequence so that
+    save(), create() and bulk_create() all allocate from 1,000,000 upwards.
+    """
+    from users.id_ranges import configure_id_ranges as configure
+
+    configure(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_populate_collaboration_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(configure_id_ranges, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_producer_id_range'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='notification',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['artist', 'read', 'created_at'], name='notif_artist_read_created'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['producer', 'read', 'created_at'], name='notif_producer_read_created'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['artist', '-created_at', '-id'], name='notif_artist_inbox'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['producer', '-created_at', '-id'], name='notif_producer_inbox'),
+        ),
+    ]
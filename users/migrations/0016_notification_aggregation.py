@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0015_notification_inbox_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='window_start',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('window_start__isnull', False)), fields=('artist', 'notification_type', 'post_id', 'window_start'), name='notif_artist_aggregate'),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('window_start__isnull', False)), fields=('producer', 'notification_type', 'post_id', 'window_start'), name='notif_producer_aggregate'),
+        ),
+    ]
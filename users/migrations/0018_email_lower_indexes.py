@@ -0,0 +1,22 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:19
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0017_outbound_email'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='artist',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='artist_email_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='producer',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='producer_email_lower'),
+        ),
+    ]
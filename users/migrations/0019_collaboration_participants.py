@@ -0,0 +1,60 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def index_existing_requests(apps, schema_editor):
+    """Create the sender and receiver participant rows of existing requests"""
+    CollaborationRequest = apps.get_model('users', 'CollaborationRequest')
+    CollaborationParticipant = apps.get_model('users', 'CollaborationParticipant')
+
+    rows = []
+    for collab_request in CollaborationRequest.objects.iterator(chunk_size=2000):
+        sides = (
+            ('sender', collab_request.sender_artist_id, collab_request.sender_producer_id),
+            ('receiver', collab_request.receiver_artist_id, collab_request.receiver_producer_id),
+        )
+        for role, artist_id, producer_id in sides:
+            if not (artist_id or producer_id):
+                continue
+            rows.append(CollaborationParticipant(
+                request_id=collab_request.id,
+                participant_type='artist' if artist_id else 'producer',
+                participant_id=artist_id or producer_id,
+                role=role,
+                status=collab_request.status,
+                created_at=collab_request.created_at,
+            ))
+        if len(rows) >= 2000:
+            CollaborationParticipant.objects.bulk_create(rows)
+            rows = []
+    CollaborationParticipant.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0018_email_lower_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollaborationParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('participant_type', models.CharField(choices=[('artist', 'Artist'), ('producer', 'Producer')], max_length=10)),
+                ('participant_id', models.BigIntegerField()),
+                ('role', models.CharField(choices=[('sender', 'Sender'), ('receiver', 'Receiver')], max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('rejected', 'Rejected')], default='pending', max_length=10)),
+                ('created_at', models.DateTimeField()),
+                ('request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='users.collaborationrequest')),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['participant_type', 'participant_id', '-created_at', '-id'], name='collab_participant_inbox'), models.Index(fields=['participant_type', 'participant_id', 'status', '-created_at', '-id'], name='collab_participant_status')],
+                'constraints': [models.UniqueConstraint(fields=('request', 'role'), name='collab_participant_role')],
+            },
+        ),
+        migrations.RunPython(index_existing_requests, migrations.RunPython.noop),
+    ]
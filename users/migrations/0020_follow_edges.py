@@ -0,0 +1,102 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:35
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def copy_follow_relations(apps, schema_editor):
+    """
+    Move the old self-referencing followers/following M2M rows into Follow
+    edges and fill in the denormalized counts.
+    """
+    Follow = apps.get_model('users', 'Follow')
+
+    edges = set()
+    for user_type, model_name in (('artist', 'Artist'), ('producer', 'Producer')):
+        model = apps.get_model('users', model_name)
+        from_field = f'from_{model_name.lower()}_id'
+        to_field = f'to_{model_name.lower()}_id'
+        # user.followers contains the users following them ...
+        for followee_id, follower_id in model.followers.through.objects.values_list(from_field, to_field):
+            edges.add((user_type, follower_id, user_type, followee_id))
+        # ... and user.following the users they follow
+        for follower_id, followee_id in model.following.through.objects.values_list(from_field, to_field):
+            edges.add((user_type, follower_id, user_type, followee_id))
+
+    Follow.objects.bulk_create([
+        Follow(follower_type=follower_type, follower_id=follower_id, followee_type=followee_type, followee_id=followee_id)
+        for follower_type, follower_id, followee_type, followee_id in edges
+        if (follower_type, follower_id) != (followee_type, followee_id)
+    ], batch_size=2000)
+
+    for user_type, model_name in (('artist', 'Artist'), ('producer', 'Producer')):
+        model = apps.get_model('users', model_name)
+        followers = Follow.objects.filter(followee_type=user_type).values('followee_id').annotate(total=Count('id'))
+        for row in followers:
+            model.objects.filter(id=row['followee_id']).update(followers_count=row['total'])
+        following = Follow.objects.filter(follower_type=user_type).values('follower_id').annotate(total=Count('id'))
+        for row in following:
+            model.objects.filter(id=row['follower_id']).update(following_count=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0019_collaboration_participants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artist',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='producer',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='producer',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Follow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('follower_type', models.CharField(choices=[('artist', 'Artist'), ('producer', 'Producer')], max_length=10)),
+                ('follower_id', models.BigIntegerField()),
+                ('followee_type', models.CharField(choices=[('artist', 'Artist'), ('producer', 'Producer')], max_length=10)),
+                ('followee_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['followee_type', 'followee_id', '-created_at', '-id'], name='follow_followers'), models.Index(fields=['follower_type', 'follower_id', '-created_at', '-id'], name='follow_following')],
+                'constraints': [models.UniqueConstraint(fields=('follower_type', 'follower_id', 'followee_type', 'followee_id'), name='follow_edge')],
+            },
+        ),
+        migrations.RunPython(copy_follow_relations, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='artist',
+            name='followers',
+        ),
+        migrations.RemoveField(
+            model_name='artist',
+            name='following',
+        ),
+        migrations.RemoveField(
+            model_name='producer',
+            name='followers',
+        ),
+        migrations.RemoveField(
+            model_name='producer',
+            name='following',
+        ),
+    ]
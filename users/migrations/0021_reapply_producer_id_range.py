@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def configure_id_ranges(apps, schema_editor):
+    """
+    Adding the follow count columns in 0020 rebuilds users_producer on
+    SQLite, which drops its sqlite_sequence row and with it the producer ID
+    range set up in 0014; set it up again.
+    """
+    from users.id_ranges import configure_id_ranges as configure
+
+    configure(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0020_follow_edges'),
+    ]
+
+    operations = [
+        migrations.RunPython(configure_id_ranges, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,13 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.hashers import make_password
 from django.core.validators import FileExtensionValidator
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 import os
 import logging
+from .hashers import is_password_hashed
+from .id_ranges import PRODUCER_ID_START
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +36,7 @@ class ArtistManager(models.Manager):
         """Get an artist by user_id, returns None if the ID is in the producer range"""
         try:
             user_id = int(user_id)
-            if user_id >= 1000000:  # This is a producer ID
+            if user_id >= PRODUCER_ID_START:  # This is a producer ID
                 return None
             return self.get(id=user_id)
         except (ValueError, self.model.DoesNotExist):
@@ -43,12 +47,25 @@ class ProducerManager(models.Manager):
         """Get a producer by user_id, returns None if the ID is in the artist range"""
         try:
             user_id = int(user_id)
-            if user_id < 1000000:  # This is an artist ID
+            if user_id < PRODUCER_ID_START:  # This is an artist ID
                 return None
             return self.get(id=user_id)
         except (ValueError, self.model.DoesNotExist):
             return None
 
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Apply the same normalization as Producer.save() before inserting.
+        IDs are allocated by the database sequence, so bulk imports land in
+        the producer range without any per-row lookups.
+        """
+        objs = list(objs)
+        for obj in objs:
+            obj.email = obj.email.lower()
+            if obj.password and not is_password_hashed(obj.password):
+                obj.password = make_password(obj.password)
+        return super().bulk_create(objs, *args, **kwargs)
+
 # Utility function to get a user by ID without knowing the type
 def get_user_by_id(user_id):
     """
@@ -58,14 +75,14 @@ def get_user_by_id(user_id):
     """
     try:
         user_id = int(user_id)
-        if user_id >= 1000000:  # Producer range
+        if user_id >= PRODUCER_ID_START:  # Producer range
             producer = Producer.objects.get(id=user_id)
             return producer, 'producer'
         else:  # Artist range
             artist = Artist.objects.get(id=user_id)
             return artist, 'artist'
     except (ValueError, Artist.DoesNotExist, Producer.DoesNotExist):
-        logger.warning(f"User not found with ID: {user_id}")
+        logger.warning("User not found with ID: %s", user_id)
         return None, None
 
 class Artist(models.Model):
@@ -98,17 +115,24 @@ class Artist(models.Model):
     talents = models.TextField(blank=True, null=True)
     genres = models.TextField(blank=True, null=True)
     location = models.CharField(max_length=255, blank=True, null=True)  # Added location
-    followers = models.ManyToManyField("self", symmetrical=False, related_name="user_followers", blank=True)  # Followers system
-    following = models.ManyToManyField("self", symmetrical=False, related_name="user_following", blank=True)  # Following system
     created_at = models.DateTimeField(auto_now_add=True)
     reset_code = models.CharField(max_length=6, blank=True, null=True)
     collaboration_count = models.PositiveIntegerField(default=0)  # Track number of successful collaborations
+    # Maintained together with the Follow edges (see users.follows)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
 
     # Use custom manager
     objects = ArtistManager()
 
+    class Meta:
+        indexes = [
+            # Case-insensitive login lookups (see users.credentials.find_user_by_email)
+            models.Index(Lower('email'), name='artist_email_lower'),
+        ]
+
     def save(self, *args, **kwargs):
-        if self.password and not self.password.startswith("pbkdf2_sha256$"):
+        if self.password and not is_password_hashed(self.password):
             self.password = make_password(self.password)
 
         # Delete old profile picture if it exists
@@ -155,33 +179,30 @@ class Producer(models.Model):
     website = models.URLField(blank=True, null=True)
     genres = models.TextField(blank=True, null=True)
     location = models.CharField(max_length=255, blank=True, null=True)  # Added location
-    followers = models.ManyToManyField("self", symmetrical=False, related_name="producer_followers", blank=True)  # Followers system
-    following = models.ManyToManyField("self", symmetrical=False, related_name="producer_following", blank=True)  # Following system
     created_at = models.DateTimeField(auto_now_add=True)
     reset_code = models.CharField(max_length=6, blank=True, null=True)
     collaboration_count = models.PositiveIntegerField(default=0)  # Track number of successful collaborations
+    # Maintained together with the Follow edges (see users.follows)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
 
     # Use custom manager
     objects = ProducerManager()
 
+    class Meta:
+        indexes = [
+            # Case-insensitive login lookups (see users.credentials.find_user_by_email)
+            models.Index(Lower('email'), name='producer_email_lower'),
+        ]
+
     def save(self, *args, **kwargs):
         self.email = self.email.lower()  # Always store emails in lowercase
 
-        if self.password and not self.password.startswith("pbkdf2_sha256$"):
+        if self.password and not is_password_hashed(self.password):
             self.password = make_password(self.password)
 
-        # Ensure new producers get IDs starting from 1,000,000
-        if not self.pk:
-            # Check if we're adding a new record
-            last_id = Producer.objects.all().order_by('-id').values_list('id', flat=True).first() or 0
-            if last_id < 1000000:
-                # If we haven't yet reached the 1M range, explicitly set the ID
-                from django.db import connection
-                db_engine = connection.settings_dict['ENGINE']
-                if 'sqlite' in db_engine:
-                    # For SQLite
-                    self.id = 1000000
-                # For PostgreSQL, the migration will handle this via sequence
+        # New producers get IDs from 1,000,000 upwards via the table's
+        # sequence (see users.id_ranges), which also covers bulk_create
 
         # Delete old profile picture if it exists
         if self.pk:
@@ -230,6 +251,78 @@ class CollaborationRequest(models.Model):
         receiver_name = self.receiver.username if self.receiver else "Unknown"
         return f"Collaboration request from {sender_name} to {receiver_name}"
 
+class CollaborationParticipant(models.Model):
+    """
+    One row per participant of a CollaborationRequest (its sender and its
+    receiver), so a user's requests in either role can be read with one
+    indexed range scan on (participant_type, participant_id). Status and
+    created_at are copied from the request and kept in sync by
+    users.collaborations.
+    """
+    ROLE_CHOICES = [
+        ('sender', 'Sender'),
+        ('receiver', 'Receiver')
+    ]
+    PARTICIPANT_TYPES = [
+        ('artist', 'Artist'),
+        ('producer', 'Producer')
+    ]
+
+    request = models.ForeignKey('CollaborationRequest', on_delete=models.CASCADE, related_name='participants')
+    participant_type = models.CharField(max_length=10, choices=PARTICIPANT_TYPES)
+    participant_id = models.BigIntegerField()
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    status = models.CharField(max_length=10, choices=CollaborationRequest.STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        constraints = [
+            models.UniqueConstraint(fields=['request', 'role'], name='collab_participant_role'),
+        ]
+        indexes = [
+            # Keyset pagination of a user's requests, optionally by status
+            models.Index(fields=['participant_type', 'participant_id', '-created_at', '-id'], name='collab_participant_inbox'),
+            models.Index(fields=['participant_type', 'participant_id', 'status', '-created_at', '-id'], name='collab_participant_status'),
+        ]
+
+    def __str__(self):
+        return f"{self.participant_type} {self.participant_id} ({self.role}) on request {self.request_id}"
+
+class Follow(models.Model):
+    """
+    "follower follows followee" between any two users, artists and producers
+    alike. The unique constraint doubles as the index for "who does X
+    follow" lookups (including batch "does X follow these users" checks);
+    follow_followers serves the reverse direction.
+    """
+    USER_TYPES = [
+        ('artist', 'Artist'),
+        ('producer', 'Producer')
+    ]
+
+    follower_type = models.CharField(max_length=10, choices=USER_TYPES)
+    follower_id = models.BigIntegerField()
+    followee_type = models.CharField(max_length=10, choices=USER_TYPES)
+    followee_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['follower_type', 'follower_id', 'followee_type', 'followee_id'], name='follow_edge',
+            ),
+        ]
+        indexes = [
+            # Keyset pagination of a user's followers and of who they follow
+            models.Index(fields=['followee_type', 'followee_id', '-created_at', '-id'], name='follow_followers'),
+            models.Index(fields=['follower_type', 'follower_id', '-created_at', '-id'], name='follow_following'),
+        ]
+
+    def __str__(self):
+        return f"{self.follower_type} {self.follower_id} follows {self.followee_type} {self.followee_id}"
+
 class Notification(models.Model):
     NOTIFICATION_TYPES = [
         ('collaboration_request', 'Collaboration Request'),
@@ -253,9 +346,35 @@ class Notification(models.Model):
     post_id = models.IntegerField(null=True, blank=True)  # ID of the related post
     read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Likes/comments on the same post within one time window are coalesced
+    # into a single row (see users.notifications.aggregate_post_notification)
+    actor_count = models.PositiveIntegerField(default=1)
+    window_start = models.DateTimeField(null=True, blank=True)
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        constraints = [
+            # Upsert target for aggregated notifications: one row per
+            # (recipient, type, post, window)
+            models.UniqueConstraint(
+                fields=['artist', 'notification_type', 'post_id', 'window_start'],
+                condition=models.Q(window_start__isnull=False),
+                name='notif_artist_aggregate',
+            ),
+            models.UniqueConstraint(
+                fields=['producer', 'notification_type', 'post_id', 'window_start'],
+                condition=models.Q(window_start__isnull=False),
+                name='notif_producer_aggregate',
+            ),
+        ]
+        indexes = [
+            # Unread badge counts and "unread only" inbox filters
+            models.Index(fields=['artist', 'read', 'created_at'], name='notif_artist_read_created'),
+            models.Index(fields=['producer', 'read', 'created_at'], name='notif_producer_read_created'),
+            # Keyset pagination of the inbox on (created_at, id)
+            models.Index(fields=['artist', '-created_at', '-id'], name='notif_artist_inbox'),
+            models.Index(fields=['producer', '-created_at', '-id'], name='notif_producer_inbox'),
+        ]
 
     @property
     def user(self):
@@ -270,3 +389,43 @@ class Notification(models.Model):
     def __str__(self):
         user_name = self.user.username if self.user else "Unknown"
         return f"Notification for {user_name}: {self.message[:50]}..."
+
+class OutboundEmail(models.Model):
+    """
+    Outbox row for mail sent through users.mail_queue. Requests only insert
+    a row; the queue workers deliver it and record the outcome.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed')
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)
+    recipients = models.JSONField(default=list)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    # Set when a worker claims the row; rows stuck in 'sending' past the
+    # lease are picked up again
+    claim_token = models.CharField(max_length=32, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            # Workers poll for due rows in status order
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_due'),
+            models.Index(fields=['claim_token'], name='outbox_claim_token'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
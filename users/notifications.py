@@ -0,0 +1,334 @@
+"""
+Notification inbox helpers: recipient resolution, fan-out and the cached
+per-user unread counter used by the notification badge.
+
+New notifications and badge changes are also pushed to the recipient's
+websocket group (see messaging.consumers.NotificationConsumer) once the
+surrounding transaction commits. Both bump the recipient's inbox version
+(the notifications:<id> tag), from which NotificationView derives its ETag.
+
+The counter lives in the default cache under ``notifications:unread:<type>:<id>``.
+It is adjusted in place when notifications are created, read or deleted,
+and recomputed from the (recipient, read, created_at) index on a miss, so a
+dropped update only lasts until the key expires.
+"""
+import datetime
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from common.response_cache import invalidate, notifications_tag
+
+from .id_ranges import PRODUCER_ID_START
+from .models import Artist, Producer, Notification
+
+logger = logging.getLogger(__name__)
+
+UNREAD_COUNT_TIMEOUT = 60 * 60  # 1 hour
+
+# Notification types that are coalesced per post and time window
+AGGREGATED_TYPES = ('like', 'comment')
+AGGREGATED_MESSAGES = {
+    'like': "{name} and {others} liked your post.",
+    'comment': "{name} and {others} commented on your post.",
+}
+
+
+def unread_count_key(user_type, user_id):
+    return f"notifications:unread:{user_type}:{user_id}"
+
+
+def notification_group_name(user_type, user_id):
+    """Channel layer group that a user's notification sockets join"""
+    return f"notifications_{user_type}_{user_id}"
+
+
+def get_user_type(user):
+    """
+    Return 'artist' or 'producer' for an authenticated user without
+    touching the database when the user object already tells us.
+    """
+    if isinstance(user, Artist):
+        return 'artist'
+    if isinstance(user, Producer):
+        return 'producer'
+
+    user_type = getattr(user, 'user_type', None)
+    if user_type in ('artist', 'producer'):
+        return user_type
+
+    # Authenticated through a backend that doesn't return our models:
+    # fall back to the database, then to the ID range
+    if Producer.objects.filter(id=user.id).exists():
+        return 'producer'
+    if Artist.objects.filter(id=user.id).exists():
+        return 'artist'
+    return 'producer' if user.id >= PRODUCER_ID_START else None
+
+
+def recipient_of(notification):
+    """Return (user_type, user_id) of the notification's recipient"""
+    if notification.artist_id:
+        return 'artist', notification.artist_id
+    if notification.producer_id:
+        return 'producer', notification.producer_id
+    return None, None
+
+
+def notifications_for(user_type, user_id):
+    """Return the notification queryset of a recipient"""
+    if user_type == 'producer':
+        return Notification.objects.filter(producer_id=user_id)
+    return Notification.objects.filter(artist_id=user_id)
+
+
+def get_unread_count(user_type, user_id):
+    """Return the unread counter, computing and caching it on a miss"""
+    key = unread_count_key(user_type, user_id)
+    count = cache.get(key)
+    if count is None:
+        count = notifications_for(user_type, user_id).filter(read=False).count()
+        cache.set(key, count, UNREAD_COUNT_TIMEOUT)
+    return count
+
+
+def adjust_unread_count(user_type, user_id, delta):
+    """
+    Apply a delta to a cached unread counter. A missing key is left alone:
+    it will be recomputed from the database on the next read.
+    """
+    if not user_type or not user_id or not delta:
+        return
+    key = unread_count_key(user_type, user_id)
+    try:
+        if cache.incr(key, delta) < 0:
+            cache.delete(key)
+    except ValueError:
+        pass
+
+
+def reset_unread_count(user_type, user_id):
+    """Mark the counter as zero after all notifications were read"""
+    cache.set(unread_count_key(user_type, user_id), 0, UNREAD_COUNT_TIMEOUT)
+
+
+def fan_out(notifications):
+    """
+    Insert several notifications in one query and bump the unread counter
+    of each recipient. bulk_create skips post_save, so the counters are
+    adjusted here instead of in the signal handler.
+    """
+    notifications = Notification.objects.bulk_create(notifications)
+    deltas = {}
+    for notification in notifications:
+        if notification.read:
+            continue
+        recipient = recipient_of(notification)
+        deltas[recipient] = deltas.get(recipient, 0) + 1
+    for (user_type, user_id), delta in deltas.items():
+        adjust_unread_count(user_type, user_id, delta)
+    for notification in notifications:
+        publish_notification(notification)
+    return notifications
+
+
+def _group_send(user_type, user_id, message):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(notification_group_name(user_type, user_id), message)
+    except Exception as e:
+        # Live push is best effort; clients still see the inbox on their next fetch
+        logger.error("Notification push to %s %s failed: %s", user_type, user_id, e)
+
+
+def push_notification(notification, unread_delta=None):
+    """Send a new notification and the badge delta to the recipient's sockets"""
+    from .serializers import NotificationSerializer
+
+    user_type, user_id = recipient_of(notification)
+    if not user_type:
+        return
+    if unread_delta is None:
+        unread_delta = 0 if notification.read else 1
+    _group_send(user_type, user_id, {
+        'type': 'notification.created',
+        'notification': NotificationSerializer(notification, context={'base_url': settings.PUBLIC_BASE_URL}).data,
+        'unread_delta': unread_delta,
+        'unread_count': get_unread_count(user_type, user_id),
+    })
+
+
+def push_unread_count(user_type, user_id, delta=None):
+    """Send a badge change (delta=None means the count was reset)"""
+    if not user_type:
+        return
+    _group_send(user_type, user_id, {
+        'type': 'notification.unread',
+        'unread_delta': delta,
+        'unread_count': get_unread_count(user_type, user_id),
+    })
+
+
+def publish_notification(notification, unread_delta=None):
+    """Push a notification to its recipient once the transaction commits"""
+    invalidate(notifications_tag(recipient_of(notification)[1]))
+    transaction.on_commit(lambda: push_notification(notification, unread_delta))
+
+
+def publish_unread_count(user_type, user_id, delta=None):
+    """Push a badge change once the transaction commits"""
+    invalidate(notifications_tag(user_id))
+    transaction.on_commit(lambda: push_unread_count(user_type, user_id, delta))
+
+
+def get_aggregation_window():
+    return getattr(settings, 'NOTIFICATION_AGGREGATION_WINDOW', datetime.timedelta(hours=1))
+
+
+def window_start_for(moment, window=None):
+    """Return the start of the aggregation window containing ``moment``"""
+    window = window or get_aggregation_window()
+    seconds = int(window.total_seconds())
+    epoch = int(moment.timestamp())
+    return datetime.datetime.fromtimestamp(epoch - epoch % seconds, tz=datetime.timezone.utc)
+
+
+def aggregated_message(notification_type, name, actor_count):
+    """Render "X and N others liked your post." for a coalesced notification"""
+    others = actor_count - 1
+    return AGGREGATED_MESSAGES[notification_type].format(
+        name=name,
+        others=f"{others} other" if others == 1 else f"{others} others",
+    )
+
+
+def window_actor_count(notification_type, post, window_start):
+    """
+    Subquery counting the distinct artists and producers, other than the
+    post's owner, who liked or commented on ``post`` in the window
+    """
+    from feed.models import Comment, Like  # Import here to avoid circular imports
+
+    model = Like if notification_type == 'like' else Comment
+    actions = (
+        model.objects
+        .filter(post_id=post.id, created_at__gte=window_start, created_at__lt=window_start + get_aggregation_window())
+        .exclude(user_type=post.user_type, user_id=post.user_id)
+        .values('post_id')
+        .annotate(actors=(
+            Count('user_id', filter=Q(user_type='artist'), distinct=True)
+            + Count('user_id', filter=Q(user_type='producer'), distinct=True)
+        ))
+        .values('actors')
+    )
+    return Subquery(actions)
+
+
+def aggregate_post_notification(notification_type, post, sender, sender_type, message):
+    """
+    Record a like/comment notification for the owner of ``post``.
+
+    All actions on the same post within one aggregation window share a
+    single row, upserted on (recipient, type, post_id, window_start): the
+    common case is a single UPDATE that moves the row to the top of the
+    inbox and recounts ``actor_count`` as the distinct people (other than
+    the owner) who liked or commented on the post within the window, from
+    the Like/Comment rows. So a sender acting again, even after someone
+    else, doesn't inflate the count.
+    """
+    now = timezone.now()
+    window_start = window_start_for(now)
+    recipient = {'artist_id': post.user_id} if post.user_type == 'artist' else {'producer_id': post.user_id}
+    if sender_type == 'artist':
+        sender_fields = {'sender_artist_id': sender.id, 'sender_producer_id': None}
+    else:
+        sender_fields = {'sender_producer_id': sender.id, 'sender_artist_id': None}
+
+    existing = Notification.objects.filter(
+        notification_type=notification_type,
+        post_id=post.id,
+        window_start=window_start,
+        **recipient,
+    )
+    changes = dict(
+        # At least the sender, whose action may fall just before the window
+        actor_count=Coalesce(window_actor_count(notification_type, post, window_start), 1),
+        message=message,
+        created_at=now,
+        **sender_fields,
+    )
+
+    # Still unread: the badge already counts it. Already read: it becomes
+    # unread again and counts once more.
+    if existing.filter(read=False).update(**changes):
+        unread_delta = 0
+    elif existing.filter(read=True).update(read=False, **changes):
+        unread_delta = 1
+    else:
+        try:
+            with transaction.atomic():
+                # post_save takes care of the badge and the live push
+                return Notification.objects.create(
+                    notification_type=notification_type,
+                    post_id=post.id,
+                    related_id=post.id,
+                    window_start=window_start,
+                    message=message,
+                    **recipient,
+                    **sender_fields,
+                )
+        except IntegrityError:
+            # Another request created the row for this window first
+            existing.update(**changes)
+            unread_delta = 0
+
+    user_type, user_id = ('artist', post.user_id) if post.user_type == 'artist' else ('producer', post.user_id)
+    adjust_unread_count(user_type, user_id, unread_delta)
+    notification = existing.first()
+    if notification is not None:
+        publish_notification(notification, unread_delta)
+    return notification
+
+
+def group_notifications(notifications):
+    """
+    Retroactively group a page of notifications: rows written before
+    aggregation existed (one per like/comment) are folded into the newest
+    row of their (type, post, window) group. The head row gets
+    ``actor_count`` summed over distinct senders and ``grouped_ids``.
+    """
+    window = get_aggregation_window()
+    grouped = []
+    heads = {}
+    for notification in notifications:
+        notification.grouped_ids = [notification.id]
+        post_key = notification.post_id or notification.related_id
+        if notification.notification_type not in AGGREGATED_TYPES or not post_key:
+            grouped.append(notification)
+            continue
+
+        window_start = notification.window_start or window_start_for(notification.created_at, window)
+        key = (notification.notification_type, post_key, window_start)
+        head = heads.get(key)
+        if head is None:
+            heads[key] = notification
+            notification.group_senders = {(notification.sender_artist_id, notification.sender_producer_id)}
+            grouped.append(notification)
+            continue
+
+        head.grouped_ids.append(notification.id)
+        sender = (notification.sender_artist_id, notification.sender_producer_id)
+        if sender not in head.group_senders:
+            head.group_senders.add(sender)
+            head.actor_count += notification.actor_count
+        head.read = head.read and notification.read
+    return grouped
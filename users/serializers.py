@@ -1,19 +1,49 @@
 from rest_framework import serializers
 from .models import Artist, Producer, CollaborationRequest, Notification
+from .follows import following_set, viewer_of
 from django.conf import settings
 import logging
 import time
 
 logger = logging.getLogger(__name__)
 
+class UserListSerializer(serializers.ListSerializer):
+    """
+    Serializes a list of artists or producers with the viewer's follow state
+    for all of them loaded in one query (see users.follows.following_set).
+    """
+
+    def to_representation(self, data):
+        users = list(data.all() if hasattr(data, 'all') else data)
+        viewer = viewer_of(self.context.get('request'))
+        if viewer and 'follow_state' not in self.context:
+            user_type = self.child.Meta.user_type
+            self.context['follow_state'] = following_set(*viewer, [(user_type, user.id) for user in users])
+        return [self.child.to_representation(item) for item in users]
+
+
+class FollowStateMixin:
+    """``is_following``: whether the requesting user follows this user"""
+
+    def get_is_following(self, obj):
+        follow_state = self.context.get('follow_state')
+        if follow_state is None:
+            viewer = viewer_of(self.context.get('request'))
+            if viewer is None:
+                return False
+            follow_state = following_set(*viewer, [(self.Meta.user_type, obj.id)])
+        return (self.Meta.user_type, obj.id) in follow_state
+
+
 # Artist Serializer
-class ArtistSerializer(serializers.ModelSerializer):
+class ArtistSerializer(FollowStateMixin, serializers.ModelSerializer):
     profile_picture = serializers.SerializerMethodField()
     cover_photo = serializers.SerializerMethodField()
     genres = serializers.SerializerMethodField()
     talents = serializers.SerializerMethodField()
     profile_url = serializers.SerializerMethodField()
     user_type = serializers.SerializerMethodField()
+    is_following = serializers.SerializerMethodField()
 
     def get_profile_picture(self, obj):
         if obj.profile_picture:
@@ -46,17 +76,21 @@ class ArtistSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'username', 'nom', 'prenom', 'email', 'profile_picture',
             'cover_photo', 'bio', 'talents', 'genres', 'location', 'created_at',
-            'profile_url', 'user_type', 'collaboration_count'
+            'profile_url', 'user_type', 'collaboration_count', 'followers_count', 'following_count',
+            'is_following'
         ]
         extra_kwargs = {'password': {'write_only': True}}  # Hide password in API responses
+        list_serializer_class = UserListSerializer
+        user_type = 'artist'
 
 # Producer Serializer
-class ProducerSerializer(serializers.ModelSerializer):
+class ProducerSerializer(FollowStateMixin, serializers.ModelSerializer):
     profile_picture = serializers.SerializerMethodField()
     cover_photo = serializers.SerializerMethodField()
     genres = serializers.SerializerMethodField()
     profile_url = serializers.SerializerMethodField()
     user_type = serializers.SerializerMethodField()
+    is_following = serializers.SerializerMethodField()
 
     def get_profile_picture(self, obj):
         if obj.profile_picture:
@@ -84,11 +118,37 @@ class ProducerSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'username', 'nom', 'prenom', 'email', 'profile_picture',
             'cover_photo', 'bio', 'studio_name', 'website', 'genres',
-            'location', 'created_at', 'profile_url', 'user_type', 'collaboration_count'
+            'location', 'created_at', 'profile_url', 'user_type', 'collaboration_count',
+            'followers_count', 'following_count', 'is_following'
         ]
         extra_kwargs = {'password': {'write_only': True}}  # Hide password in API responses
+        list_serializer_class = UserListSerializer
+        user_type = 'producer'
 
 # Collaboration Request Serializer
+class CollaborationRequestListSerializer(serializers.ListSerializer):
+    """
+    Serializes a list of collaboration requests with one query per user
+    model: every sender and receiver on the list is loaded up front.
+    """
+
+    def to_representation(self, data):
+        collab_requests = list(data.all() if hasattr(data, 'all') else data)
+        self.context['collaboration_batch'] = self.load_related(collab_requests)
+        return [self.child.to_representation(item) for item in collab_requests]
+
+    def load_related(self, collab_requests):
+        artist_ids = set()
+        producer_ids = set()
+        for collab_request in collab_requests:
+            artist_ids.update(filter(None, (collab_request.sender_artist_id, collab_request.receiver_artist_id)))
+            producer_ids.update(filter(None, (collab_request.sender_producer_id, collab_request.receiver_producer_id)))
+        return {
+            'artists': Artist.objects.in_bulk(artist_ids) if artist_ids else {},
+            'producers': Producer.objects.in_bulk(producer_ids) if producer_ids else {},
+        }
+
+
 class CollaborationRequestSerializer(serializers.ModelSerializer):
     sender_details = serializers.SerializerMethodField()
     receiver_details = serializers.SerializerMethodField()
@@ -102,142 +162,171 @@ class CollaborationRequestSerializer(serializers.ModelSerializer):
             'sender_type', 'receiver_type', 'sender_details', 'receiver_details'
         ]
         read_only_fields = ['id', 'status', 'created_at', 'updated_at']
+        list_serializer_class = CollaborationRequestListSerializer
 
     def get_sender_type(self, obj):
-        return 'artist' if obj.sender_artist else 'producer'
+        return 'artist' if obj.sender_artist_id else 'producer'
 
     def get_receiver_type(self, obj):
-        return 'artist' if obj.receiver_artist else 'producer'
+        return 'artist' if obj.receiver_artist_id else 'producer'
+
+    def _user_details(self, artist_id, producer_id, artist_field, producer_field, obj):
+        """Serialize a participant from the list batch, falling back to the FK"""
+        batch = self.context.get('collaboration_batch')
+        if artist_id:
+            user = batch['artists'].get(artist_id) if batch is not None else getattr(obj, artist_field)
+            return ArtistSerializer(user).data if user else None
+        if producer_id:
+            user = batch['producers'].get(producer_id) if batch is not None else getattr(obj, producer_field)
+            return ProducerSerializer(user).data if user else None
+        return None
 
     def get_sender_details(self, obj):
-        sender = obj.sender_artist or obj.sender_producer
-        if not sender:
-            return None
-
-        if obj.sender_artist:
-            serializer = ArtistSerializer(sender)
-        else:
-            serializer = ProducerSerializer(sender)
-        return serializer.data
+        return self._user_details(obj.sender_artist_id, obj.sender_producer_id, 'sender_artist', 'sender_producer', obj)
 
     def get_receiver_details(self, obj):
-        receiver = obj.receiver_artist or obj.receiver_producer
-        if not receiver:
-            return None
+        return self._user_details(obj.receiver_artist_id, obj.receiver_producer_id, 'receiver_artist', 'receiver_producer', obj)
+
+class NotificationListSerializer(serializers.ListSerializer):
+    """
+    Serializes a page of notifications with a fixed number of queries:
+    every sender, recipient and post referenced by the page is loaded in
+    one query per model before the rows are rendered.
+    """
+
+    def to_representation(self, data):
+        notifications = list(data.all() if hasattr(data, 'all') else data)
+        self.context['notification_batch'] = self.load_related(notifications)
+        return [self.child.to_representation(item) for item in notifications]
+
+    def load_related(self, notifications):
+        from feed.models import Post  # Import here to avoid circular imports
+
+        artist_ids = set()
+        producer_ids = set()
+        post_ids = set()
+        for notification in notifications:
+            artist_ids.update(filter(None, (notification.sender_artist_id, notification.artist_id)))
+            producer_ids.update(filter(None, (notification.sender_producer_id, notification.producer_id)))
+            if notification.post_id:
+                post_ids.add(notification.post_id)
+
+        user_fields = ('id', 'username', 'profile_picture')
+        return {
+            'artists': Artist.objects.only(*user_fields).in_bulk(artist_ids) if artist_ids else {},
+            'producers': Producer.objects.only(*user_fields).in_bulk(producer_ids) if producer_ids else {},
+            'posts': Post.objects.only('id', 'content', 'image', 'video').in_bulk(post_ids) if post_ids else {},
+        }
 
-        if obj.receiver_artist:
-            serializer = ArtistSerializer(receiver)
-        else:
-            serializer = ProducerSerializer(receiver)
-        return serializer.data
 
 class NotificationSerializer(serializers.ModelSerializer):
     sender = serializers.SerializerMethodField()
     recipient = serializers.SerializerMethodField()
     post = serializers.SerializerMethodField()
+    message = serializers.SerializerMethodField()
+    grouped_ids = serializers.SerializerMethodField()
 
     class Meta:
         model = Notification
-        fields = ['id', 'recipient', 'sender', 'notification_type', 'message', 'post', 'read', 'created_at']
+        fields = [
+            'id', 'recipient', 'sender', 'notification_type', 'message', 'post', 'read', 'created_at',
+            'actor_count', 'grouped_ids'
+        ]
+        list_serializer_class = NotificationListSerializer
 
-    def get_sender(self, obj):
-        """Return sender information"""
+    def _absolute_url(self, url):
+        # Without a request (websocket pushes), from the base URL in the context
         request = self.context.get('request')
-        base_url = request.build_absolute_uri('/').rstrip('/') if request else ""
-
-        sender = obj.sender
-        if not sender:
-            logger.warning(f"Notification {obj.id}: No sender found")
-            return None
-
-        logger.info(f"Notification {obj.id}: Sender is {sender.username} ({sender.id})")
-
+        if request:
+            return request.build_absolute_uri(url)
+        base_url = self.context.get('base_url')
+        return base_url.rstrip('/') + url if base_url and url.startswith('/') else url
+
+    def _get_user(self, artist_id, producer_id):
+        """Resolve a user from the page batch, falling back to a single lookup"""
+        batch = self.context.get('notification_batch')
+        if artist_id:
+            if batch is not None:
+                return batch['artists'].get(artist_id), 'artist'
+            return Artist.objects.filter(id=artist_id).first(), 'artist'
+        if producer_id:
+            if batch is not None:
+                return batch['producers'].get(producer_id), 'producer'
+            return Producer.objects.filter(id=producer_id).first(), 'producer'
+        return None, None
+
+    def _user_data(self, user, role):
         avatar_url = None
-        if hasattr(sender, 'profile_picture') and sender.profile_picture:
-            # Check if the profile picture actually exists
-            if sender.profile_picture and hasattr(sender.profile_picture, 'url'):
-                # Make sure we're using the full absolute URL
-                avatar_url = request.build_absolute_uri(sender.profile_picture.url)
-                logger.info(f"Notification {obj.id}: Found profile picture at {avatar_url}")
-            else:
-                logger.warning(f"Notification {obj.id}: Sender has profile_picture attribute but no URL")
-        else:
-            logger.warning(f"Notification {obj.id}: Sender has no profile_picture")
-
-        result = {
-            'id': sender.id,
-            'username': sender.username,
-            'role': 'artist' if obj.sender_artist else 'producer',
+        if user.profile_picture:
+            avatar_url = self._absolute_url(user.profile_picture.url)
+        return {
+            'id': user.id,
+            'username': user.username,
+            'role': role,
             'avatar': avatar_url
         }
 
-        logger.info(f"Notification {obj.id}: Returning sender data: {result}")
-        return result
+    def get_message(self, obj):
+        """Render "X and N others ..." for coalesced like/comment notifications"""
+        from .notifications import AGGREGATED_TYPES, aggregated_message
+
+        if obj.actor_count <= 1 or obj.notification_type not in AGGREGATED_TYPES:
+            return obj.message
+        sender, _ = self._get_user(obj.sender_artist_id, obj.sender_producer_id)
+        if not sender:
+            return obj.message
+        return aggregated_message(obj.notification_type, sender.username, obj.actor_count)
+
+    def get_grouped_ids(self, obj):
+        """IDs of the notifications folded into this one when grouping a page"""
+        return getattr(obj, 'grouped_ids', [obj.id])
+
+    def get_sender(self, obj):
+        """Return sender information"""
+        sender, role = self._get_user(obj.sender_artist_id, obj.sender_producer_id)
+        if not sender:
+            return None
+        return self._user_data(sender, role)
 
     def get_recipient(self, obj):
         """Return recipient information"""
-        request = self.context.get('request')
-        base_url = request.build_absolute_uri('/').rstrip('/') if request else ""
-
-        user = obj.user
+        user, role = self._get_user(obj.artist_id, obj.producer_id)
         if not user:
-            logger.warning(f"Notification {obj.id}: No recipient found")
+            logger.warning("Notification %s: No recipient found", obj.id)
             return None
-
-        logger.info(f"Notification {obj.id}: Recipient is {user.username} ({user.id})")
-
-        avatar_url = None
-        if hasattr(user, 'profile_picture') and user.profile_picture:
-            # Check if the profile picture actually exists
-            if user.profile_picture and hasattr(user.profile_picture, 'url'):
-                # Make sure we're using the full absolute URL
-                avatar_url = request.build_absolute_uri(user.profile_picture.url)
-                logger.info(f"Notification {obj.id}: Found recipient profile picture at {avatar_url}")
-            else:
-                logger.warning(f"Notification {obj.id}: Recipient has profile_picture attribute but no URL")
-        else:
-            logger.warning(f"Notification {obj.id}: Recipient has no profile_picture")
-
-        result = {
-            'id': user.id,
-            'username': user.username,
-            'role': 'artist' if obj.artist else 'producer',
-            'avatar': avatar_url
-        }
-
-        logger.info(f"Notification {obj.id}: Returning recipient data: {result}")
-        return result
+        return self._user_data(user, role)
 
     def get_post(self, obj):
         """Return post information if this is a post-related notification"""
         if not obj.post_id:
             return None
 
-        from feed.models import Post  # Import here to avoid circular imports
-
-        try:
-            post = Post.objects.get(id=obj.post_id)
+        batch = self.context.get('notification_batch')
+        if batch is not None:
+            post = batch['posts'].get(obj.post_id)
+        else:
+            from feed.models import Post  # Import here to avoid circular imports
+            post = Post.objects.filter(id=obj.post_id).first()
 
-            request = self.context.get('request')
-            base_url = request.build_absolute_uri('/').rstrip('/') if request else ""
+        if post is None:
+            logger.warning("Post %s referenced in notification %s does not exist", obj.post_id, obj.id)
+            return {'id': obj.post_id, 'deleted': True}
 
+        try:
             post_data = {
                 'id': post.id,
                 'content': post.content[:100] + ('...' if len(post.content) > 100 else '') if post.content else None,
             }
 
-            # Add post image if available
-            if post.image and hasattr(post.image, 'url'):
-                post_data['image'] = request.build_absolute_uri(post.image.url)
+            # Add post image (used as the thumbnail) if available
+            if post.image:
+                post_data['image'] = self._absolute_url(post.image.url)
 
             # Add post video if available
-            if post.video and hasattr(post.video, 'url'):
-                post_data['video'] = request.build_absolute_uri(post.video.url)
+            if post.video:
+                post_data['video'] = self._absolute_url(post.video.url)
 
             return post_data
-        except Post.DoesNotExist:
-            logger.warning(f"Post {obj.post_id} referenced in notification {obj.id} does not exist")
-            return {'id': obj.post_id, 'deleted': True}
         except Exception as e:
-            logger.error(f"Error getting post data for notification: {str(e)}")
+            logger.error("Error getting post data for notification: %s", e)
             return {'id': obj.post_id, 'error': True}
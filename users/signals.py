@@ -0,0 +1,50 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from common.response_cache import POSTS_TAG, PROFILES_TAG, invalidate, notifications_tag, user_tag
+
+from .collaborations import index_requests, sync_status
+from .models import Artist, CollaborationRequest, Notification, Producer
+from .notifications import adjust_unread_count, recipient_of, publish_notification, publish_unread_count
+
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, **kwargs):
+    """Count new unread notifications in the recipient's badge and push them live"""
+    if not created:
+        return
+    if not instance.read:
+        adjust_unread_count(*recipient_of(instance), 1)
+    publish_notification(instance)
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    """Deleting an unread notification removes it from the badge"""
+    user_type, user_id = recipient_of(instance)
+    if not instance.read:
+        adjust_unread_count(user_type, user_id, -1)
+        publish_unread_count(user_type, user_id, -1)
+    else:
+        invalidate(notifications_tag(user_id))
+
+
+@receiver(post_save, sender=CollaborationRequest)
+def collaboration_request_saved(sender, instance, created, **kwargs):
+    """Keep the per-participant inbox rows in sync with the request"""
+    if created:
+        index_requests([instance])
+    else:
+        sync_status([instance.id], instance.status)
+
+
+@receiver(post_save, sender=Artist)
+@receiver(post_save, sender=Producer)
+@receiver(post_delete, sender=Artist)
+@receiver(post_delete, sender=Producer)
+def profile_changed(sender, instance, **kwargs):
+    """Drop cached profiles, and post listings, which show author names and avatars"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and update_fields <= {'password', 'last_login'}:
+        return
+    invalidate(PROFILES_TAG, POSTS_TAG, user_tag(instance.id))
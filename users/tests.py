@@ -1,3 +1,135 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from common.instrumentation import view_query_budget
+from feed.models import Post
+
+from .mail_queue import claim_batch, deliver_batch, enqueue_mail
+from .models import Artist, Notification, OutboundEmail, Producer
+from .views import NotificationView, get_tokens_for_user
+
+ENFORCED = {**settings.INSTRUMENTATION, 'ENFORCE_QUERY_BUDGETS': True}
+
+
+@override_settings(INSTRUMENTATION=ENFORCED)
+class NotificationQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.artist = Artist.objects.create(username='artist', nom='Test', prenom='Artist', email='artist@example.com', password='x')
+        senders = [
+            Artist.objects.create(username='fan', nom='Test', prenom='Fan', email='fan@example.com', password='x'),
+            Producer.objects.create(username='producer', nom='Test', prenom='Producer', email='producer@example.com', password='x'),
+        ]
+        for i in range(6):
+            sender = senders[i % 2]
+            post = Post.objects.create(user_id=cls.artist.id, user_type='artist', content=f'post {i}')
+            Notification.objects.create(
+                artist=cls.artist,
+                sender_artist=sender if isinstance(sender, Artist) else None,
+                sender_producer=sender if isinstance(sender, Producer) else None,
+                notification_type='like' if i % 2 else 'comment',
+                message=f'notification {i}',
+                post_id=post.id,
+                read=i < 2,
+            )
+
+    def setUp(self):
+        self.client.defaults['HTTP_AUTHORIZATION'] = f"Bearer {get_tokens_for_user(self.artist)['access']}"
+
+    def assertWithinBudget(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), view_query_budget(NotificationView, 'GET'))
+        return response
+
+    def test_inbox_within_budget(self):
+        response = self.assertWithinBudget('/api/auth/notifications/')
+        self.assertEqual(len(response.json()['results']), 6)
+
+    def test_filtered_inbox_within_budget(self):
+        self.assertWithinBudget('/api/auth/notifications/?type=like&unread=true')
+
+    def test_legacy_pages_within_budget(self):
+        self.assertWithinBudget('/api/auth/notifications/?page=1')
+
+
+class AggregatedNotificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = Artist.objects.create(username='owner', nom='Test', prenom='Owner', email='owner@example.com', password='x')
+        cls.fan = Artist.objects.create(username='fan', nom='Test', prenom='Fan', email='fan@example.com', password='x')
+        cls.producer = Producer.objects.create(username='producer', nom='Test', prenom='Producer', email='producer@example.com', password='x')
+        cls.post = Post.objects.create(user_id=cls.owner.id, user_type='artist', content='post')
+
+    def comment_as(self, user):
+        response = self.client.post(
+            f'/api/feed/posts/{self.post.id}/comment/', {'text': 'nice'}, content_type='application/json',
+            HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(user)['access']}",
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_actor_count_counts_distinct_people(self):
+        # A, B, A: two people, however the actions interleave
+        self.comment_as(self.fan)
+        self.comment_as(self.producer)
+        self.comment_as(self.fan)
+
+        notification = Notification.objects.get(artist=self.owner, notification_type='comment')
+        self.assertEqual(notification.actor_count, 2)
+        self.assertEqual(notification.sender_artist_id, self.fan.id)
+
+
+class MailQueueTests(TestCase):
+    def setUp(self):
+        self.emails = [enqueue_mail(f'Subject {i}', 'Body', [f'user{i}@example.com']) for i in range(3)]
+        self.connection = get_connection('django.core.mail.backends.locmem.EmailBackend')
+
+    def test_reclaimed_rows_are_left_to_their_new_worker(self):
+        batch = claim_batch()
+        # The lease ran out and another worker claimed the second email
+        OutboundEmail.objects.filter(id=self.emails[1].id).update(claim_token='other')
+
+        deliver_batch(batch, self.connection)
+
+        statuses = dict(OutboundEmail.objects.values_list('id', 'status'))
+        self.assertEqual([statuses[email.id] for email in self.emails], ['sent', 'sending', 'sent'])
+        reclaimed = OutboundEmail.objects.get(id=self.emails[1].id)
+        self.assertEqual((reclaimed.claim_token, reclaimed.attempts), ('other', 0))
+
+    def test_sent_rows_are_recorded_before_the_batch_ends(self):
+        batch = claim_batch()
+        with mock.patch.object(EmailMessage, 'send', side_effect=[1, KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                deliver_batch(batch, self.connection)
+
+        statuses = dict(OutboundEmail.objects.values_list('id', 'status'))
+        self.assertEqual([statuses[email.id] for email in self.emails], ['sent', 'sending', 'sending'])
+
+
+@override_settings(PUBLIC_BASE_URL='http://testserver')
+class NotificationPushTests(TestCase):
+    def test_push_matches_the_inbox(self):
+        artist = Artist.objects.create(username='artist', nom='Test', prenom='Artist', email='artist@example.com', password='x')
+        fan = Artist.objects.create(
+            username='fan', nom='Test', prenom='Fan', email='fan@example.com', password='x', profile_picture='profile_pics/fan.jpg',
+        )
+        post = Post.objects.create(user_id=artist.id, user_type='artist', content='post', image='posts/images/post.jpg')
+        with mock.patch('users.notifications._group_send') as group_send:
+            with self.captureOnCommitCallbacks(execute=True):
+                notification = Notification.objects.create(
+                    artist=artist, sender_artist=fan, notification_type='like', message='fan liked your post.', post_id=post.id,
+                )
+        pushed = group_send.call_args.args[2]['notification']
+
+        self.client.defaults['HTTP_AUTHORIZATION'] = f"Bearer {get_tokens_for_user(artist)['access']}"
+        listed = self.client.get('/api/auth/notifications/').json()['results'][0]
+        self.assertEqual(listed['id'], notification.id)
+        self.assertEqual(pushed['sender']['avatar'], 'http://testserver/media/profile_pics/fan.jpg')
+        self.assertEqual(pushed['sender'], listed['sender'])
+        self.assertEqual(pushed['post'], listed['post'])
@@ -3,9 +3,9 @@ from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     LoginView, SignupView, GetProfileView, UpdateProfileView, GetAllUsersView,
     ForgotPasswordView, ResetPasswordView, ValidateTokenView, CustomTokenRefreshView,
-    DiscoverView, CollaborationRequestView, CollaborationRequestActionView, ExploreFeedView,
-    TestCollaborationRequestsView, NotificationView, MarkNotificationReadView, DeleteNotificationView,
-    GoogleLoginView
+    DiscoverView, CollaborationRequestView, CollaborationRequestActionView, CollaborationInboxView, ExploreFeedView,
+    TestCollaborationRequestsView, NotificationView, NotificationUnreadCountView, MarkNotificationReadView, DeleteNotificationView,
+    GoogleLoginView, FollowView, FollowListView, FollowStatusView
 )
 
 urlpatterns = [
@@ -38,11 +38,19 @@ urlpatterns = [
     
     # Collaboration requests
     path('collaboration-requests/', CollaborationRequestView.as_view(), name='collaboration_requests'),
+    path('collaboration-requests/inbox/', CollaborationInboxView.as_view(), name='collaboration_inbox'),
     path('collaboration-requests/<int:request_id>/', CollaborationRequestView.as_view(), name='collaboration_request_detail'),
     path('collaboration-requests/<int:request_id>/action/', CollaborationRequestActionView.as_view(), name='collaboration_request_action'),
     
+    # Follows
+    path('follows/status/', FollowStatusView.as_view(), name='follow_status'),
+    path('follows/<str:user_type>/<int:user_id>/', FollowView.as_view(), name='follow'),
+    path('follows/<str:user_type>/<int:user_id>/followers/', FollowListView.as_view(), {'direction': 'followers'}, name='followers'),
+    path('follows/<str:user_type>/<int:user_id>/following/', FollowListView.as_view(), {'direction': 'following'}, name='following'),
+
     # Notifications
     path('notifications/', NotificationView.as_view(), name='notifications'),
+    path('notifications/unread-count/', NotificationUnreadCountView.as_view(), name='notification_unread_count'),
     path('notifications/<int:notification_id>/read/', MarkNotificationReadView.as_view(), name='mark_notification_read'),
     path('notifications/<int:notification_id>/', DeleteNotificationView.as_view(), name='delete_notification'),
     
@@ -1,25 +1,41 @@
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
-from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.hashers import make_password
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.views import TokenRefreshView as BaseTokenRefreshView
 from rest_framework.parsers import MultiPartParser, FormParser
 from .models import Artist, Producer, CollaborationRequest, Notification
-from django.db import models
+from django.db import models, transaction
 import logging
 import json
-from django.core.mail import send_mail
 from django.utils.crypto import get_random_string
 from django.utils import timezone
 from .jwt_auth import CustomJWTAuthentication  # Import our custom JWT auth class
+from .credentials import PasswordVerificationBusy, email_registered, find_user_by_email, verify_password
 from .serializers import ArtistSerializer, ProducerSerializer, CollaborationRequestSerializer, NotificationSerializer
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound
+from common.pagination import KeysetPagination
+from common.conditional import conditional_response, tags_version
+from common.replicas import read_from_replica
+from common.response_cache import PROFILES_TAG, cache_response, invalidate, notifications_tag, user_tag
+from .collaborations import (
+    ROLE_FILTERS as COLLABORATION_ROLE_FILTERS, STATUSES as COLLABORATION_STATUSES, requests_for, sync_status
+)
+from .follows import (
+    USER_MODELS as FOLLOW_USER_MODELS, follow, unfollow, followers_of, following_of, following_set, followed_by_set,
+    load_users, viewer_of
+)
+from .notifications import (
+    get_user_type, notifications_for, get_unread_count, adjust_unread_count, reset_unread_count,
+    publish_unread_count, group_notifications, fan_out
+)
 from django.template.loader import render_to_string
 from django.conf import settings
-from django.db.models import Q
+from django.db.models import F, Q
 import datetime
 import random
 import re
@@ -83,7 +99,7 @@ def get_tokens_for_user(user):
             algorithm=settings.SIMPLE_JWT['ALGORITHM']
         )
 
-        logger.debug(f"Generated new tokens for user: {user.username}")
+        logger.debug("Generated new tokens for user: %s", user.username)
         return {
             "refresh": refresh_token,
             "access": access_token,
@@ -93,7 +109,7 @@ def get_tokens_for_user(user):
             "email": user.email
         }
     except Exception as e:
-        logger.error(f"Error generating tokens: {str(e)}")
+        logger.error("Error generating tokens: %s", e)
         raise
 
 
@@ -103,40 +119,43 @@ class LoginView(APIView):
 
     def post(self, request):
         try:
-            logger.debug(f"Login request received - DATA: {request.data}")
+            logger.debug("Login request received - DATA: %s", request.data)
             email = request.data.get("email")
             password = request.data.get("password")
 
             if not email or not password:
-                logger.warning(f"Missing credentials - Email: {email is not None}, Password: {password is not None}")
+                logger.warning("Missing credentials - Email: %s, Password: %s", email is not None, password is not None)
                 return Response({"error": "Email and password are required."}, status=status.HTTP_400_BAD_REQUEST)
 
             user = None
             user_type = None
 
-            # Check both Artist and Producer models
-            user = Artist.objects.filter(email=email).first()
+            # Check both Artist and Producer models (case-insensitive email)
+            user, user_type = find_user_by_email(email)
             if user:
-                user_type = "artist"
-                logger.info(f"Found artist user: {user.username} (email: {email})")
+                logger.info("Found %s user: %s (email: %s)", user_type, user.username, email)
             else:
-                user = Producer.objects.filter(email=email).first()
-                if user:
-                    user_type = "producer"
-                    logger.info(f"Found producer user: {user.username} (email: {email})")
-                else:
-                    logger.warning(f"No user found with email: {email}")
+                logger.warning("No user found with email: %s", email)
 
-            if not user or not check_password(password, user.password):
-                logger.warning(f"Invalid credentials for email: {email}")
+            try:
+                valid = bool(user) and verify_password(user, password)
+            except PasswordVerificationBusy:
+                logger.warning("Password verification busy, shedding login for: %s", email)
+                return Response(
+                    {"error": "Too many login attempts right now, please try again."},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={"Retry-After": "1"},
+                )
+
+            if not valid:
+                logger.warning("Invalid credentials for email: %s", email)
                 return Response({"error": "Invalid credentials."}, status=status.HTTP_401_UNAUTHORIZED)
 
             # Generate JWT Token
             tokens = get_tokens_for_user(user)
 
             # Log successful login
-            logger.info(f"Successful login for user: {user.username} ({user_type})")
-            logger.debug(f"Login response tokens: {tokens}")
+            logger.info("Successful login for user: %s (%s)", user.username, user_type)
 
             # Build absolute URLs for media files
             base_url = request.build_absolute_uri('/').rstrip('/')  # Get base URL like http://192.168.1.47:8000
@@ -145,7 +164,7 @@ class LoginView(APIView):
             profile_picture_url = None
             if user.profile_picture:
                 profile_picture_url = f"{base_url}{user.profile_picture.url}"
-                logger.debug(f"LoginView: Full profile picture URL: {profile_picture_url}")
+                logger.debug("LoginView: Full profile picture URL: %s", profile_picture_url)
 
             response_data = {
                 "refresh": tokens["refresh"],
@@ -156,11 +175,11 @@ class LoginView(APIView):
                 "profile_picture": profile_picture_url,
             }
 
-            logger.info(f"LoginView: Sending login response with email: {response_data['email']}")
+            logger.info("LoginView: Sending login response with email: %s", response_data['email'])
             return Response(response_data, status=status.HTTP_200_OK)
 
         except Exception as e:
-            logger.error(f"Login Error: {str(e)}")
+            logger.error("Login Error: %s", e)
             return Response(
                 {"error": "An error occurred during login."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -188,7 +207,7 @@ class SignupView(APIView):
                 return Response({"error": "Username already taken"}, status=status.HTTP_400_BAD_REQUEST)
 
             # Check email uniqueness across both models
-            if Artist.objects.filter(email=email).exists() or Producer.objects.filter(email=email).exists():
+            if email_registered(email):
                 return Response({"error": "Email already registered"}, status=status.HTTP_400_BAD_REQUEST)
 
             # Validate user type
@@ -237,7 +256,7 @@ class SignupView(APIView):
             }, status=status.HTTP_201_CREATED)
 
         except Exception as e:
-            logger.error(f"Signup Error: {str(e)}")
+            logger.error("Signup Error: %s", e)
             return Response({"error": "Something went wrong during signup."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
@@ -246,12 +265,15 @@ class GetProfileView(APIView):
     permission_classes = [AllowAny]  # Change to AllowAny to allow public access to profiles
     authentication_classes = [CustomJWTAuthentication]
 
+    # Profiles looked up by email are only known to be this user's once loaded
+    @cache_response(tags=lambda kwargs, data: [user_tag(kwargs.get('user_id') or (data or {}).get('id'))])
+    @read_from_replica(tags=lambda request, kwargs: [user_tag(kwargs['user_id'])] if kwargs.get('user_id') else None)
     def get(self, request, email=None, user_id=None, user_type_param=None):
         """
         Get a user's profile by email or user_id.
         """
         try:
-            logger.info(f"GetProfileView: Fetching profile for email: {email} or user_id: {user_id}, user_type_param: {user_type_param}")
+            logger.debug("GetProfileView: Fetching profile for email: %s or user_id: %s, user_type_param: %s", email, user_id, user_type_param)
 
             user = None
 
@@ -260,21 +282,15 @@ class GetProfileView(APIView):
                 email = email.strip().lower()
 
                 # Search for user in both models regardless of authentication status
-                user = Artist.objects.filter(email__iexact=email).first()
+                user, user_type = find_user_by_email(email)
                 if user:
-                    logger.info(f"GetProfileView: Found artist: {user.email}")
-                    user_type = "artist"
+                    logger.debug("GetProfileView: Found %s: %s", user_type, user.email)
                 else:
-                    user = Producer.objects.filter(email__iexact=email).first()
-                    if user:
-                        logger.info(f"GetProfileView: Found producer: {user.email}")
-                        user_type = "producer"
-                    else:
-                        logger.warning(f"GetProfileView: No user found with email: '{email}'")
-                        return Response(
-                            {"code": "user_not_found", "detail": "User not found"},
-                            status=status.HTTP_404_NOT_FOUND
-                        )
+                    logger.warning("GetProfileView: No user found with email: '%s'", email)
+                    return Response(
+                        {"code": "user_not_found", "detail": "User not found"},
+                        status=status.HTTP_404_NOT_FOUND
+                    )
 
             elif user_id:
                 # Use the ID range to determine the user type - simplifies the logic
@@ -283,32 +299,32 @@ class GetProfileView(APIView):
 
                 # If the ID-based lookup failed but we have a user_type_param, try the specific lookup
                 if user is None and user_type_param:
-                    logger.info(f"GetProfileView: ID-based lookup failed, trying with user_type_param: {user_type_param}")
+                    logger.debug("GetProfileView: ID-based lookup failed, trying with user_type_param: %s", user_type_param)
 
                     if user_type_param == 'artist':
                         user = Artist.objects.filter(id=user_id).first()
                         if user:
-                            logger.info(f"GetProfileView: Found artist with ID: {user_id}")
+                            logger.debug("GetProfileView: Found artist with ID: %s", user_id)
                             user_type = "artist"
                         else:
-                            logger.warning(f"GetProfileView: No artist found with ID: {user_id}")
+                            logger.warning("GetProfileView: No artist found with ID: %s", user_id)
                             return Response({"error": "Artist not found"}, status=status.HTTP_404_NOT_FOUND)
 
                     elif user_type_param == 'producer':
                         user = Producer.objects.filter(id=user_id).first()
                         if user:
-                            logger.info(f"GetProfileView: Found producer with ID: {user_id}")
+                            logger.debug("GetProfileView: Found producer with ID: %s", user_id)
                             user_type = "producer"
                         else:
-                            logger.warning(f"GetProfileView: No producer found with ID: {user_id}")
+                            logger.warning("GetProfileView: No producer found with ID: %s", user_id)
                             return Response({"error": "Producer not found"}, status=status.HTTP_404_NOT_FOUND)
 
                 # If we still don't have a user, return error
                 if user is None:
-                    logger.warning(f"GetProfileView: No user found with ID: {user_id}")
+                    logger.warning("GetProfileView: No user found with ID: %s", user_id)
                     return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
-                logger.info(f"GetProfileView: Found user type: {user_type} with ID: {user_id}")
+                logger.debug("GetProfileView: Found user type: %s with ID: %s", user_type, user_id)
 
             else:
                 return Response({"error": "Email or user_id required"}, status=status.HTTP_400_BAD_REQUEST)
@@ -323,12 +339,12 @@ class GetProfileView(APIView):
                 from feed.serializers import PostSerializer
 
                 # Get posts for this user
-                logger.info(f"GetProfileView: Fetching posts for user {user.id} of type {user_type}")
+                logger.debug("GetProfileView: Fetching posts for user %s of type %s", user.id, user_type)
                 posts = Post.objects.filter(user_id=user.id, user_type=user_type).order_by('-created_at')
                 posts_serialized = PostSerializer(posts, many=True, context={'request': request}).data
-                logger.info(f"GetProfileView: Found {len(posts_serialized)} posts for user {user.username}")
+                logger.debug("GetProfileView: Found %s posts for user %s", len(posts_serialized), user.username)
             except Exception as post_error:
-                logger.error(f"GetProfileView: Error fetching posts: {str(post_error)}")
+                logger.error("GetProfileView: Error fetching posts: %s", post_error)
                 posts_serialized = []
 
             # Prepare response data
@@ -344,8 +360,9 @@ class GetProfileView(APIView):
                 "bio": user.bio if hasattr(user, 'bio') else None,
                 "location": user.location if hasattr(user, 'location') else None,
                 "genres": user.genres.split(',') if hasattr(user, 'genres') and user.genres else [],
-                "followers": 0,  # TODO: Implement followers count
-                "following": 0,  # TODO: Implement following count
+                "followers": user.followers_count,
+                "following": user.following_count,
+                "is_following": follow_state_for(request, user_type, user.id),
                 "posts": posts_serialized  # Include the serialized posts in the response
             }
 
@@ -356,7 +373,7 @@ class GetProfileView(APIView):
                 response_data["studio_name"] = user.studio_name if hasattr(user, 'studio_name') else None
                 response_data["website"] = user.website if hasattr(user, 'website') else None
 
-            logger.info(f"GetProfileView: Sending response for user: {response_data['email']} with {len(posts_serialized)} posts")
+            logger.debug("GetProfileView: Sending response for user: %s with %s posts", response_data['email'], len(posts_serialized))
 
             # Check if collaborations are requested
             if request.query_params.get('include_collaborations') == 'true':
@@ -401,12 +418,12 @@ class GetProfileView(APIView):
                     context={'request': request}
                 ).data
 
-                logger.info(f"Added {len(recent_collabs)} recent collaborations to profile response")
+                logger.debug("Added %s recent collaborations to profile response", len(recent_collabs))
 
             return Response(response_data, status=status.HTTP_200_OK)
 
         except Exception as e:
-            logger.error(f"GetProfileView Error: {str(e)}")
+            logger.error("GetProfileView Error: %s", e)
             return Response(
                 {"error": "An error occurred while fetching the profile."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -424,24 +441,22 @@ class UpdateProfileView(APIView):
             # Clean up email
             email = email.strip().lower()
 
-            logger.info(f"UpdateProfileView: Received update request for email: '{email}'")
-            logger.info(f"UpdateProfileView: Authenticated user's email is: '{request.user.email}'")
+            logger.info("UpdateProfileView: Received update request for email: '%s'", email)
+            logger.info("UpdateProfileView: Authenticated user's email is: '%s'", request.user.email)
 
             # Verify user has permission to update this profile
             if email != request.user.email.strip().lower():
-                logger.warning(f"UpdateProfileView: User {request.user.email} attempted to update profile of {email}")
+                logger.warning("UpdateProfileView: User %s attempted to update profile of %s", request.user.email, email)
                 return Response(
                     {"error": "You do not have permission to update this profile"},
                     status=status.HTTP_403_FORBIDDEN
                 )
 
             # Find the user
-            user = Artist.objects.filter(email__iexact=email).first()
-            if not user:
-                user = Producer.objects.filter(email__iexact=email).first()
+            user, _ = find_user_by_email(email)
 
             if not user:
-                logger.warning(f"UpdateProfileView: No user found with email: '{email}'")
+                logger.warning("UpdateProfileView: No user found with email: '%s'", email)
                 return Response(
                     {"error": "User not found"},
                     status=status.HTTP_404_NOT_FOUND
@@ -457,9 +472,9 @@ class UpdateProfileView(APIView):
                             status=status.HTTP_400_BAD_REQUEST
                         )
                     user.profile_picture = file
-                    logger.info(f"UpdateProfileView: Updated profile picture for {email}")
+                    logger.info("UpdateProfileView: Updated profile picture for %s", email)
                 except Exception as e:
-                    logger.error(f"UpdateProfileView: Error processing profile picture: {str(e)}")
+                    logger.error("UpdateProfileView: Error processing profile picture: %s", e)
                     return Response(
                         {"error": "Failed to process profile picture"},
                         status=status.HTTP_400_BAD_REQUEST
@@ -475,9 +490,9 @@ class UpdateProfileView(APIView):
                             status=status.HTTP_400_BAD_REQUEST
                         )
                     user.cover_photo = file
-                    logger.info(f"UpdateProfileView: Updated cover photo for {email}")
+                    logger.info("UpdateProfileView: Updated cover photo for %s", email)
                 except Exception as e:
-                    logger.error(f"UpdateProfileView: Error processing cover photo: {str(e)}")
+                    logger.error("UpdateProfileView: Error processing cover photo: %s", e)
                     return Response(
                         {"error": "Failed to process cover photo"},
                         status=status.HTTP_400_BAD_REQUEST
@@ -497,7 +512,7 @@ class UpdateProfileView(APIView):
                                 status=status.HTTP_400_BAD_REQUEST
                             )
                     setattr(user, field, request.data[field])
-                    logger.info(f"UpdateProfileView: Updated {field} for {email}")
+                    logger.info("UpdateProfileView: Updated %s for %s", field, email)
 
             # Update genres
             if 'genres' in request.data:
@@ -518,9 +533,9 @@ class UpdateProfileView(APIView):
                             {"error": "Genres must be a list or comma-separated string"},
                             status=status.HTTP_400_BAD_REQUEST
                         )
-                    logger.info(f"UpdateProfileView: Updated genres for {email}")
+                    logger.info("UpdateProfileView: Updated genres for %s", email)
                 except Exception as e:
-                    logger.error(f"UpdateProfileView: Error processing genres: {str(e)}")
+                    logger.error("UpdateProfileView: Error processing genres: %s", e)
                     return Response(
                         {"error": "Invalid genres format"},
                         status=status.HTTP_400_BAD_REQUEST
@@ -545,9 +560,9 @@ class UpdateProfileView(APIView):
                             {"error": "Talents must be a list or comma-separated string"},
                             status=status.HTTP_400_BAD_REQUEST
                         )
-                    logger.info(f"UpdateProfileView: Updated talents for {email}")
+                    logger.info("UpdateProfileView: Updated talents for %s", email)
                 except Exception as e:
-                    logger.error(f"UpdateProfileView: Error processing talents: {str(e)}")
+                    logger.error("UpdateProfileView: Error processing talents: %s", e)
                     return Response(
                         {"error": "Invalid talents format"},
                         status=status.HTTP_400_BAD_REQUEST
@@ -561,7 +576,7 @@ class UpdateProfileView(APIView):
                     user.website = request.data['website']
 
             user.save()
-            logger.info(f"UpdateProfileView: Successfully updated profile for {email}")
+            logger.info("UpdateProfileView: Successfully updated profile for %s", email)
 
             # Return updated user data
             if isinstance(user, Artist):
@@ -572,7 +587,7 @@ class UpdateProfileView(APIView):
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         except Exception as e:
-            logger.error(f"UpdateProfileView Error: {str(e)}")
+            logger.error("UpdateProfileView Error: %s", e)
             return Response(
                 {"error": "An error occurred while updating the profile"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -621,9 +636,9 @@ class GetAllUsersView(APIView):
         return Response(users, status=200)
 
 
-from django.core.mail import send_mail
 from django.contrib.auth.hashers import make_password
 from django.utils.crypto import get_random_string
+from .mail_queue import enqueue_mail
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -657,9 +672,6 @@ class CustomTokenRefreshView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Log token info for debugging (don't log the full token in production)
-            logger.info(f"TokenRefreshView: Refresh token provided (first 10 chars): {refresh_token[:10]}...")
-
             # Decode the refresh token
             try:
                 # Decode token manually without token verification (we'll verify it in the next step)
@@ -708,7 +720,7 @@ class CustomTokenRefreshView(APIView):
                     user = Producer.objects.filter(id=user_id).first()
 
                 if not user:
-                    logger.error(f"TokenRefreshView: User not found - ID: {user_id}, Type: {user_type}")
+                    logger.error("TokenRefreshView: User not found - ID: %s, Type: %s", user_id, user_type)
                     return Response(
                         {"error": "User not found", "code": "user_not_found"},
                         status=status.HTTP_401_UNAUTHORIZED
@@ -786,7 +798,7 @@ class CustomTokenRefreshView(APIView):
                 )
 
         except Exception as e:
-            logger.error(f"TokenRefreshView: Error refreshing token - {str(e)}")
+            logger.error("TokenRefreshView: Error refreshing token - %s", e)
 
             return Response(
                 {"error": "Failed to refresh token", "code": "refresh_failed", "detail": str(e)},
@@ -801,47 +813,10 @@ class ValidateTokenView(APIView):
 
     def get(self, request):
         try:
-            # Add direct debug output
-            print(f"\n\nVALIDATE TOKEN VIEW ACCESSED\n\n")
-            print(f"User: {request.user} ({type(request.user).__name__})")
-            print(f"User email: {getattr(request.user, 'email', 'NO EMAIL')}")
-            print(f"User is_authenticated: {getattr(request.user, 'is_authenticated', False)}")
-            print(f"Auth header: {request.headers.get('Authorization', 'NO AUTH HEADER')[:30]}...")
+            # The token was already verified by the authentication class;
+            # neither it nor its claims are logged
             user = request.user
-            logger.info(f"ValidateTokenView: User authenticated as: {user.email}")
-            logger.info(f"ValidateTokenView: User ID: {user.id}")
-            logger.info(f"ValidateTokenView: User type: {type(user).__name__}")
-
-            # Get the actual email from the JWT token payload
-            auth_header = request.headers.get('Authorization', '')
-            if auth_header.startswith('Bearer '):
-                from rest_framework_simplejwt.tokens import AccessToken
-                import jwt
-                from django.conf import settings
-
-                token = auth_header.split(' ')[1]
-                try:
-                    # First try to decode with JWT library to see raw payload
-                    payload = jwt.decode(
-                        token,
-                        settings.SIMPLE_JWT['SIGNING_KEY'],
-                        algorithms=[settings.SIMPLE_JWT['ALGORITHM']]
-                    )
-                    logger.info(f"ValidateTokenView: Raw token payload: {payload}")
-                    logger.info(f"ValidateTokenView: Token email value: {payload.get('email')}")
-                except Exception as e:
-                    logger.error(f"ValidateTokenView: Error decoding raw token: {str(e)}")
-
-            # Compare user email to the one in request.user
-            if hasattr(user, 'email'):
-                # Print exact character comparison to identify any invisible differences
-                email = user.email.strip().lower()
-                logger.info(f"ValidateTokenView: User email (raw): '{user.email}'")
-                logger.info(f"ValidateTokenView: User email (normalized): '{email}'")
-
-                # Create hex representation to spot invisible characters
-                hex_email = ' '.join(hex(ord(c))[2:] for c in user.email)
-                logger.info(f"ValidateTokenView: User email (hex): {hex_email}")
+            logger.debug("ValidateTokenView: %s %s", type(user).__name__, user.id)
 
             # Return token validation success with user info
             return Response({
@@ -855,16 +830,16 @@ class ValidateTokenView(APIView):
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
-            logger.error(f"ValidateTokenView Error: {str(e)}")
+            logger.error("ValidateTokenView Error: %s", e)
             return Response(
                 {"valid": False, "error": str(e)},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
 
-from django.core.mail import send_mail
 from django.contrib.auth.hashers import make_password
 from django.utils.crypto import get_random_string
+from .mail_queue import enqueue_mail
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -878,7 +853,7 @@ class ForgotPasswordView(APIView):
         if not email:
             return Response({"error": "Email is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        user = Artist.objects.filter(email=email).first() or Producer.objects.filter(email=email).first()
+        user, _ = find_user_by_email(email)
         if not user:
             return Response({"error": "User with this email does not exist"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -889,13 +864,12 @@ class ForgotPasswordView(APIView):
         user.reset_code = reset_code
         user.save()
 
-        # Send email with reset code
-        send_mail(
+        # Queue the email with the reset code; the mail queue workers deliver it
+        enqueue_mail(
             "Password Reset Code",
             f"Your password reset code is: {reset_code}",
-            "no-reply@yourapp.com",
             [email],
-            fail_silently=False,
+            from_email="no-reply@yourapp.com",
         )
 
         return Response({"message": "Reset code sent successfully"}, status=status.HTTP_200_OK)
@@ -912,7 +886,7 @@ class ResetPasswordView(APIView):
         if not email or not code or not new_password:
             return Response({"error": "All fields are required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        user = Artist.objects.filter(email=email, reset_code=code).first() or Producer.objects.filter(email=email, reset_code=code).first()
+        user, _ = find_user_by_email(email, reset_code=code)
         if not user:
             return Response({"error": "Invalid reset code"}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -965,6 +939,8 @@ class DiscoverView(APIView):
     permission_classes = [AllowAny]
     authentication_classes = [CustomJWTAuthentication]  # Allow authentication but don't require it
 
+    @cache_response(tags=lambda kwargs, data: [PROFILES_TAG])
+    @read_from_replica(tags=lambda request, kwargs: [PROFILES_TAG])
     def get(self, request):
         try:
             user_type = request.query_params.get('type', 'all')  # 'artist', 'producer', or 'all'
@@ -976,17 +952,17 @@ class DiscoverView(APIView):
 
             # Exclude the current user if they are authenticated
             if request.user and request.user.is_authenticated:
-                logger.info(f"DiscoverView: Excluding authenticated user {request.user.username} (ID: {request.user.id})")
+                logger.debug("DiscoverView: Excluding authenticated user %s (ID: %s)", request.user.username, request.user.id)
 
                 if isinstance(request.user, Artist):
                     # Current user is an artist, exclude them from artists queryset
                     artists_queryset = artists_queryset.exclude(id=request.user.id)
-                    logger.info(f"DiscoverView: Excluded artist with ID {request.user.id} from results")
+                    logger.debug("DiscoverView: Excluded artist with ID %s from results", request.user.id)
 
                 elif isinstance(request.user, Producer):
                     # Current user is a producer, exclude them from producers queryset
                     producers_queryset = producers_queryset.exclude(id=request.user.id)
-                    logger.info(f"DiscoverView: Excluded producer with ID {request.user.id} from results")
+                    logger.debug("DiscoverView: Excluded producer with ID %s from results", request.user.id)
 
             # Apply search filter if provided
             if search_query:
@@ -1027,7 +1003,7 @@ class DiscoverView(APIView):
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
-            logger.error(f"Discover Error: {str(e)}")
+            logger.error("Discover Error: %s", e)
             return Response(
                 {"error": "An error occurred while fetching discover data."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -1041,10 +1017,10 @@ class CollaborationRequestView(APIView):
     def post(self, request):
         try:
             # Debug request information
-            logger.info(f"==== CREATING COLLABORATION REQUEST ====")
-            logger.info(f"User sending request: {request.user.username} (ID: {request.user.id})")
-            logger.info(f"User type: {'Artist' if isinstance(request.user, Artist) else 'Producer'}")
-            logger.info(f"Request data: {request.data}")
+            logger.info("==== CREATING COLLABORATION REQUEST ====")
+            logger.info("User sending request: %s (ID: %s)", request.user.username, request.user.id)
+            logger.info("User type: %s", 'Artist' if isinstance(request.user, Artist) else 'Producer')
+            logger.info("Request data: %s", request.data)
 
             # Support both parameter formats for backward compatibility
             # Old format: receiver (ID only)
@@ -1055,11 +1031,11 @@ class CollaborationRequestView(APIView):
             # If receiver_id is not present, try the old format
             if not receiver_id:
                 receiver_id = request.data.get('receiver')
-                logger.info(f"Using legacy parameter 'receiver': {receiver_id}")
+                logger.info("Using legacy parameter 'receiver': %s", receiver_id)
 
             receiver_type = request.data.get('receiver_type', '').lower()  # 'artist' or 'producer'
 
-            logger.info(f"Processed parameters - Receiver ID: {receiver_id}, Receiver type: {receiver_type}")
+            logger.info("Processed parameters - Receiver ID: %s, Receiver type: %s", receiver_id, receiver_type)
 
             if not receiver_id:
                 logger.warning("No receiver_id/receiver provided in request")
@@ -1071,10 +1047,10 @@ class CollaborationRequestView(APIView):
             # If no receiver_type was provided, default to 'producer' for backward compatibility
             if not receiver_type:
                 receiver_type = 'producer'  # Legacy behavior assumed producer
-                logger.info(f"No receiver_type provided, defaulting to 'producer' for backward compatibility")
+                logger.info("No receiver_type provided, defaulting to 'producer' for backward compatibility")
 
             if receiver_type not in ['artist', 'producer']:
-                logger.warning(f"Invalid receiver_type: {receiver_type}")
+                logger.warning("Invalid receiver_type: %s", receiver_type)
                 return Response(
                     {"error": "Valid receiver_type is required ('artist' or 'producer')"},
                     status=status.HTTP_400_BAD_REQUEST
@@ -1090,31 +1066,31 @@ class CollaborationRequestView(APIView):
 
                 # Check if user is trying to send a request to themselves
                 if sender_is_artist and request.user.id == int(receiver_id):
-                    logger.warning(f"User attempted to send collaboration request to themselves: {request.user.username}")
+                    logger.warning("User attempted to send collaboration request to themselves: %s", request.user.username)
                     return Response(
                         {"error": "You cannot send a collaboration request to yourself"},
                         status=status.HTTP_400_BAD_REQUEST
                     )
 
                 if receiver:
-                    logger.info(f"Found artist receiver: {receiver.username} (ID: {receiver.id})")
+                    logger.info("Found artist receiver: %s (ID: %s)", receiver.username, receiver.id)
                 else:
-                    logger.warning(f"Could not find artist with ID: {receiver_id}")
+                    logger.warning("Could not find artist with ID: %s", receiver_id)
             else:  # producer
                 receiver = Producer.objects.filter(id=receiver_id).first()
 
                 # Check if user is trying to send a request to themselves
                 if not sender_is_artist and request.user.id == int(receiver_id):
-                    logger.warning(f"User attempted to send collaboration request to themselves: {request.user.username}")
+                    logger.warning("User attempted to send collaboration request to themselves: %s", request.user.username)
                     return Response(
                         {"error": "You cannot send a collaboration request to yourself"},
                         status=status.HTTP_400_BAD_REQUEST
                     )
 
                 if receiver:
-                    logger.info(f"Found producer receiver: {receiver.username} (ID: {receiver.id})")
+                    logger.info("Found producer receiver: %s (ID: %s)", receiver.username, receiver.id)
                 else:
-                    logger.warning(f"Could not find producer with ID: {receiver_id}")
+                    logger.warning("Could not find producer with ID: %s", receiver_id)
 
             if not receiver:
                 # Try both types as a last resort if type was auto-assigned
@@ -1122,12 +1098,12 @@ class CollaborationRequestView(APIView):
                     # For legacy calls without receiver_type, also check artist
                     fallback_receiver = Artist.objects.filter(id=receiver_id).first()
                     if fallback_receiver:
-                        logger.info(f"Found artist receiver as fallback: {fallback_receiver.username} (ID: {fallback_receiver.id})")
+                        logger.info("Found artist receiver as fallback: %s (ID: %s)", fallback_receiver.username, fallback_receiver.id)
                         receiver = fallback_receiver
                         receiver_type = 'artist'
 
             if not receiver:
-                logger.error(f"Collaboration Request Error: Receiver ID {receiver_id} not found as {receiver_type}")
+                logger.error("Collaboration Request Error: Receiver ID %s not found as %s", receiver_id, receiver_type)
                 return Response(
                     {"error": f"Receiver not found with ID {receiver_id}"},
                     status=status.HTTP_404_NOT_FOUND
@@ -1142,7 +1118,7 @@ class CollaborationRequestView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            logger.info(f"Message: {message[:50]}{'...' if len(message) > 50 else ''}")
+            logger.info("Message: %s%s", message[:50], '...' if len(message) > 50 else '')
 
             # Create a new collaboration request
             collab_request = CollaborationRequest(
@@ -1151,28 +1127,28 @@ class CollaborationRequestView(APIView):
 
             # Set sender fields based on current user type
             if sender_is_artist:
-                logger.info(f"Setting sender as artist: {request.user.username}")
+                logger.info("Setting sender as artist: %s", request.user.username)
                 collab_request.sender_artist = request.user
                 collab_request.sender_producer = None
             else:
-                logger.info(f"Setting sender as producer: {request.user.username}")
+                logger.info("Setting sender as producer: %s", request.user.username)
                 collab_request.sender_producer = request.user
                 collab_request.sender_artist = None
 
             # Set receiver fields based on type
             if receiver_type == 'artist':
-                logger.info(f"Setting receiver as artist: {receiver.username}")
+                logger.info("Setting receiver as artist: %s", receiver.username)
                 collab_request.receiver_artist = receiver
                 collab_request.receiver_producer = None
             else:
-                logger.info(f"Setting receiver as producer: {receiver.username}")
+                logger.info("Setting receiver as producer: %s", receiver.username)
                 collab_request.receiver_producer = receiver
                 collab_request.receiver_artist = None
 
             # Save to database
             try:
                 collab_request.save()
-                logger.info(f"Successfully saved collaboration request with ID: {collab_request.id}")
+                logger.info("Successfully saved collaboration request with ID: %s", collab_request.id)
 
                 # Create a notification for the receiver
                 notification = Notification()
@@ -1186,10 +1162,10 @@ class CollaborationRequestView(APIView):
                 notification.related_id = collab_request.id
                 notification.save()
 
-                logger.info(f"Created notification for {receiver.username} about new collaboration request")
+                logger.info("Created notification for %s about new collaboration request", receiver.username)
 
             except Exception as save_error:
-                logger.error(f"Error saving collaboration request: {str(save_error)}")
+                logger.error("Error saving collaboration request: %s", save_error)
                 return Response(
                     {"error": f"Error saving request: {str(save_error)}"},
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -1197,15 +1173,15 @@ class CollaborationRequestView(APIView):
 
             # Create response
             sender_type = 'artist' if sender_is_artist else 'producer'
-            logger.info(f"Collaboration request created: {sender_type} {request.user.username} to {receiver_type} {receiver.username}")
+            logger.info("Collaboration request created: %s %s to %s %s", sender_type, request.user.username, receiver_type, receiver.username)
 
             # Use serializer to return response data
             serializer = CollaborationRequestSerializer(collab_request)
-            logger.info(f"==== END CREATING COLLABORATION REQUEST ====")
+            logger.info("==== END CREATING COLLABORATION REQUEST ====")
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         except Exception as e:
-            logger.error(f"Collaboration Request Error: {str(e)}")
+            logger.error("Collaboration Request Error: %s", e)
             return Response(
                 {"error": "An error occurred while creating the collaboration request."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -1213,49 +1189,25 @@ class CollaborationRequestView(APIView):
 
     def get(self, request):
         try:
-            # Debug user information
-            logger.info(f"==== COLLABORATION REQUESTS DEBUG ====")
-            logger.info(f"User requesting collaboration requests: {request.user.username} (ID: {request.user.id})")
-            user_is_artist = isinstance(request.user, Artist)
-            logger.info(f"User type: {'Artist' if user_is_artist else 'Producer'}")
-
-            # Find requests that involve this user (both sent and received)
-            # For improved performance, we'll build the query specifically for the user type
-            if user_is_artist:
-                logger.info(f"Fetching collaboration requests for artist: {request.user.username}")
-                # This user is an artist, so look at sender_artist and receiver_artist
-                sent_requests = CollaborationRequest.objects.filter(sender_artist=request.user)
-                received_requests = CollaborationRequest.objects.filter(receiver_artist=request.user)
-            else:
-                logger.info(f"Fetching collaboration requests for producer: {request.user.username}")
-                # This user is a producer, so look at sender_producer and receiver_producer
-                sent_requests = CollaborationRequest.objects.filter(sender_producer=request.user)
-                received_requests = CollaborationRequest.objects.filter(receiver_producer=request.user)
-
-            # Debug the queries
-            logger.info(f"Sent requests query: {sent_requests.query}")
-            logger.info(f"Sent requests count: {sent_requests.count()}")
-            for req in sent_requests:
-                receiver = req.receiver_artist or req.receiver_producer
-                logger.info(f"  - Sent to: {receiver.username if receiver else 'Unknown'}, status: {req.status}")
-
-            logger.info(f"Received requests query: {received_requests.query}")
-            logger.info(f"Received requests count: {received_requests.count()}")
-            for req in received_requests:
-                sender = req.sender_artist or req.sender_producer
-                logger.info(f"  - Received from: {sender.username if sender else 'Unknown'}, status: {req.status}")
-
-            # Get all requests involving this user
-            all_requests = sent_requests.union(received_requests).order_by('-created_at')
-            logger.info(f"Total unique requests: {all_requests.count()}")
-
-            # Format the response
-            sent_data = CollaborationRequestSerializer(sent_requests, many=True).data
-            received_data = CollaborationRequestSerializer(received_requests, many=True).data
+            user_type = 'artist' if isinstance(request.user, Artist) else 'producer'
+            logger.info("Fetching collaboration requests for %s: %s", user_type, request.user.username)
+
+            # One indexed query over the user's participant rows covers both
+            # sent and received requests
+            rows = list(requests_for(user_type, request.user.id))
+            all_requests = []
+            roles = {}
+            for row in rows:
+                if row.request_id not in roles:
+                    all_requests.append(row.request)
+                roles.setdefault(row.request_id, set()).add(row.role)
+
+            # Serialize each request once, with every participant bulk-loaded
             all_data = CollaborationRequestSerializer(all_requests, many=True).data
+            sent_data = [item for item in all_data if 'sender' in roles[item['id']]]
+            received_data = [item for item in all_data if 'receiver' in roles[item['id']]]
 
-            logger.info(f"Response data counts - sent: {len(sent_data)}, received: {len(received_data)}, all: {len(all_data)}")
-            logger.info(f"==== END COLLABORATION REQUESTS DEBUG ====")
+            logger.info("Response data counts - sent: %s, received: %s, all: %s", len(sent_data), len(received_data), len(all_data))
 
             # Return the response with sent, received, and all requests
             return Response({
@@ -1265,7 +1217,7 @@ class CollaborationRequestView(APIView):
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
-            logger.error(f"Get Collaboration Requests Error: {str(e)}")
+            logger.error("Get Collaboration Requests Error: %s", e)
             return Response(
                 {"error": "An error occurred while fetching collaboration requests."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -1282,13 +1234,13 @@ class CollaborationRequestView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            logger.info(f"Attempting to delete collaboration request with ID: {request_id}")
+            logger.info("Attempting to delete collaboration request with ID: %s", request_id)
 
             # Find the collaboration request
             try:
                 collab_request = CollaborationRequest.objects.get(id=request_id)
             except CollaborationRequest.DoesNotExist:
-                logger.warning(f"Collaboration request not found with ID: {request_id}")
+                logger.warning("Collaboration request not found with ID: %s", request_id)
                 return Response(
                     {"error": f"Collaboration request with ID {request_id} not found"},
                     status=status.HTTP_404_NOT_FOUND
@@ -1312,7 +1264,7 @@ class CollaborationRequestView(APIView):
                 user_is_receiver = True
 
             if not (user_is_sender or user_is_receiver):
-                logger.warning(f"User {current_user.username} attempted to delete a request they're not involved in: {request_id}")
+                logger.warning("User %s attempted to delete a request they're not involved in: %s", current_user.username, request_id)
                 return Response(
                     {"error": "You don't have permission to delete this collaboration request"},
                     status=status.HTTP_403_FORBIDDEN
@@ -1320,14 +1272,14 @@ class CollaborationRequestView(APIView):
 
             # Delete the collaboration request
             collab_request.delete()
-            logger.info(f"Successfully deleted collaboration request {request_id}")
+            logger.info("Successfully deleted collaboration request %s", request_id)
 
             # Also delete any related notifications
             if user_is_sender or user_is_receiver:
                 notifications = Notification.objects.filter(related_id=request_id)
                 count = notifications.count()
                 notifications.delete()
-                logger.info(f"Deleted {count} notifications related to collaboration request {request_id}")
+                logger.info("Deleted %s notifications related to collaboration request %s", count, request_id)
 
             return Response(
                 {"success": True, "message": f"Collaboration request with ID {request_id} has been deleted"},
@@ -1335,13 +1287,70 @@ class CollaborationRequestView(APIView):
             )
 
         except Exception as e:
-            logger.error(f"Error deleting collaboration request: {str(e)}")
+            logger.error("Error deleting collaboration request: %s", e)
             return Response(
                 {"error": f"An error occurred while deleting the collaboration request: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
 
+class CollaborationInboxPagination(KeysetPagination):
+    page_size = 20
+    max_page_size = 100
+
+
+class CollaborationInboxView(APIView):
+    """
+    Cursor-paginated list of the user's collaboration requests, newest first.
+
+    Query parameters:
+      role      'sent', 'received' or 'all' (default)
+      status    one or more of pending/accepted/rejected, comma separated
+      cursor    next_cursor of the previous page
+      page_size default 20, max 100
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def get(self, request):
+        role = request.query_params.get('role', 'all').lower()
+        if role not in ('all', *COLLABORATION_ROLE_FILTERS):
+            return Response(
+                {"error": "Invalid role. Must be 'sent', 'received' or 'all'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        statuses = [value.strip().lower() for value in request.query_params.get('status', '').split(',') if value.strip()]
+        invalid = [value for value in statuses if value not in COLLABORATION_STATUSES]
+        if invalid:
+            return Response(
+                {"error": f"Invalid status: {', '.join(invalid)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            user_type = 'artist' if isinstance(request.user, Artist) else 'producer'
+            rows = requests_for(user_type, request.user.id, role=role, statuses=statuses)
+
+            paginator = CollaborationInboxPagination()
+            page = paginator.paginate_queryset(rows, request, view=self)
+
+            data = CollaborationRequestSerializer([row.request for row in page], many=True).data
+            for item, row in zip(data, page):
+                item['role'] = row.role
+
+            return paginator.get_paginated_response(data)
+
+        except NotFound:
+            raise
+        except Exception as e:
+            logger.error("CollaborationInboxView Error: %s", e)
+            return Response(
+                {"error": "An error occurred while fetching collaboration requests."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class CollaborationRequestActionView(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]
@@ -1350,95 +1359,264 @@ class CollaborationRequestActionView(APIView):
         try:
             action = request.data.get('action', '').lower()
             if action not in ['accept', 'reject']:
-                logger.warning(f"Invalid action attempted: {action}")
+                logger.warning("Invalid action attempted: %s", action)
                 return Response(
                     {"error": "Invalid action. Must be 'accept' or 'reject'"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Get the collaboration request
-            try:
-                collab_request = CollaborationRequest.objects.get(id=request_id)
-            except CollaborationRequest.DoesNotExist:
-                logger.error(f"Collaboration request not found: {request_id}")
-                return Response(
-                    {"error": f"Collaboration request not found with ID {request_id}"},
-                    status=status.HTTP_404_NOT_FOUND
-                )
-
-            # Verify the current user is the intended receiver
             current_user = request.user
             is_artist = isinstance(current_user, Artist)
+            new_status = 'accepted' if action == 'accept' else 'rejected'
 
-            # Check if the current user is the receiver of this request
-            is_receiver = False
-            if is_artist and collab_request.receiver_artist == current_user:
-                is_receiver = True
-            elif not is_artist and collab_request.receiver_producer == current_user:
-                is_receiver = True
-
-            # Ensure only the receiver can accept/reject requests
-            if not is_receiver:
-                logger.warning(f"User {current_user.username} attempted to action a request they didn't receive: {request_id}")
-                return Response(
-                    {"error": "You can only respond to collaboration requests sent to you"},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-
-            # Update the request status based on the action
-            collab_request.status = 'accepted' if action == 'accept' else 'rejected'
-            collab_request.updated_at = timezone.now()
-            collab_request.save()
-
-            logger.info(f"Collaboration request {request_id} {action}ed by {current_user.username}")
-
-            # If request is accepted, increment collaboration count for both users
-            if action == 'accept':
-                # Get sender and receiver
-                sender = collab_request.sender_artist or collab_request.sender_producer
-                receiver = collab_request.receiver_artist or collab_request.receiver_producer
+            with transaction.atomic():
+                # Lock the request so concurrent accept/reject calls are applied one at a time
+                try:
+                    collab_request = CollaborationRequest.objects.select_for_update().get(id=request_id)
+                except CollaborationRequest.DoesNotExist:
+                    logger.error("Collaboration request not found: %s", request_id)
+                    return Response(
+                        {"error": f"Collaboration request not found with ID {request_id}"},
+                        status=status.HTTP_404_NOT_FOUND
+                    )
 
-                if sender and receiver:
-                    # Increment collaboration counts
-                    sender.collaboration_count += 1
-                    receiver.collaboration_count += 1
+                # Check if the current user is the receiver of this request
+                if is_artist:
+                    is_receiver = collab_request.receiver_artist_id == current_user.id
+                else:
+                    is_receiver = collab_request.receiver_producer_id == current_user.id
 
-                    # Save changes
-                    sender.save(update_fields=['collaboration_count'])
-                    receiver.save(update_fields=['collaboration_count'])
+                # Ensure only the receiver can accept/reject requests
+                if not is_receiver:
+                    logger.warning("User %s attempted to action a request they didn't receive: %s", current_user.username, request_id)
+                    return Response(
+                        {"error": "You can only respond to collaboration requests sent to you"},
+                        status=status.HTTP_403_FORBIDDEN
+                    )
 
-                    logger.info(f"Incremented collaboration counts for {sender.username} and {receiver.username}")
+                # Repeating the same action (e.g. a retried accept) changes nothing
+                if collab_request.status != new_status:
+                    previous_status = collab_request.status
+                    CollaborationRequest.objects.filter(id=collab_request.id).update(
+                        status=new_status, updated_at=timezone.now()
+                    )
+                    sync_status([collab_request.id], new_status)
+                    # Accepted requests and collaboration counts show on both profiles
+                    invalidate(
+                        PROFILES_TAG,
+                        user_tag(collab_request.sender_artist_id or collab_request.sender_producer_id),
+                        user_tag(collab_request.receiver_artist_id or collab_request.receiver_producer_id),
+                    )
+                    logger.info("Collaboration request %s %sed by %s", request_id, action, current_user.username)
 
-            # Create a notification for the sender
-            sender = collab_request.sender_artist or collab_request.sender_producer
-            if sender:
-                # Determine which notification model to use based on sender type
-                notification = Notification()
-                if isinstance(sender, Artist):
-                    notification.artist = sender
+                    # If request is accepted, increment collaboration count for both users
+                    has_both = (
+                        (collab_request.sender_artist_id or collab_request.sender_producer_id)
+                        and (collab_request.receiver_artist_id or collab_request.receiver_producer_id)
+                    )
+                    if new_status == 'accepted' and previous_status != 'accepted' and has_both:
+                        artist_ids = [i for i in (collab_request.sender_artist_id, collab_request.receiver_artist_id) if i]
+                        producer_ids = [i for i in (collab_request.sender_producer_id, collab_request.receiver_producer_id) if i]
+                        # F() increments are applied by the database, so concurrent accepts can't lose updates
+                        if artist_ids:
+                            Artist.objects.filter(id__in=artist_ids).update(collaboration_count=F('collaboration_count') + 1)
+                        if producer_ids:
+                            Producer.objects.filter(id__in=producer_ids).update(collaboration_count=F('collaboration_count') + 1)
+                        logger.info("Incremented collaboration counts for request %s", request_id)
+
+                    # Create a notification for the sender
+                    if collab_request.sender_artist_id or collab_request.sender_producer_id:
+                        fan_out([Notification(
+                            artist_id=collab_request.sender_artist_id,
+                            producer_id=collab_request.sender_producer_id,
+                            notification_type='collaboration_update',
+                            message=f"Your collaboration request to {current_user.username} has been {action}ed",
+                            related_id=collab_request.id,
+                        )])
+                        logger.info("Created notification about collaboration request %s %s", request_id, action)
                 else:
-                    notification.producer = sender
+                    logger.info("Collaboration request %s already %s", request_id, new_status)
 
-                # Set notification details
-                notification.notification_type = 'collaboration_update'
-                notification.message = f"Your collaboration request to {current_user.username} has been {action}ed"
-                notification.related_id = collab_request.id
-                notification.save()
-
-                logger.info(f"Created notification for {sender.username} about collaboration request {action}")
+            # Reload with both parties for the response (counters included)
+            collab_request = CollaborationRequest.objects.select_related(
+                'sender_artist', 'sender_producer', 'receiver_artist', 'receiver_producer'
+            ).get(id=request_id)
 
             # Return the updated collaboration request
             serializer = CollaborationRequestSerializer(collab_request)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         except Exception as e:
-            logger.error(f"CollaborationRequestActionView Error: {str(e)}")
+            logger.error("CollaborationRequestActionView Error: %s", e)
             return Response(
                 {"error": "An error occurred while processing the collaboration request action"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
 
+def follow_state_for(request, user_type, user_id):
+    """Whether the requesting user follows the given user (False when anonymous)"""
+    viewer = viewer_of(request)
+    if viewer is None:
+        return False
+    return (user_type, user_id) in following_set(*viewer, [(user_type, user_id)])
+
+
+def serialize_users(users, request, follow_state=None):
+    """Serialize a mixed list of artists and producers with one follow state lookup"""
+    viewer = viewer_of(request)
+    if follow_state is None and viewer is not None:
+        follow_state = following_set(*viewer, [(get_user_type(user), user.id) for user in users])
+    context = {'request': request, 'follow_state': follow_state if follow_state is not None else set()}
+    return [
+        (ArtistSerializer if isinstance(user, Artist) else ProducerSerializer)(user, context=context).data
+        for user in users
+    ]
+
+
+class FollowView(APIView):
+    """
+    POST follows the given user, DELETE unfollows them. Both are idempotent
+    and return the new follow state and the target's follower count.
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def post(self, request, user_type, user_id):
+        return self.change(request, user_type, user_id, following=True)
+
+    def delete(self, request, user_type, user_id):
+        return self.change(request, user_type, user_id, following=False)
+
+    def change(self, request, user_type, user_id, following):
+        model = FOLLOW_USER_MODELS.get(user_type)
+        if model is None:
+            return Response({"error": "user_type must be 'artist' or 'producer'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        viewer_type, viewer_id = viewer_of(request)
+        if (viewer_type, viewer_id) == (user_type, user_id):
+            return Response({"error": "You cannot follow yourself"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            if not model.objects.filter(id=user_id).exists():
+                return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+
+            if following:
+                changed = follow(viewer_type, viewer_id, user_type, user_id)
+            else:
+                changed = unfollow(viewer_type, viewer_id, user_type, user_id)
+            logger.info("FollowView: %s %s %s %s %s (changed: %s)", viewer_type, viewer_id, 'followed' if following else 'unfollowed', user_type, user_id, changed)
+
+            followers_count = model.objects.filter(id=user_id).values_list('followers_count', flat=True).first()
+            return Response({
+                "following": following,
+                "changed": changed,
+                "followers_count": followers_count,
+            }, status=status.HTTP_201_CREATED if following and changed else status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error("FollowView Error: %s", e)
+            return Response(
+                {"error": "An error occurred while updating the follow."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class FollowListPagination(KeysetPagination):
+    page_size = 20
+    max_page_size = 100
+
+
+class FollowListView(APIView):
+    """
+    Cursor-paginated followers of a user, or the users they follow, newest
+    first, each with the requesting user's follow state.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = [CustomJWTAuthentication]  # Allow authentication but don't require it
+
+    def get(self, request, user_type, user_id, direction):
+        if user_type not in FOLLOW_USER_MODELS:
+            return Response({"error": "user_type must be 'artist' or 'producer'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            if direction == 'followers':
+                edges, side = followers_of(user_type, user_id), 'follower'
+            else:
+                edges, side = following_of(user_type, user_id), 'followee'
+
+            paginator = FollowListPagination()
+            page = paginator.paginate_queryset(edges, request, view=self)
+
+            pairs = [(getattr(edge, f'{side}_type'), getattr(edge, f'{side}_id')) for edge in page]
+            loaded = load_users(pairs)
+            # Edges of deleted users are skipped
+            users = [loaded[pair] for pair in pairs if pair in loaded]
+            return paginator.get_paginated_response(serialize_users(users, request))
+
+        except NotFound:
+            raise
+        except Exception as e:
+            logger.error("FollowListView Error: %s", e)
+            return Response(
+                {"error": f"An error occurred while fetching {direction}."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class FollowStatusView(APIView):
+    """
+    Batch follow check: GET ?users=artist:12,producer:1000003 returns, for
+    each user, whether the requesting user follows them and whether they
+    follow back. Two indexed queries regardless of the number of users.
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication]
+    max_users = 100
+
+    def get(self, request):
+        targets = []
+        for value in request.query_params.get('users', '').split(','):
+            if not value.strip():
+                continue
+            user_type, _, user_id = value.strip().partition(':')
+            if user_type not in FOLLOW_USER_MODELS or not user_id.isdigit():
+                return Response(
+                    {"error": f"Invalid user '{value}'. Use user_type:id, e.g. artist:12"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            targets.append((user_type, int(user_id)))
+
+        if not targets:
+            return Response({"error": "users is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(targets) > self.max_users:
+            return Response({"error": f"At most {self.max_users} users per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            viewer = viewer_of(request)
+            following = following_set(*viewer, targets)
+            followed_by = followed_by_set(*viewer, targets)
+            return Response({
+                "results": [
+                    {
+                        "user_type": user_type,
+                        "id": user_id,
+                        "following": (user_type, user_id) in following,
+                        "followed_by": (user_type, user_id) in followed_by,
+                        "mutual": (user_type, user_id) in following and (user_type, user_id) in followed_by,
+                    }
+                    for user_type, user_id in targets
+                ]
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error("FollowStatusView Error: %s", e)
+            return Response(
+                {"error": "An error occurred while checking follow status."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 # Add this after CollaborationRequestActionView
 class TestCollaborationRequestsView(APIView):
     permission_classes = [AllowAny]  # Allow without authentication for testing
@@ -1493,7 +1671,7 @@ class TestCollaborationRequestsView(APIView):
             return Response(results, status=status.HTTP_200_OK)
 
         except Exception as e:
-            logger.error(f"Test Collaboration Requests Error: {str(e)}")
+            logger.error("Test Collaboration Requests Error: %s", e)
             return Response({
                 "error": str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1557,82 +1735,86 @@ class TestCollaborationRequestsView(APIView):
             }, status=status.HTTP_201_CREATED)
 
         except Exception as e:
-            logger.error(f"Test Create Collaboration Request Error: {str(e)}")
+            logger.error("Test Create Collaboration Request Error: %s", e)
             return Response({
                 "error": str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-# Notification pagination class
+# Notification pagination class (legacy page-number clients)
 class NotificationPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+
+# Keyset pagination on (created_at, id) for the notification inbox
+class NotificationInboxPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    max_page_size = 100
+
+
 # Get and update notifications
 class NotificationView(APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication, CustomJWTAuthentication]  # Add both authentication classes for compatibility
-    pagination_class = NotificationPagination
-
+    # CustomJWTAuthentication first so request.user is the Artist/Producer itself;
+    # JWTAuthentication stays as a fallback for compatibility
+    authentication_classes = [CustomJWTAuthentication, JWTAuthentication]
+    pagination_class = NotificationInboxPagination
+    legacy_pagination_class = NotificationPagination
+    query_budget = {"GET": 6}  # Per page, however many notifications (see common.instrumentation)
+
+    # Every inbox change goes through publish_notification/publish_unread_count,
+    # which bump the tag; a refresh with nothing new is answered with a 304
+    @conditional_response(tags_version(lambda request, kwargs: [notifications_tag(request.user.id)]))
+    @read_from_replica(tags=lambda request, kwargs: [notifications_tag(request.user.id)])
     def get(self, request):
         try:
-            # Log authentication info for debugging
-            logger.info(f"NotificationView: Request received with auth: {request.auth}")
-            logger.info(f"NotificationView: User: {request.user}")
-            logger.info(f"NotificationView: User ID: {getattr(request.user, 'id', 'No ID')}")
-
-            # Get the user type and id from the token
             user_id = request.user.id
-            user_type = None
-
-            # Determine user type
-            if Producer.objects.filter(id=user_id).exists():
-                user_type = "producer"
-                logger.info(f"NotificationView: User is a producer with ID {user_id}")
-            elif Artist.objects.filter(id=user_id).exists():
-                user_type = "artist"
-                logger.info(f"NotificationView: User is an artist with ID {user_id}")
-            else:
-                logger.error(f"NotificationView: Could not determine user type for ID {user_id}")
+            user_type = get_user_type(request.user)
+            if not user_type:
+                logger.error("NotificationView: Could not determine user type for ID %s", user_id)
                 return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
-            # Query notifications based on user type
-            if user_type == "producer":
-                notifications = Notification.objects.filter(producer_id=user_id)
-            else:  # artist
-                notifications = Notification.objects.filter(artist_id=user_id)
-
-            logger.info(f"NotificationView: Found {notifications.count()} notifications for {user_type} with ID {user_id}")
-
-            # Log all notifications for debugging
-            for notification in notifications:
-                logger.info(f"NotificationView: Notification {notification.id}: {notification.notification_type} - {notification.message}")
+            notifications = notifications_for(user_type, user_id)
 
             # Get notification type filter if provided
             notification_type = request.query_params.get('type')
             if notification_type:
                 notifications = notifications.filter(notification_type=notification_type)
-                logger.info(f"NotificationView: Filtered by type {notification_type}, now have {notifications.count()} notifications")
 
             # Get unread filter if provided
             unread_only = request.query_params.get('unread')
             if unread_only and unread_only.lower() == 'true':
                 notifications = notifications.filter(read=False)
-                logger.info(f"NotificationView: Filtered by unread, now have {notifications.count()} notifications")
 
-            # Apply pagination
+            # Older clients page with ?page=N and expect a total count
+            if 'page' in request.query_params:
+                paginator = self.legacy_pagination_class()
+                paginated_notifications = paginator.paginate_queryset(notifications, request)
+                serializer = NotificationSerializer(paginated_notifications, many=True, context={'request': request})
+                return paginator.get_paginated_response(serializer.data)
+
+            # Keyset pagination: no COUNT, no OFFSET
             paginator = self.pagination_class()
             paginated_notifications = paginator.paginate_queryset(notifications, request)
 
+            # Fold older per-like/per-comment rows into "X and N others" entries
+            if request.query_params.get('group', 'true').lower() != 'false':
+                paginated_notifications = group_notifications(paginated_notifications)
+
             # Serialize notifications
             serializer = NotificationSerializer(paginated_notifications, many=True, context={'request': request})
 
-            # Return paginated response
-            return paginator.get_paginated_response(serializer.data)
+            data = paginator.get_paginated_data(serializer.data)
+            data['unread_count'] = get_unread_count(user_type, user_id)
+            return Response(data, status=status.HTTP_200_OK)
 
+        except NotFound:
+            raise
         except Exception as e:
-            logger.error(f"NotificationView Error: {str(e)}")
+            logger.error("NotificationView Error: %s", e)
             logger.error(traceback.format_exc())  # Log the full stack trace
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -1640,63 +1822,70 @@ class NotificationView(APIView):
         """Mark all notifications as read"""
         try:
             user_id = request.user.id
-            user_type = None
-
-            # Determine user type
-            if Producer.objects.filter(id=user_id).exists():
-                user_type = "producer"
-            elif Artist.objects.filter(id=user_id).exists():
-                user_type = "artist"
-            else:
+            user_type = get_user_type(request.user)
+            if not user_type:
                 return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
-            # Update all notifications to read based on user type
-            if user_type == "producer":
-                Notification.objects.filter(producer_id=user_id).update(read=True)
-            else:  # artist
-                Notification.objects.filter(artist_id=user_id).update(read=True)
+            # Update all unread notifications to read based on user type
+            notifications_for(user_type, user_id).filter(read=False).update(read=True)
+            reset_unread_count(user_type, user_id)
+            publish_unread_count(user_type, user_id)
 
             return Response({"message": "All notifications marked as read"}, status=status.HTTP_200_OK)
 
         except Exception as e:
-            logger.error(f"Error marking notifications as read: {str(e)}")
+            logger.error("Error marking notifications as read: %s", e)
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# Unread notification badge
+class NotificationUnreadCountView(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication, JWTAuthentication]
+
+    def get(self, request):
+        user_type = get_user_type(request.user)
+        if not user_type:
+            return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        # Served from the cached counter; only a cold cache hits the database
+        return Response(
+            {"unread_count": get_unread_count(user_type, request.user.id)},
+            status=status.HTTP_200_OK
+        )
+
+
 # Mark a single notification as read
 class MarkNotificationReadView(APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication, CustomJWTAuthentication]
+    authentication_classes = [CustomJWTAuthentication, JWTAuthentication]
 
     def post(self, request, notification_id):
         try:
-            # Log authentication info for debugging
-            logger.info(f"MarkNotificationReadView: User ID: {getattr(request.user, 'id', 'No ID')}")
-
             user_id = request.user.id
+            user_type = get_user_type(request.user)
 
-            # Find the notification and ensure it belongs to this user
-            notification = None
-            try:
-                # Check if user is a producer
-                if Producer.objects.filter(id=user_id).exists():
-                    notification = Notification.objects.get(id=notification_id, producer_id=user_id)
-                    logger.info(f"MarkNotificationReadView: Found notification for producer {user_id}")
-                # Check if user is an artist
-                elif Artist.objects.filter(id=user_id).exists():
-                    notification = Notification.objects.get(id=notification_id, artist_id=user_id)
-                    logger.info(f"MarkNotificationReadView: Found notification for artist {user_id}")
-            except Notification.DoesNotExist:
-                logger.warning(f"MarkNotificationReadView: Notification {notification_id} not found for user {user_id}")
+            # Grouped inbox entries can mark all of their folded notifications at once
+            ids = {notification_id}
+            grouped_ids = request.data.get('grouped_ids') or []
+            if isinstance(grouped_ids, list):
+                ids.update(int(i) for i in grouped_ids if str(i).isdigit())
+
+            # Mark as read, scoped to this user's notifications; only an
+            # actual unread -> read transition moves the badge
+            notifications = notifications_for(user_type, user_id).filter(id__in=ids) if user_type else None
+            marked = notifications.filter(read=False).update(read=True) if notifications is not None else 0
+
+            if not marked and (notifications is None or not notifications.exists()):
+                logger.warning("MarkNotificationReadView: Notification %s not found for user %s", notification_id, user_id)
                 return Response(
                     {"error": "Notification not found or you don't have permission to access it"},
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # Mark as read
-            notification.read = True
-            notification.save()
-            logger.info(f"MarkNotificationReadView: Marked notification {notification_id} as read")
+            if marked:
+                adjust_unread_count(user_type, user_id, -marked)
+                publish_unread_count(user_type, user_id, -marked)
 
             return Response(
                 {"success": True, "message": "Notification marked as read"},
@@ -1704,7 +1893,7 @@ class MarkNotificationReadView(APIView):
             )
 
         except Exception as e:
-            logger.error(f"MarkNotificationReadView Error: {str(e)}")
+            logger.error("MarkNotificationReadView Error: %s", e)
             logger.error(traceback.format_exc())
             return Response(
                 {"error": f"Failed to mark notification as read: {str(e)}"},
@@ -1715,36 +1904,25 @@ class MarkNotificationReadView(APIView):
 # Delete a notification
 class DeleteNotificationView(APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication, CustomJWTAuthentication]
+    authentication_classes = [CustomJWTAuthentication, JWTAuthentication]
 
     def delete(self, request, notification_id):
         try:
-            # Log authentication info for debugging
-            logger.info(f"DeleteNotificationView: User ID: {getattr(request.user, 'id', 'No ID')}")
-
             user_id = request.user.id
+            user_type = get_user_type(request.user)
 
             # Find the notification and ensure it belongs to this user
-            notification = None
-            try:
-                # Check if user is a producer
-                if Producer.objects.filter(id=user_id).exists():
-                    notification = Notification.objects.get(id=notification_id, producer_id=user_id)
-                    logger.info(f"DeleteNotificationView: Found notification for producer {user_id}")
-                # Check if user is an artist
-                elif Artist.objects.filter(id=user_id).exists():
-                    notification = Notification.objects.get(id=notification_id, artist_id=user_id)
-                    logger.info(f"DeleteNotificationView: Found notification for artist {user_id}")
-            except Notification.DoesNotExist:
-                logger.warning(f"DeleteNotificationView: Notification {notification_id} not found for user {user_id}")
+            notification = notifications_for(user_type, user_id).filter(id=notification_id).first() if user_type else None
+            if notification is None:
+                logger.warning("DeleteNotificationView: Notification %s not found for user %s", notification_id, user_id)
                 return Response(
                     {"error": "Notification not found or you don't have permission to delete it"},
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # Delete the notification
+            # Delete the notification (the post_delete signal updates the unread badge)
             notification.delete()
-            logger.info(f"DeleteNotificationView: Deleted notification {notification_id}")
+            logger.info("DeleteNotificationView: Deleted notification %s", notification_id)
 
             return Response(
                 {"success": True, "message": "Notification deleted successfully"},
@@ -1752,7 +1930,7 @@ class DeleteNotificationView(APIView):
             )
 
         except Exception as e:
-            logger.error(f"DeleteNotificationView Error: {str(e)}")
+            logger.error("DeleteNotificationView Error: %s", e)
             logger.error(traceback.format_exc())
             return Response(
                 {"error": f"Failed to delete notification: {str(e)}"},
@@ -1797,11 +1975,8 @@ class GoogleLoginView(APIView):
                     return Response({'error': 'Email not provided by Google'}, status=status.HTTP_400_BAD_REQUEST)
 
                 # Check if user exists
-                artist_user = Artist.objects.filter(email=email).first()
-                producer_user = Producer.objects.filter(email=email).first()
-
                 # For simplicity, we'll prioritize Artist accounts over Producer accounts
-                user = artist_user or producer_user
+                user, _ = find_user_by_email(email)
 
                 if not user:
                     # User doesn't exist, create a new one